@@ -0,0 +1,110 @@
+#!/usr/bin/python
+#
+# Copyright (c) 2017 Cable Television Laboratories, Inc. ("CableLabs")
+#                    and others.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# This script runs the benchmarks of a YAML file against the OpenStack cloud
+# of its connection or an in-process stand-in cloud and reports the seconds
+# to active and to SSH as p50/p95/p99, the API calls per resource and the
+# number of resources created per second at each concurrency level.
+import argparse
+import logging
+import os
+
+from snaps import file_utils
+from snaps.openstack import fake_cloud
+from snaps.openstack.benchmark import BenchmarkRunner, BenchmarkSettings
+from snaps.openstack.os_credentials import OSCreds, ProxySettings
+
+__author__ = 'spisarski'
+
+logger = logging.getLogger('benchmark_runner')
+
+# The credentials of the admin user every FakeCloud is seeded with
+FAKE_CLOUD_CREDS = {'username': 'admin', 'password': 'admin',
+                    'auth_url': 'http://localhost:5000/v3',
+                    'project_name': 'admin'}
+
+
+def __get_os_creds(config):
+    """
+    Returns the credentials of the connection in the benchmark file
+    :param config: the dict read from the benchmark file
+    :return: an OSCreds instance
+    """
+    connection = dict(config.get('openstack', dict()).get('connection') or
+                      dict())
+    if not connection:
+        raise Exception('Invalid connection configuration')
+    if connection.get('proxy_settings'):
+        connection['proxy_settings'] = ProxySettings(
+            **connection['proxy_settings'])
+    return OSCreds(**connection)
+
+
+def main(arguments):
+    log_level = logging.INFO
+    if arguments.log_level != 'INFO':
+        log_level = logging.DEBUG
+    logging.basicConfig(level=log_level)
+
+    config = file_utils.read_yaml(arguments.benchmark_file)
+    if arguments.fake_cloud:
+        fake_cloud.install(fake_cloud.create_cloud(
+            file_utils.read_yaml(arguments.fake_cloud) or dict()))
+        os_creds = OSCreds(**FAKE_CLOUD_CREDS)
+    else:
+        os_creds = __get_os_creds(config)
+
+    runner = BenchmarkRunner(os_creds)
+    for benchmark_config in config.get('benchmarks', list()):
+        settings = BenchmarkSettings(**benchmark_config.get('benchmark'))
+        if settings.template_path:
+            settings.template_path = os.path.join(
+                os.path.dirname(os.path.abspath(arguments.benchmark_file)),
+                settings.template_path)
+        logger.info('Running benchmark %s', settings.name)
+        runner.run(settings)
+
+    print(runner.summary())
+    if arguments.output_file:
+        runner.write(arguments.output_file)
+        logger.info('Wrote the results to %s', arguments.output_file)
+
+    failures = sum(len(result.failures) for result in runner.get_results())
+    if failures:
+        logger.error('%d benchmarked resources failed', failures)
+        exit(1)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '-b', '--benchmark-file', dest='benchmark_file', required=True,
+        help='YAML file with the OpenStack connection and the benchmarks to '
+             'run - REQUIRED')
+    parser.add_argument(
+        '-o', '--output', dest='output_file',
+        help='File to which the results are written as JSON')
+    parser.add_argument(
+        '-f', '--fake-cloud', dest='fake_cloud',
+        help='YAML file configuring an in-process stand-in cloud against '
+             'which the benchmarks are run rather than OpenStack')
+    parser.add_argument(
+        '-l', '--log-level', dest='log_level', default='INFO',
+        help='Logging Level (INFO|DEBUG)')
+    args = parser.parse_args()
+
+    main(args)
@@ -0,0 +1,136 @@
+#!/usr/bin/python
+#
+# Copyright (c) 2017 Cable Television Laboratories, Inc. ("CableLabs")
+#                    and others.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# This script compares the CPU cost of the two ways a local image file can be
+# handed to the glance client for upload: a regular file object and a
+# snaps.file_utils.MappedFileReader. Both are uploaded with the v2 client's
+# images.upload() to a local HTTP server, run in another process, that
+# discards the request body, so the measured path is the one real uploads
+# take through glanceclient, requests and urllib3. A sparse file is used so
+# the comparison is not dominated by disk reads.
+import argparse
+import logging
+import multiprocessing
+import os
+import socket
+import tempfile
+import time
+
+from glanceclient import client as glance_client
+from six.moves import BaseHTTPServer
+
+from snaps import file_utils
+
+__author__ = 'spisarski'
+
+logger = logging.getLogger('image_upload_benchmark')
+
+
+class DiscardingHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """
+    Reads and discards the chunked body of each PUT request
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def do_PUT(self):
+        while True:
+            size = int(self.rfile.readline().split(b';')[0], 16)
+            remaining = size + 2
+            while remaining:
+                remaining -= len(self.rfile.read(min(remaining, 1 << 20)))
+            if not size:
+                break
+        self.send_response(204)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def __serve(server_socket):
+    """
+    Serves the upload requests on the listening socket
+    """
+    server = BaseHTTPServer.HTTPServer(
+        server_socket.getsockname(), DiscardingHandler,
+        bind_and_activate=False)
+    server.socket = server_socket
+    server.serve_forever()
+
+
+def __upload(glance, body):
+    """
+    Uploads body with the glance client and returns the (cpu, wall) seconds
+    spent by this process
+    """
+    cpu_start = time.process_time()
+    wall_start = time.time()
+    glance.images.upload('benchmark', body)
+    return time.process_time() - cpu_start, time.time() - wall_start
+
+
+def main(arguments):
+    logging.basicConfig(level=logging.INFO)
+    size = int(float(arguments.size_gb) * 1024 * 1024 * 1024)
+    chunk_size = int(float(arguments.chunk_mb) * 1024 * 1024)
+
+    server_socket = socket.socket()
+    server_socket.bind(('127.0.0.1', 0))
+    server_socket.listen(5)
+    server = multiprocessing.Process(target=__serve, args=(server_socket,))
+    server.daemon = True
+    server.start()
+    glance = glance_client.Client(
+        '2', endpoint='http://127.0.0.1:%d' % server_socket.getsockname()[1],
+        token='benchmark')
+
+    fd, sparse_path = tempfile.mkstemp(
+        dir=arguments.tmp_dir, suffix='.qcow2')
+    try:
+        os.ftruncate(fd, size)
+        os.close(fd)
+
+        with open(sparse_path, 'rb') as file_obj:
+            file_cpu, file_wall = __upload(glance, file_obj)
+        with file_utils.MappedFileReader(sparse_path, chunk_size) as reader:
+            mapped_cpu, mapped_wall = __upload(glance, reader)
+
+        logger.info('Uploaded %.2f GB sparse file', size / 1024.0 ** 3)
+        logger.info('  file object      cpu %7.3fs  wall %7.3fs',
+                    file_cpu, file_wall)
+        logger.info('  MappedFileReader cpu %7.3fs  wall %7.3fs',
+                    mapped_cpu, mapped_wall)
+    finally:
+        os.remove(sparse_path)
+        server.terminate()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '-s', '--size-gb', dest='size_gb', default='2',
+        help='Size of the sparse file in GB (default 2)')
+    parser.add_argument(
+        '-c', '--chunk-mb', dest='chunk_mb', default='8',
+        help='MappedFileReader chunk size in MB (default 8)')
+    parser.add_argument(
+        '-d', '--tmp-dir', dest='tmp_dir', default=None,
+        help='Directory in which to create the sparse file')
+    args = parser.parse_args()
+
+    main(args)
@@ -25,10 +25,12 @@ from jinja2 import Environment, FileSystemLoader
 import os
 import yaml
 
-from snaps import file_utils
+from snaps import api_metrics, file_utils, image_metrics, trace, waiter
 from snaps.openstack.create_flavor import FlavorSettings, OpenStackFlavor
 from snaps.openstack.create_image import ImageSettings, OpenStackImage
-from snaps.openstack.create_instance import VmInstanceSettings
+from snaps.openstack import deployment, fake_cloud, journal, plan
+from snaps.openstack.create_instance import (
+    VmInstanceSettings, OpenStackVmInstance)
 from snaps.openstack.create_keypairs import KeypairSettings, OpenStackKeypair
 from snaps.openstack.create_network import (
     PortSettings, NetworkSettings, OpenStackNetwork)
@@ -38,11 +40,11 @@ from snaps.openstack.create_router import RouterSettings, OpenStackRouter
 from snaps.openstack.create_security_group import (
     OpenStackSecurityGroup, SecurityGroupSettings)
 from snaps.openstack.create_user import OpenStackUser, UserSettings
-from snaps.openstack.create_volume import OpenStackVolume, VolumeSettings
+from snaps.openstack.create_volume import (
+    OpenStackVolumeGroup, VolumeSettings)
 from snaps.openstack.create_volume_type import (
     OpenStackVolumeType, VolumeTypeSettings)
 from snaps.openstack.os_credentials import OSCreds, ProxySettings
-from snaps.openstack.utils import deploy_utils
 from snaps.provisioning import ansible_utils
 
 __author__ = 'spisarski'
@@ -148,46 +150,154 @@ def __parse_ports_config(config):
     return out
 
 
-def __create_instances(os_creds_dict, creator_class, config_class, config,
-                       config_key, cleanup=False, os_users_dict=None):
+def __get_creds_dependencies(inst_config):
     """
-    Returns a dictionary of SNAPS creator objects where the key is the name
+    Returns the user and the project membership that must exist before a
+    resource configured with os_user credentials can be deployed
+    :param inst_config: the resource configuration
+    :return: a list of (resource type, name) tuples
+    """
+    out = list()
+    os_user_conf = inst_config.get('os_user')
+    if os_user_conf:
+        if os_user_conf.get('name'):
+            out.append((deployment.RES_USER, os_user_conf['name']))
+        if os_user_conf.get('project_name'):
+            out.append((deployment.RES_PROJECT_USERS,
+                        os_user_conf['project_name']))
+    return out
+
+
+def __get_action(cleanup):
+    """
+    Returns the function deploying a creator
+    :param cleanup: Denotes whether or not this is being called for cleanup
+    :return: the function
+    """
+    if cleanup:
+        return lambda creator: creator.initialize()
+    return lambda creator: creator.create()
+
+
+def __add_instances(graph, os_creds_dict, creator_class, config_class, config,
+                    config_key, cleanup=False, os_users_dict=None):
+    """
+    Adds a SNAPS creator object to the deployment graph for each configuration
+    :param graph: the DeploymentGraph object
     :param os_creds_dict: Dictionary of OSCreds objects where the key is the
                           name
     :param config: The list of configurations for the same type
-    :param config_key: The list of configurations for the same type
+    :param config_key: The list of configurations for the same type which is
+                       also the graph's resource type
     :param cleanup: Denotes whether or not this is being called for cleanup
-    :return: dictionary
+    :param os_users_dict: Dictionary of OpenStackUser objects where the key is
+                          the username
     """
-    out = {}
-
     if config:
         try:
             for config_dict in config:
                 inst_config = config_dict.get(config_key)
                 if inst_config:
+                    settings = config_class(**inst_config)
                     creator = creator_class(
                         __get_creds(os_creds_dict, os_users_dict, inst_config),
-                        config_class(**inst_config))
-
-                    if cleanup:
-                        creator.initialize()
-                    else:
-                        creator.create()
-                    out[inst_config['name']] = creator
-            logger.info('Created configured %s', config_key)
+                        settings)
+                    graph.add(config_key, inst_config['name'], creator,
+                              settings=settings,
+                              depends_on=__get_creds_dependencies(inst_config),
+                              action=__get_action(cleanup))
         except Exception as e:
             logger.error('Unexpected error instantiating creator [%s] '
                          'with exception %s', creator_class, e)
 
-    return out
+
+def __add_project_users(graph, projects_dict, users_dict):
+    """
+    Adds a node to the deployment graph for each project associating the
+    configured users to it once both have been created
+    :param graph: the DeploymentGraph object
+    :param projects_dict: Dictionary of OpenStackProject objects where the key
+                          is the name
+    :param users_dict: Dictionary of OpenStackUser objects where the key is
+                       the username
+    """
+    for project_name, project_creator in projects_dict.items():
+        user_creators = [users_dict[user_name] for user_name in
+                         project_creator.project_settings.users
+                         if user_name in users_dict]
+
+        def assoc_users(creator, user_creators=user_creators):
+            for user_creator in user_creators:
+                creator.assoc_user(user_creator.get_user())
+
+        # The settings are journaled so the users are associated again when
+        # the project or its users change
+        graph.add(deployment.RES_PROJECT_USERS, project_name, project_creator,
+                  settings=[project_creator.project_settings] + [
+                      user_creator.user_settings
+                      for user_creator in user_creators],
+                  depends_on=[(deployment.RES_PROJECT, project_name)] + [
+                      (deployment.RES_USER, user_creator.user_settings.name)
+                      for user_creator in user_creators],
+                  action=assoc_users)
+
+
+def __add_volume_groups(graph, os_creds_dict, volumes_config, cleanup=False,
+                        os_users_dict=None):
+    """
+    Adds an OpenStackVolumeGroup object to the deployment graph for each set
+    of credentials used by the configured volumes, so the volumes are created
+    and awaited concurrently rather than one after another
+    :param graph: the DeploymentGraph object
+    :param os_creds_dict: Dictionary of OSCreds objects where the key is the
+                          name
+    :param volumes_config: The list of volume configurations
+    :param cleanup: Denotes whether or not this is being called for cleanup
+    :param os_users_dict: Dictionary of OpenStackUser objects where the key is
+                          the username
+    """
+    if volumes_config:
+        try:
+            groups = dict()
+            for config_dict in volumes_config:
+                inst_config = config_dict.get('volume')
+                if inst_config:
+                    os_user = inst_config.get('os_user', dict())
+                    key = (os_user.get('name'), os_user.get('project_name'),
+                           inst_config.get('os_creds_name'))
+                    if key not in groups:
+                        groups[key] = (
+                            __get_creds(
+                                os_creds_dict, os_users_dict, inst_config),
+                            list(), __get_creds_dependencies(inst_config))
+                    groups[key][1].append(VolumeSettings(**inst_config))
+
+            def create_group(creator):
+                creator.create(block=True)
+                for name, seconds in sorted(
+                        creator.get_creation_times().items()):
+                    logger.info('Volume %s available in %.1f seconds',
+                                name, seconds)
+
+            for key, (os_creds, settings_list, creds_deps) in groups.items():
+                graph.add(
+                    deployment.RES_VOLUME_GROUP, key,
+                    OpenStackVolumeGroup(os_creds, settings_list),
+                    settings=settings_list, depends_on=creds_deps,
+                    action=create_group if not cleanup else __get_action(
+                        cleanup),
+                    aliases=[(deployment.RES_VOLUME, settings.name)
+                             for settings in settings_list])
+        except Exception as e:
+            logger.error('Unexpected error creating volumes - %s', e)
 
 
-def __create_vm_instances(os_creds_dict, os_users_dict, instances_config,
-                          image_dict, keypairs_dict, cleanup=False):
+def __add_vm_instances(graph, os_creds_dict, os_users_dict, instances_config,
+                       image_dict, keypairs_dict, cleanup=False):
     """
-    Returns a dictionary of OpenStackVmInstance objects where the key is the
-    instance name
+    Adds an OpenStackVmInstance object to the deployment graph for each
+    instance configuration
+    :param graph: the DeploymentGraph object
     :param os_creds_dict: Dictionary of OSCreds objects where the key is the
                           name
     :param os_users_dict: Dictionary of OpenStackUser objects where the key is
@@ -198,42 +308,40 @@ def __create_vm_instances(os_creds_dict, os_users_dict, instances_config,
     :param keypairs_dict: A dictionary of keypairs that will probably be used
                           to instantiate the VM instance
     :param cleanup: Denotes whether or not this is being called for cleanup
-    :return: dictionary
     """
-    vm_dict = {}
-
     if instances_config:
-        try:
-            for instance_config in instances_config:
-                conf = instance_config.get('instance')
-                if conf:
-                    if image_dict:
-                        image_creator = image_dict.get(conf.get('imageName'))
-                        if image_creator:
-                            instance_settings = VmInstanceSettings(
-                                **instance_config['instance'])
-                            kp_name = conf.get('keypair_name')
-                            vm_dict[conf[
-                                'name']] = deploy_utils.create_vm_instance(
-                                __get_creds(
-                                    os_creds_dict, os_users_dict, conf),
-                                instance_settings,
-                                image_creator.image_settings,
-                                keypair_creator=keypairs_dict[kp_name],
-                                init_only=cleanup)
-                        else:
-                            raise Exception('Image creator instance not found.'
-                                            ' Cannot instantiate')
-                    else:
-                        raise Exception('Image dictionary is None. Cannot '
-                                        'instantiate')
-                else:
+        for instance_config in instances_config:
+            conf = instance_config.get('instance')
+            try:
+                if not conf:
                     raise Exception('Instance configuration is None. Cannot '
                                     'instantiate')
-            logger.info('Created configured instances')
-        except Exception as e:
-            logger.error('Unexpected error creating VM instances - %s', e)
-    return vm_dict
+                if not image_dict:
+                    raise Exception('Image dictionary is None. Cannot '
+                                    'instantiate')
+                image_creator = image_dict.get(conf.get('imageName'))
+                if not image_creator:
+                    raise Exception('Image creator instance not found.'
+                                    ' Cannot instantiate')
+
+                instance_settings = VmInstanceSettings(**conf)
+                kp_name = conf.get('keypair_name')
+                kp_settings = None
+                if kp_name in keypairs_dict:
+                    kp_settings = keypairs_dict[kp_name].keypair_settings
+                creator = OpenStackVmInstance(
+                    __get_creds(os_creds_dict, os_users_dict, conf),
+                    instance_settings, image_creator.image_settings,
+                    kp_settings)
+                graph.add(
+                    deployment.RES_INSTANCE, conf['name'], creator,
+                    settings=instance_settings,
+                    depends_on=[(deployment.RES_IMAGE, conf['imageName']),
+                                (deployment.RES_KEYPAIR, kp_name)] +
+                    __get_creds_dependencies(conf),
+                    action=__get_action(cleanup))
+            except Exception as e:
+                logger.error('Unexpected error creating VM instances - %s', e)
 
 
 def __apply_ansible_playbooks(ansible_configs, os_creds_dict, vm_dict,
@@ -583,6 +691,19 @@ def main(arguments):
 
     logger.info('Starting to Deploy')
 
+    metrics_collector = image_metrics.ImageMetricsCollector()
+    image_metrics.add_hook(metrics_collector)
+    wait_collector = waiter.WaitMetricsCollector()
+    waiter.add_hook(wait_collector)
+
+    # Every OpenStack API call is timed only when requested
+    api_collector = api_metrics.ApiMetricsCollector()
+    if arguments.api_metrics is not ARG_NOT_SET:
+        api_metrics.add_hook(api_collector)
+        if arguments.api_metrics:
+            api_metrics.add_hook(
+                api_metrics.ApiCallJsonWriter(arguments.api_metrics))
+
     # Apply env_file/substitution file to template
     env = Environment(loader=FileSystemLoader(
         searchpath=os.path.dirname(arguments.tmplt_file)))
@@ -598,7 +719,8 @@ def main(arguments):
     if config:
         os_config = config.get('openstack')
 
-        creators = list()
+        graph = None
+        deploy_journal = None
         vm_dict = dict()
         images_dict = dict()
         flavors_dict = dict()
@@ -608,89 +730,88 @@ def main(arguments):
         if os_config:
             os_creds_dict = __get_creds_dict(os_config)
 
+            # Records the IDs of the deployed resources so later runs load
+            # them by ID rather than searching for each one by name
+            if arguments.journal:
+                deploy_journal = journal.DeploymentJournal(arguments.journal)
+
             try:
-                # Create projects
-                projects_dict = __create_instances(
-                    os_creds_dict, OpenStackProject, ProjectSettings,
-                    os_config.get('projects'), 'project', clean)
-                creators.append(projects_dict)
-
-                # Create users
-                users_dict = __create_instances(
-                    os_creds_dict, OpenStackUser, UserSettings,
-                    os_config.get('users'), 'user', clean)
-                creators.append(users_dict)
+                graph = deployment.DeploymentGraph(
+                    deploy_journal=deploy_journal)
+
+                __add_instances(
+                    graph, os_creds_dict, OpenStackProject, ProjectSettings,
+                    os_config.get('projects'), deployment.RES_PROJECT, clean)
+                __add_instances(
+                    graph, os_creds_dict, OpenStackUser, UserSettings,
+                    os_config.get('users'), deployment.RES_USER, clean)
+                projects_dict = graph.get_creators(deployment.RES_PROJECT)
+                users_dict = graph.get_creators(deployment.RES_USER)
 
                 # Associate new users to projects
                 if not clean:
-                    for project_creator in projects_dict.values():
-                        users = project_creator.project_settings.users
-                        for user_name in users:
-                            user_creator = users_dict.get(user_name)
-                            if user_creator:
-                                project_creator.assoc_user(
-                                    user_creator.get_user())
-
-                # Create flavors
-                flavors_dict = __create_instances(
-                    os_creds_dict, OpenStackFlavor, FlavorSettings,
-                    os_config.get('flavors'), 'flavor', clean, users_dict)
-                creators.append(flavors_dict)
-
-                # Create QoS specs
-                qos_dict = __create_instances(
-                    os_creds_dict, OpenStackQoS, QoSSettings,
-                    os_config.get('qos_specs'), 'qos_spec', clean, users_dict)
-                creators.append(qos_dict)
-
-                # Create volume types
-                vol_type_dict = __create_instances(
-                    os_creds_dict, OpenStackVolumeType, VolumeTypeSettings,
-                    os_config.get('volume_types'), 'volume_type', clean,
+                    __add_project_users(graph, projects_dict, users_dict)
+
+                __add_instances(
+                    graph, os_creds_dict, OpenStackFlavor, FlavorSettings,
+                    os_config.get('flavors'), deployment.RES_FLAVOR, clean,
+                    users_dict)
+                __add_instances(
+                    graph, os_creds_dict, OpenStackQoS, QoSSettings,
+                    os_config.get('qos_specs'), deployment.RES_QOS_SPEC,
+                    clean, users_dict)
+                __add_instances(
+                    graph, os_creds_dict, OpenStackVolumeType,
+                    VolumeTypeSettings, os_config.get('volume_types'),
+                    deployment.RES_VOLUME_TYPE, clean, users_dict)
+                __add_volume_groups(
+                    graph, os_creds_dict, os_config.get('volumes'), clean,
+                    users_dict)
+                __add_instances(
+                    graph, os_creds_dict, OpenStackImage, ImageSettings,
+                    os_config.get('images'), deployment.RES_IMAGE, clean,
+                    users_dict)
+                __add_instances(
+                    graph, os_creds_dict, OpenStackNetwork, NetworkSettings,
+                    os_config.get('networks'), deployment.RES_NETWORK, clean,
+                    users_dict)
+                __add_instances(
+                    graph, os_creds_dict, OpenStackRouter, RouterSettings,
+                    os_config.get('routers'), deployment.RES_ROUTER, clean,
+                    users_dict)
+                __add_instances(
+                    graph, os_creds_dict, OpenStackKeypair, KeypairSettings,
+                    os_config.get('keypairs'), deployment.RES_KEYPAIR, clean,
                     users_dict)
-                creators.append(vol_type_dict)
-
-                # Create volume types
-                vol_dict = __create_instances(
-                    os_creds_dict, OpenStackVolume, VolumeSettings,
-                    os_config.get('volumes'), 'volume', clean, users_dict)
-                creators.append(vol_dict)
-
-                # Create images
-                images_dict = __create_instances(
-                    os_creds_dict, OpenStackImage, ImageSettings,
-                    os_config.get('images'), 'image', clean, users_dict)
-                creators.append(images_dict)
-
-                # Create networks
-                creators.append(__create_instances(
-                    os_creds_dict, OpenStackNetwork, NetworkSettings,
-                    os_config.get('networks'), 'network', clean, users_dict))
-
-                # Create routers
-                creators.append(__create_instances(
-                    os_creds_dict, OpenStackRouter, RouterSettings,
-                    os_config.get('routers'), 'router', clean, users_dict))
-
-                # Create keypairs
-                keypairs_dict = __create_instances(
-                    os_creds_dict, OpenStackKeypair, KeypairSettings,
-                    os_config.get('keypairs'), 'keypair', clean, users_dict)
-                creators.append(keypairs_dict)
-
-                # Create security groups
-                creators.append(__create_instances(
-                    os_creds_dict, OpenStackSecurityGroup,
-                    SecurityGroupSettings,
-                    os_config.get('security_groups'), 'security_group', clean,
-                    users_dict))
-
-                # Create instance
-                vm_dict = __create_vm_instances(
-                    os_creds_dict, users_dict, os_config.get('instances'),
-                    images_dict, keypairs_dict,
-                    arguments.clean is not ARG_NOT_SET)
-                creators.append(vm_dict)
+                __add_instances(
+                    graph, os_creds_dict, OpenStackSecurityGroup,
+                    SecurityGroupSettings, os_config.get('security_groups'),
+                    deployment.RES_SECURITY_GROUP, clean, users_dict)
+                images_dict = graph.get_creators(deployment.RES_IMAGE)
+                __add_vm_instances(
+                    graph, os_creds_dict, users_dict,
+                    os_config.get('instances'), images_dict,
+                    graph.get_creators(deployment.RES_KEYPAIR), clean)
+
+                if arguments.plan is not ARG_NOT_SET:
+                    # Resolves the graph against a snapshot of the existing
+                    # resources without initializing any creator
+                    print(plan.format_plan(plan.create_plan(graph)))
+                    exit(0)
+
+                # Independent creators are deployed concurrently, i.e. images
+                # upload while networks and routers are created
+                try:
+                    graph.deploy()
+                except deployment.DeploymentError as e:
+                    logger.error('Unexpected error deploying - %s', e)
+
+                if graph.get_restored():
+                    logger.info('Loaded %s creators from the journal',
+                                len(graph.get_restored()))
+
+                flavors_dict = graph.get_creators(deployment.RES_FLAVOR)
+                vm_dict = graph.get_creators(deployment.RES_INSTANCE)
                 logger.info(
                     'Completed creating/retrieving all configured instances')
             except Exception as e:
@@ -698,11 +819,17 @@ def main(arguments):
                     'Unexpected error deploying environment. Rolling back due'
                     ' to - ' + str(e))
                 raise
+            finally:
+                metrics_collector.log_summary()
+                wait_collector.log_summary()
+                api_collector.log_summary()
 
         # Must enter either block
         if arguments.clean is not ARG_NOT_SET:
             # Cleanup Environment
-            __cleanup(creators, arguments.clean_image is not ARG_NOT_SET)
+            __cleanup(graph, arguments.clean_image is not ARG_NOT_SET)
+            if deploy_journal:
+                deploy_journal.compact()
         elif arguments.deploy is not ARG_NOT_SET:
             logger.info('Configuring NICs where required')
             for vm in vm_dict.values():
@@ -725,15 +852,19 @@ def main(arguments):
     exit(0)
 
 
-def __cleanup(creators, clean_image=False):
-    for creator_dict in reversed(creators):
-        for key, creator in creator_dict.items():
-            if ((isinstance(creator, OpenStackImage) and clean_image)
-                    or not isinstance(creator, OpenStackImage)):
-                try:
-                    creator.clean()
-                except Exception as e:
-                    logger.warning('Error cleaning component - %s', e)
+def __cleanup(graph, clean_image=False):
+    if not graph:
+        return
+
+    skip_types = list()
+    if not clean_image:
+        skip_types.append(deployment.RES_IMAGE)
+
+    # Each tier is removed concurrently after the tiers depending upon it
+    try:
+        graph.clean(skip_types)
+    except deployment.DeploymentError as e:
+        logger.warning('Error cleaning components - %s', e)
 
 
 if __name__ == '__main__':
@@ -752,6 +883,10 @@ if __name__ == '__main__':
         '-i', '--clean-image', dest='clean_image', nargs='?',
         default=ARG_NOT_SET,
         help='When cleaning, if this is set, the image will be cleaned too')
+    parser.add_argument(
+        '-p', '--plan', dest='plan', nargs='?', default=ARG_NOT_SET,
+        help='When used, prints what deploying would create without changing '
+             'the environment')
     parser.add_argument(
         '-t', '--tmplt', dest='tmplt_file', required=True,
         help='The SNAPS deployment template YAML file - REQUIRED')
@@ -761,14 +896,51 @@ if __name__ == '__main__':
     parser.add_argument(
         '-l', '--log-level', dest='log_level', default='INFO',
         help='Logging Level (INFO|DEBUG)')
+    parser.add_argument(
+        '-j', '--journal', dest='journal',
+        help='File recording the IDs of the deployed resources so later '
+             'deployments and cleanups load them by ID')
+    parser.add_argument(
+        '-m', '--api-metrics', dest='api_metrics', nargs='?',
+        default=ARG_NOT_SET,
+        help='When used, logs the number and duration of the OpenStack API '
+             'calls by operation and appends each call as a line of JSON to '
+             'the file when one is given')
+    parser.add_argument(
+        '-r', '--trace', dest='trace_file',
+        help='File to which a timeline of the creators, waits and API calls '
+             'is written in the Chrome trace format')
+    parser.add_argument(
+        '-f', '--fake-cloud', dest='fake_cloud',
+        help='YAML file configuring an in-process stand-in cloud against '
+             'which the environment is deployed rather than OpenStack')
     args = parser.parse_args()
 
-    if args.deploy is ARG_NOT_SET and args.clean is ARG_NOT_SET:
+    modes = [mode for mode in (args.deploy, args.clean, args.plan)
+             if mode is not ARG_NOT_SET]
+    if not modes:
         print(
-            'Must enter either -d for deploy or -c for cleaning up and '
-            'environment')
+            'Must enter either -d for deploy, -c for cleaning up or -p for '
+            'planning an environment')
         exit(1)
-    if args.deploy is not ARG_NOT_SET and args.clean is not ARG_NOT_SET:
-        print('Cannot enter both options -d/--deploy and -c/--clean')
+    if len(modes) > 1:
+        print('Cannot enter more than one of the options -d/--deploy, '
+              '-c/--clean and -p/--plan')
         exit(1)
-    main(args)
+
+    if args.fake_cloud:
+        fake_cloud.install(fake_cloud.create_cloud(
+            file_utils.read_yaml(args.fake_cloud) or dict()))
+
+    # Registered before any creator is initialized so its API calls are
+    # recorded and written even when main() exits with an error
+    trace_recorder = None
+    if args.trace_file:
+        trace_recorder = trace.TraceRecorder()
+        trace_recorder.start()
+    try:
+        main(args)
+    finally:
+        if trace_recorder:
+            trace_recorder.stop()
+            trace_recorder.write(args.trace_file)
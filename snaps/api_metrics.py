@@ -0,0 +1,370 @@
+# Copyright (c) 2017 Cable Television Laboratories, Inc. ("CableLabs")
+#                    and others.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import json
+import logging
+import threading
+import time
+import types
+
+from snaps import hooks
+
+__author__ = 'spisarski'
+
+"""
+Times the calls made through the OpenStack clients created by the
+snaps.openstack.utils modules and reports each one to the hooks registered
+with add_hook(). Clients created while no hook is registered are returned
+untouched so instrumentation costs nothing when it is not used
+"""
+
+logger = logging.getLogger('api_metrics')
+
+SERVICE_COMPUTE = 'compute'
+SERVICE_NETWORK = 'network'
+SERVICE_IMAGE = 'image'
+SERVICE_VOLUME = 'volume'
+SERVICE_ORCHESTRATION = 'orchestration'
+SERVICE_IDENTITY = 'identity'
+
+STATUS_OK = 'OK'
+
+# The suffixes of the resource manager classes of the OpenStack clients such
+# as novaclient's ServerManager or the image Controller of glance v2
+MANAGER_SUFFIXES = ('Manager', 'Controller')
+
+__hooks = hooks.HookRegistry()
+
+
+def add_hook(hook):
+    """
+    Registers a hook to be notified of API calls. Only the clients created
+    after the first hook is registered are instrumented
+    :param hook: an ApiCallHook object
+    """
+    __hooks.add(hook)
+
+
+def remove_hook(hook):
+    """
+    Unregisters a hook added with add_hook()
+    :param hook: the ApiCallHook object
+    """
+    __hooks.remove(hook)
+
+
+def is_enabled():
+    """
+    Returns True when at least one hook is registered
+    """
+    return __hooks.is_enabled()
+
+
+def instrument(service, client):
+    """
+    Returns a client reporting each call made through it to the hooks
+    :param service: the OpenStack service of the client (i.e.
+                    SERVICE_COMPUTE)
+    :param client: the OpenStack client object
+    :return: an InstrumentedClient object or the client itself when no hook
+             is registered
+    """
+    if not __hooks.is_enabled():
+        return client
+    return InstrumentedClient(service, client)
+
+
+def record_call(service, operation, start, seconds, status, items):
+    """
+    Notifies the hooks that an API call has returned
+    :param service: the OpenStack service called
+    :param operation: the client method called (i.e. 'servers.list')
+    :param start: the time the call was made as returned by time.time()
+    :param seconds: the duration of the call
+    :param status: STATUS_OK or the error's HTTP status code or class name
+    :param items: the number of resources returned
+    """
+    __hooks.notify('on_call', service, operation, start, seconds, status,
+                   items)
+
+
+def get_item_count(result):
+    """
+    Returns the number of resources in the result of an API call
+    :param result: the value returned by the client
+    :return: the count
+    """
+    if result is None:
+        return 0
+    if isinstance(result, (list, tuple)):
+        return len(result)
+    if isinstance(result, dict):
+        # i.e. the neutron client's {'networks': [...]}
+        if len(result) == 1:
+            value = list(result.values())[0]
+            if isinstance(value, (list, tuple)):
+                return len(value)
+    return 1
+
+
+def timed_generator(service, operation, start, seconds, generator):
+    """
+    Returns a generator yielding the items of a generator returned by a
+    client, such as the paged image lists of glance v2, where the time spent
+    fetching each page is added to the call as the items are read. The call
+    is reported once the generator is exhausted, raises or is closed. As a
+    generator does no work until its first item is read, one that is never
+    read is not reported
+    :param service: the OpenStack service called
+    :param operation: the client method called
+    :param start: the time the call was made as returned by time.time()
+    :param seconds: the time spent in the call before the first item
+    :param generator: the generator returned by the client
+    :return: the generator
+    """
+    items = 0
+    status = STATUS_OK
+    try:
+        while True:
+            page_start = time.time()
+            try:
+                item = next(generator)
+            except StopIteration:
+                return
+            except Exception as e:
+                status = get_error_status(e)
+                raise
+            finally:
+                seconds += time.time() - page_start
+            items += 1
+            yield item
+    finally:
+        record_call(service, operation, start, seconds, status, items)
+
+
+def get_error_status(error):
+    """
+    Returns the HTTP status code of a client error else its class name
+    :param error: the exception raised by the client
+    :return: the status string
+    """
+    for attr in ('status_code', 'http_status', 'code'):
+        value = getattr(error, attr, None)
+        if isinstance(value, int):
+            return str(value)
+    return error.__class__.__name__
+
+
+class InstrumentedClient(object):
+    """
+    Proxy of an OpenStack client, or of one of its resource managers, timing
+    every method called through it. Attributes that are resource managers
+    (i.e. nova.servers) are proxied in turn so the operation is reported
+    with its full path (i.e. 'servers.list'). Results that are
+    generators, such as the image lists of glance v2, are wrapped with
+    timed_generator() so the time of every page is included as it is read
+    """
+
+    def __init__(self, service, target, prefix=''):
+        """
+        Constructor
+        :param service: the OpenStack service of the client
+        :param target: the client or manager object
+        :param prefix: the path of target from the client (i.e. 'servers.')
+        """
+        self._service = service
+        self._target = target
+        self._prefix = prefix
+
+    def __getattr__(self, name):
+        # Only called for the attributes of the target as the proxy's own are
+        # found first, raising AttributeError when it is not constructed yet
+        value = getattr(object.__getattribute__(self, '_target'), name)
+        if name.startswith('_') or isinstance(value, type):
+            return value
+        if callable(value):
+            return self.__timed(self._prefix + name, value)
+        if type(value).__name__.endswith(MANAGER_SUFFIXES):
+            return InstrumentedClient(self._service, value,
+                                      self._prefix + name + '.')
+        return value
+
+    def __setattr__(self, name, value):
+        if name.startswith('_'):
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._target, name, value)
+
+    def __timed(self, operation, function):
+        """
+        Returns a function calling function and reporting the call
+        :param operation: the name of the operation
+        :param function: the client's method
+        :return: the function
+        """
+        service = self._service
+
+        def call(*args, **kwargs):
+            start = time.time()
+            try:
+                result = function(*args, **kwargs)
+            except Exception as e:
+                record_call(service, operation, start, time.time() - start,
+                            get_error_status(e), 0)
+                raise
+            if isinstance(result, types.GeneratorType):
+                return timed_generator(service, operation, start,
+                                       time.time() - start, result)
+            record_call(service, operation, start, time.time() - start,
+                        STATUS_OK, get_item_count(result))
+            return result
+
+        return call
+
+
+class ApiCallHook:
+    """
+    Base class for objects receiving API call events. Implementations must be
+    thread safe as calls are made from several threads and each event is
+    delivered on the thread that made the call
+    """
+
+    def on_call(self, service, operation, start, seconds, status, items):
+        """
+        Called when an API call has returned or raised an error
+        """
+        pass
+
+
+class ApiCallMetrics:
+    """
+    The metrics collected for a single operation of a service
+    """
+
+    def __init__(self, service, operation):
+        """
+        Constructor
+        :param service: the OpenStack service
+        :param operation: the client method
+        """
+        self.service = service
+        self.operation = operation
+        self.calls = 0
+        self.errors = 0
+        self.total_seconds = 0
+        self.max_seconds = 0
+        self.items = 0
+
+    def average_seconds(self):
+        """
+        Returns the average time of a call or None when there were none
+        :return: a float or None
+        """
+        if self.calls:
+            return self.total_seconds / float(self.calls)
+
+
+class ApiMetricsCollector(ApiCallHook, hooks.MetricsCollector):
+    """
+    Hook accumulating the ApiCallMetrics of each operation in memory
+    """
+
+    def __init__(self):
+        hooks.MetricsCollector.__init__(self, ApiCallMetrics, logger)
+
+    def on_call(self, service, operation, start, seconds, status, items):
+        with self._lock:
+            metrics = self._get(service, operation)
+            metrics.calls += 1
+            if status != STATUS_OK:
+                metrics.errors += 1
+            metrics.total_seconds += seconds
+            metrics.max_seconds = max(metrics.max_seconds, seconds)
+            metrics.items += items
+
+    def get_metrics(self):
+        """
+        Returns the collected metrics with the operations that took the most
+        time in total first
+        :return: a list of ApiCallMetrics objects
+        """
+        return sorted(
+            super(ApiMetricsCollector, self).get_metrics(),
+            key=lambda metrics: -metrics.total_seconds)
+
+    def get_call_count(self, service=None):
+        """
+        Returns the number of calls collected
+        :param service: only count the calls to this service (optional)
+        :return: the count
+        """
+        return sum(metrics.calls for metrics in self.get_metrics()
+                   if not service or metrics.service == service)
+
+    def summary(self):
+        """
+        Returns a human readable table of the collected metrics
+        :return: the string
+        """
+        lines = ['API call metrics:']
+        for metrics in self.get_metrics():
+            lines.append(
+                '  %-13s %-36s calls %5d, errors %3d, total %8.2fs, avg '
+                '%6.3fs, max %6.3fs, items %6d' % (
+                    metrics.service, metrics.operation, metrics.calls,
+                    metrics.errors, metrics.total_seconds,
+                    metrics.average_seconds(), metrics.max_seconds,
+                    metrics.items))
+        return '\n'.join(lines)
+
+
+class ApiCallLogger(ApiCallHook):
+    """
+    Hook logging every API call
+    """
+
+    def __init__(self, level=logging.DEBUG):
+        """
+        Constructor
+        :param level: the logging level (default DEBUG)
+        """
+        self.level = level
+
+    def on_call(self, service, operation, start, seconds, status, items):
+        logger.log(self.level, '%s %s returned %s in %.3fs with %d items',
+                   service, operation, status, seconds, items)
+
+
+class ApiCallJsonWriter(ApiCallHook):
+    """
+    Hook appending each API call to a file as a line of JSON
+    """
+
+    def __init__(self, path):
+        """
+        Constructor
+        :param path: the path to the file
+        """
+        self.path = path
+        self.__lock = threading.Lock()
+
+    def on_call(self, service, operation, start, seconds, status, items):
+        line = json.dumps({
+            'service': service, 'operation': operation, 'start': start,
+            'seconds': seconds, 'status': status, 'items': items,
+            'thread': threading.current_thread().name}, sort_keys=True)
+        with self.__lock:
+            with open(self.path, 'a') as json_file:
+                json_file.write(line)
+                json_file.write('\n')
@@ -0,0 +1,91 @@
+# Copyright (c) 2017 Cable Television Laboratories, Inc. ("CableLabs")
+#                    and others.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import threading
+
+__author__ = 'spisarski'
+
+"""
+The bounded worker threads with which creators, groups and utils issue
+OpenStack calls concurrently. Plain threads are used as the calls spend
+their time waiting on the network and the clients are not asyncio aware.
+There is no shared pool: each call of run_concurrent() starts up to
+max_workers threads of its own, so nested callers multiply the thread count.
+For instance a deployment graph running volume and stack groups whose heat
+lookups also run concurrently may have the product of the three maximums
+in flight at once
+"""
+
+
+def run_workers(worker, count):
+    """
+    Runs a function in a number of daemon threads and waits until each of
+    them has returned
+    :param worker: the function taking no arguments
+    :param count: the number of threads
+    """
+    threads = list()
+    for i in range(count):
+        thread = threading.Thread(target=worker)
+        thread.daemon = True
+        thread.start()
+        threads.append(thread)
+
+    for thread in threads:
+        thread.join()
+
+
+def run_concurrent(function, items, max_workers, on_error=None):
+    """
+    Calls function once for each item with no more than max_workers calls in
+    flight at the same time. A single item is handled in the calling thread
+    :param function: the function to call with a single item
+    :param items: the list of items
+    :param max_workers: the maximum number of concurrent calls
+    :param on_error: the function called with the item and the exception of
+                     each call that raised. When None, no new call is started
+                     once a call has raised and its exception is raised when
+                     the calls in flight have returned
+    :return: the list of the values returned by function in item order where
+             the items whose call raised have None
+    """
+    items = list(items)
+    results = [None] * len(items)
+    errors = list()
+    remaining = list(range(len(items)))
+    lock = threading.Lock()
+
+    def worker():
+        while True:
+            with lock:
+                if not remaining or (errors and not on_error):
+                    return
+                index = remaining.pop(0)
+            try:
+                results[index] = function(items[index])
+            except Exception as e:
+                if on_error:
+                    on_error(items[index], e)
+                else:
+                    with lock:
+                        errors.append(e)
+
+    if len(items) == 1:
+        worker()
+    elif items:
+        run_workers(worker, min(max_workers, len(items)))
+
+    if errors:
+        raise errors[0]
+    return results
@@ -47,6 +47,29 @@ class Resource:
         self.id = resource_id
 
 
+class Event:
+    """
+    SNAPS domain object for an event emitted while a heat stack changes
+    """
+    def __init__(self, event_id, resource_name, physical_resource_id,
+                 resource_status, resource_status_reason, event_time):
+        """
+        Constructor
+        :param event_id: the event's ID
+        :param resource_name: the logical name of the resource or the stack
+        :param physical_resource_id: the ID of the resource or the stack
+        :param resource_status: the status such as CREATE_COMPLETE
+        :param resource_status_reason: the reason for the status
+        :param event_time: the time of the event as an ISO 8601 string
+        """
+        self.id = event_id
+        self.resource_name = resource_name
+        self.physical_resource_id = physical_resource_id
+        self.resource_status = resource_status
+        self.resource_status_reason = resource_status_reason
+        self.event_time = event_time
+
+
 class Output:
     """
     SNAPS domain object for an output defined by a heat template
@@ -14,7 +14,7 @@
 # limitations under the License.
 
 import unittest
-from snaps.domain.stack import Stack, Resource, Output
+from snaps.domain.stack import Stack, Resource, Output, Event
 
 
 class StackDomainObjectTests(unittest.TestCase):
@@ -68,3 +68,32 @@ class OutputDomainObjectTests(unittest.TestCase):
         self.assertEqual('foo', resource.description)
         self.assertEqual('test_key', resource.key)
         self.assertEqual('bar', resource.value)
+
+
+class EventDomainObjectTests(unittest.TestCase):
+    """
+    Tests the construction of the snaps.domain.Event class
+    """
+
+    def test_construction_positional(self):
+        event = Event('id', 'name', 'res-id', 'CREATE_COMPLETE', 'done',
+                      '2017-08-01T12:00:00Z')
+        self.assertEqual('id', event.id)
+        self.assertEqual('name', event.resource_name)
+        self.assertEqual('res-id', event.physical_resource_id)
+        self.assertEqual('CREATE_COMPLETE', event.resource_status)
+        self.assertEqual('done', event.resource_status_reason)
+        self.assertEqual('2017-08-01T12:00:00Z', event.event_time)
+
+    def test_construction_named(self):
+        event = Event(event_time='2017-08-01T12:00:00Z',
+                      resource_status_reason='done',
+                      resource_status='CREATE_COMPLETE',
+                      physical_resource_id='res-id', resource_name='name',
+                      event_id='id')
+        self.assertEqual('id', event.id)
+        self.assertEqual('name', event.resource_name)
+        self.assertEqual('res-id', event.physical_resource_id)
+        self.assertEqual('CREATE_COMPLETE', event.resource_status)
+        self.assertEqual('done', event.resource_status_reason)
+        self.assertEqual('2017-08-01T12:00:00Z', event.event_time)
@@ -15,7 +15,7 @@
 
 import unittest
 from snaps.domain.volume import (
-    QoSSpec, VolumeType, VolumeTypeEncryption, Volume)
+    QoSSpec, VolumeType, VolumeTypeEncryption, Volume, VolumeSnapshot)
 
 
 class VolumeDomainObjectTests(unittest.TestCase):
@@ -54,6 +54,29 @@ class VolumeDomainObjectTests(unittest.TestCase):
         self.assertEqual(1, len(volume.attachments))
 
 
+class VolumeSnapshotDomainObjectTests(unittest.TestCase):
+    """
+    Tests the construction of the snaps.domain.volume.VolumeSnapshot class
+    """
+
+    def test_construction_positional(self):
+        snapshot = VolumeSnapshot('name1', 'id1', 'vol-id1', 2, 'desc_val1')
+        self.assertEqual('name1', snapshot.name)
+        self.assertEqual('id1', snapshot.id)
+        self.assertEqual('vol-id1', snapshot.volume_id)
+        self.assertEqual(2, snapshot.size)
+        self.assertEqual('desc_val1', snapshot.description)
+
+    def test_construction_named(self):
+        snapshot = VolumeSnapshot(size=3, volume_id='vol-id2',
+                                  snapshot_id='id2', name='name2')
+        self.assertEqual('name2', snapshot.name)
+        self.assertEqual('id2', snapshot.id)
+        self.assertEqual('vol-id2', snapshot.volume_id)
+        self.assertEqual(3, snapshot.size)
+        self.assertIsNone(snapshot.description)
+
+
 class VolumeTypeDomainObjectTests(unittest.TestCase):
     """
     Tests the construction of the snaps.domain.volume.VolumeType class
@@ -51,6 +51,33 @@ class Volume:
                 and self.multi_attach == other.multi_attach)
 
 
+class VolumeSnapshot:
+    """
+    SNAPS domain object for Volume Snapshots. Should contain attributes that
+    are shared amongst cloud providers
+    """
+    def __init__(self, name, snapshot_id, volume_id, size, description=None):
+        """
+        Constructor
+        :param name: the snapshot's name
+        :param snapshot_id: the snapshot's id
+        :param volume_id: the id of the volume from which it was taken
+        :param size: the snapshot's size in GB
+        :param description: the snapshot's description
+        """
+        self.name = name
+        self.id = snapshot_id
+        self.volume_id = volume_id
+        self.size = size
+        self.description = description
+
+    def __eq__(self, other):
+        return (self.name == other.name and self.id == other.id
+                and self.volume_id == other.volume_id
+                and self.size == other.size
+                and self.description == other.description)
+
+
 class VolumeType:
     """
     SNAPS domain object for Volume Types. Should contain attributes that
@@ -12,8 +12,14 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import bz2
+import hashlib
+import mmap
 import os
 import logging
+import threading
+import time
+import zlib
 
 from cryptography.hazmat.primitives import serialization
 
@@ -22,6 +28,16 @@ try:
 except ImportError:
     import urllib2 as urllib
 
+try:
+    from http.client import HTTPException
+except ImportError:
+    from httplib import HTTPException
+
+try:
+    import lzma
+except ImportError:
+    lzma = None
+
 import yaml
 
 __author__ = 'spisarski'
@@ -32,6 +48,20 @@ Utilities for basic file handling
 
 logger = logging.getLogger('file_utils')
 
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+MAPPED_READ_CHUNK_SIZE = 8 * 1024 * 1024
+
+# Kept small as highly compressible images (i.e. raw disks) can expand
+# several hundred fold
+COMPRESSED_READ_SIZE = 64 * 1024
+
+COMPRESSION_GZIP = 'gzip'
+COMPRESSION_XZ = 'xz'
+COMPRESSION_BZ2 = 'bz2'
+COMPRESSION_SUFFIXES = {
+    '.gz': COMPRESSION_GZIP, '.gzip': COMPRESSION_GZIP,
+    '.xz': COMPRESSION_XZ, '.bz2': COMPRESSION_BZ2}
+
 
 def file_exists(file_path):
     """
@@ -47,36 +77,261 @@ def file_exists(file_path):
     return False
 
 
-def download(url, dest_path, name=None):
+def download(url, dest_path, name=None, resume=False, segments=1,
+             checksum=None, retries=0, callback=None):
     """
     Download a file to a destination path given a URL
     :param url: the endpoint to the file to download
     :param dest_path: the directory to save the file
     :param name: the file name (optional)
+    :param resume: when True and a partial file already exists at the
+                   destination, only the missing bytes are requested with an
+                   HTTP Range header (default False)
+    :param segments: the number of byte ranges to fetch in parallel into a
+                     preallocated file; only honored when the server supports
+                     range requests (default 1)
+    :param checksum: the expected MD5 hex digest of the downloaded file; a
+                     DownloadException is raised on mismatch (optional)
+    :param retries: the number of times a dropped transfer is resumed from
+                    the last byte received before giving up (default 0)
+    :param callback: function called with (phase, seconds, num_bytes) after
+                     the 'connect', 'download' and 'write' phases of each
+                     request and with ('retry', 0, 0) before each retry
+                     (optional)
     :rtype : File object
     """
     if not name:
         name = url.rsplit('/')[-1]
     dest = dest_path + '/' + name
     logger.debug('Downloading file from - ' + url)
-    # Override proxy settings to use localhost to download file
-    download_file = None
 
     if not os.path.isdir(dest_path):
         try:
             os.mkdir(dest_path)
         except:
             raise
-    try:
-        with open(dest, 'wb') as download_file:
-            logger.debug('Saving file to - %s',
-                         os.path.abspath(download_file.name))
-            response = __get_url_response(url)
-            download_file.write(response.read())
+
+    total_size = None
+    if segments > 1:
+        total_size = __get_range_size(url)
+        if not total_size:
+            logger.info('Range requests not supported by %s, downloading '
+                        'with a single stream', url)
+
+    logger.debug('Saving file to - %s', os.path.abspath(dest))
+    if total_size:
+        __download_segments(url, dest, total_size, segments, retries,
+                            callback)
+    else:
+        __download_stream(url, dest, resume, retries, callback)
+
+    if checksum:
+        __verify_checksum(dest, checksum)
+
+    with open(dest, 'rb') as download_file:
         return download_file
+
+
+def __download_stream(url, dest, resume, retries, callback):
+    """
+    Downloads the URL into dest with a single connection, continuing from
+    the end of an existing file when resume is True
+    :param url: the endpoint to the file to download
+    :param dest: the destination file path
+    :param resume: when True, the bytes already in dest are kept
+    :param retries: the number of times a dropped transfer is resumed
+    :param callback: the download() callback or None
+    """
+    if not resume or not os.path.isfile(dest):
+        open(dest, 'wb').close()
+
+    attempt = 0
+    while True:
+        offset = os.path.getsize(dest)
+        headers = dict()
+        if offset:
+            headers['Range'] = 'bytes=%d-' % offset
+        try:
+            start = time.time()
+            try:
+                response = __get_url_response(url, headers)
+            except urllib.HTTPError as e:
+                if e.code == 416 and offset:
+                    logger.info('File already downloaded - %s', dest)
+                    return
+                raise
+            __notify(callback, 'connect', time.time() - start)
+
+            try:
+                if offset and response.getcode() != 206:
+                    logger.info('Range request ignored, restarting download '
+                                'of %s', url)
+                    offset = 0
+                with open(dest, 'r+b') as download_file:
+                    download_file.seek(offset)
+                    download_file.truncate()
+                    __copy_response(response, download_file, callback)
+                return
+            finally:
+                response.close()
+        except urllib.HTTPError:
+            raise
+        except (IOError, HTTPException, DownloadException) as e:
+            if attempt >= retries:
+                raise
+            attempt += 1
+            __notify(callback, 'retry')
+            logger.warning('Download of %s interrupted (%s), resuming - '
+                           'attempt %d of %d', url, e, attempt, retries)
+
+
+def __download_segments(url, dest, total_size, segments, retries,
+                        callback):
+    """
+    Downloads the URL into a preallocated dest file by fetching byte ranges
+    concurrently
+    :param url: the endpoint to the file to download
+    :param dest: the destination file path
+    :param total_size: the number of bytes to download
+    :param segments: the number of concurrent byte ranges
+    :param retries: the number of times each dropped range is resumed
+    :param callback: the download() callback or None
+    """
+    with open(dest, 'wb') as download_file:
+        download_file.truncate(total_size)
+
+    segment_size = -(-total_size // segments)
+    errors = list()
+    threads = list()
+    for start in range(0, total_size, segment_size):
+        end = min(start + segment_size, total_size) - 1
+        thread = threading.Thread(
+            target=__download_segment,
+            args=(url, dest, start, end, retries, callback, errors))
+        thread.start()
+        threads.append(thread)
+
+    for thread in threads:
+        thread.join()
+
+    if errors:
+        raise errors[0]
+
+
+def __download_segment(url, dest, start, end, retries, callback, errors):
+    """
+    Writes the byte range start-end (inclusive) of the URL into dest at the
+    same offset. Errors are appended to the errors list as this runs on its
+    own thread
+    """
+    position = start
+    attempt = 0
+    while position <= end:
+        try:
+            with open(dest, 'r+b') as download_file:
+                download_file.seek(position)
+                try:
+                    connect_start = time.time()
+                    response = __get_url_response(
+                        url, {'Range': 'bytes=%d-%d' % (position, end)})
+                    __notify(callback, 'connect', time.time() - connect_start)
+                    try:
+                        if response.getcode() != 206:
+                            raise DownloadException(
+                                'Range request ignored by ' + url)
+                        __copy_response(response, download_file, callback)
+                    finally:
+                        response.close()
+                finally:
+                    position = download_file.tell()
+        except urllib.HTTPError as e:
+            errors.append(e)
+            return
+        except (IOError, HTTPException, DownloadException) as e:
+            if attempt >= retries:
+                errors.append(e)
+                return
+            attempt += 1
+            __notify(callback, 'retry')
+            logger.warning('Download of bytes %d-%d from %s interrupted (%s),'
+                           ' resuming - attempt %d of %d', position, end, url,
+                           e, attempt, retries)
+
+
+def __copy_response(response, out_file, callback=None):
+    """
+    Writes the response body to out_file in DOWNLOAD_CHUNK_SIZE pieces
+    :param response: the HTTP response
+    :param out_file: the file object opened for writing
+    :param callback: the download() callback receiving the time spent reading
+                     from the network and writing to disk (optional)
+    :raise DownloadException when the connection closes before the number of
+           bytes in the Content-Length header has been received
+    """
+    expected = response.headers.get('Content-Length')
+    received = 0
+    read_time = 0
+    write_time = 0
+    try:
+        while True:
+            start = time.time()
+            chunk = response.read(DOWNLOAD_CHUNK_SIZE)
+            read_time += time.time() - start
+            if not chunk:
+                break
+
+            start = time.time()
+            out_file.write(chunk)
+            write_time += time.time() - start
+            received += len(chunk)
     finally:
-        if download_file:
-            download_file.close()
+        __notify(callback, 'download', read_time, received)
+        __notify(callback, 'write', write_time, received)
+
+    if expected is not None and received < int(expected):
+        raise DownloadException(
+            'Connection closed after %d of %s bytes' % (received, expected))
+
+
+def __notify(callback, phase, seconds=0, num_bytes=0):
+    """
+    Calls the download() callback when one has been configured
+    """
+    if callback:
+        callback(phase, seconds, num_bytes)
+
+
+def __get_range_size(url):
+    """
+    Returns the size of the file behind the URL when the server honors range
+    requests else None
+    :param url: the URL to inspect
+    :return: the number of bytes or None
+    """
+    response = __get_url_response(url, {'Range': 'bytes=0-0'})
+    try:
+        content_range = response.headers.get('Content-Range')
+        if response.getcode() == 206 and content_range:
+            total = content_range.rsplit('/', 1)[-1]
+            if total.isdigit():
+                return int(total)
+    finally:
+        response.close()
+
+
+def __verify_checksum(file_path, checksum):
+    """
+    Removes the file and raises a DownloadException when the MD5 digest of
+    its contents does not match the checksum
+    :param file_path: the path to the file
+    :param checksum: the expected MD5 hex digest
+    """
+    actual = get_file_checksum(file_path)
+    if actual != checksum.lower():
+        os.remove(file_path)
+        raise DownloadException(
+            'Checksum mismatch for %s, expected %s but was %s' % (
+                file_path, checksum, actual))
 
 
 def save_keys_to_files(keys=None, pub_file_path=None, priv_file_path=None):
@@ -159,16 +414,103 @@ def get_content_length(url):
     return response.headers['Content-Length']
 
 
-def __get_url_response(url):
+def get_file_checksum(file_path, compression=None):
+    """
+    Returns the MD5 hex digest of a file's contents as computed by Glance
+    :param file_path: the path to the file
+    :param compression: when set, the digest is computed over the
+                        decompressed contents (optional)
+    :return: the checksum string
+    """
+    if compression:
+        with open_decompressed(compression, file_path=file_path) as reader:
+            while reader.read(DOWNLOAD_CHUNK_SIZE):
+                pass
+            return reader.checksum()
+
+    digest = hashlib.md5()
+    with open(os.path.expanduser(file_path), 'rb') as the_file:
+        for chunk in iter(lambda: the_file.read(DOWNLOAD_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def get_compression(path):
+    """
+    Returns the compression type implied by the extension of a file name or
+    URL
+    :param path: the file path or URL (optional)
+    :return: one of the COMPRESSION_* values or None
+    """
+    if path:
+        extension = os.path.splitext(path.split('?')[0])[1].lower()
+        return COMPRESSION_SUFFIXES.get(extension)
+
+
+def get_decompressed_name(path):
+    """
+    Returns the base name of a file path or URL without any compression
+    extension
+    :param path: the file path or URL
+    :return: the name
+    """
+    name = os.path.basename(path.split('?')[0])
+    base, extension = os.path.splitext(name)
+    if extension.lower() in COMPRESSION_SUFFIXES:
+        return base
+    return name
+
+
+def get_cache_name(path):
+    """
+    Returns the name under which the decompressed contents of a file path or
+    URL are cached, which is the decompressed name prefixed with a digest of
+    the full URL or absolute path so sources with the same base name do not
+    share a cached file
+    :param path: the file path or URL
+    :return: the name
+    """
+    source = path
+    if '://' not in path:
+        source = os.path.abspath(os.path.expanduser(path))
+    digest = hashlib.sha1(source.encode('utf-8')).hexdigest()[:16]
+    return '%s-%s' % (digest, get_decompressed_name(path))
+
+
+def open_decompressed(compression, url=None, file_path=None,
+                      cache_path=None, checksum=None):
+    """
+    Returns a DecompressingReader streaming the decompressed contents of a URL
+    or local file without writing the compressed data to disk
+    :param compression: one of the COMPRESSION_* values
+    :param url: the URL of the compressed data (this or file_path)
+    :param file_path: the path to the compressed file (this or url)
+    :param cache_path: when set, the decompressed data is also saved to this
+                       path once the stream has been read completely
+    :param checksum: the expected MD5 hex digest of the decompressed data
+    :return: the DecompressingReader
+    """
+    if url:
+        source = __get_url_response(url)
+    elif file_path:
+        source = open(os.path.expanduser(file_path), 'rb')
+    else:
+        raise ValueError('A URL or file path is required')
+    return DecompressingReader(source, compression, url or file_path,
+                               cache_path, checksum)
+
+
+def __get_url_response(url, headers=None):
     """
     Returns a response object for a given URL
     :param url: the URL
+    :param headers: dict() of request headers (optional)
     :return: the response
     """
     proxy_handler = urllib.ProxyHandler({})
     opener = urllib.build_opener(proxy_handler)
     urllib.install_opener(opener)
-    return urllib.urlopen(url)
+    return urllib.urlopen(urllib.Request(url, headers=headers or dict()))
 
 
 def read_yaml(config_file_path):
@@ -226,13 +568,260 @@ def read_file(filename):
     :param filename: the name of the file
     :return:
     """
-    out = str()
     the_file = None
     try:
         the_file = open(filename)
-        for line in the_file:
-            out += line
-        return out
+        return the_file.read()
     finally:
         if the_file:
             the_file.close()
+
+
+class MappedFileReader:
+    """
+    Read-only file-like object streaming a memory mapped file as memoryview
+    slices, so reads are served from the page cache without a read() system
+    call and a new byte string each. Iterating over it yields slices of
+    chunk_size bytes (rounded up to the mmap allocation granularity).
+    """
+
+    def __init__(self, file_path, chunk_size=MAPPED_READ_CHUNK_SIZE):
+        """
+        Constructor
+        :param file_path: the path to the file to read
+        :param chunk_size: the number of bytes of each slice yielded when
+                           iterating
+        :raise ValueError when the file is empty as it cannot be mapped
+        """
+        granularity = mmap.ALLOCATIONGRANULARITY
+        self.chunk_size = max(
+            granularity, -(-int(chunk_size) // granularity) * granularity)
+        self.name = os.path.expanduser(file_path)
+        self.__position = 0
+        self.__map = None
+        self.__view = None
+
+        self.__file = open(self.name, 'rb')
+        try:
+            self.size = os.fstat(self.__file.fileno()).st_size
+            self.__map = mmap.mmap(
+                self.__file.fileno(), 0, access=mmap.ACCESS_READ)
+            if hasattr(self.__map, 'madvise'):
+                self.__map.madvise(mmap.MADV_SEQUENTIAL)
+            self.__view = memoryview(self.__map)
+        except Exception:
+            self.close()
+            raise
+
+    def read(self, size=-1):
+        """
+        Returns the next slice of the file as a memoryview
+        :param size: the maximum number of bytes to return where a negative
+                     value returns the remainder
+        :return: a memoryview, empty at the end of the file
+        """
+        if size is None or size < 0:
+            end = self.size
+        else:
+            end = self.__position + size
+        chunk = self.__view[self.__position:min(end, self.size)]
+        self.__position += len(chunk)
+        return chunk
+
+    def __iter__(self):
+        while True:
+            chunk = self.read(self.chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+    def tell(self):
+        return self.__position
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if whence == os.SEEK_CUR:
+            offset += self.__position
+        elif whence == os.SEEK_END:
+            offset += self.size
+        self.__position = min(max(offset, 0), self.size)
+        return self.__position
+
+    def close(self):
+        """
+        Releases the mapping and the underlying file
+        """
+        if self.__view is not None:
+            self.__view.release()
+            self.__view = None
+        if self.__map is not None:
+            try:
+                self.__map.close()
+            except BufferError:
+                logger.debug('Slices of %s still referenced, the mapping '
+                             'will be released when collected', self.name)
+            self.__map = None
+        if self.__file:
+            self.__file.close()
+            self.__file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class DecompressingReader:
+    """
+    Read-only file-like object returning the decompressed contents of a
+    compressed source stream. Concatenated gzip members and xz streams are
+    supported. The MD5 digest of the decompressed data is computed as it is
+    read and the data can be saved to a cache file at the same time.
+    """
+
+    def __init__(self, source, compression, name=None, cache_path=None,
+                 checksum=None):
+        """
+        Constructor
+        :param source: a file-like object with the compressed data
+        :param compression: one of the COMPRESSION_* values
+        :param name: the name of the source used in log messages
+        :param cache_path: when set, the decompressed data is written to this
+                           path once the stream has been read completely
+        :param checksum: the expected MD5 hex digest of the decompressed
+                         data; a DownloadException is raised by the read
+                         reaching the end of the stream on mismatch
+        """
+        self.name = name
+        self.__source = source
+        self.__compression = compression
+        self.__decompressor = self.__new_decompressor()
+        self.__buffer = b''
+        self.__offset = 0
+        self.__eof = False
+        self.__digest = hashlib.md5()
+        self.__checksum = checksum
+        self.__position = 0
+        self.__cache_path = cache_path
+        self.__cache_file = None
+        if cache_path:
+            cache_dir = os.path.dirname(cache_path)
+            if cache_dir and not os.path.isdir(cache_dir):
+                os.makedirs(cache_dir)
+            self.__cache_file = open(cache_path + '.part', 'wb')
+
+    def __new_decompressor(self):
+        if self.__compression == COMPRESSION_GZIP:
+            return zlib.decompressobj(16 + zlib.MAX_WBITS)
+        elif self.__compression == COMPRESSION_BZ2:
+            return bz2.BZ2Decompressor()
+        elif self.__compression == COMPRESSION_XZ:
+            if not lzma:
+                raise DownloadException('xz decompression is unavailable')
+            return lzma.LZMADecompressor()
+        raise DownloadException(
+            'Unsupported compression - ' + str(self.__compression))
+
+    def __fill(self, size):
+        """
+        Decompresses source data until the buffer holds size unread bytes or
+        the stream has ended
+        """
+        while not self.__eof and (
+                size < 0 or len(self.__buffer) - self.__offset < size):
+            data = self.__source.read(COMPRESSED_READ_SIZE)
+            if not data:
+                self.__eof = True
+                if not getattr(self.__decompressor, 'eof', True):
+                    raise DownloadException(
+                        'Compressed data from %s ended unexpectedly' %
+                        self.name)
+                break
+
+            decompressed = list()
+            while data:
+                if getattr(self.__decompressor, 'eof', False):
+                    self.__decompressor = self.__new_decompressor()
+                decompressed.append(self.__decompressor.decompress(data))
+                data = None
+                if getattr(self.__decompressor, 'eof', False):
+                    data = self.__decompressor.unused_data
+
+            self.__buffer = b''.join(
+                [self.__buffer[self.__offset:]] + decompressed)
+            self.__offset = 0
+
+    def read(self, size=-1):
+        """
+        Returns up to size decompressed bytes, all remaining bytes when size
+        is negative and an empty string at the end of the stream
+        :param size: the maximum number of bytes
+        :return: the bytes
+        """
+        if size is None:
+            size = -1
+        self.__fill(size)
+        if size < 0:
+            out = self.__buffer[self.__offset:]
+        else:
+            out = self.__buffer[self.__offset:self.__offset + size]
+        self.__offset += len(out)
+
+        self.__position += len(out)
+        self.__digest.update(out)
+        if self.__cache_file:
+            self.__cache_file.write(out)
+
+        if not out and self.__eof:
+            self.__complete()
+        return out
+
+    def __complete(self):
+        """
+        Verifies the checksum and saves the cache file once the whole stream
+        has been read
+        """
+        if self.__checksum and self.checksum() != self.__checksum.lower():
+            self.close()
+            raise DownloadException(
+                'Checksum mismatch for %s, expected %s but was %s' % (
+                    self.name, self.__checksum, self.checksum()))
+
+        if self.__cache_file:
+            self.__cache_file.close()
+            self.__cache_file = None
+            os.rename(self.__cache_path + '.part', self.__cache_path)
+            logger.info('Cached decompressed data to %s', self.__cache_path)
+
+    def checksum(self):
+        """
+        Returns the MD5 hex digest of the decompressed bytes read so far
+        """
+        return self.__digest.hexdigest()
+
+    def tell(self):
+        return self.__position
+
+    def close(self):
+        """
+        Closes the source and discards any incomplete cache file
+        """
+        if self.__source:
+            self.__source.close()
+            self.__source = None
+        if self.__cache_file:
+            self.__cache_file.close()
+            self.__cache_file = None
+            os.remove(self.__cache_path + '.part')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class DownloadException(Exception):
+    """
+    Exception when a file cannot be downloaded completely or correctly
+    """
@@ -0,0 +1,117 @@
+# Copyright (c) 2017 Cable Television Laboratories, Inc. ("CableLabs")
+#                    and others.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import threading
+
+__author__ = 'spisarski'
+
+"""
+The registry of hooks and the in memory metrics collectors shared by the
+modules reporting events such as waiter, api_metrics, image_metrics and
+deployment. Each of those modules only defines the methods of its hook
+"""
+
+
+class HookRegistry:
+    """
+    The hooks registered with a module, notified in registration order
+    """
+
+    def __init__(self):
+        self.__hooks = list()
+
+    def add(self, hook):
+        """
+        Registers a hook where a hook already registered is ignored
+        :param hook: the hook object
+        """
+        if hook not in self.__hooks:
+            self.__hooks.append(hook)
+
+    def remove(self, hook):
+        """
+        Unregisters a hook added with add()
+        :param hook: the hook object
+        """
+        if hook in self.__hooks:
+            self.__hooks.remove(hook)
+
+    def is_enabled(self):
+        """
+        Returns True when at least one hook is registered
+        """
+        return len(self.__hooks) > 0
+
+    def notify(self, method, *args):
+        """
+        Calls a method of each registered hook
+        :param method: the name of the hook method (i.e. 'on_wait')
+        :param args: the arguments of the method
+        """
+        for hook in list(self.__hooks):
+            getattr(hook, method)(*args)
+
+
+class MetricsCollector:
+    """
+    Base class of the hooks accumulating metrics objects in memory where a
+    metrics object is created on first use from the key it is stored under
+    """
+
+    def __init__(self, metrics_class, logger):
+        """
+        Constructor
+        :param metrics_class: the class of the metrics objects constructed
+                              with the values of their key
+        :param logger: the logger of log_summary()
+        """
+        self._lock = threading.Lock()
+        self.__metrics_class = metrics_class
+        self.__logger = logger
+        self.__metrics = dict()
+
+    def _get(self, *key):
+        """
+        Returns the metrics object of a key, which must be called while
+        holding self._lock
+        :param key: the values the metrics object is constructed with
+        :return: the metrics object
+        """
+        metrics = self.__metrics.get(key)
+        if not metrics:
+            metrics = self.__metrics_class(*key)
+            self.__metrics[key] = metrics
+        return metrics
+
+    def get_metrics(self):
+        """
+        Returns the collected metrics ordered by key
+        :return: a list of metrics objects
+        """
+        with self._lock:
+            return [self.__metrics[key] for key in sorted(self.__metrics)]
+
+    def summary(self):
+        """
+        Returns a human readable table of the collected metrics
+        :return: the string
+        """
+        raise NotImplementedError('Do not override abstract method')
+
+    def log_summary(self):
+        """
+        Logs the summary when metrics have been collected
+        """
+        if self.__metrics:
+            self.__logger.info(self.summary())
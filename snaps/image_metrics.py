@@ -0,0 +1,208 @@
+# Copyright (c) 2017 Cable Television Laboratories, Inc. ("CableLabs")
+#                    and others.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import logging
+
+from snaps import hooks
+
+__author__ = 'spisarski'
+
+"""
+Hooks for collecting the bytes transferred and the time spent in each phase
+of staging an image. Nothing is recorded until a hook has been registered
+with add_hook()
+"""
+
+logger = logging.getLogger('image_metrics')
+
+PHASE_CONNECT = 'connect'
+PHASE_DOWNLOAD = 'download'
+PHASE_WRITE = 'write'
+PHASE_UPLOAD = 'upload'
+PHASE_ACTIVATE = 'activate'
+PHASE_RETRY = 'retry'
+
+__hooks = hooks.HookRegistry()
+
+
+def add_hook(hook):
+    """
+    Registers a hook to be notified of image transfer events
+    :param hook: an ImageMetricsHook object
+    """
+    __hooks.add(hook)
+
+
+def remove_hook(hook):
+    """
+    Unregisters a hook added with add_hook()
+    :param hook: the ImageMetricsHook object
+    """
+    __hooks.remove(hook)
+
+
+def record_phase(image_name, phase, seconds, num_bytes=0):
+    """
+    Notifies the hooks that a transfer phase has completed
+    :param image_name: the name of the image
+    :param phase: the phase name (i.e. PHASE_DOWNLOAD)
+    :param seconds: the time spent in the phase
+    :param num_bytes: the number of bytes transferred during the phase
+    """
+    __hooks.notify('on_phase', image_name, phase, seconds, num_bytes)
+
+
+def record_retry(image_name, phase):
+    """
+    Notifies the hooks that a transfer phase is being retried
+    :param image_name: the name of the image
+    :param phase: the phase name
+    """
+    __hooks.notify('on_retry', image_name, phase)
+
+
+def record_active(image_name, seconds):
+    """
+    Notifies the hooks that an image has become active
+    :param image_name: the name of the image
+    :param seconds: the time from the start of the upload until the image
+                    became active
+    """
+    __hooks.notify('on_active', image_name, seconds)
+
+
+def download_callback(image_name):
+    """
+    Returns the callback to pass to file_utils.download() for an image or
+    None when no hooks are registered
+    :param image_name: the name of the image being downloaded
+    :return: a function or None
+    """
+    if not __hooks.is_enabled():
+        return None
+
+    def callback(phase, seconds, num_bytes):
+        if phase == PHASE_RETRY:
+            record_retry(image_name, PHASE_DOWNLOAD)
+        else:
+            record_phase(image_name, phase, seconds, num_bytes)
+
+    return callback
+
+
+class ImageMetricsHook:
+    """
+    Base class for objects receiving image transfer events. Implementations
+    must be thread safe as segmented downloads report from several threads
+    """
+
+    def on_phase(self, image_name, phase, seconds, num_bytes):
+        """
+        Called when a transfer phase has completed
+        """
+        pass
+
+    def on_retry(self, image_name, phase):
+        """
+        Called before a transfer phase is retried
+        """
+        pass
+
+    def on_active(self, image_name, seconds):
+        """
+        Called when an image has become active
+        """
+        pass
+
+
+class ImageTransferMetrics:
+    """
+    The metrics collected for a single image
+    """
+
+    def __init__(self, name):
+        """
+        Constructor
+        :param name: the image's name
+        """
+        self.name = name
+        self.phase_seconds = dict()
+        self.phase_bytes = dict()
+        self.retries = 0
+        self.time_to_active = None
+
+    def throughput(self, phase):
+        """
+        Returns the MB/s achieved during a phase or None when no bytes or
+        time were recorded for it
+        :param phase: the phase name
+        :return: a float or None
+        """
+        seconds = self.phase_seconds.get(phase)
+        num_bytes = self.phase_bytes.get(phase)
+        if seconds and num_bytes:
+            return num_bytes / seconds / (1024 * 1024)
+
+
+class ImageMetricsCollector(ImageMetricsHook, hooks.MetricsCollector):
+    """
+    Hook accumulating the ImageTransferMetrics of each image in memory
+    """
+
+    def __init__(self):
+        hooks.MetricsCollector.__init__(self, ImageTransferMetrics, logger)
+
+    def on_phase(self, image_name, phase, seconds, num_bytes):
+        with self._lock:
+            metrics = self._get(image_name)
+            metrics.phase_seconds[phase] = (
+                metrics.phase_seconds.get(phase, 0) + seconds)
+            metrics.phase_bytes[phase] = (
+                metrics.phase_bytes.get(phase, 0) + num_bytes)
+
+    def on_retry(self, image_name, phase):
+        with self._lock:
+            self._get(image_name).retries += 1
+
+    def on_active(self, image_name, seconds):
+        with self._lock:
+            self._get(image_name).time_to_active = seconds
+
+    def summary(self):
+        """
+        Returns a human readable table of the collected metrics
+        :return: the string
+        """
+        phases = [PHASE_CONNECT, PHASE_DOWNLOAD, PHASE_WRITE, PHASE_UPLOAD,
+                  PHASE_ACTIVATE]
+        lines = ['Image transfer metrics:']
+        for metrics in self.get_metrics():
+            active = 'n/a'
+            if metrics.time_to_active is not None:
+                active = '%.2fs' % metrics.time_to_active
+            lines.append('  %s - time to active %s, retries %d' % (
+                metrics.name, active, metrics.retries))
+            for phase in phases:
+                if phase not in metrics.phase_seconds:
+                    continue
+                line = '    %-8s %8.2fs' % (
+                    phase, metrics.phase_seconds[phase])
+                if metrics.phase_bytes.get(phase):
+                    line += ' %10.1f MB' % (
+                        metrics.phase_bytes[phase] / (1024.0 * 1024))
+                    rate = metrics.throughput(phase)
+                    if rate:
+                        line += ' %8.1f MB/s' % rate
+                lines.append(line)
+        return '\n'.join(lines)
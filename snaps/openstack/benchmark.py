@@ -0,0 +1,572 @@
+# Copyright (c) 2017 Cable Television Laboratories, Inc. ("CableLabs")
+#                    and others.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import json
+import logging
+import math
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from snaps import api_metrics, concurrency
+from snaps.openstack.create_image import ImageSettings
+from snaps.openstack.create_instance import (
+    FloatingIpSettings, OpenStackVmInstance, VmInstanceSettings)
+from snaps.openstack.create_keypairs import KeypairSettings, OpenStackKeypair
+from snaps.openstack.create_network import (
+    NetworkSettings, OpenStackNetwork, PortSettings, SubnetSettings)
+from snaps.openstack.create_router import OpenStackRouter, RouterSettings
+from snaps.openstack.create_security_group import (
+    Direction, OpenStackSecurityGroup, Protocol, SecurityGroupRuleSettings,
+    SecurityGroupSettings)
+from snaps.openstack.create_stack import OpenStackHeatStack, StackSettings
+
+__author__ = 'spisarski'
+
+"""
+Measures a cloud by repeatedly creating and cleaning a number of resources of
+one type with the SNAPS-OO creators at each of a list of concurrency levels.
+The seconds each resource took to become active (and reachable over SSH for
+VMs) are reported as percentiles along with the API calls made per resource
+and the number of resources created per second
+"""
+
+logger = logging.getLogger('benchmark')
+
+RES_VM = 'vm'
+RES_NETWORK = 'network'
+RES_STACK = 'stack'
+RESOURCE_TYPES = (RES_VM, RES_NETWORK, RES_STACK)
+
+PHASE_CREATE = 'create'
+PHASE_CLEAN = 'clean'
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(samples, pct):
+    """
+    Returns the nearest-rank percentile of a list of numbers
+    :param samples: the list of numbers
+    :param pct: the percentile between 0 and 100
+    :return: the number or None when there are no samples
+    """
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    rank = int(math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[max(rank, 1) - 1]
+
+
+def get_percentiles(samples):
+    """
+    Returns the percentiles of PERCENTILES of a list of numbers
+    :param samples: the list of numbers
+    :return: a dict of numbers or None keyed by 'p50', 'p95' and 'p99'
+    """
+    return dict(('p%d' % pct, percentile(samples, pct))
+                for pct in PERCENTILES)
+
+
+class BenchmarkSettings:
+    """
+    Class representing a resource mix to benchmark
+    """
+
+    def __init__(self, **kwargs):
+        """
+        Constructor
+        :param name: the name of the benchmark which prefixes the names of
+                     the resources it creates (required)
+        :param resource_type: one of RESOURCE_TYPES (required)
+        :param count: the number of resources created and cleaned together
+                      in each iteration (default 1)
+        :param iterations: the number of times the resources are created and
+                           cleaned at each concurrency level (default 1)
+        :param concurrency: the list of the numbers of resources created or
+                            cleaned at the same time (default [1])
+        :param flavor: the name of the flavor of the VMs (required for VMs)
+        :param image_name: the name of the existing image of the VMs (required
+                           for VMs)
+        :param image_user: the user with which to SSH into the VMs (required
+                           for VMs)
+        :param ext_net_name: the name of the external network to which the
+                             routers are attached (required when floating_ip
+                             is True)
+        :param floating_ip: when True a floating IP is assigned to each VM
+                            (default False)
+        :param ssh: when True the seconds until each VM can be reached over
+                    SSH through its floating IP are measured (default False)
+        :param template_path: the Heat template of the stacks (required for
+                              stacks)
+        :param env_values: the dict of the parameters of the stacks
+        :param cidr_prefix: the first two octets of the CIDRs of the subnets
+                            (default '10.200')
+        """
+        self.name = kwargs.get('name')
+        self.resource_type = kwargs.get('resource_type',
+                                        kwargs.get('type'))
+        self.count = int(kwargs.get('count', 1))
+        self.iterations = int(kwargs.get('iterations', 1))
+
+        concurrency = kwargs.get('concurrency', [1])
+        if not isinstance(concurrency, list):
+            concurrency = [concurrency]
+        self.concurrency = [int(level) for level in concurrency]
+
+        self.flavor = kwargs.get('flavor')
+        self.image_name = kwargs.get('image_name', kwargs.get('image'))
+        self.image_user = kwargs.get('image_user')
+        self.ext_net_name = kwargs.get('ext_net_name', kwargs.get('ext_net'))
+        self.floating_ip = bool(kwargs.get('floating_ip', False))
+        self.ssh = bool(kwargs.get('ssh', False))
+        self.template_path = kwargs.get('template_path')
+        self.env_values = kwargs.get('env_values')
+        self.cidr_prefix = kwargs.get('cidr_prefix', '10.200')
+
+        if not self.name:
+            raise BenchmarkSettingsError('name is required')
+        if self.resource_type not in RESOURCE_TYPES:
+            raise BenchmarkSettingsError(
+                'type must be one of %s' % ', '.join(RESOURCE_TYPES))
+        if self.count < 1 or self.iterations < 1:
+            raise BenchmarkSettingsError(
+                'count and iterations must be at least 1')
+        if not self.concurrency or min(self.concurrency) < 1:
+            raise BenchmarkSettingsError(
+                'concurrency levels must be at least 1')
+        if self.resource_type == RES_VM:
+            if not self.flavor or not self.image_name or not self.image_user:
+                raise BenchmarkSettingsError(
+                    'flavor, image_name and image_user are required for VMs')
+            if self.ssh and not self.floating_ip:
+                raise BenchmarkSettingsError(
+                    'ssh requires floating_ip to be True')
+            if self.floating_ip and not self.ext_net_name:
+                raise BenchmarkSettingsError(
+                    'floating_ip requires ext_net_name')
+        if self.resource_type == RES_STACK and not self.template_path:
+            raise BenchmarkSettingsError(
+                'template_path is required for stacks')
+
+
+class BenchmarkResult:
+    """
+    The measurements of a benchmark at one concurrency level
+    """
+
+    def __init__(self, name, resource_type, concurrency):
+        self.name = name
+        self.resource_type = resource_type
+        self.concurrency = concurrency
+        self.resources = 0
+        self.failures = list()
+        self.active_times = list()
+        self.ssh_times = list()
+        self.clean_times = list()
+        self.create_seconds = 0
+        self.create_calls = 0
+        self.clean_calls = 0
+
+    def throughput(self):
+        """
+        Returns the number of resources that became active per second spent
+        creating them
+        :return: the float value
+        """
+        if self.create_seconds:
+            return len(self.active_times) / self.create_seconds
+        return 0
+
+    def calls_per_resource(self, phase):
+        """
+        Returns the average number of API calls made for each resource
+        :param phase: PHASE_CREATE or PHASE_CLEAN
+        :return: the float value
+        """
+        if not self.resources:
+            return 0
+        if phase == PHASE_CREATE:
+            return self.create_calls / float(self.resources)
+        return self.clean_calls / float(self.resources)
+
+    def to_dict(self):
+        """
+        Returns the measurements in the types json can serialize
+        :return: the dict
+        """
+        return {
+            'name': self.name,
+            'type': self.resource_type,
+            'concurrency': self.concurrency,
+            'resources': self.resources,
+            'failures': list(self.failures),
+            'time_to_active': get_percentiles(self.active_times),
+            'time_to_ssh': get_percentiles(self.ssh_times),
+            'time_to_clean': get_percentiles(self.clean_times),
+            'api_calls_per_resource': {
+                PHASE_CREATE: self.calls_per_resource(PHASE_CREATE),
+                PHASE_CLEAN: self.calls_per_resource(PHASE_CLEAN)},
+            'throughput': self.throughput(),
+        }
+
+
+class BenchmarkRunner(api_metrics.ApiCallHook):
+    """
+    Runs benchmarks and keeps their results. While running, the runner is an
+    api_metrics hook counting the calls made in the current phase, so the
+    OpenStack clients of the creators are instrumented
+    """
+
+    def __init__(self, os_creds):
+        """
+        Constructor
+        :param os_creds: the OpenStack credentials
+        """
+        self.os_creds = os_creds
+        self.__lock = threading.Lock()
+        self.__results = list()
+        self.__calls = 0
+
+    def on_call(self, service, operation, start, seconds, status, items):
+        with self.__lock:
+            self.__calls += 1
+
+    def run(self, benchmark_settings):
+        """
+        Runs the benchmark at each of its concurrency levels
+        :param benchmark_settings: the BenchmarkSettings object
+        :return: the list of BenchmarkResult objects of this benchmark
+        """
+        api_metrics.add_hook(self)
+        tmp_dir = tempfile.mkdtemp()
+        shared = list()
+        try:
+            shared = self.__create_shared(benchmark_settings, tmp_dir)
+            results = list()
+            for level in benchmark_settings.concurrency:
+                result = BenchmarkResult(
+                    benchmark_settings.name,
+                    benchmark_settings.resource_type, level)
+                for iteration in range(benchmark_settings.iterations):
+                    self.__run_iteration(benchmark_settings, result,
+                                         iteration, tmp_dir)
+                logger.info('Benchmark %s at concurrency %d - %d of %d '
+                            'resources active', result.name, level,
+                            len(result.active_times), result.resources)
+                results.append(result)
+            with self.__lock:
+                self.__results.extend(results)
+            return results
+        finally:
+            for creator in reversed(shared):
+                try:
+                    creator.clean()
+                except Exception as e:
+                    logger.error('Unexpected error cleaning shared resource '
+                                 'of benchmark %s - %s',
+                                 benchmark_settings.name, e)
+            api_metrics.remove_hook(self)
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def get_results(self):
+        """
+        Returns the results of every benchmark run
+        :return: a list of BenchmarkResult objects
+        """
+        with self.__lock:
+            return list(self.__results)
+
+    def to_json(self):
+        """
+        Returns the results as a JSON document
+        :return: the string
+        """
+        return json.dumps(
+            {'results': [result.to_dict() for result in self.get_results()]},
+            indent=2, sort_keys=True)
+
+    def write(self, path):
+        """
+        Writes the results as a JSON document
+        :param path: the file path
+        """
+        with open(path, 'w') as json_file:
+            json_file.write(self.to_json())
+            json_file.write('\n')
+
+    def summary(self):
+        """
+        Returns a human readable table of the results with the seconds to
+        active and to SSH as p50/p95/p99
+        :return: the string
+        """
+        lines = ['Benchmark results:',
+                 '  %-20s %-8s %5s %9s %-26s %-26s %9s %9s %8s' % (
+                     'name', 'type', 'conc', 'active',
+                     'to active p50/p95/p99 (s)', 'to ssh p50/p95/p99 (s)',
+                     'calls/res', 'clean/res', 'res/s')]
+        for result in self.get_results():
+            lines.append('  %-20s %-8s %5d %9s %-26s %-26s %9.1f %9.1f '
+                         '%8.3f' % (
+                             result.name, result.resource_type,
+                             result.concurrency, '%d/%d' % (
+                                 len(result.active_times), result.resources),
+                             self.__format_percentiles(result.active_times),
+                             self.__format_percentiles(result.ssh_times),
+                             result.calls_per_resource(PHASE_CREATE),
+                             result.calls_per_resource(PHASE_CLEAN),
+                             result.throughput()))
+        return '\n'.join(lines)
+
+    def log_summary(self):
+        """
+        Logs the summary when benchmarks have been run
+        """
+        if self.get_results():
+            logger.info(self.summary())
+
+    @staticmethod
+    def __format_percentiles(samples):
+        """
+        Returns the p50/p95/p99 of samples as a string
+        """
+        if not samples:
+            return '-'
+        return '/'.join('%.2f' % percentile(samples, pct)
+                        for pct in PERCENTILES)
+
+    def __get_calls(self):
+        with self.__lock:
+            return self.__calls
+
+    def __run_iteration(self, settings, result, iteration, tmp_dir):
+        """
+        Creates the resources of one iteration and cleans them
+        :param settings: the BenchmarkSettings object
+        :param result: the BenchmarkResult object in which the measurements
+                       are recorded
+        :param iteration: the index of the iteration
+        :param tmp_dir: the directory holding the benchmark's key files
+        """
+        creators = list()
+        for index in range(settings.count):
+            name = '%s-%d-%d-%d' % (settings.name, result.concurrency,
+                                    iteration, index)
+            creators.append(
+                (name, self.__get_creator(settings, name, index, tmp_dir)))
+        result.resources += len(creators)
+
+        def create(creator):
+            start = time.time()
+            self.__create(settings, creator)
+            elapsed = time.time() - start
+            with self.__lock:
+                result.active_times.append(elapsed)
+            if settings.ssh:
+                if not creator.vm_ssh_active(block=True):
+                    raise BenchmarkError('not reachable over SSH')
+                elapsed = time.time() - start
+                with self.__lock:
+                    result.ssh_times.append(elapsed)
+
+        def clean(creator):
+            start = time.time()
+            creator.clean()
+            elapsed = time.time() - start
+            with self.__lock:
+                result.clean_times.append(elapsed)
+
+        calls = self.__get_calls()
+        start = time.time()
+        result.failures.extend(self.__run_concurrent(
+            create, creators, result.concurrency))
+        result.create_seconds += time.time() - start
+        result.create_calls += self.__get_calls() - calls
+
+        calls = self.__get_calls()
+        result.failures.extend(self.__run_concurrent(
+            clean, creators, result.concurrency))
+        result.clean_calls += self.__get_calls() - calls
+
+    @staticmethod
+    def __create(settings, creator):
+        """
+        Creates the resources of a creator and waits until they are active
+        :param settings: the BenchmarkSettings object
+        :param creator: the creator or list of creators of one resource
+        """
+        if settings.resource_type == RES_VM:
+            creator.create(block=True)
+        else:
+            creator.create()
+
+    def __run_concurrent(self, function, creators, max_workers):
+        """
+        Calls function once for each creator with no more than max_workers
+        calls in flight at the same time
+        :param function: the function to call with a creator
+        :param creators: the list of (name, creator) tuples
+        :param max_workers: the maximum number of concurrent calls
+        :return: a list of error messages for the calls that raised
+        """
+        errors = list()
+        lock = threading.Lock()
+
+        def call(item):
+            name, creator = item
+            function(creator)
+
+        def on_error(item, e):
+            name, creator = item
+            logger.error('Unexpected error with %s - %s', name, e)
+            with lock:
+                errors.append('%s: %s' % (name, e))
+
+        concurrency.run_concurrent(call, creators, max_workers,
+                                   on_error=on_error)
+        return errors
+
+    def __create_shared(self, settings, tmp_dir):
+        """
+        Creates the resources the VMs of a benchmark share, which are a
+        network with a router when floating IPs are used and a keypair and a
+        security group opening SSH when SSH is measured
+        :param settings: the BenchmarkSettings object
+        :param tmp_dir: the directory in which the keypair files are written
+        :return: the list of creators of the shared resources
+        """
+        if settings.resource_type != RES_VM:
+            return list()
+
+        creators = [self.__get_network_creator(
+            settings, settings.name + '-net', 0)]
+        if settings.floating_ip:
+            creators.append(OpenStackRouter(self.os_creds, RouterSettings(
+                name=settings.name + '-router',
+                external_gateway=settings.ext_net_name,
+                internal_subnets=[settings.name + '-net-subnet'])))
+        if settings.ssh:
+            creators.append(OpenStackKeypair(self.os_creds, KeypairSettings(
+                name=settings.name + '-kp',
+                public_filepath=os.path.join(tmp_dir, 'benchmark.pub'),
+                private_filepath=os.path.join(tmp_dir, 'benchmark'))))
+            sec_grp_name = settings.name + '-sec-grp'
+            creators.append(OpenStackSecurityGroup(
+                self.os_creds, SecurityGroupSettings(
+                    name=sec_grp_name, rule_settings=[
+                        SecurityGroupRuleSettings(
+                            sec_grp_name=sec_grp_name,
+                            direction=Direction.ingress,
+                            protocol=Protocol.tcp, port_range_min=22,
+                            port_range_max=22)])))
+
+        created = list()
+        try:
+            for creator in creators:
+                creator.create()
+                created.append(creator)
+        except Exception:
+            for creator in reversed(created):
+                creator.clean()
+            raise
+        return created
+
+    def __get_network_creator(self, settings, name, index):
+        """
+        Returns the creator of a network with a subnet whose CIDR is unique
+        per index
+        """
+        return OpenStackNetwork(self.os_creds, NetworkSettings(
+            name=name, subnet_settings=[SubnetSettings(
+                name=name + '-subnet', cidr='%s.%d.0/24' % (
+                    settings.cidr_prefix, index % 256))]))
+
+    def __get_creator(self, settings, name, index, tmp_dir):
+        """
+        Returns the creator of one resource of a benchmark
+        :param settings: the BenchmarkSettings object
+        :param name: the name of the resource
+        :param index: the index of the resource in its iteration
+        :param tmp_dir: the directory holding the benchmark's key files
+        :return: an object with the methods create() and clean()
+        """
+        if settings.resource_type == RES_VM:
+            port_name = name + '-port'
+            floating_ips = list()
+            if settings.floating_ip:
+                floating_ips.append(FloatingIpSettings(
+                    name=name + '-fip', port_name=port_name,
+                    router_name=settings.name + '-router'))
+            keypair_settings = None
+            security_group_names = list()
+            if settings.ssh:
+                keypair_settings = KeypairSettings(
+                    name=settings.name + '-kp',
+                    public_filepath=os.path.join(tmp_dir, 'benchmark.pub'),
+                    private_filepath=os.path.join(tmp_dir, 'benchmark'))
+                security_group_names.append(settings.name + '-sec-grp')
+            return OpenStackVmInstance(
+                self.os_creds, VmInstanceSettings(
+                    name=name, flavor=settings.flavor,
+                    port_settings=[PortSettings(
+                        name=port_name,
+                        network_name=settings.name + '-net')],
+                    floating_ip_settings=floating_ips,
+                    security_group_names=security_group_names),
+                ImageSettings(name=settings.image_name,
+                              image_user=settings.image_user, exists=True),
+                keypair_settings=keypair_settings)
+        if settings.resource_type == RES_NETWORK:
+            return NetworkRouterCreator(
+                self.__get_network_creator(settings, name, index),
+                OpenStackRouter(self.os_creds, RouterSettings(
+                    name=name + '-router',
+                    external_gateway=settings.ext_net_name,
+                    internal_subnets=[name + '-subnet'])))
+        return OpenStackHeatStack(self.os_creds, StackSettings(
+            name=name, template_path=settings.template_path,
+            env_values=settings.env_values))
+
+
+class NetworkRouterCreator:
+    """
+    Creates a network with its router as one resource of a benchmark
+    """
+
+    def __init__(self, network_creator, router_creator):
+        self.network_creator = network_creator
+        self.router_creator = router_creator
+
+    def create(self):
+        self.network_creator.create()
+        self.router_creator.create()
+
+    def clean(self):
+        self.router_creator.clean()
+        self.network_creator.clean()
+
+
+class BenchmarkSettingsError(Exception):
+    """
+    Exception to be thrown when benchmark settings attributes are incorrect
+    """
+
+
+class BenchmarkError(Exception):
+    """
+    Exception to be thrown when a benchmarked resource cannot be reached
+    """
@@ -58,6 +58,19 @@ class OpenStackFlavor(OpenStackComputeObject):
                         self.flavor_settings.name)
         return self.__flavor
 
+    def initialize_from_ids(self, resource_ids):
+        """
+        Loads the existing OpenStack flavor from the ID returned by
+        get_resource_ids() rather than searching for it by name
+        :param resource_ids: the dict returned by get_resource_ids()
+        :return: The Flavor domain object or None
+        """
+        super(self.__class__, self).initialize()
+
+        self.__flavor = nova_utils.get_flavor_by_id(
+            self._nova, resource_ids['flavor'])
+        return self.__flavor
+
     def create(self):
         """
         Creates the image in OpenStack if it does not already exist
@@ -95,6 +108,14 @@ class OpenStackFlavor(OpenStackComputeObject):
         """
         return self.__flavor
 
+    def get_resource_ids(self):
+        """
+        Returns the ID of the flavor to be given to initialize_from_ids()
+        :return: a dict or None when there is no flavor
+        """
+        if self.__flavor:
+            return {'flavor': self.__flavor.id}
+
 
 class FlavorSettings:
     """
@@ -17,6 +17,7 @@ from glanceclient.exc import HTTPNotFound
 import logging
 import time
 
+from snaps import file_utils, image_metrics, waiter
 from snaps.openstack.openstack_creator import OpenStackCloudObject
 from snaps.openstack.utils import glance_utils
 
@@ -47,6 +48,7 @@ class OpenStackImage(OpenStackCloudObject):
         self.__image = None
         self.__kernel_image = None
         self.__ramdisk_image = None
+        self.__reused_image_ids = set()
         self.__glance = None
 
     def initialize(self):
@@ -77,6 +79,26 @@ class OpenStackImage(OpenStackCloudObject):
 
         return self.__image
 
+    def initialize_from_ids(self, resource_ids):
+        """
+        Loads the existing Image and its kernel and ramdisk images from the
+        IDs returned by get_resource_ids() rather than searching for them by
+        name
+        :param resource_ids: the dict returned by get_resource_ids()
+        :return: The Image domain object or None
+        """
+        self.__glance = glance_utils.glance_client(self._os_creds)
+        self.__image = glance_utils.get_image_by_id(
+            self.__glance, resource_ids['image'])
+        if resource_ids.get('kernel_image'):
+            self.__kernel_image = glance_utils.get_image_by_id(
+                self.__glance, resource_ids['kernel_image'])
+        if resource_ids.get('ramdisk_image'):
+            self.__ramdisk_image = glance_utils.get_image_by_id(
+                self.__glance, resource_ids['ramdisk_image'])
+        self.__reused_image_ids = set(resource_ids.get('reused', list()))
+        return self.__image
+
     def create(self):
         """
         Creates the image in OpenStack if it does not already exist and returns
@@ -89,6 +111,9 @@ class OpenStackImage(OpenStackCloudObject):
             extra_properties = self.image_settings.extra_properties or dict()
 
             if self.image_settings.kernel_image_settings:
+                if not self.__kernel_image:
+                    self.__kernel_image = self.__get_duplicate_image(
+                        self.image_settings.kernel_image_settings)
                 if not self.__kernel_image:
                     logger.info(
                         'Creating associated kernel image with name - %s',
@@ -98,6 +123,9 @@ class OpenStackImage(OpenStackCloudObject):
                         self.image_settings.kernel_image_settings)
                 extra_properties['kernel_id'] = self.__kernel_image.id
             if self.image_settings.ramdisk_image_settings:
+                if not self.__ramdisk_image:
+                    self.__ramdisk_image = self.__get_duplicate_image(
+                        self.image_settings.ramdisk_image_settings)
                 if not self.__ramdisk_image:
                     logger.info(
                         'Creating associated ramdisk image with name - %s',
@@ -108,15 +136,26 @@ class OpenStackImage(OpenStackCloudObject):
                 extra_properties['ramdisk_id'] = self.__ramdisk_image.id
 
             self.image_settings.extra_properties = extra_properties
+            self.__image = self.__get_duplicate_image(self.image_settings)
+            if self.__image:
+                return self.__image
+
+            create_start = time.time()
             self.__image = glance_utils.create_image(self.__glance,
                                                      self.image_settings)
 
             logger.info(
                 'Created image with name - %s', self.image_settings.name)
+            active_start = time.time()
             if self.__image and self.image_active(block=True):
                 logger.info(
                     'Image is now active with name - %s',
                     self.image_settings.name)
+                image_metrics.record_phase(
+                    self.image_settings.name, image_metrics.PHASE_ACTIVATE,
+                    time.time() - active_start)
+                image_metrics.record_active(
+                    self.image_settings.name, time.time() - create_start)
                 return self.__image
             else:
                 raise ImageCreationError(
@@ -133,7 +172,7 @@ class OpenStackImage(OpenStackCloudObject):
         :return: void
         """
         for image in [self.__image, self.__kernel_image, self.__ramdisk_image]:
-            if image:
+            if image and image.id not in self.__reused_image_ids:
                 try:
                     glance_utils.delete_image(self.__glance, image)
                 except HTTPNotFound:
@@ -142,6 +181,37 @@ class OpenStackImage(OpenStackCloudObject):
         self.__image = None
         self.__kernel_image = None
         self.__ramdisk_image = None
+        self.__reused_image_ids = set()
+
+    def __get_duplicate_image(self, image_settings):
+        """
+        Returns an existing active image with the same contents as the one
+        configured by image_settings when its dedup attribute is True. Images
+        returned here are shared and will not be deleted by clean()
+        :param image_settings: the settings of the image to find
+        :return: the Image domain object or None
+        """
+        if not image_settings.dedup:
+            return None
+
+        checksum = image_settings.checksum
+        if not checksum and image_settings.image_file:
+            checksum = file_utils.get_file_checksum(
+                image_settings.image_file, image_settings.compression)
+        if not checksum:
+            logger.info(
+                'Cannot deduplicate image without a checksum or image file '
+                '- %s', image_settings.name)
+            return None
+
+        image = glance_utils.get_image_by_checksum(
+            self.__glance, checksum, image_settings.format,
+            image_settings.extra_properties)
+        if image:
+            logger.info('Reusing image %s with the same contents as - %s',
+                        image.name, image_settings.name)
+            self.__reused_image_ids.add(image.id)
+        return image
 
     def get_image(self):
         """
@@ -167,6 +237,20 @@ class OpenStackImage(OpenStackCloudObject):
         """
         return self.__ramdisk_image
 
+    def get_resource_ids(self):
+        """
+        Returns the IDs of the image and its kernel and ramdisk images to be
+        given to initialize_from_ids() where the shared images found through
+        the dedup setting are listed under 'reused'
+        :return: a dict or None when there is no image
+        """
+        if self.__image:
+            return {'image': self.__image.id,
+                    'kernel_image': getattr(self.__kernel_image, 'id', None),
+                    'ramdisk_image': getattr(
+                        self.__ramdisk_image, 'id', None),
+                    'reused': sorted(self.__reused_image_ids)}
+
     def image_active(self, block=False, timeout=IMAGE_ACTIVE_TIMEOUT,
                      poll_interval=POLL_INTERVAL):
         """
@@ -194,28 +278,11 @@ class OpenStackImage(OpenStackCloudObject):
         :param poll_interval: The polling interval in seconds
         :return: T/F
         """
-        # sleep and wait for image status change
-        if block:
-            start = time.time()
-        else:
-            start = time.time() - timeout
-
-        while timeout > time.time() - start:
-            status = self._status(expected_status_code)
-            if status:
-                logger.debug(
-                    'Image is active with name - ' + self.image_settings.name)
-                return True
-
-            logger.debug('Retry querying image status in ' + str(
-                poll_interval) + ' seconds')
-            time.sleep(poll_interval)
-            logger.debug('Image status query timeout in ' + str(
-                timeout - (time.time() - start)))
-
-        logger.error(
-            'Timeout checking for image status for ' + expected_status_code)
-        return False
+        return waiter.wait_for(
+            'image', self.image_settings.name,
+            lambda: self._status(expected_status_code), timeout,
+            block=block, poll_interval=poll_interval,
+            expected=expected_status_code)
 
     def _status(self, expected_status_code):
         """
@@ -257,6 +324,24 @@ class ImageSettings:
         :param exists: When True, an image with the given name must exist
         :param public: When True, an image will be created with public
                        visibility
+        :param checksum: the MD5 checksum of the image's contents used to
+                         verify downloads and to find duplicate images; for
+                         compressed sources, the checksum of the
+                         decompressed contents (optional)
+        :param dedup: When True, an existing active image with the same
+                      checksum, format and extra properties is reused instead
+                      of uploading a new one (default False)
+        :param upload_chunk_size: the number of bytes of each slice of a
+                                  local file when its upload body is iterated
+                                  rather than read, as the glance client reads
+                                  it in its own chunk size
+                                  (default file_utils.MAPPED_READ_CHUNK_SIZE)
+        :param compression: the compression of the url or image_file
+                            contents (gzip|xz|bz2) which is decompressed as
+                            it is streamed into glance (default determined
+                            by the url or image_file extension)
+        :param cache_dir: the directory in which decompressed images are
+                          saved for reuse by later uploads (optional)
         """
 
         self.name = kwargs.get('name')
@@ -308,6 +393,23 @@ class ImageSettings:
         else:
             self.public = False
 
+        self.checksum = kwargs.get('checksum')
+
+        if 'dedup' in kwargs and kwargs['dedup'] is True:
+            self.dedup = True
+        else:
+            self.dedup = False
+
+        self.upload_chunk_size = None
+        if kwargs.get('upload_chunk_size'):
+            self.upload_chunk_size = int(kwargs['upload_chunk_size'])
+
+        self.compression = kwargs.get('compression')
+        if not self.compression:
+            self.compression = file_utils.get_compression(
+                self.url or self.image_file)
+        self.cache_dir = kwargs.get('cache_dir')
+
         if not self.name:
             raise ImageSettingsError("The attribute name is required")
 
@@ -322,6 +424,11 @@ class ImageSettings:
             raise ImageSettingsError(
                 'Format is required when the image should not already exist')
 
+        if (self.compression and self.compression not in
+                file_utils.COMPRESSION_SUFFIXES.values()):
+            raise ImageSettingsError(
+                'Unsupported compression - ' + self.compression)
+
 
 class ImageSettingsError(Exception):
     """
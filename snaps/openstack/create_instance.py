@@ -16,9 +16,14 @@ import logging
 import time
 
 from neutronclient.common.exceptions import PortNotFoundClient
+from neutronclient.common.utils import str2bool
 from novaclient.exceptions import NotFound
 
+from snaps import waiter
+from snaps.domain.vm_inst import FloatingIp
 from snaps.openstack.create_network import PortSettings
+from snaps.openstack.create_volume import (
+    VolumeSettings, get_image_volume_cache)
 from snaps.openstack.openstack_creator import OpenStackComputeObject
 from snaps.openstack.utils import glance_utils, cinder_utils
 from snaps.openstack.utils import neutron_utils
@@ -65,6 +70,12 @@ class OpenStackVmInstance(OpenStackComputeObject):
         # Note: this object does not change after the VM becomes active
         self.__vm = None
 
+        # The cloned boot volume when instance_settings.boot_from_volume
+        self.__boot_volume_creator = None
+
+        # True once the VM's deletion has been requested by clean()
+        self.__vm_deleting = False
+
     def initialize(self):
         """
         Loads the existing VMInst, Port, FloatingIps
@@ -77,6 +88,71 @@ class OpenStackVmInstance(OpenStackComputeObject):
         self.__ports = self.__query_ports(self.instance_settings.port_settings)
         self.__lookup_existing_vm_by_name()
 
+    def initialize_existing(self, vm_inst, ports, floating_ips, nova=None,
+                            neutron=None):
+        """
+        Loads an existing VMInst from objects that have already been retrieved
+        in bulk instead of querying OpenStack for them
+        :param vm_inst: the VMInst domain object
+        :param ports: a list of tuple 2 where index 0 is the port name and
+                      index 1 is the SNAPS-OO Port object
+        :param floating_ips: a list of tuple 2 (port_id, SNAPS FloatingIp)
+                             of the VM's ports
+        :param nova: a nova client to share rather than creating a new one
+        :param neutron: a neutron client to share rather than creating a new
+                        one
+        :return: VMInst domain object
+        """
+        self._nova = nova or nova_utils.nova_client(self._os_creds)
+        self.__neutron = neutron or neutron_utils.neutron_client(
+            self._os_creds)
+
+        self.__ports = list(ports)
+        self.__vm = vm_inst
+
+        port_names = dict((port.id, port.name) for name, port in self.__ports)
+        for port_id, fip in floating_ips:
+            for fip_setting in self.instance_settings.floating_ip_settings:
+                if (port_id == fip_setting.port_id or
+                        (port_id in port_names and
+                         port_names[port_id] == fip_setting.port_name)):
+                    self.__floating_ip_dict[fip_setting.name] = fip
+
+        return self.__vm
+
+    def initialize_from_ids(self, resource_ids):
+        """
+        Loads the existing VMInst, Ports and FloatingIps from the IDs returned
+        by get_resource_ids() rather than searching for them by name
+        :param resource_ids: the dict returned by get_resource_ids()
+        :return: VMInst domain object or None when the VM or any of its ports
+                 no longer exists
+        """
+        super(self.__class__, self).initialize()
+
+        self.__neutron = neutron_utils.neutron_client(self._os_creds)
+
+        vm_inst = nova_utils.get_server_object_by_id(
+            self._nova, resource_ids['vm'])
+        if not vm_inst:
+            return None
+
+        ports = list()
+        for port_name, port_id in resource_ids.get('ports', list()):
+            port = neutron_utils.get_port_by_id(self.__neutron, port_id)
+            if not port:
+                return None
+            ports.append((port_name, port))
+
+        floating_ips = list()
+        for port_id, fip_id, fip_ip in resource_ids.get(
+                'floating_ips', list()):
+            floating_ips.append((port_id, FloatingIp(id=fip_id, ip=fip_ip)))
+
+        return self.initialize_existing(
+            vm_inst, ports, floating_ips, nova=self._nova,
+            neutron=self.__neutron)
+
     def create(self, block=False):
         """
         Creates a VM instance and associated objects unless they already exist
@@ -132,9 +208,14 @@ class OpenStackVmInstance(OpenStackComputeObject):
                       assigned after active when block=True
         """
         glance = glance_utils.glance_client(self._os_creds)
+        boot_volume = None
+        if self.instance_settings.boot_from_volume:
+            boot_volume = self.__create_boot_volume()
+
         self.__vm = nova_utils.create_server(
             self._nova, self.__neutron, glance, self.instance_settings,
-            self.image_settings, self.keypair_settings)
+            self.image_settings, self.keypair_settings,
+            boot_volume=boot_volume)
         logger.info('Created instance with name - %s',
                     self.instance_settings.name)
 
@@ -157,8 +238,8 @@ class OpenStackVmInstance(OpenStackComputeObject):
                     self.instance_settings.name)
 
         if self.instance_settings.volume_names:
+            cinder = cinder_utils.cinder_client(self._os_creds)
             for volume_name in self.instance_settings.volume_names:
-                cinder = cinder_utils.cinder_client(self._os_creds)
                 volume = cinder_utils.get_volume(
                     cinder, volume_name=volume_name)
 
@@ -233,9 +314,29 @@ class OpenStackVmInstance(OpenStackComputeObject):
                 return network.name
         return None
 
-    def clean(self):
+    def __create_boot_volume(self):
+        """
+        Clones the boot volume of this VM from the cached volume of its image
+        and volume type
+        :return: the domain Volume object
+        """
+        volume_settings = VolumeSettings(
+            name=self.instance_settings.get_boot_volume_name(),
+            size=self.instance_settings.boot_volume_size or 1,
+            type_name=self.instance_settings.boot_volume_type,
+            availability_zone=self.instance_settings.availability_zone)
+        cache = get_image_volume_cache(self._os_creds)
+        self.__boot_volume_creator = cache.clone(
+            volume_settings, self.image_settings.name)
+        return self.__boot_volume_creator.get_volume()
+
+    def clean(self, block=True):
         """
         Destroys the VM instance
+        :param block: when False, the VM's deletion is requested without
+                      waiting for it to complete. Calling clean() again once
+                      the VM is gone (see vms_deleted()) deletes the boot
+                      volume
         """
 
         # Cleanup floating IPs
@@ -248,9 +349,15 @@ class OpenStackVmInstance(OpenStackComputeObject):
         self.__floating_ip_dict = dict()
 
         # Detach Volume
-        for volume_rec in self.__vm.volume_ids:
+        volume_recs = list()
+        if self.__vm and not self.__vm_deleting:
+            volume_recs = self.__vm.volume_ids
+        for volume_rec in volume_recs:
             cinder = cinder_utils.cinder_client(self._os_creds)
             volume = cinder_utils.get_volume_by_id(cinder, volume_rec['id'])
+            if (volume and volume.name ==
+                    self.instance_settings.get_boot_volume_name()):
+                continue
             if volume:
                 try:
                     vm = nova_utils.detach_volume(
@@ -279,12 +386,18 @@ class OpenStackVmInstance(OpenStackComputeObject):
 
         # Cleanup VM
         if self.__vm:
-            try:
-                logger.info(
-                    'Deleting VM instance - ' + self.instance_settings.name)
-                nova_utils.delete_vm_instance(self._nova, self.__vm)
-            except Exception as e:
-                logger.error('Error deleting VM - %s', e)
+            if not self.__vm_deleting:
+                try:
+                    logger.info(
+                        'Deleting VM instance - ' +
+                        self.instance_settings.name)
+                    nova_utils.delete_vm_instance(self._nova, self.__vm)
+                except Exception as e:
+                    logger.error('Error deleting VM - %s', e)
+                self.__vm_deleting = True
+
+            if not block:
+                return
 
             # Block until instance cannot be found or returns the status of
             # DELETED
@@ -296,6 +409,7 @@ class OpenStackVmInstance(OpenStackComputeObject):
                         'VM has been properly deleted VM with name - %s',
                         self.instance_settings.name)
                     self.__vm = None
+                    self.__vm_deleting = False
                 else:
                     logger.error(
                         'VM not deleted within the timeout period of %s '
@@ -305,6 +419,15 @@ class OpenStackVmInstance(OpenStackComputeObject):
                     'Unexpected error while checking VM instance status - %s',
                     e)
 
+        # Cleanup a boot volume nova has not deleted along with the VM
+        if (self.__boot_volume_creator
+                and self.instance_settings.delete_boot_volume):
+            try:
+                self.__boot_volume_creator.clean()
+            except Exception as e:
+                logger.error('Error deleting boot volume - %s', e)
+            self.__boot_volume_creator = None
+
     def __query_ports(self, port_settings):
         """
         Returns the previously configured ports or an empty list if none
@@ -389,13 +512,6 @@ class OpenStackVmInstance(OpenStackComputeObject):
         raise VmInstanceCreationError(
             'Timeout while attempting add floating IP to instance')
 
-    def get_os_creds(self):
-        """
-        Returns the OpenStack credentials used to create these objects
-        :return: the credentials
-        """
-        return self._os_creds
-
     def get_vm_inst(self):
         """
         Returns the latest version of this server object from OpenStack
@@ -403,6 +519,37 @@ class OpenStackVmInstance(OpenStackComputeObject):
         """
         return nova_utils.get_server_object_by_id(self._nova, self.__vm.id)
 
+    def get_vm_id(self):
+        """
+        Returns the ID of the server this creator has created or loaded
+        without calling OpenStack
+        :return: the server ID or None when there is no server
+        """
+        if self.__vm:
+            return self.__vm.id
+
+    def get_resource_ids(self):
+        """
+        Returns the IDs of the VM, its ports and floating IPs to be given to
+        initialize_from_ids()
+        :return: a dict or None when there is no VM
+        """
+        if not self.__vm:
+            return None
+
+        port_ids = dict((name, port.id) for name, port in self.__ports)
+        floating_ips = list()
+        for fip_setting in self.instance_settings.floating_ip_settings:
+            fip = self.__floating_ip_dict.get(fip_setting.name)
+            if fip:
+                floating_ips.append([
+                    fip_setting.port_id or port_ids.get(
+                        fip_setting.port_name), fip.id, fip.ip])
+
+        return {'vm': self.__vm.id,
+                'ports': [[name, port.id] for name, port in self.__ports],
+                'floating_ips': floating_ips}
+
     def get_console_output(self):
         """
         Returns the vm console object for parsing logs
@@ -600,27 +747,11 @@ class OpenStackVmInstance(OpenStackComputeObject):
         :param poll_interval: The polling interval in seconds
         :return: T/F
         """
-        # sleep and wait for VM status change
-        if block:
-            start = time.time()
-        else:
-            return self.__status(expected_status_code)
-
-        while timeout > time.time() - start:
-            status = self.__status(expected_status_code)
-            if status:
-                logger.info('VM is - ' + expected_status_code)
-                return True
-
-            logger.debug('Retry querying VM status in ' + str(
-                poll_interval) + ' seconds')
-            time.sleep(poll_interval)
-            logger.debug('VM status query timeout in ' + str(
-                timeout - (time.time() - start)))
-
-        logger.error(
-            'Timeout checking for VM status for ' + expected_status_code)
-        return False
+        return waiter.wait_for(
+            'vm', self.instance_settings.name,
+            lambda: self.__status(expected_status_code), timeout,
+            block=block, poll_interval=poll_interval,
+            expected=expected_status_code)
 
     def __status(self, expected_status_code):
         """
@@ -635,7 +766,13 @@ class OpenStackVmInstance(OpenStackComputeObject):
             else:
                 return False
 
-        status = nova_utils.get_server_status(self._nova, self.__vm)
+        try:
+            status = nova_utils.get_server_status(self._nova, self.__vm)
+        except NotFound:
+            if expected_status_code == STATUS_DELETED:
+                return True
+            raise
+
         if not status:
             logger.warning('Cannot find instance with id - ' + self.__vm.id)
             return False
@@ -662,22 +799,12 @@ class OpenStackVmInstance(OpenStackComputeObject):
         timeout = self.instance_settings.ssh_connect_timeout
 
         if self.vm_active(block=True):
-            if block:
-                start = time.time()
-            else:
-                start = time.time() - timeout
-
-            while timeout > time.time() - start:
-                status = self.__ssh_active()
-                if status:
-                    logger.info('SSH is active for VM instance')
-                    return True
-
-                logger.debug('Retry SSH connection in ' + str(
-                    poll_interval) + ' seconds')
-                time.sleep(poll_interval)
-                logger.debug('SSH connection timeout in ' + str(
-                    timeout - (time.time() - start)))
+            if waiter.wait_for(
+                    'vm_ssh', self.instance_settings.name,
+                    self.__ssh_active, timeout, block=block,
+                    poll_interval=poll_interval, expected='reachable'):
+                logger.info('SSH is active for VM instance')
+                return True
 
         logger.error('Timeout attempting to connect with VM via SSH')
         return False
@@ -766,6 +893,62 @@ class OpenStackVmInstance(OpenStackComputeObject):
             return False
 
 
+def vms_deleted(vm_creators, timeout=None, poll_interval=POLL_INTERVAL):
+    """
+    Blocks until the VMs of OpenStackVmInstance objects cleaned with
+    block=False can no longer be found. The servers of each set of
+    credentials are polled with a single list call per interval rather than
+    one call per VM. The VMs that are already gone count as deleted and the
+    creators without a VM are ignored
+    :param vm_creators: list of OpenStackVmInstance objects
+    :param timeout: the number of seconds to wait (default = the largest
+                    vm_delete_timeout of the creators' settings)
+    :param poll_interval: The polling interval in seconds
+    :return: the list of creators whose VMs have not been deleted within
+             the timeout
+    """
+    creators = dict((creator.get_vm_id(), creator)
+                    for creator in vm_creators if creator.get_vm_id())
+    if timeout is None:
+        timeout = max([creator.instance_settings.vm_delete_timeout
+                       for creator in creators.values()] or [0])
+
+    nova_clients = dict()
+    for creator in creators.values():
+        key = creator.get_os_creds().get_key()
+        if key not in nova_clients:
+            nova_clients[key] = nova_utils.nova_client(
+                creator.get_os_creds())
+
+    def list_statuses(server_ids):
+        ids_by_creds = dict()
+        for server_id in server_ids:
+            ids_by_creds.setdefault(
+                creators[server_id].get_os_creds().get_key(),
+                list()).append(server_id)
+
+        # the servers still listed have no status to wait for
+        statuses = dict()
+        for key, ids in ids_by_creds.items():
+            for vm_inst in nova_utils.get_servers_by_ids(
+                    nova_clients[key], ids):
+                statuses[vm_inst.id] = None
+        return statuses
+
+    done, failed, not_deleted = waiter.wait_for_all(
+        'vm', list(creators.keys()), list_statuses, STATUS_DELETED, timeout,
+        missing_status=STATUS_DELETED,
+        names=dict((server_id, creator.instance_settings.name)
+                   for server_id, creator in creators.items()),
+        poll_interval=poll_interval)
+
+    for server_id in not_deleted:
+        logger.error('VM %s not deleted within the timeout period of %s '
+                     'seconds', creators[server_id].instance_settings.name,
+                     timeout)
+    return [creators[server_id] for server_id in not_deleted]
+
+
 class VmInstanceSettings:
     """
     Class responsible for holding configuration setting for a VM Instance
@@ -793,6 +976,15 @@ class VmInstanceSettings:
                                   deploy the VM (optional)
         :param volume_names: a list of the names of the volume to attach
                              (optional)
+        :param boot_from_volume: when True, the VM boots from a volume cloned
+                                 from a cached volume of its image rather than
+                                 from the image itself (default False)
+        :param boot_volume_size: the size of the boot volume in GB which is
+                                 never less than the size of the image
+                                 (optional)
+        :param boot_volume_type: the name of the boot volume's type (optional)
+        :param delete_boot_volume: when True, the boot volume is deleted along
+                                   with the VM (default True)
         :param userdata: the string contents of any optional cloud-init script
                          to execute after the VM has been activated.
                          This value may also contain a dict who's key value
@@ -850,6 +1042,19 @@ class VmInstanceSettings:
         if self.volume_names and not isinstance(self.volume_names, list):
             raise VmInstanceSettingsError('volume_names must be a list')
 
+        self.boot_from_volume = str2bool(
+            str(kwargs.get('boot_from_volume', False)))
+        self.boot_volume_size = kwargs.get('boot_volume_size')
+        if self.boot_volume_size is not None:
+            try:
+                self.boot_volume_size = int(self.boot_volume_size)
+            except ValueError:
+                raise VmInstanceSettingsError(
+                    'boot_volume_size must be an integer')
+        self.boot_volume_type = kwargs.get('boot_volume_type')
+        self.delete_boot_volume = str2bool(
+            str(kwargs.get('delete_boot_volume', True)))
+
         if not self.name or not self.flavor:
             raise VmInstanceSettingsError(
                 'Instance configuration requires the attributes: name, flavor')
@@ -858,6 +1063,14 @@ class VmInstanceSettings:
             raise VmInstanceSettingsError(
                 'Instance configuration requires port settings (aka. NICS)')
 
+    def get_boot_volume_name(self):
+        """
+        Returns the name of the volume from which this VM boots when
+        boot_from_volume is True
+        :return: the volume name
+        """
+        return self.name + '-boot-volume'
+
 
 class FloatingIpSettings:
     """
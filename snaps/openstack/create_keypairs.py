@@ -60,6 +60,21 @@ class OpenStackKeypair(OpenStackComputeObject):
         except Exception as e:
             logger.warn('Cannot load existing keypair - %s', e)
 
+    def initialize_from_ids(self, resource_ids):
+        """
+        Loads the existing OpenStack Keypair from the ID returned by
+        get_resource_ids() rather than listing every keypair
+        :param resource_ids: the dict returned by get_resource_ids()
+        :return: The Keypair domain object or None
+        """
+        super(self.__class__, self).initialize()
+
+        self.__keypair = nova_utils.keypair_exists(
+            self._nova, resource_ids['keypair'])
+        if 'delete_keys_on_clean' in resource_ids:
+            self.__delete_keys_on_clean = resource_ids['delete_keys_on_clean']
+        return self.__keypair
+
     def create(self):
         """
         Responsible for creating the keypair object.
@@ -138,6 +153,15 @@ class OpenStackKeypair(OpenStackComputeObject):
         """
         return self.__keypair
 
+    def get_resource_ids(self):
+        """
+        Returns the ID of the keypair to be given to initialize_from_ids()
+        :return: a dict or None when there is no keypair
+        """
+        if self.__keypair:
+            return {'keypair': self.__keypair.id,
+                    'delete_keys_on_clean': self.__delete_keys_on_clean}
+
 
 class KeypairSettings:
     """
@@ -65,6 +65,32 @@ class OpenStackNetwork(OpenStackNetworkObject):
 
         return self.__network
 
+    def initialize_from_ids(self, resource_ids):
+        """
+        Loads the existing OpenStack network/subnet from the IDs returned by
+        get_resource_ids() rather than searching for them by name
+        :param resource_ids: the dict returned by get_resource_ids()
+        :return: The Network domain object or None when the network or any
+                 of its subnets no longer exists
+        """
+        super(self.__class__, self).initialize()
+
+        network = neutron_utils.get_network_by_id(
+            self._neutron, resource_ids['network'])
+        if not network:
+            return None
+
+        subnets = list()
+        for subnet_id in resource_ids.get('subnets', list()):
+            subnet = neutron_utils.get_subnet_by_id(self._neutron, subnet_id)
+            if not subnet:
+                return None
+            subnets.append(subnet)
+
+        self.__network = network
+        self.__subnets = subnets
+        return self.__network
+
     def create(self):
         """
         Responsible for creating not only the network but then a private
@@ -130,6 +156,16 @@ class OpenStackNetwork(OpenStackNetworkObject):
         """
         return self.__subnets
 
+    def get_resource_ids(self):
+        """
+        Returns the IDs of the network and subnets to be given to
+        initialize_from_ids()
+        :return: a dict or None when there is no network
+        """
+        if self.__network:
+            return {'network': self.__network.id,
+                    'subnets': [subnet.id for subnet in self.__subnets]}
+
 
 class NetworkSettings:
     """
@@ -54,6 +54,19 @@ class OpenStackProject(OpenStackIdentityObject):
             keystone=self._keystone, project_settings=self.project_settings)
         return self.__project
 
+    def initialize_from_ids(self, resource_ids):
+        """
+        Loads the existing Project object from the ID returned by
+        get_resource_ids() rather than searching for it by name
+        :param resource_ids: the dict returned by get_resource_ids()
+        :return: The Project domain object or None
+        """
+        super(self.__class__, self).initialize()
+
+        self.__project = keystone_utils.get_project_by_id(
+            self._keystone, resource_ids['project'])
+        return self.__project
+
     def create(self):
         """
         Creates a Project/Tenant in OpenStack if it does not already exist
@@ -120,6 +133,14 @@ class OpenStackProject(OpenStackIdentityObject):
         """
         return self.__project
 
+    def get_resource_ids(self):
+        """
+        Returns the ID of the project to be given to initialize_from_ids()
+        :return: a dict or None when there is no project
+        """
+        if self.__project:
+            return {'project': self.__project.id}
+
     def assoc_user(self, user):
         """
         The user object to associate with the project
@@ -59,6 +59,19 @@ class OpenStackQoS(OpenStackVolumeObject):
 
         return self.__qos
 
+    def initialize_from_ids(self, resource_ids):
+        """
+        Loads the existing QoS from the ID returned by get_resource_ids()
+        rather than searching for it by name
+        :param resource_ids: the dict returned by get_resource_ids()
+        :return: The QoS domain object or None
+        """
+        super(self.__class__, self).initialize()
+
+        self.__qos = cinder_utils.get_qos_by_id(
+            self._cinder, resource_ids['qos_spec'])
+        return self.__qos
+
     def create(self):
         """
         Creates the qos in OpenStack if it does not already exist and returns
@@ -97,6 +110,14 @@ class OpenStackQoS(OpenStackVolumeObject):
         """
         return self.__qos
 
+    def get_resource_ids(self):
+        """
+        Returns the ID of the QoS to be given to initialize_from_ids()
+        :return: a dict or None when there is no QoS
+        """
+        if self.__qos:
+            return {'qos_spec': self.__qos.id}
+
 
 class Consumer(enum.Enum):
     """
@@ -80,6 +80,40 @@ class OpenStackRouter(OpenStackNetworkObject):
 
         return self.__router
 
+    def initialize_from_ids(self, resource_ids):
+        """
+        Loads the existing router, internal subnets and ports from the IDs
+        returned by get_resource_ids() rather than searching for them by name
+        :param resource_ids: the dict returned by get_resource_ids()
+        :return: the Router domain object or None when the router or any of
+                 its internal subnets or ports no longer exists
+        """
+        super(self.__class__, self).initialize()
+
+        router = neutron_utils.get_router_by_id(
+            self._neutron, resource_ids['router'])
+        if not router:
+            return None
+
+        internal_subnets = list()
+        for subnet_id in resource_ids.get('internal_subnets', list()):
+            subnet = neutron_utils.get_subnet_by_id(self._neutron, subnet_id)
+            if not subnet:
+                return None
+            internal_subnets.append(subnet)
+
+        ports = list()
+        for port_id in resource_ids.get('ports', list()):
+            port = neutron_utils.get_port_by_id(self._neutron, port_id)
+            if not port:
+                return None
+            ports.append(port)
+
+        self.__router = router
+        self.__internal_subnets = internal_subnets
+        self.__ports = ports
+        return self.__router
+
     def create(self):
         """
         Responsible for creating the router.
@@ -183,6 +217,18 @@ class OpenStackRouter(OpenStackNetworkObject):
         """
         return self.__internal_router_interface
 
+    def get_resource_ids(self):
+        """
+        Returns the IDs of the router, internal subnets and ports to be given
+        to initialize_from_ids()
+        :return: a dict or None when there is no router
+        """
+        if self.__router:
+            return {'router': self.__router.id,
+                    'internal_subnets': [
+                        subnet.id for subnet in self.__internal_subnets],
+                    'ports': [port.id for port in self.__ports]}
+
 
 class RouterCreationError(Exception):
     """
@@ -57,17 +57,38 @@ class OpenStackSecurityGroup(OpenStackNetworkObject):
         self.__security_group = neutron_utils.get_security_group(
             self._neutron, sec_grp_settings=self.sec_grp_settings)
         if self.__security_group:
-            # Populate rules
-            existing_rules = neutron_utils.get_rules_by_security_group(
-                self._neutron, self.__security_group)
+            self.__load_rules()
+
+        return self.__security_group
+
+    def initialize_from_ids(self, resource_ids):
+        """
+        Loads the existing security group from the ID returned by
+        get_resource_ids() rather than searching for it by name
+        :param resource_ids: the dict returned by get_resource_ids()
+        :return: the security group domain object or None
+        """
+        super(self.__class__, self).initialize()
 
-            for existing_rule in existing_rules:
-                # For Custom Rules
-                rule_setting = self.__get_setting_from_rule(existing_rule)
-                self.__rules[rule_setting] = existing_rule
+        self.__security_group = neutron_utils.get_security_group_by_id(
+            self._neutron, resource_ids['security_group'])
+        if self.__security_group:
+            self.__load_rules()
 
         return self.__security_group
 
+    def __load_rules(self):
+        """
+        Populates the rules of the existing security group
+        """
+        existing_rules = neutron_utils.get_rules_by_security_group(
+            self._neutron, self.__security_group)
+
+        for existing_rule in existing_rules:
+            # For Custom Rules
+            rule_setting = self.__get_setting_from_rule(existing_rule)
+            self.__rules[rule_setting] = existing_rule
+
     def create(self):
         """
         Responsible for creating the security group.
@@ -168,6 +189,15 @@ class OpenStackSecurityGroup(OpenStackNetworkObject):
         """
         return self.__rules
 
+    def get_resource_ids(self):
+        """
+        Returns the ID of the security group to be given to
+        initialize_from_ids()
+        :return: a dict or None when there is no security group
+        """
+        if self.__security_group:
+            return {'security_group': self.__security_group.id}
+
     def add_rule(self, rule_setting):
         """
         Adds a rule to this security group
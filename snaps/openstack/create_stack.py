@@ -13,11 +13,15 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import calendar
+import datetime
 import logging
+import threading
 import time
 
 from heatclient.exc import HTTPNotFound
 
+from snaps import concurrency, waiter
 from snaps.openstack.create_instance import OpenStackVmInstance
 from snaps.openstack.create_volume import OpenStackVolume
 from snaps.openstack.create_volume_type import OpenStackVolumeType
@@ -35,10 +39,14 @@ logger = logging.getLogger('create_stack')
 STACK_DELETE_TIMEOUT = 1200
 STACK_COMPLETE_TIMEOUT = 1200
 POLL_INTERVAL = 3
+EVENT_POLL_INTERVAL = 1
 STATUS_CREATE_FAILED = 'CREATE_FAILED'
 STATUS_CREATE_COMPLETE = 'CREATE_COMPLETE'
 STATUS_DELETE_COMPLETE = 'DELETE_COMPLETE'
 STATUS_DELETE_FAILED = 'DELETE_FAILED'
+STATUS_UPDATE_COMPLETE = 'UPDATE_COMPLETE'
+STATUS_UPDATE_FAILED = 'UPDATE_FAILED'
+DEFAULT_MAX_WORKERS = 10
 
 
 class OpenStackHeatStack(OpenStackCloudObject, object):
@@ -76,6 +84,10 @@ class OpenStackHeatStack(OpenStackCloudObject, object):
 
         self.__stack = None
         self.__heat_cli = None
+        self.__resource_index = None
+        self.__event_marker = None
+        self.__action_pending = False
+        self.__resource_times = dict()
 
     def initialize(self):
         """
@@ -83,6 +95,7 @@ class OpenStackHeatStack(OpenStackCloudObject, object):
         :return: The Stack domain object or None
         """
         self.__heat_cli = heat_utils.heat_client(self._os_creds)
+        self.__resource_index = None
         self.__stack = heat_utils.get_stack(
             self.__heat_cli, stack_settings=self.stack_settings)
         if self.__stack:
@@ -101,6 +114,8 @@ class OpenStackHeatStack(OpenStackCloudObject, object):
             logger.info('Found stack with name - %s', self.stack_settings.name)
             return self.__stack
         else:
+            self.__event_marker = None
+            self.__action_pending = True
             self.__stack = heat_utils.create_stack(self.__heat_cli,
                                                    self.stack_settings)
             logger.info(
@@ -115,6 +130,73 @@ class OpenStackHeatStack(OpenStackCloudObject, object):
                 logger.error('ERROR: STACK CREATION FAILED: %s', status)
                 raise StackCreationError('Failure while creating stack')
 
+    def update(self, stack_settings=None, existing=True, preview=False):
+        """
+        Updates the existing heat stack in place so only the resources whose
+        definitions have changed are touched. The stack is created when it
+        does not already exist
+        :param stack_settings: the new stack settings (defaults to the current
+                               ones)
+        :param existing: when True, parameters not set in the new settings are
+                         kept from the existing stack (PATCH semantics)
+        :param preview: when True, the changes are previewed first and the
+                        update is skipped when no resource would change
+        :return: The Stack domain object
+        """
+        if stack_settings:
+            self.stack_settings = stack_settings
+
+        self.initialize()
+
+        if not self.__stack:
+            return self.create()
+
+        if preview:
+            changes = self.preview_update(existing=existing)
+            logger.info('Stack %s update preview - %s',
+                        self.stack_settings.name, changes)
+            if not any(changes.get(change_type) for change_type in
+                       ('added', 'deleted', 'replaced', 'updated')):
+                logger.info('No resources to update in stack - %s',
+                            self.stack_settings.name)
+                return self.__stack
+
+        self.__mark_events()
+        heat_utils.update_stack(
+            self.__heat_cli, self.__stack, self.stack_settings,
+            existing=existing)
+        logger.info('Updating stack with name - %s', self.stack_settings.name)
+
+        # resources may have been added, replaced or removed
+        self.__resource_index = None
+
+        if self.stack_updated(block=True):
+            self.__stack = heat_utils.get_stack_by_id(
+                self.__heat_cli, self.__stack.id)
+            logger.info('Stack is now updated with name - %s',
+                        self.stack_settings.name)
+            return self.__stack
+        else:
+            status = heat_utils.get_stack_status_reason(self.__heat_cli,
+                                                        self.__stack.id)
+            logger.error('ERROR: STACK UPDATE FAILED: %s', status)
+            raise StackUpdateError('Failure while updating stack')
+
+    def preview_update(self, stack_settings=None, existing=True):
+        """
+        Returns the changes an update with the given settings would make to
+        the stack's resources without changing anything
+        :param stack_settings: the new stack settings (defaults to the current
+                               ones)
+        :param existing: when True, parameters not set in the new settings are
+                         kept from the existing stack
+        :return: a dict of lists of resource names keyed by the type of change
+                 (added, deleted, replaced, updated and unchanged)
+        """
+        return heat_utils.preview_stack_update(
+            self.__heat_cli, self.__stack,
+            stack_settings or self.stack_settings, existing=existing)
+
     def clean(self):
         """
         Cleanse environment of all artifacts
@@ -123,6 +205,7 @@ class OpenStackHeatStack(OpenStackCloudObject, object):
         if self.__stack:
             try:
                 logger.info('Deleting stack - %s', self.__stack.name)
+                self.__mark_events()
                 heat_utils.delete_stack(self.__heat_cli, self.__stack)
 
                 try:
@@ -146,6 +229,7 @@ class OpenStackHeatStack(OpenStackCloudObject, object):
                             self.__stack.name)
 
                 # Delete Stack again
+                self.__mark_events()
                 heat_utils.delete_stack(self.__heat_cli, self.__stack)
                 deleted = self.stack_deleted(block=True)
                 if not deleted:
@@ -155,6 +239,7 @@ class OpenStackHeatStack(OpenStackCloudObject, object):
                 pass
 
             self.__stack = None
+            self.__resource_index = None
 
     def get_stack(self):
         """
@@ -181,7 +266,7 @@ class OpenStackHeatStack(OpenStackCloudObject, object):
         return heat_utils.get_stack_status(self.__heat_cli, self.__stack.id)
 
     def stack_complete(self, block=False, timeout=None,
-                       poll_interval=POLL_INTERVAL):
+                       poll_interval=EVENT_POLL_INTERVAL):
         """
         Returns true when the stack status returns the value of
         expected_status_code
@@ -193,11 +278,35 @@ class OpenStackHeatStack(OpenStackCloudObject, object):
         """
         if not timeout:
             timeout = self.stack_settings.stack_create_timeout
+        if block:
+            return self.__wait_for_event(
+                STATUS_CREATE_COMPLETE, STATUS_CREATE_FAILED, timeout,
+                poll_interval)
         return self._stack_status_check(STATUS_CREATE_COMPLETE, block, timeout,
                                         poll_interval, STATUS_CREATE_FAILED)
 
+    def stack_updated(self, block=False, timeout=None,
+                      poll_interval=EVENT_POLL_INTERVAL):
+        """
+        Returns true when the stack status returns the value of
+        expected_status_code
+        :param block: When true, thread will block until active or timeout
+                      value in seconds has been exceeded (False)
+        :param timeout: The timeout value
+        :param poll_interval: The polling interval in seconds
+        :return: T/F
+        """
+        if not timeout:
+            timeout = self.stack_settings.stack_create_timeout
+        if block:
+            return self.__wait_for_event(
+                STATUS_UPDATE_COMPLETE, STATUS_UPDATE_FAILED, timeout,
+                poll_interval)
+        return self._stack_status_check(STATUS_UPDATE_COMPLETE, block, timeout,
+                                        poll_interval, STATUS_UPDATE_FAILED)
+
     def stack_deleted(self, block=False, timeout=STACK_DELETE_TIMEOUT,
-                      poll_interval=POLL_INTERVAL):
+                      poll_interval=EVENT_POLL_INTERVAL):
         """
         Returns true when the stack status returns the value of
         expected_status_code
@@ -207,9 +316,77 @@ class OpenStackHeatStack(OpenStackCloudObject, object):
         :param poll_interval: The polling interval in seconds
         :return: T/F
         """
+        if block:
+            return self.__wait_for_event(
+                STATUS_DELETE_COMPLETE, STATUS_DELETE_FAILED, timeout,
+                poll_interval)
         return self._stack_status_check(STATUS_DELETE_COMPLETE, block, timeout,
                                         poll_interval, STATUS_DELETE_FAILED)
 
+    def get_resource_times(self):
+        """
+        Returns how long each resource took to reach its final status during
+        the last blocking call to stack_complete(), stack_updated() or
+        stack_deleted()
+        :return: a dict of seconds keyed by the resource name
+        """
+        return dict(self.__resource_times)
+
+    def __mark_events(self):
+        """
+        Remembers the latest stack event before an update or delete is issued
+        so the next wait only reads the events emitted after it
+        """
+        self.__action_pending = True
+        try:
+            event = heat_utils.get_last_stack_event(
+                self.__heat_cli, self.__stack)
+            self.__event_marker = event.id if event else None
+        except HTTPNotFound:
+            self.__event_marker = None
+
+    def __wait_for_event(self, expected_status_code, fail_status, timeout,
+                         poll_interval):
+        """
+        Waits for the stack event with the expected status and records the
+        time taken by each resource. When no create, update or delete has been
+        issued since the last wait ended, the stack's status is checked first
+        as the events of its last action have already been read
+        :param expected_status_code: the terminal stack status to wait for
+        :param fail_status: the stack status raising a StackError
+        :param timeout: The timeout value
+        :param poll_interval: The polling interval in seconds
+        :return: T/F
+        """
+        waiter = StackEventWaiter(
+            self.__heat_cli, self.__stack, marker=self.__event_marker)
+        try:
+            if waiter.wait(expected_status_code, fail_status, timeout,
+                           poll_interval,
+                           check_status=not self.__action_pending):
+                self.__action_pending = False
+                return True
+            return False
+        except StackError:
+            self.__action_pending = False
+            raise
+        finally:
+            self.__event_marker = waiter.get_marker()
+            self.__resource_times = waiter.get_resource_times()
+            waiter.log_slowest_resources()
+
+    def get_resource_index(self):
+        """
+        Returns the physical IDs of the stack's resources grouped by type. The
+        resources are listed once and reused by the get_*_creators() methods
+        until the stack is initialized or cleaned again
+        :return: a dict of lists of physical resource IDs keyed by type
+        """
+        if self.__resource_index is None:
+            self.__resource_index = heat_utils.get_resource_index(
+                self.__heat_cli, self.__stack)
+        return self.__resource_index
+
     def get_network_creators(self):
         """
         Returns a list of network creator objects as configured by the heat
@@ -221,7 +398,8 @@ class OpenStackHeatStack(OpenStackCloudObject, object):
 
         out = list()
         stack_networks = heat_utils.get_stack_networks(
-            self.__heat_cli, neutron, self.__stack)
+            self.__heat_cli, neutron, self.__stack,
+            resource_index=self.get_resource_index())
 
         for stack_network in stack_networks:
             net_settings = settings_utils.create_network_settings(
@@ -232,22 +410,36 @@ class OpenStackHeatStack(OpenStackCloudObject, object):
 
         return out
 
-    def get_vm_inst_creators(self, heat_keypair_option=None):
+    def get_vm_inst_creators(self, heat_keypair_option=None, batch=False):
         """
         Returns a list of VM Instance creator objects as configured by the heat
         template
+        :param heat_keypair_option: the stack output holding the private key
+                                    of a keypair created by the template
+        :param batch: when True, the flavors, images, networks, ports,
+                      floating IPs and outputs of all servers are retrieved
+                      once and every creator is built and initialized from
+                      them with shared clients instead of querying OpenStack
+                      for each server
         :return: list() of OpenStackVmInstance objects
         """
 
         out = list()
         nova = nova_utils.nova_client(self._os_creds)
-
-        stack_servers = heat_utils.get_stack_servers(
-            self.__heat_cli, nova, self.__stack)
-
         neutron = neutron_utils.neutron_client(self._os_creds)
         glance = glance_utils.glance_client(self._os_creds)
 
+        if batch:
+            stack_servers = nova_utils.get_servers_by_ids(
+                nova, self.get_resource_index().get(
+                    heat_utils.RES_TYPE_SERVER, list()))
+            return self.__create_vm_inst_creators(
+                nova, neutron, glance, stack_servers, heat_keypair_option)
+
+        stack_servers = heat_utils.get_stack_servers(
+            self.__heat_cli, nova, self.__stack,
+            resource_index=self.get_resource_index())
+
         for stack_server in stack_servers:
             vm_inst_settings = settings_utils.create_vm_inst_settings(
                 nova, neutron, stack_server)
@@ -265,6 +457,51 @@ class OpenStackHeatStack(OpenStackCloudObject, object):
 
         return out
 
+    def __create_vm_inst_creators(self, nova, neutron, glance, stack_servers,
+                                  heat_keypair_option):
+        """
+        Returns a list of VM Instance creator objects built from resources
+        retrieved once for all of the stack's servers
+        :param nova: the nova client shared by the creators
+        :param neutron: the neutron client shared by the creators
+        :param glance: the glance client
+        :param stack_servers: the stack's VmInst domain objects
+        :param heat_keypair_option: the stack output holding the private key
+        :return: list() of OpenStackVmInstance objects
+        """
+        out = list()
+
+        resource_index = settings_utils.get_server_resource_index(
+            nova, neutron, glance, stack_servers)
+        outputs = None
+        if heat_keypair_option:
+            outputs = heat_utils.get_outputs(self.__heat_cli, self.__stack)
+
+        for stack_server in stack_servers:
+            vm_inst_settings = settings_utils.create_vm_inst_settings(
+                nova, neutron, stack_server, resource_index=resource_index)
+            image_settings = settings_utils.determine_image_settings(
+                glance, stack_server, self.image_settings,
+                resource_index=resource_index)
+            keypair_settings = settings_utils.determine_keypair_settings(
+                self.__heat_cli, self.__stack, stack_server,
+                keypair_settings=self.keypair_settings,
+                priv_key_key=heat_keypair_option, outputs=outputs)
+            vm_inst_creator = OpenStackVmInstance(
+                self._os_creds, vm_inst_settings, image_settings,
+                keypair_settings)
+            out.append(vm_inst_creator)
+
+            ports = settings_utils.get_vm_inst_ports(
+                resource_index, vm_inst_settings)
+            vm_inst_creator.initialize_existing(
+                stack_server, ports,
+                settings_utils.get_vm_inst_floating_ips(
+                    resource_index, ports),
+                nova=nova, neutron=neutron)
+
+        return out
+
     def get_volume_creators(self):
         """
         Returns a list of Volume creator objects as configured by the heat
@@ -276,7 +513,8 @@ class OpenStackHeatStack(OpenStackCloudObject, object):
         cinder = cinder_utils.cinder_client(self._os_creds)
 
         volumes = heat_utils.get_stack_volumes(
-            self.__heat_cli, cinder, self.__stack)
+            self.__heat_cli, cinder, self.__stack,
+            resource_index=self.get_resource_index())
 
         for volume in volumes:
             settings = settings_utils.create_volume_settings(volume)
@@ -302,7 +540,8 @@ class OpenStackHeatStack(OpenStackCloudObject, object):
         cinder = cinder_utils.cinder_client(self._os_creds)
 
         vol_types = heat_utils.get_stack_volume_types(
-            self.__heat_cli, cinder, self.__stack)
+            self.__heat_cli, cinder, self.__stack,
+            resource_index=self.get_resource_index())
 
         for volume in vol_types:
             settings = settings_utils.create_volume_type_settings(volume)
@@ -332,28 +571,11 @@ class OpenStackHeatStack(OpenStackCloudObject, object):
         :param fail_status: Returns false if the fail_status code is found
         :return: T/F
         """
-        # sleep and wait for stack status change
-        if block:
-            start = time.time()
-        else:
-            start = time.time() - timeout
-
-        while timeout > time.time() - start:
-            status = self._status(expected_status_code, fail_status)
-            if status:
-                logger.debug(
-                    'Stack is active with name - ' + self.stack_settings.name)
-                return True
-
-            logger.debug('Retry querying stack status in ' + str(
-                poll_interval) + ' seconds')
-            time.sleep(poll_interval)
-            logger.debug('Stack status query timeout in ' + str(
-                timeout - (time.time() - start)))
-
-        logger.error(
-            'Timeout checking for stack status for ' + expected_status_code)
-        return False
+        return waiter.wait_for(
+            'stack', self.stack_settings.name,
+            lambda: self._status(expected_status_code, fail_status), timeout,
+            block=block, poll_interval=poll_interval,
+            expected=expected_status_code)
 
     def _status(self, expected_status_code, fail_status=STATUS_CREATE_FAILED):
         """
@@ -374,6 +596,414 @@ class OpenStackHeatStack(OpenStackCloudObject, object):
         return status == expected_status_code
 
 
+class OpenStackHeatStackGroup(OpenStackCloudObject):
+    """
+    Class responsible for managing many independent heat stacks at once. The
+    stacks are created and deleted concurrently with a shared heat client and
+    a single stack list call polls the status of every pending stack. A stack
+    that fails does not stop the others
+    """
+
+    def __init__(self, os_creds, stack_settings_list,
+                 max_workers=DEFAULT_MAX_WORKERS):
+        """
+        Constructor
+        :param os_creds: The OpenStack connection credentials
+        :param stack_settings_list: list of StackSettings objects
+        :param max_workers: the maximum number of concurrent heat calls
+                            (default 10)
+        :return:
+        """
+        super(self.__class__, self).__init__(os_creds)
+
+        self.stack_settings_list = stack_settings_list
+        self.max_workers = max(1, int(max_workers))
+        self.__heat_cli = None
+        self.__stacks = dict()
+        self.__failures = dict()
+        self.__creation_times = dict()
+        self.__deletion_times = dict()
+
+    def initialize(self):
+        """
+        Loads the existing stacks with a single stack list call
+        :return: a dict of the existing Stack domain objects keyed by name
+        """
+        self.__heat_cli = heat_utils.heat_client(self._os_creds)
+        self.__stacks = heat_utils.get_stacks_by_name(
+            self.__heat_cli,
+            [settings.name for settings in self.stack_settings_list])
+        return self.get_stacks()
+
+    def create(self, block=True):
+        """
+        Creates the stacks that do not already exist in OpenStack
+        :param block: when True, wait until every new stack is complete and
+                      record how long each one took
+        :return: a dict of the Stack domain objects keyed by name
+        :raise StackCreationError when any stack could not be created or
+               completed in the alloted amount of time. The stacks that did
+               complete are still returned by get_stacks()
+        """
+        self.initialize()
+        self.__failures = dict()
+
+        pending = [settings for settings in self.stack_settings_list
+                   if settings.name not in self.__stacks]
+        start_times = dict()
+        lock = threading.Lock()
+
+        def create_stack(stack_settings):
+            start = time.time()
+            stack = heat_utils.create_stack(self.__heat_cli, stack_settings)
+            logger.info('Created stack with name - %s', stack_settings.name)
+            with lock:
+                self.__stacks[stack_settings.name] = stack
+                start_times[stack.id] = start
+
+        self.__run_concurrent(create_stack, pending)
+
+        if block and start_times:
+            timeout = max(settings.stack_create_timeout
+                          for settings in pending)
+            self.__wait_for_status(
+                start_times, STATUS_CREATE_COMPLETE, STATUS_CREATE_FAILED,
+                timeout, self.__creation_times)
+
+        if self.__failures:
+            raise StackCreationError(
+                'Stack group was not created - %s' % '; '.join(
+                    '%s: %s' % item for item in sorted(
+                        self.__failures.items())))
+
+        return self.get_stacks()
+
+    def clean(self):
+        """
+        Cleanse environment of all stacks in the group
+        :return: void
+        """
+        if not self.__stacks:
+            return
+
+        start_times = dict()
+        lock = threading.Lock()
+
+        def delete_stack(stack_settings):
+            stack = self.__stacks[stack_settings.name]
+            start = time.time()
+            try:
+                heat_utils.delete_stack(self.__heat_cli, stack)
+            except HTTPNotFound:
+                pass
+            with lock:
+                start_times[stack.id] = start
+
+        self.__failures = dict()
+        self.__run_concurrent(
+            delete_stack, [settings for settings in self.stack_settings_list
+                           if settings.name in self.__stacks])
+        self.__wait_for_status(
+            start_times, STATUS_DELETE_COMPLETE, STATUS_DELETE_FAILED,
+            STACK_DELETE_TIMEOUT, self.__deletion_times)
+        for name, reason in self.__failures.items():
+            logger.error('Stack %s was not deleted - %s', name, reason)
+
+        self.__stacks = dict()
+
+    def get_stacks(self):
+        """
+        Returns the domain Stack objects as they were populated when
+        initialize() or create() was called
+        :return: a dict of Stack objects keyed by name
+        """
+        return dict(self.__stacks)
+
+    def get_stack_creators(self):
+        """
+        Returns an initialized OpenStackHeatStack for each stack in the group
+        so its resources can be retrieved
+        :return: a dict of OpenStackHeatStack objects keyed by name
+        """
+        out = dict()
+        for stack_settings in self.stack_settings_list:
+            if stack_settings.name in self.__stacks:
+                creator = OpenStackHeatStack(self._os_creds, stack_settings)
+                creator.initialize()
+                out[stack_settings.name] = creator
+        return out
+
+    def get_failures(self):
+        """
+        Returns the reasons of the stacks that failed during the last call to
+        create() or clean()
+        :return: a dict of failure reasons keyed by the stack name
+        """
+        return dict(self.__failures)
+
+    def get_creation_times(self):
+        """
+        Returns the number of seconds each stack created by this group took
+        to complete
+        :return: a dict of seconds keyed by the stack name
+        """
+        return dict(self.__creation_times)
+
+    def get_deletion_times(self):
+        """
+        Returns the number of seconds each stack deleted by this group took
+        to disappear
+        :return: a dict of seconds keyed by the stack name
+        """
+        return dict(self.__deletion_times)
+
+    def __run_concurrent(self, function, items):
+        """
+        Calls function once for each item with no more than max_workers calls
+        in flight at the same time. Errors are recorded as failures keyed by
+        the item's name
+        :param function: the function to call
+        :param items: the list of StackSettings arguments
+        """
+        lock = threading.Lock()
+
+        def on_error(item, e):
+            logger.error('Unexpected error with stack %s - %s', item.name, e)
+            with lock:
+                self.__failures[item.name] = str(e)
+
+        concurrency.run_concurrent(function, items, self.max_workers,
+                                   on_error=on_error)
+
+    def __wait_for_status(self, start_times, expected_status_code,
+                          fail_status, timeout, elapsed_times,
+                          poll_interval=POLL_INTERVAL):
+        """
+        Polls the status of all pending stacks with one stack list call per
+        interval until each one reaches the expected or failed status. Stacks
+        that fail or time out are recorded as failures
+        :param start_times: dict of start times keyed by the stack ID
+        :param expected_status_code: the status to wait for where the value
+                                     STATUS_DELETE_COMPLETE is also reached
+                                     when the stack disappears
+        :param fail_status: the status of a failed stack
+        :param timeout: the timeout value in seconds
+        :param elapsed_times: dict in which the seconds each stack took is
+                              recorded by name
+        :param poll_interval: the polling interval in seconds
+        """
+        names = dict((stack.id, name) for name, stack in self.__stacks.items())
+        reasons = dict()
+
+        def list_statuses(stack_ids):
+            statuses = dict()
+            for stack_id, status_reason in heat_utils.get_stack_statuses(
+                    self.__heat_cli, stack_ids).items():
+                statuses[stack_id] = status_reason[0]
+                reasons[stack_id] = status_reason[1]
+            return statuses
+
+        done, failed, pending = waiter.wait_for_all(
+            'stack', list(start_times.keys()), list_statuses,
+            expected_status_code, timeout,
+            is_failed=lambda status: status in (
+                fail_status, STATUS_DELETE_COMPLETE),
+            missing_status=STATUS_DELETE_COMPLETE, names=names,
+            poll_interval=poll_interval)
+
+        for stack_id, end_time in done.items():
+            elapsed_times[names[stack_id]] = end_time - start_times[stack_id]
+        for stack_id, status in failed.items():
+            self.__failures[names[stack_id]] = '%s - %s' % (
+                status, reasons.get(stack_id))
+        for stack_id in pending:
+            self.__failures[names[stack_id]] = (
+                'Timeout waiting for %s' % expected_status_code)
+
+
+class StackEventWaiter:
+    """
+    Waits for a heat stack to reach a terminal status by reading only the
+    events emitted since the last one seen rather than polling the stack.
+    Resource failures are logged as soon as their events arrive and the time
+    each resource takes is recorded
+    """
+
+    def __init__(self, heat_cli, stack, marker=None):
+        """
+        Constructor
+        :param heat_cli: the OpenStack heat client
+        :param stack: the SNAPS-OO Stack domain object
+        :param marker: the ID of the last event to ignore (optional)
+        """
+        self.__heat_cli = heat_cli
+        self.__stack = stack
+        self.__marker = marker
+        self.__start_times = dict()
+        self.__resource_times = dict()
+        self.__failures = list()
+
+    def wait(self, expected_status_code, fail_status, timeout,
+             poll_interval=EVENT_POLL_INTERVAL, check_status=False):
+        """
+        Returns True as soon as the stack event with the expected status is
+        read
+        :param expected_status_code: the terminal stack status to wait for
+        :param fail_status: the stack status raising a StackError
+        :param timeout: The timeout value in seconds
+        :param poll_interval: The interval in seconds between event reads
+        :param check_status: when True, the stack's status is read first and
+                             the wait ends when it is already the expected or
+                             failed status. Must be False right after an
+                             action is issued as the status may still be the
+                             one of the previous action
+        :return: T/F
+        :raise StackError when the stack reaches the fail_status
+        """
+        if check_status:
+            try:
+                status = heat_utils.get_stack_status(
+                    self.__heat_cli, self.__stack.id)
+            except HTTPNotFound:
+                if expected_status_code == STATUS_DELETE_COMPLETE:
+                    return True
+                raise
+            if status == expected_status_code:
+                return True
+            if status == fail_status:
+                raise StackError('Stack had an error - %s' % (
+                    heat_utils.get_stack_status_reason(
+                        self.__heat_cli, self.__stack.id)))
+
+        if waiter.wait_for(
+                'stack', self.__stack.name,
+                lambda: self.__read_events(expected_status_code, fail_status),
+                timeout, poll_interval=poll_interval,
+                expected=expected_status_code):
+            return True
+
+        # Events may have been purged so confirm with the stack's status
+        try:
+            if (heat_utils.get_stack_status(
+                    self.__heat_cli, self.__stack.id) ==
+                    expected_status_code):
+                return True
+        except HTTPNotFound:
+            if expected_status_code == STATUS_DELETE_COMPLETE:
+                return True
+
+        logger.error('Timeout waiting for stack status %s',
+                     expected_status_code)
+        return False
+
+    def __read_events(self, expected_status_code, fail_status):
+        """
+        Reads the events emitted since the last one read
+        :param expected_status_code: the terminal stack status to wait for
+        :param fail_status: the stack status raising a StackError
+        :return: True once the event with the expected status has been read
+        :raise StackError when the stack reaches the fail_status
+        """
+        try:
+            events = heat_utils.get_stack_events(
+                self.__heat_cli, self.__stack, marker=self.__marker)
+        except HTTPNotFound:
+            if expected_status_code == STATUS_DELETE_COMPLETE:
+                return True
+            raise
+
+        for event in events:
+            self.__marker = event.id
+            if event.physical_resource_id != self.__stack.id:
+                self.__record(event)
+            elif event.resource_status == expected_status_code:
+                logger.debug('Stack %s has status %s',
+                             self.__stack.name, expected_status_code)
+                return True
+            elif event.resource_status == fail_status:
+                raise StackError(self.__failure_message(event))
+        return False
+
+    def get_marker(self):
+        """
+        Returns the ID of the last event read
+        :return: the ID or None
+        """
+        return self.__marker
+
+    def get_resource_times(self):
+        """
+        Returns how long each resource took to reach its final status
+        :return: a dict of seconds keyed by the resource name
+        """
+        return dict(self.__resource_times)
+
+    def get_failures(self):
+        """
+        Returns the resources that failed
+        :return: a list of tuples containing the resource name, status and
+                 reason
+        """
+        return list(self.__failures)
+
+    def log_slowest_resources(self, count=5):
+        """
+        Logs the resources that took the longest
+        :param count: the number of resources to log
+        """
+        slowest = sorted(self.__resource_times.items(),
+                         key=lambda item: item[1], reverse=True)[:count]
+        for name, seconds in slowest:
+            logger.info('Stack %s resource %s took %.1f seconds',
+                        self.__stack.name, name, seconds)
+
+    def __record(self, event):
+        """
+        Records the timing or failure of a resource event
+        :param event: the Event domain object
+        """
+        event_time = self.__parse_time(event.event_time)
+        status = event.resource_status or ''
+        if status.endswith('_IN_PROGRESS'):
+            self.__start_times.setdefault(event.resource_name, event_time)
+        elif status.endswith('_COMPLETE') or status.endswith('_FAILED'):
+            start = self.__start_times.pop(event.resource_name, event_time)
+            self.__resource_times[event.resource_name] = event_time - start
+
+        if status.endswith('_FAILED'):
+            logger.error('Stack %s resource %s has status %s - %s',
+                         self.__stack.name, event.resource_name, status,
+                         event.resource_status_reason)
+            self.__failures.append(
+                (event.resource_name, status, event.resource_status_reason))
+
+    def __failure_message(self, event):
+        """
+        Returns the error message of a failed stack
+        :param event: the Event domain object of the stack's failure
+        :return: the message
+        """
+        message = 'Stack had an error - %s' % event.resource_status_reason
+        if self.__failures:
+            message += '; failed resources - ' + ', '.join(
+                '%s: %s' % (name, reason)
+                for name, status, reason in self.__failures)
+        return message
+
+    @staticmethod
+    def __parse_time(event_time):
+        """
+        Returns the seconds since the epoch of an event's ISO 8601 UTC time
+        :param event_time: the event time string
+        :return: the seconds
+        """
+        try:
+            return calendar.timegm(datetime.datetime.strptime(
+                event_time[:19], '%Y-%m-%dT%H:%M:%S').timetuple())
+        except (TypeError, ValueError):
+            return time.time()
+
+
 class StackSettings:
     def __init__(self, **kwargs):
         """
@@ -422,6 +1052,12 @@ class StackCreationError(Exception):
     """
 
 
+class StackUpdateError(Exception):
+    """
+    Exception to be thrown when an stack cannot be updated
+    """
+
+
 class StackError(Exception):
     """
     General exception
@@ -53,6 +53,19 @@ class OpenStackUser(OpenStackIdentityObject):
                                               self.user_settings.name)
         return self.__user
 
+    def initialize_from_ids(self, resource_ids):
+        """
+        Loads the existing user from the ID returned by get_resource_ids()
+        rather than searching for it by name
+        :param resource_ids: the dict returned by get_resource_ids()
+        :return: The User domain object or None
+        """
+        super(self.__class__, self).initialize()
+
+        self.__user = keystone_utils.get_user_by_id(
+            self._keystone, resource_ids['user'])
+        return self.__user
+
     def create(self, cleanup=False):
         """
         Creates a User if one does not already exist
@@ -83,6 +96,14 @@ class OpenStackUser(OpenStackIdentityObject):
         """
         return self.__user
 
+    def get_resource_ids(self):
+        """
+        Returns the ID of the user to be given to initialize_from_ids()
+        :return: a dict or None when there is no user
+        """
+        if self.__user:
+            return {'user': self.__user.id}
+
     def get_os_creds(self, project_name=None):
         """
         Returns an OSCreds object based on this user account and a project
@@ -14,12 +14,14 @@
 # limitations under the License.
 
 import logging
+import threading
 import time
 
 from cinderclient.exceptions import NotFound
 
+from snaps import concurrency, waiter
 from snaps.openstack.openstack_creator import OpenStackVolumeObject
-from snaps.openstack.utils import cinder_utils
+from snaps.openstack.utils import cinder_utils, glance_utils
 
 __author__ = 'spisarski'
 
@@ -32,6 +34,13 @@ STATUS_ACTIVE = 'available'
 STATUS_IN_USE = 'in-use'
 STATUS_FAILED = 'error'
 STATUS_DELETED = 'deleted'
+SNAPSHOT_ACTIVE_TIMEOUT = 300
+BYTES_PER_GB = 1024 * 1024 * 1024
+
+# Shared ImageVolumeCache objects keyed by the identity of the credentials
+__image_volume_caches = dict()
+__image_volume_caches_lock = threading.Lock()
+DEFAULT_MAX_WORKERS = 10
 
 
 class OpenStackVolume(OpenStackVolumeObject):
@@ -184,28 +193,11 @@ class OpenStackVolume(OpenStackVolumeObject):
         :param poll_interval: The polling interval in seconds
         :return: T/F
         """
-        # sleep and wait for volume status change
-        if block:
-            start = time.time()
-        else:
-            start = time.time() - timeout + 1
-
-        while timeout > time.time() - start:
-            status = self._status(expected_status_code)
-            if status:
-                logger.debug('Volume is active with name - %s',
-                             self.volume_settings.name)
-                return True
-
-            logger.debug('Retry querying volume status in %s seconds',
-                         str(poll_interval))
-            time.sleep(poll_interval)
-            logger.debug('Volume status query timeout in %s',
-                         str(timeout - (time.time() - start)))
-
-        logger.error(
-            'Timeout checking for volume status for ' + expected_status_code)
-        return False
+        return waiter.wait_for(
+            'volume', self.volume_settings.name,
+            lambda: self._status(expected_status_code), timeout,
+            block=block, poll_interval=poll_interval,
+            expected=expected_status_code)
 
     def _status(self, expected_status_code):
         """
@@ -214,7 +206,14 @@ class OpenStackVolume(OpenStackVolumeObject):
                                      value
         :return: T/F
         """
-        status = cinder_utils.get_volume_status(self._cinder, self.__volume)
+        try:
+            status = cinder_utils.get_volume_status(
+                self._cinder, self.__volume)
+        except NotFound:
+            if expected_status_code == STATUS_DELETED:
+                return True
+            raise
+
         if not status:
             logger.warning(
                 'Cannot volume status for volume with ID - %s',
@@ -228,6 +227,524 @@ class OpenStackVolume(OpenStackVolumeObject):
         return status == expected_status_code
 
 
+class OpenStackVolumeGroup(OpenStackVolumeObject):
+    """
+    Class responsible for managing many volumes in OpenStack at once. All
+    create and delete calls are issued concurrently with no more than
+    max_workers of them at a time while the status of the pending volumes is
+    polled with concurrent volume calls
+    """
+
+    def __init__(self, os_creds, volume_settings_list,
+                 max_workers=DEFAULT_MAX_WORKERS):
+        """
+        Constructor
+        :param os_creds: The OpenStack connection credentials
+        :param volume_settings_list: list of VolumeSettings objects
+        :param max_workers: the maximum number of concurrent cinder calls
+                            (default 10)
+        :return:
+        """
+        super(self.__class__, self).__init__(os_creds)
+
+        self.volume_settings_list = volume_settings_list
+        self.max_workers = max(1, int(max_workers))
+        self.__volumes = dict()
+        self.__creation_times = dict()
+        self.__deletion_times = dict()
+
+    def initialize(self):
+        """
+        Loads the existing volumes with one volume list call filtered by name
+        per volume
+        :return: a dict of the existing Volume domain objects keyed by name
+        """
+        super(self.__class__, self).initialize()
+
+        self.__volumes = cinder_utils.get_volumes_by_name(
+            self._cinder,
+            [settings.name for settings in self.volume_settings_list])
+        return self.get_volumes()
+
+    def initialize_from_ids(self, resource_ids):
+        """
+        Loads the existing volumes from the IDs returned by get_resource_ids()
+        with one volume call per ID
+        :param resource_ids: the dict returned by get_resource_ids()
+        :return: a dict of the existing Volume domain objects keyed by name
+        """
+        super(self.__class__, self).initialize()
+
+        volumes = cinder_utils.get_volumes_by_ids(
+            self._cinder, resource_ids['volumes'].values())
+        self.__volumes = dict((volume.name, volume) for volume in volumes)
+        return self.get_volumes()
+
+    def create(self, block=False):
+        """
+        Creates the volumes that do not already exist in OpenStack
+        :param block: when True, wait until every new volume is available and
+                      record how long each one took
+        :return: a dict of the Volume domain objects keyed by name
+        :raise VolumeCreationError when any volume could not be created or
+               activated in the alloted amount of time
+        """
+        self.initialize()
+
+        pending = [settings for settings in self.volume_settings_list
+                   if settings.name not in self.__volumes]
+        start_times = dict()
+        lock = threading.Lock()
+
+        def create_volume(volume_settings):
+            start = time.time()
+            volume = cinder_utils.create_volume(self._cinder, volume_settings)
+            logger.info('Created volume with name - %s', volume.name)
+            with lock:
+                self.__volumes[volume.name] = volume
+                start_times[volume.id] = start
+
+        errors = self.__run_concurrent(create_volume, pending)
+
+        if block and start_times:
+            failed = self.__wait_for_status(
+                start_times, STATUS_ACTIVE, VOLUME_ACTIVE_TIMEOUT,
+                self.__creation_times)
+            if failed:
+                errors.append('Volumes not active in the alloted amount of '
+                              'time - %s' % ', '.join(failed))
+
+        if errors:
+            raise VolumeCreationError(
+                'Volume group was not created - %s' % '; '.join(errors))
+
+        return self.get_volumes()
+
+    def clean(self):
+        """
+        Cleanse environment of all volumes in the group
+        :return: void
+        """
+        if not self.__volumes:
+            return
+
+        start_times = dict()
+        lock = threading.Lock()
+
+        def delete_volume(volume):
+            start = time.time()
+            try:
+                cinder_utils.delete_volume(self._cinder, volume)
+            except NotFound:
+                pass
+            with lock:
+                start_times[volume.id] = start
+
+        errors = self.__run_concurrent(
+            delete_volume, list(self.__volumes.values()))
+        for error in errors:
+            logger.error('Unexpected error deleting volume - %s', error)
+
+        failed = self.__wait_for_status(
+            start_times, STATUS_DELETED, VOLUME_DELETE_TIMEOUT,
+            self.__deletion_times)
+        if failed:
+            logger.error(
+                'Volumes not deleted within the timeout period of %s seconds '
+                '- %s', VOLUME_DELETE_TIMEOUT, ', '.join(failed))
+
+        self.__volumes = dict()
+
+    def get_volumes(self):
+        """
+        Returns the domain Volume objects as they were populated when
+        initialize() or create() was called
+        :return: a dict of Volume objects keyed by name
+        """
+        return dict(self.__volumes)
+
+    def get_resource_ids(self):
+        """
+        Returns the IDs of the volumes to be given to initialize_from_ids()
+        :return: a dict or None when there are no volumes
+        """
+        if self.__volumes:
+            return {'volumes': dict(
+                (name, volume.id) for name, volume in self.__volumes.items())}
+
+    def get_creation_times(self):
+        """
+        Returns the number of seconds each volume created by this group took
+        to become available
+        :return: a dict of seconds keyed by the volume name
+        """
+        return dict(self.__creation_times)
+
+    def get_deletion_times(self):
+        """
+        Returns the number of seconds each volume deleted by this group took
+        to disappear
+        :return: a dict of seconds keyed by the volume name
+        """
+        return dict(self.__deletion_times)
+
+    def __run_concurrent(self, function, items):
+        """
+        Calls function once for each item with no more than max_workers calls
+        in flight at the same time
+        :param function: the function to call
+        :param items: the list of arguments
+        :return: a list of error messages for the calls that raised
+        """
+        errors = list()
+        lock = threading.Lock()
+
+        def on_error(item, e):
+            logger.error('Unexpected error with volume %s - %s', item.name, e)
+            with lock:
+                errors.append('%s: %s' % (item.name, e))
+
+        concurrency.run_concurrent(function, items, self.max_workers,
+                                   on_error=on_error)
+        return errors
+
+    def __wait_for_status(self, start_times, expected_status_code, timeout,
+                          elapsed_times, poll_interval=POLL_INTERVAL):
+        """
+        Polls the status of all pending volumes with concurrent volume calls
+        every interval until each one reaches the expected status
+        :param start_times: dict of start times keyed by the volume ID
+        :param expected_status_code: the status to wait for where the value
+                                     STATUS_DELETED waits for each volume to
+                                     disappear
+        :param timeout: the timeout value in seconds
+        :param elapsed_times: dict in which the seconds each volume took is
+                              recorded by name
+        :param poll_interval: the polling interval in seconds
+        :return: a list of the names of the volumes that failed or timed out
+        """
+        names = dict((volume.id, volume.name)
+                     for volume in self.__volumes.values())
+        done, failed, pending = waiter.wait_for_all(
+            'volume', list(start_times.keys()),
+            lambda ids: cinder_utils.get_volume_statuses(self._cinder, ids),
+            expected_status_code, timeout,
+            is_failed=lambda status: status.startswith(STATUS_FAILED),
+            missing_status=STATUS_DELETED, names=names,
+            poll_interval=poll_interval)
+
+        for volume_id, end_time in done.items():
+            elapsed_times[names[volume_id]] = (
+                end_time - start_times[volume_id])
+        return [names[volume_id]
+                for volume_id in list(failed.keys()) + pending]
+
+
+class OpenStackGoldenVolume(OpenStackVolumeObject):
+    """
+    Class responsible for managing a golden image-backed volume from which
+    clones are handed out. The golden volume is created once and reused by
+    name so the expensive image to volume copy is not repeated, while each
+    clone is a copy-on-write clone on most cinder backends
+    """
+
+    def __init__(self, os_creds, golden_settings, use_snapshot=False):
+        """
+        Constructor
+        :param os_creds: The OpenStack connection credentials
+        :param golden_settings: The VolumeSettings of the golden volume
+        :param use_snapshot: when True, clones are created from a snapshot of
+                             the golden volume rather than from the volume
+                             itself (default False)
+        :return:
+        """
+        super(self.__class__, self).__init__(os_creds)
+
+        self.golden_settings = golden_settings
+        self.use_snapshot = use_snapshot
+        self.snapshot_name = golden_settings.name + '-snapshot'
+        self.__golden_creator = OpenStackVolume(os_creds, golden_settings)
+        self.__snapshot = None
+        self.__clone_creators = list()
+
+    def initialize(self):
+        """
+        Loads the existing golden volume and snapshot
+        :return: The golden Volume domain object or None
+        """
+        super(self.__class__, self).initialize()
+
+        volume = self.__golden_creator.initialize()
+        if self.use_snapshot:
+            self.__snapshot = cinder_utils.get_volume_snapshot(
+                self._cinder, self.snapshot_name)
+        return volume
+
+    def create(self, block=True):
+        """
+        Creates the golden volume and its snapshot when they do not already
+        exist and waits for them to become available
+        :param block: unused as the golden volume must be available before
+                      it can be cloned
+        :return: The golden Volume domain object
+        """
+        self.initialize()
+
+        volume = self.__golden_creator.create(block=True)
+        if not self.__golden_creator.volume_active(block=True):
+            raise VolumeCreationError(
+                'Golden volume is not available with name - %s' %
+                self.golden_settings.name)
+
+        if self.use_snapshot and not self.__snapshot:
+            self.__snapshot = cinder_utils.create_volume_snapshot(
+                self._cinder, volume, self.snapshot_name)
+            logger.info('Created volume snapshot with name - %s',
+                        self.snapshot_name)
+        if self.__snapshot:
+            self.__snapshot_active()
+
+        return volume
+
+    def clone(self, volume_settings, block=True):
+        """
+        Creates a volume cloned from the golden volume or its snapshot. The
+        size is never less than the golden volume's size
+        :param volume_settings: the VolumeSettings of the clone where any
+                                image, snapshot or source volume is ignored
+        :param block: when True, wait until the clone is available
+        :return: the OpenStackVolume creator of the clone
+        """
+        golden_volume = self.__golden_creator.get_volume()
+        if not golden_volume:
+            raise VolumeCreationError(
+                'Golden volume must be created before it can be cloned')
+
+        clone_settings = VolumeSettings(
+            name=volume_settings.name,
+            description=volume_settings.description,
+            size=max(volume_settings.size, golden_volume.size),
+            type_name=volume_settings.type_name,
+            availability_zone=volume_settings.availability_zone)
+        if self.__snapshot:
+            clone_settings.snapshot_name = self.__snapshot.name
+        else:
+            clone_settings.source_volume_name = golden_volume.name
+
+        clone_creator = OpenStackVolume(self._os_creds, clone_settings)
+        self.__clone_creators.append(clone_creator)
+        clone_creator.create(block=block)
+        return clone_creator
+
+    def clean_clones(self):
+        """
+        Deletes the clones handed out by this object while keeping the golden
+        volume and snapshot for reuse
+        :return: void
+        """
+        for clone_creator in reversed(self.__clone_creators):
+            try:
+                clone_creator.clean()
+            except Exception as e:
+                logger.error('Unexpected error cleaning volume clone - %s', e)
+        self.__clone_creators = list()
+
+    def clean(self):
+        """
+        Cleanse environment of the clones, snapshot and golden volume
+        :return: void
+        """
+        self.clean_clones()
+
+        if self.__snapshot:
+            try:
+                cinder_utils.delete_volume_snapshot(
+                    self._cinder, self.__snapshot)
+                self.__snapshot_deleted()
+            except NotFound:
+                pass
+            self.__snapshot = None
+
+        self.__golden_creator.clean()
+
+    def get_volume(self):
+        """
+        Returns the golden Volume domain object
+        :return: the object
+        """
+        return self.__golden_creator.get_volume()
+
+    def get_snapshot(self):
+        """
+        Returns the VolumeSnapshot domain object of the golden volume
+        :return: the object or None
+        """
+        return self.__snapshot
+
+    def __snapshot_active(self, poll_interval=POLL_INTERVAL):
+        """
+        Waits for the snapshot of the golden volume to become available
+        :param poll_interval: The polling interval in seconds
+        :raise VolumeCreationError on error or timeout
+        """
+        def active():
+            status = cinder_utils.get_volume_snapshot_status(
+                self._cinder, self.__snapshot)
+            if status == STATUS_FAILED:
+                raise VolumeCreationError(
+                    'Volume snapshot had an error - %s' % self.snapshot_name)
+            return status == STATUS_ACTIVE
+
+        if not waiter.wait_for(
+                'volume_snapshot', self.snapshot_name, active,
+                SNAPSHOT_ACTIVE_TIMEOUT, poll_interval=poll_interval,
+                expected=STATUS_ACTIVE):
+            raise VolumeCreationError(
+                'Volume snapshot was not available in the alloted amount of '
+                'time - %s' % self.snapshot_name)
+
+    def __snapshot_deleted(self, poll_interval=POLL_INTERVAL):
+        """
+        Waits for the snapshot of the golden volume to be deleted as cinder
+        will not delete a volume that still has snapshots
+        :param poll_interval: The polling interval in seconds
+        """
+        def deleted():
+            try:
+                cinder_utils.get_volume_snapshot_status(
+                    self._cinder, self.__snapshot)
+            except NotFound:
+                return True
+            return False
+
+        if not waiter.wait_for(
+                'volume_snapshot', self.snapshot_name, deleted,
+                VOLUME_DELETE_TIMEOUT, poll_interval=poll_interval,
+                expected=STATUS_DELETED):
+            logger.error('Volume snapshot not deleted within the timeout '
+                         'period of %s seconds', VOLUME_DELETE_TIMEOUT)
+
+
+class ImageVolumeCache:
+    """
+    Managed cache of golden image-backed volumes, one for each image and
+    volume type, from which boot volumes are cloned. Each golden volume is
+    created the first time it is requested and is reused by name afterwards
+    """
+
+    def __init__(self, os_creds):
+        """
+        Constructor
+        :param os_creds: The OpenStack connection credentials
+        """
+        self.os_creds = os_creds
+        self.__golden_volumes = dict()
+        self.__locks = dict()
+        self.__lock = threading.Lock()
+
+    def get_golden_volume(self, image_name, type_name=None):
+        """
+        Returns the golden volume creator of an image and volume type and
+        creates the volume when it does not already exist
+        :param image_name: the name of the glance image
+        :param type_name: the name of the volume type (optional)
+        :return: the OpenStackGoldenVolume object
+        """
+        key = (image_name, type_name)
+        with self.__lock:
+            golden_volume = self.__golden_volumes.get(key)
+            if golden_volume:
+                return golden_volume
+            key_lock = self.__locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            golden_volume = self.__golden_volumes.get(key)
+            if not golden_volume:
+                golden_settings = VolumeSettings(
+                    name=self.get_golden_volume_name(image_name, type_name),
+                    size=self.__get_image_size(image_name),
+                    image_name=image_name, type_name=type_name)
+                golden_volume = OpenStackGoldenVolume(
+                    self.os_creds, golden_settings)
+                golden_volume.create()
+                logger.info('Image volume cached with name - %s',
+                            golden_settings.name)
+                with self.__lock:
+                    self.__golden_volumes[key] = golden_volume
+            return golden_volume
+
+    def clone(self, volume_settings, image_name):
+        """
+        Creates a volume cloned from the cached golden volume of an image and
+        of the volume_settings.type_name volume type
+        :param volume_settings: the VolumeSettings of the clone
+        :param image_name: the name of the glance image
+        :return: the OpenStackVolume creator of the clone
+        """
+        golden_volume = self.get_golden_volume(
+            image_name, volume_settings.type_name)
+        return golden_volume.clone(volume_settings)
+
+    def clean(self):
+        """
+        Deletes every golden volume created or loaded by this cache
+        :return: void
+        """
+        with self.__lock:
+            golden_volumes = list(self.__golden_volumes.values())
+            self.__golden_volumes = dict()
+
+        for golden_volume in golden_volumes:
+            try:
+                golden_volume.clean()
+            except Exception as e:
+                logger.error('Unexpected error cleaning image volume - %s',
+                             e)
+
+    @staticmethod
+    def get_golden_volume_name(image_name, type_name=None):
+        """
+        Returns the name of the golden volume of an image and volume type
+        :param image_name: the name of the glance image
+        :param type_name: the name of the volume type (optional)
+        :return: the volume name
+        """
+        return '%s-%s-image-volume' % (image_name, type_name or 'default')
+
+    def __get_image_size(self, image_name):
+        """
+        Returns the smallest volume size in GB that can hold an image
+        :param image_name: the name of the glance image
+        :return: the size in GB
+        """
+        glance = glance_utils.glance_client(self.os_creds)
+        image = glance_utils.get_image(glance, image_name=image_name)
+        if not image:
+            raise VolumeCreationError(
+                'Cannot cache image volume, image not found with name - %s' %
+                image_name)
+
+        size = int(image.size or 0)
+        return max(1, (size + BYTES_PER_GB - 1) // BYTES_PER_GB)
+
+
+def get_image_volume_cache(os_creds):
+    """
+    Returns the ImageVolumeCache shared by all callers using the same user,
+    project and cloud
+    :param os_creds: The OpenStack connection credentials
+    :return: the ImageVolumeCache object
+    """
+    key = (os_creds.auth_url, os_creds.username, os_creds.project_name,
+           os_creds.region_name)
+    with __image_volume_caches_lock:
+        cache = __image_volume_caches.get(key)
+        if not cache:
+            cache = ImageVolumeCache(os_creds)
+            __image_volume_caches[key] = cache
+        return cache
+
+
 class VolumeSettings:
     def __init__(self, **kwargs):
         """
@@ -237,6 +754,10 @@ class VolumeSettings:
         :param size: the volume's size in GB (default 1)
         :param image_name: when a glance image is used for the image source
                            (optional)
+        :param snapshot_name: the name of a volume snapshot from which the
+                              volume is created (optional)
+        :param source_volume_name: the name of an existing volume from which
+                                   the volume is cloned (optional)
         :param type_name: the associated volume's type name (optional)
         :param availability_zone: the name of the compute server on which to
                                   deploy the volume (optional)
@@ -248,6 +769,8 @@ class VolumeSettings:
         self.description = kwargs.get('description')
         self.size = int(kwargs.get('size', 1))
         self.image_name = kwargs.get('image_name')
+        self.snapshot_name = kwargs.get('snapshot_name')
+        self.source_volume_name = kwargs.get('source_volume_name')
         self.type_name = kwargs.get('type_name')
         self.availability_zone = kwargs.get('availability_zone')
 
@@ -259,6 +782,14 @@ class VolumeSettings:
         if not self.name:
             raise VolumeSettingsError("The attribute name is required")
 
+        sources = [source for source in (
+            self.image_name, self.snapshot_name, self.source_volume_name)
+            if source]
+        if len(sources) > 1:
+            raise VolumeSettingsError(
+                'Only one of image_name, snapshot_name or source_volume_name '
+                'can be configured')
+
 
 class VolumeSettingsError(Exception):
     """
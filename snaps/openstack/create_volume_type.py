@@ -56,6 +56,19 @@ class OpenStackVolumeType(OpenStackVolumeObject):
 
         return self.__volume_type
 
+    def initialize_from_ids(self, resource_ids):
+        """
+        Loads the existing Volume Type from the ID returned by
+        get_resource_ids() rather than searching for it by name
+        :param resource_ids: the dict returned by get_resource_ids()
+        :return: The VolumeType domain object or None
+        """
+        super(self.__class__, self).initialize()
+
+        self.__volume_type = cinder_utils.get_volume_type_by_id(
+            self._cinder, resource_ids['volume_type'])
+        return self.__volume_type
+
     def create(self):
         """
         Creates the volume in OpenStack if it does not already exist and
@@ -95,6 +108,14 @@ class OpenStackVolumeType(OpenStackVolumeObject):
         """
         return self.__volume_type
 
+    def get_resource_ids(self):
+        """
+        Returns the ID of the volume type to be given to initialize_from_ids()
+        :return: a dict or None when there is no volume type
+        """
+        if self.__volume_type:
+            return {'volume_type': self.__volume_type.id}
+
 
 class VolumeTypeSettings:
     def __init__(self, **kwargs):
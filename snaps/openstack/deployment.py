@@ -0,0 +1,575 @@
+# Copyright (c) 2017 Cable Television Laboratories, Inc. ("CableLabs")
+#                    and others.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import logging
+import threading
+import time
+
+from snaps import concurrency, hooks
+from snaps.openstack import create_instance, journal
+from snaps.openstack.create_instance import OpenStackVmInstance
+
+__author__ = 'spisarski'
+
+logger = logging.getLogger('deployment')
+
+DEFAULT_MAX_WORKERS = 10
+DEFAULT_CLEAN_RETRIES = 2
+DEFAULT_CLEAN_RETRY_INTERVAL = 5
+
+RES_PROJECT = 'project'
+RES_PROJECT_USERS = 'project_users'
+RES_USER = 'user'
+RES_FLAVOR = 'flavor'
+RES_QOS_SPEC = 'qos_spec'
+RES_VOLUME_TYPE = 'volume_type'
+RES_VOLUME = 'volume'
+RES_VOLUME_GROUP = 'volume_group'
+RES_IMAGE = 'image'
+RES_NETWORK = 'network'
+RES_SUBNET = 'subnet'
+RES_ROUTER = 'router'
+RES_KEYPAIR = 'keypair'
+RES_SECURITY_GROUP = 'security_group'
+RES_INSTANCE = 'instance'
+
+ACTION_DEPLOY = 'deploy'
+ACTION_RESTORE = 'restore'
+ACTION_CLEAN = 'clean'
+
+__hooks = hooks.HookRegistry()
+
+# Settings attributes holding the name of a single resource of another type
+SETTINGS_REFERENCES = (
+    ('project_name', RES_PROJECT),
+    ('flavor', RES_FLAVOR),
+    ('qos_spec_name', RES_QOS_SPEC),
+    ('type_name', RES_VOLUME_TYPE),
+    ('boot_volume_type', RES_VOLUME_TYPE),
+    ('image_name', RES_IMAGE),
+    ('source_volume_name', RES_VOLUME),
+    ('external_gateway', RES_NETWORK),
+)
+
+
+def get_settings_references(settings):
+    """
+    Returns the resources a settings object refers to by name such as the
+    network_name of its ports or the router_name of its floating IPs
+    :param settings: any SNAPS-OO settings object
+    :return: a set of (resource type, name) tuples
+    """
+    out = set()
+    if settings is None:
+        return out
+
+    for attr, res_type in SETTINGS_REFERENCES:
+        value = getattr(settings, attr, None)
+        # i.e. a Flavor domain object in place of the flavor's name
+        if hasattr(value, 'name'):
+            value = value.name
+        if value:
+            out.add((res_type, value))
+
+    for port_settings in getattr(settings, 'port_settings', None) or list():
+        if port_settings.network_name:
+            out.add((RES_NETWORK, port_settings.network_name))
+        if port_settings.project_name:
+            out.add((RES_PROJECT, port_settings.project_name))
+
+    for sec_grp_name in (
+            getattr(settings, 'security_group_names', None) or list()):
+        out.add((RES_SECURITY_GROUP, sec_grp_name))
+
+    for fip_settings in (
+            getattr(settings, 'floating_ip_settings', None) or list()):
+        if fip_settings.router_name:
+            out.add((RES_ROUTER, fip_settings.router_name))
+
+    for volume_name in getattr(settings, 'volume_names', None) or list():
+        out.add((RES_VOLUME, volume_name))
+
+    for subnet_name in getattr(settings, 'internal_subnets', None) or list():
+        out.add((RES_SUBNET, subnet_name))
+
+    return out
+
+
+def add_hook(hook):
+    """
+    Registers a hook to be notified each time a creator of a DeploymentGraph
+    has been deployed or cleaned
+    :param hook: a DeploymentHook object
+    """
+    __hooks.add(hook)
+
+
+def remove_hook(hook):
+    """
+    Unregisters a hook added with add_hook()
+    :param hook: the DeploymentHook object
+    """
+    __hooks.remove(hook)
+
+
+def record_node(action, resource_type, name, start, seconds, error=None):
+    """
+    Notifies the hooks that a node of a graph has been deployed or cleaned.
+    This is called on the thread that did the work
+    :param action: ACTION_DEPLOY, ACTION_RESTORE (loaded from the journal) or
+                   ACTION_CLEAN
+    :param resource_type: the type of resource
+    :param name: the name of the resource
+    :param start: the time the action started as returned by time.time()
+    :param seconds: the duration of the action
+    :param error: the reason the action failed (optional)
+    """
+    __hooks.notify('on_node', action, resource_type, name, start, seconds,
+                   error)
+
+
+class DeploymentHook:
+    """
+    Base class for objects receiving the events of deployment graphs.
+    Implementations must be thread safe as creators are deployed and cleaned
+    from several threads
+    """
+
+    def on_node(self, action, resource_type, name, start, seconds, error):
+        """
+        Called when a creator has been deployed or cleaned
+        """
+        pass
+
+
+class DeploymentGraph:
+    """
+    Deploys SNAPS-OO creators in dependency order where creators that do not
+    depend upon each other are deployed concurrently by a bounded pool of
+    worker threads. Dependencies are inferred from the names referenced by
+    each creator's settings and any that are not part of the graph are
+    assumed to already exist. The creators are cleaned in the reverse order.
+    When given a DeploymentJournal, the IDs of every deployed resource are
+    recorded and the creators whose settings have not changed since are
+    loaded from those IDs by the next deploy() instead of being deployed
+    """
+
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS, deploy_journal=None):
+        """
+        Constructor
+        :param max_workers: the maximum number of creators deployed at the
+                            same time (default 10)
+        :param deploy_journal: the DeploymentJournal object (optional)
+        """
+        self.max_workers = max(1, int(max_workers))
+        self.deploy_journal = deploy_journal
+        self.__nodes = dict()
+        self.__order = list()
+        self.__aliases = dict()
+        self.__settings = dict()
+        self.__failures = dict()
+        self.__deploy_times = dict()
+        self.__clean_failures = dict()
+        self.__restored = set()
+
+    def add(self, resource_type, name, creator, settings=None,
+            depends_on=None, action=None, aliases=None):
+        """
+        Adds a creator to the graph
+        :param resource_type: the type of resource (i.e. RES_NETWORK)
+        :param name: the name of the resource
+        :param creator: the SNAPS-OO creator object
+        :param settings: the settings object or list of settings objects from
+                         which the dependencies are inferred
+        :param depends_on: a list of additional (resource type, name) tuples
+                           that must be deployed first
+        :param action: the function called with the creator to deploy it
+                       (default calls creator.create())
+        :param aliases: a list of other (resource type, name) tuples by which
+                        this creator can be referenced
+        :return: the node's key
+        """
+        key = (resource_type, name)
+        if key in self.__nodes:
+            raise DeploymentError('Duplicate resource - %s %s' % key)
+
+        if settings is None:
+            settings_list = list()
+        elif isinstance(settings, (list, tuple)):
+            settings_list = list(settings)
+        else:
+            settings_list = [settings]
+
+        references = set(depends_on or list())
+        for node_settings in settings_list:
+            references.update(get_settings_references(node_settings))
+            for subnet_settings in (
+                    getattr(node_settings, 'subnet_settings', None) or list()):
+                self.__aliases[(RES_SUBNET, subnet_settings.name)] = key
+
+        for alias in aliases or list():
+            self.__aliases[alias] = key
+
+        self.__nodes[key] = (creator, references, action)
+        self.__settings[key] = settings_list
+        self.__order.append(key)
+        return key
+
+    def get_creator(self, resource_type, name):
+        """
+        Returns the creator added for a resource
+        :param resource_type: the type of resource
+        :param name: the name of the resource
+        :return: the creator or None
+        """
+        node = self.__nodes.get((resource_type, name))
+        if node:
+            return node[0]
+
+    def get_creators(self, resource_type):
+        """
+        Returns the creators of one type of resource
+        :param resource_type: the type of resource
+        :return: a dict of creators keyed by name
+        """
+        out = dict()
+        for key in self.__order:
+            if key[0] == resource_type:
+                out[key[1]] = self.__nodes[key][0]
+        return out
+
+    def get_settings(self, key):
+        """
+        Returns the settings objects added with a node
+        :param key: the (resource type, name) tuple of the node
+        :return: a list of settings objects
+        """
+        return list(self.__settings[key])
+
+    def get_dependencies(self, key):
+        """
+        Returns the nodes of the graph that must be deployed before another
+        :param key: the (resource type, name) tuple of the node
+        :return: a set of (resource type, name) tuples
+        """
+        out = set()
+        for reference in self.__nodes[key][1]:
+            resolved = self.__aliases.get(reference, reference)
+            if resolved in self.__nodes and resolved != key:
+                out.add(resolved)
+        return out
+
+    def get_levels(self):
+        """
+        Returns the nodes grouped into levels where the nodes of each level
+        only depend upon the nodes of the previous levels
+        :return: a list of lists of (resource type, name) tuples
+        :raise DeploymentError when the dependencies contain a cycle
+        """
+        waiting = dict((key, self.get_dependencies(key))
+                       for key in self.__order)
+        done = set()
+        out = list()
+        while waiting:
+            level = [key for key in self.__order
+                     if key in waiting and waiting[key] <= done]
+            if not level:
+                raise DeploymentError(
+                    'Dependency cycle between - %s' % ', '.join(
+                        '%s %s' % key for key in sorted(waiting)))
+            for key in level:
+                del waiting[key]
+            done.update(level)
+            out.append(level)
+        return out
+
+    def deploy(self):
+        """
+        Deploys every creator once all of the ones it depends upon have been
+        deployed. A creator that fails does not stop the creators that do not
+        depend upon it. Creators recorded in the journal with the same
+        settings are loaded from their recorded IDs instead
+        :return: a dict of the deployed creators keyed by (resource type,
+                 name)
+        :raise DeploymentError when any creator could not be deployed
+        """
+        self.get_levels()
+        self.__failures = dict()
+        self.__restored = set()
+        entries = dict()
+        if self.deploy_journal:
+            entries = self.deploy_journal.load()
+
+        waiting = dict((key, self.get_dependencies(key))
+                       for key in self.__order)
+        ready = [key for key in self.__order if not waiting[key]]
+        for key in ready:
+            del waiting[key]
+        done = set()
+        cond = threading.Condition()
+
+        def finish(key, error):
+            done.add(key)
+            if error:
+                self.__failures[key] = error
+            for other in [other for other in self.__order
+                          if other in waiting and key in waiting[other]]:
+                if other not in waiting:
+                    # already skipped through another failed dependency
+                    continue
+                if error:
+                    del waiting[other]
+                    logger.warning('Skipping %s %s as %s %s failed',
+                                   other[0], other[1], key[0], key[1])
+                    finish(other, 'Dependency %s %s failed' % key)
+                else:
+                    waiting[other].discard(key)
+                    if not waiting[other]:
+                        del waiting[other]
+                        ready.append(other)
+
+        def worker():
+            while True:
+                with cond:
+                    while not ready and len(done) < len(self.__order):
+                        cond.wait()
+                    if not ready:
+                        return
+                    key = ready.pop(0)
+
+                error = None
+                start = time.time()
+                try:
+                    self.__deploy_node(key, entries.get(key))
+                except Exception as e:
+                    logger.error('Unexpected error deploying %s %s - %s',
+                                 key[0], key[1], e)
+                    error = str(e) or e.__class__.__name__
+
+                seconds = time.time() - start
+                record_node(
+                    ACTION_RESTORE if key in self.__restored else
+                    ACTION_DEPLOY, key[0], key[1], start, seconds, error)
+
+                with cond:
+                    self.__deploy_times[key] = seconds
+                    finish(key, error)
+                    cond.notify_all()
+
+        concurrency.run_workers(
+            worker, min(self.max_workers, len(self.__order)))
+
+        if self.__failures:
+            raise DeploymentError('Deployment failed - %s' % '; '.join(
+                '%s %s: %s' % (key[0], key[1], reason)
+                for key, reason in sorted(self.__failures.items())))
+
+        return dict((key, self.__nodes[key][0]) for key in self.__order)
+
+    def clean(self, skip_types=None, retries=DEFAULT_CLEAN_RETRIES,
+              retry_interval=DEFAULT_CLEAN_RETRY_INTERVAL):
+        """
+        Cleans the creators in the reverse order of get_levels() where the
+        creators of each level are cleaned concurrently. The deletions of the
+        level's VM instances are requested first and then awaited together.
+        A creator that fails is retried and then reported without stopping
+        the rest of the teardown
+        :param skip_types: a list of resource types whose creators are left
+                           in place (i.e. [RES_IMAGE])
+        :param retries: the number of times a failed clean() is retried
+                        (default 2)
+        :param retry_interval: the number of seconds between retries
+                               (default 5)
+        :raise DeploymentError when any creator could not be cleaned
+        """
+        self.__clean_failures = dict()
+        skip_types = skip_types or list()
+
+        for level in reversed(self.get_levels()):
+            keys = [key for key in level if key[0] not in skip_types]
+            vm_keys = [key for key in keys if isinstance(
+                self.__nodes[key][0], OpenStackVmInstance)]
+
+            self.__run_concurrent(keys, lambda key: self.__clean_node(
+                key, retries, retry_interval, key not in vm_keys))
+
+            vm_keys = [key for key in vm_keys
+                       if key not in self.__clean_failures]
+            if vm_keys:
+                try:
+                    not_deleted = create_instance.vms_deleted(
+                        [self.__nodes[key][0] for key in vm_keys])
+                except Exception as e:
+                    logger.error('Unexpected error waiting for VMs to be '
+                                 'deleted - %s', e)
+                    for key in vm_keys:
+                        self.__clean_failures[key] = str(e)
+                    vm_keys = list()
+                    not_deleted = list()
+
+                for key in [key for key in vm_keys
+                            if self.__nodes[key][0] in not_deleted]:
+                    vm_keys.remove(key)
+                    self.__clean_failures[key] = 'VM not deleted in time'
+
+                # Cleans what remains after the VMs are gone (boot volumes)
+                self.__run_concurrent(vm_keys, lambda key: self.__clean_node(
+                    key, retries, retry_interval))
+
+        if self.__clean_failures:
+            raise DeploymentError('Clean failed - %s' % '; '.join(
+                '%s %s: %s' % (key[0], key[1], reason)
+                for key, reason in sorted(self.__clean_failures.items())))
+
+    def get_clean_failures(self):
+        """
+        Returns the reasons of the creators that could not be cleaned during
+        the last clean()
+        :return: a dict of reasons keyed by (resource type, name)
+        """
+        return dict(self.__clean_failures)
+
+    def get_failures(self):
+        """
+        Returns the reasons of the creators that failed or were skipped
+        because a creator they depend upon failed during the last deploy()
+        :return: a dict of reasons keyed by (resource type, name)
+        """
+        return dict(self.__failures)
+
+    def get_restored(self):
+        """
+        Returns the nodes loaded from the journal during the last deploy()
+        :return: a set of (resource type, name) tuples
+        """
+        return set(self.__restored)
+
+    def get_deploy_times(self):
+        """
+        Returns the number of seconds each creator took to deploy
+        :return: a dict of seconds keyed by (resource type, name)
+        """
+        return dict(self.__deploy_times)
+
+    def __deploy_node(self, key, entry=None):
+        """
+        Deploys the creator of a node unless it can be loaded from the IDs of
+        its journal entry
+        :param key: the (resource type, name) tuple of the node
+        :param entry: the node's journal entry (optional)
+        """
+        creator, references, action = self.__nodes[key]
+        settings_hash = None
+        if self.deploy_journal:
+            settings_hash = journal.get_settings_hash(self.__settings[key])
+            if (entry and entry.get('hash') == settings_hash
+                    and self.__restore_node(key, entry.get('ids'))):
+                return
+
+        logger.info('Deploying %s %s', key[0], key[1])
+        if action:
+            action(creator)
+        else:
+            creator.create()
+
+        if self.deploy_journal and hasattr(creator, 'get_resource_ids'):
+            resource_ids = creator.get_resource_ids()
+            if resource_ids:
+                self.deploy_journal.record_deployed(
+                    key[0], key[1], settings_hash, resource_ids)
+
+    def __restore_node(self, key, resource_ids):
+        """
+        Loads the creator of a node from the IDs recorded in the journal
+        :param key: the (resource type, name) tuple of the node
+        :param resource_ids: the dict returned by get_resource_ids()
+        :return: T/F - False when the creator must be deployed as the
+                 resources cannot be found by their IDs
+        """
+        creator = self.__nodes[key][0]
+        if not resource_ids or not hasattr(creator, 'initialize_from_ids'):
+            return False
+
+        try:
+            if creator.initialize_from_ids(resource_ids):
+                logger.info('Loaded %s %s from the journal', key[0], key[1])
+                self.__restored.add(key)
+                return True
+        except Exception as e:
+            logger.warning('Cannot load %s %s from the journal - %s',
+                           key[0], key[1], e)
+
+        logger.info('Resources of %s %s not found by ID', key[0], key[1])
+        return False
+
+    def __clean_node(self, key, retries, retry_interval, block=True):
+        """
+        Cleans the creator of a node retrying when it raises an error
+        :param key: the (resource type, name) tuple of the node
+        :param retries: the number of times to retry
+        :param retry_interval: the number of seconds between retries
+        :param block: when False, a VM instance's deletion is not awaited
+        """
+        creator = self.__nodes[key][0]
+        logger.info('Cleaning %s %s', key[0], key[1])
+        attempt = 0
+        while True:
+            start = time.time()
+            try:
+                if block:
+                    creator.clean()
+                else:
+                    creator.clean(block=False)
+            except Exception as e:
+                record_node(ACTION_CLEAN, key[0], key[1], start,
+                            time.time() - start,
+                            str(e) or e.__class__.__name__)
+                if attempt >= retries:
+                    raise
+                attempt += 1
+                logger.warning('Retrying clean of %s %s in %s seconds - %s',
+                               key[0], key[1], retry_interval, e)
+                time.sleep(retry_interval)
+                continue
+
+            record_node(ACTION_CLEAN, key[0], key[1], start,
+                        time.time() - start)
+            if block and self.deploy_journal:
+                self.deploy_journal.record_cleaned(key[0], key[1])
+            return
+
+    def __run_concurrent(self, keys, function):
+        """
+        Calls function once for each node with no more than max_workers calls
+        in flight at the same time. Errors are recorded as clean failures
+        :param keys: the list of (resource type, name) tuples
+        :param function: the function to call with each key
+        """
+        lock = threading.Lock()
+
+        def on_error(key, e):
+            logger.error('Unexpected error cleaning %s %s - %s',
+                         key[0], key[1], e)
+            with lock:
+                self.__clean_failures[key] = str(e) or e.__class__.__name__
+
+        concurrency.run_concurrent(function, keys, self.max_workers,
+                                   on_error=on_error)
+
+
+class DeploymentError(Exception):
+    """
+    Exception to be thrown when a deployment graph is invalid or any of its
+    creators could not be deployed or cleaned
+    """
@@ -0,0 +1,1966 @@
+# Copyright (c) 2017 Cable Television Laboratories, Inc. ("CableLabs")
+#                    and others.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import copy
+import functools
+import hashlib
+import logging
+import random
+import socket
+import struct
+import threading
+import time
+import uuid
+
+from cinderclient.exceptions import NotFound as CinderNotFound
+from glanceclient.exc import HTTPNotFound as GlanceNotFound
+from heatclient.exc import HTTPNotFound as HeatNotFound
+from keystoneclient.exceptions import NotFound as KeystoneNotFound
+from neutronclient.common.exceptions import (
+    NetworkNotFoundClient, NotFound as NeutronNotFound, PortNotFoundClient)
+from novaclient.exceptions import NotFound as NovaNotFound
+
+from snaps import api_metrics
+from snaps.openstack.utils import client_factory
+
+__author__ = 'spisarski'
+
+"""
+In-process stand-in for the identity, compute, network, image, volume and
+orchestration APIs of an OpenStack cloud. While a FakeCloud is installed, the
+client factories of the snaps.openstack.utils modules return its clients
+instead of connecting to OpenStack so the creators and launch.py can be run,
+benchmarked and load tested without a cloud. Only the subset of each API used
+by SNAPS is emulated
+"""
+
+logger = logging.getLogger('fake_cloud')
+
+# The resource types whose status changes over time
+RES_SERVER = 'server'
+RES_VOLUME = 'volume'
+RES_SNAPSHOT = 'snapshot'
+RES_IMAGE = 'image'
+RES_STACK = 'stack'
+
+ACTION_CREATE = 'CREATE'
+ACTION_UPDATE = 'UPDATE'
+ACTION_UPLOAD = 'UPLOAD'
+ACTION_DELETE = 'DELETE'
+
+# The statuses of each resource type while an action is in progress, once it
+# has completed and once it has failed. A resource is gone once its delete
+# action has completed
+STATUSES = {
+    RES_SERVER: {
+        ACTION_CREATE: ('BUILD', 'ACTIVE', 'ERROR'),
+        ACTION_DELETE: ('ACTIVE', 'DELETED', 'ERROR')},
+    RES_VOLUME: {
+        ACTION_CREATE: ('creating', 'available', 'error'),
+        ACTION_DELETE: ('deleting', 'deleted', 'error_deleting')},
+    RES_SNAPSHOT: {
+        ACTION_CREATE: ('creating', 'available', 'error'),
+        ACTION_DELETE: ('deleting', 'deleted', 'error_deleting')},
+    RES_IMAGE: {
+        ACTION_UPLOAD: ('saving', 'active', 'killed'),
+        ACTION_DELETE: ('active', 'deleted', 'killed')},
+    RES_STACK: {
+        ACTION_CREATE: ('CREATE_IN_PROGRESS', 'CREATE_COMPLETE',
+                        'CREATE_FAILED'),
+        ACTION_UPDATE: ('UPDATE_IN_PROGRESS', 'UPDATE_COMPLETE',
+                        'UPDATE_FAILED'),
+        ACTION_DELETE: ('DELETE_IN_PROGRESS', 'DELETE_COMPLETE',
+                        'DELETE_FAILED')},
+}
+
+DEFAULT_COMPUTE_QUOTAS = {
+    'metadata_items': 128, 'cores': 20, 'instances': 10,
+    'injected_files': 5, 'injected_file_content_bytes': 10240,
+    'ram': 51200, 'fixed_ips': -1, 'key_pairs': 100}
+
+DEFAULT_NETWORK_QUOTAS = {
+    'security_group': 10, 'security_group_rule': 100, 'floatingip': 50,
+    'network': 100, 'port': 500, 'router': 10, 'subnet': 100}
+
+__clouds = list()
+
+
+def install(cloud):
+    """
+    Makes the client factories return the clients of a fake cloud until it is
+    uninstalled by registering get_client() with
+    client_factory.set_client_factory(). The last cloud installed wins
+    :param cloud: the FakeCloud object
+    """
+    if cloud not in __clouds:
+        __clouds.append(cloud)
+    client_factory.set_client_factory(get_client)
+
+
+def uninstall(cloud):
+    """
+    Restores the clients replaced by install()
+    :param cloud: the FakeCloud object
+    """
+    if cloud in __clouds:
+        __clouds.remove(cloud)
+    if not __clouds:
+        client_factory.set_client_factory(None)
+
+
+def get_client(service):
+    """
+    Returns the client of the installed fake cloud for a service
+    :param service: the OpenStack service (i.e. api_metrics.SERVICE_COMPUTE)
+    :return: the fake client or None when no fake cloud is installed
+    """
+    if __clouds:
+        return __clouds[-1].client(service)
+
+
+def create_cloud(config):
+    """
+    Returns a new fake cloud configured by a dict such as the one read from
+    this YAML:
+        seed: 1                  # of the random failures of the errors
+        latency: 0.05            # or a list of dicts with the keys seconds,
+                                 # service and operation
+        transitions:             # seconds or a dict with the keys seconds
+          server: 10             # and delete_seconds
+          stack: {seconds: 30, delete_seconds: 10}
+        errors:                  # the keys of inject_error() and the HTTP
+          - service: compute     # code of the FakeApiError raised
+            operation: servers.create
+            rate: 0.1
+            code: 503
+        failures:
+          - type: server
+            name: vm-2
+        flavors:
+          - {name: m1.small, ram: 2048, disk: 20, vcpus: 1}
+        images:
+          - {name: cirros, disk_format: qcow2}
+        networks:
+          - {name: external, cidr: 172.24.4.0/24, external: True}
+    :param config: the dict
+    :return: the FakeCloud object
+    """
+    cloud = FakeCloud(seed=config.get('seed'))
+
+    for flavor in config.get('flavors', list()):
+        cloud.add_flavor(**flavor)
+    for image in config.get('images', list()):
+        cloud.add_image(**image)
+    for network in config.get('networks', list()):
+        cloud.add_network(**network)
+
+    latency = config.get('latency')
+    if isinstance(latency, list):
+        for entry in latency:
+            cloud.set_latency(entry['seconds'], entry.get('service'),
+                              entry.get('operation'))
+    elif latency:
+        cloud.set_latency(latency)
+
+    for resource_type, seconds in config.get('transitions', dict()).items():
+        if isinstance(seconds, dict):
+            cloud.set_transition(resource_type, seconds.get('seconds', 0),
+                                 seconds.get('delete_seconds', 0))
+        else:
+            cloud.set_transition(resource_type, seconds)
+
+    for error in config.get('errors', list()):
+        cloud.inject_error(
+            error['service'], operation=error.get('operation'),
+            error=FakeApiError('Injected error', error.get('code', 500)),
+            count=error.get('count', None if error.get('rate') else 1),
+            rate=error.get('rate'))
+
+    for failure in config.get('failures', list()):
+        cloud.fail_resource(failure['type'], failure['name'])
+    return cloud
+
+
+def new_id():
+    """
+    Returns a new resource ID
+    """
+    return str(uuid.uuid4())
+
+
+def __ip_to_int(ip):
+    """
+    Returns the integer value of an IPv4 address
+    :param ip: the dotted address
+    :return: the int
+    """
+    return struct.unpack('!I', socket.inet_aton(ip))[0]
+
+
+def __int_to_ip(value):
+    """
+    Returns the IPv4 address of an integer value
+    :param value: the int
+    :return: the dotted address
+    """
+    return socket.inet_ntoa(struct.pack('!I', value))
+
+
+def get_host_ip(cidr, index):
+    """
+    Returns the address of a host within an IPv4 CIDR
+    :param cidr: the subnet's CIDR (i.e. '10.0.0.0/24')
+    :param index: the host's index where 1 is the first address after the
+                  network's
+    :return: the dotted address
+    """
+    network, prefix = cidr.split('/')
+    mask = (0xffffffff << (32 - int(prefix))) & 0xffffffff
+    return __int_to_ip((__ip_to_int(network) & mask) + index)
+
+
+def matches(resource, filters):
+    """
+    Returns True when a resource passes the filters of a neutron list call.
+    A list value matches any of its items and the keys the resource does not
+    have are ignored
+    :param resource: the resource dict
+    :param filters: the keyword arguments given to the list call
+    :return: T/F
+    """
+    for key, value in filters.items():
+        if key not in resource:
+            continue
+        if isinstance(value, (list, tuple, set)):
+            if resource[key] not in value:
+                return False
+        elif resource[key] != value:
+            return False
+    return True
+
+
+def not_found(service, message):
+    """
+    Returns the exception the client of a service raises when a resource
+    does not exist
+    :param service: the OpenStack service (i.e. api_metrics.SERVICE_COMPUTE)
+    :param message: the error message
+    :return: the exception
+    """
+    if service == api_metrics.SERVICE_COMPUTE:
+        return NovaNotFound(404, message)
+    if service == api_metrics.SERVICE_VOLUME:
+        return CinderNotFound(404, message)
+    if service == api_metrics.SERVICE_IDENTITY:
+        return KeystoneNotFound(message)
+    if service == api_metrics.SERVICE_IMAGE:
+        return GlanceNotFound(message)
+    if service == api_metrics.SERVICE_ORCHESTRATION:
+        return HeatNotFound(message)
+    return NeutronNotFound(message=message)
+
+
+def get_stack(cloud, stack_id):
+    """
+    Returns a stack of a fake cloud
+    :param cloud: the FakeCloud object
+    :param stack_id: the stack's ID
+    :return: the FakeStack object
+    :raises heatclient.exc.HTTPNotFound: when the stack does not exist
+    """
+    with cloud.lock:
+        stack = cloud.stacks.get(stack_id)
+    if not stack:
+        raise HeatNotFound('Stack %s not found' % stack_id)
+    return stack
+
+
+def api_call(function):
+    """
+    Decorates the operations of the fake clients so each call is delayed by
+    the latency of the cloud and may fail with an injected error
+    :param function: the method of a FakeApi
+    :return: the decorated method
+    """
+    @functools.wraps(function)
+    def call(self, *args, **kwargs):
+        self.cloud.before_call(self.service, self.prefix + function.__name__)
+        return function(self, *args, **kwargs)
+
+    return call
+
+
+class FakeCloudError(Exception):
+    """
+    Exception raised when the fake cloud is asked for something it does not
+    emulate
+    """
+
+
+class FakeApiError(Exception):
+    """
+    Exception raised by the calls failing with an error injected with
+    FakeCloud.inject_error()
+    """
+
+    def __init__(self, message, code=500):
+        super(FakeApiError, self).__init__(message)
+        self.code = code
+
+
+class FakeState:
+    """
+    The actions applied to a resource whose status changes over time. Each
+    action completes once its delay has passed
+    """
+
+    def __init__(self, resource_type):
+        """
+        Constructor
+        :param resource_type: the type (i.e. RES_SERVER)
+        """
+        self.resource_type = resource_type
+        self.actions = list()
+
+    def start(self, action, delay, failed=False):
+        """
+        Starts an action
+        :param action: the action (i.e. ACTION_CREATE)
+        :param delay: the seconds until the action completes
+        :param failed: when True, the action fails once it completes
+        """
+        self.actions.append((action, time.time(), delay, failed))
+
+    def get_events(self):
+        """
+        Returns an event for the start and for the completion of each action
+        in the order they happened
+        :return: a list of (index, status, reason, time) tuples where index
+                 identifies the event amongst those of the resource
+        """
+        now = time.time()
+        out = list()
+        for index, (action, started, delay, failed) in enumerate(
+                self.actions):
+            in_progress, complete, failure = STATUSES[
+                self.resource_type][action]
+            out.append((index * 2, in_progress, '%s started' % action,
+                        started))
+            if now >= started + delay:
+                if failed:
+                    out.append((index * 2 + 1, failure,
+                                '%s failed: injected failure' % action,
+                                started + delay))
+                else:
+                    out.append((index * 2 + 1, complete,
+                                '%s completed successfully' % action,
+                                started + delay))
+        return sorted(out, key=lambda event: (event[3], event[0]))
+
+    def get_status(self):
+        """
+        Returns the status of the resource
+        """
+        return self.get_events()[-1][1]
+
+    def get_reason(self):
+        """
+        Returns the reason of the status of the resource
+        """
+        return self.get_events()[-1][2]
+
+    def is_gone(self):
+        """
+        Returns True once the resource has been deleted
+        """
+        action, started, delay, failed = self.actions[-1]
+        return (action == ACTION_DELETE and not failed and
+                time.time() >= started + delay)
+
+
+class FakeCloud:
+    """
+    The resources of the fake cloud and the fake clients sharing them. Each
+    call made through a fake client is first delayed by the latency set with
+    set_latency() and may fail with an error injected with inject_error().
+    Servers, volumes, snapshots, uploaded images and stacks reach their final
+    status and are gone once deleted after the seconds set with
+    set_transition(), which is immediately by default
+    """
+
+    def __init__(self, seed=None):
+        """
+        Constructor
+        :param seed: the seed of the random numbers deciding which calls fail
+                     when an error is injected with a rate (optional)
+        """
+        self.lock = threading.RLock()
+
+        self.domains = dict()
+        self.projects = dict()
+        self.users = dict()
+        self.roles = dict()
+        # (user ID, project ID, role ID) tuples
+        self.role_grants = set()
+
+        self.servers = dict()
+        self.flavors = dict()
+        self.keypairs = dict()
+        self.compute_quotas = dict()
+
+        self.images = dict()
+
+        self.networks = dict()
+        self.subnets = dict()
+        self.ports = dict()
+        self.floating_ips = dict()
+        self.routers = dict()
+        self.security_groups = dict()
+        self.security_group_rules = dict()
+        self.network_quotas = dict()
+
+        self.volumes = dict()
+        self.snapshots = dict()
+        self.volume_types = dict()
+        self.volume_encryptions = dict()
+        self.qos_specs = dict()
+
+        self.stacks = dict()
+
+        # FakeState objects keyed by the ID of their resource
+        self.states = dict()
+
+        self.__latencies = dict()
+        self.__transitions = dict()
+        self.__errors = list()
+        self.__failures = set()
+        self.__random = random.Random(seed)
+        self.__next_mac = 1
+        self.__next_hosts = dict()
+
+        domain = FakeResource(id='default', name='Default', enabled=True)
+        self.domains[domain.id] = domain
+        project = self.add_project('admin')
+        user = self.add_user('admin', project)
+        role = self.add_role('admin')
+        self.role_grants.add((user.id, project.id, role.id))
+
+    def client(self, service):
+        """
+        Returns a new client of this cloud
+        :param service: the OpenStack service (i.e.
+                        api_metrics.SERVICE_COMPUTE)
+        :return: the fake client
+        :raises FakeCloudError: when the service is not emulated
+        """
+        if service == api_metrics.SERVICE_COMPUTE:
+            return FakeNovaClient(self)
+        if service == api_metrics.SERVICE_NETWORK:
+            return FakeNeutronClient(self)
+        if service == api_metrics.SERVICE_IMAGE:
+            return FakeGlanceClient(self)
+        if service == api_metrics.SERVICE_IDENTITY:
+            return FakeKeystoneClient(self)
+        if service == api_metrics.SERVICE_VOLUME:
+            return FakeCinderClient(self)
+        if service == api_metrics.SERVICE_ORCHESTRATION:
+            return FakeHeatClient(self)
+        raise FakeCloudError('The fake cloud has no %s service' % service)
+
+    def set_latency(self, seconds, service=None, operation=None):
+        """
+        Sets the time each call takes. The latency of an operation takes
+        precedence over the latency of its service which takes precedence
+        over the latency of every call
+        :param seconds: the delay in seconds
+        :param service: the OpenStack service (i.e.
+                        api_metrics.SERVICE_COMPUTE)
+        :param operation: the operation of the service as named by
+                          api_metrics (i.e. 'servers.create')
+        """
+        with self.lock:
+            self.__latencies[(service, operation)] = seconds
+
+    def get_latency(self, service, operation):
+        """
+        Returns the time a call takes
+        :param service: the OpenStack service
+        :param operation: the operation
+        :return: the seconds
+        """
+        with self.lock:
+            for key in ((service, operation), (service, None), (None, None)):
+                if key in self.__latencies:
+                    return self.__latencies[key]
+        return 0
+
+    def set_transition(self, resource_type, seconds, delete_seconds=0):
+        """
+        Sets the time resources of a type take to reach their final status
+        :param resource_type: the type (i.e. RES_SERVER)
+        :param seconds: the seconds until a resource is active once it has
+                        been created, updated or uploaded
+        :param delete_seconds: the seconds until a resource is gone once it
+                               has been deleted
+        """
+        with self.lock:
+            self.__transitions[resource_type] = (seconds, delete_seconds)
+
+    def get_transition(self, resource_type, action):
+        """
+        Returns the time an action takes to complete
+        :param resource_type: the type (i.e. RES_SERVER)
+        :param action: the action (i.e. ACTION_CREATE)
+        :return: the seconds
+        """
+        with self.lock:
+            seconds, delete_seconds = self.__transitions.get(
+                resource_type, (0, 0))
+        if action == ACTION_DELETE:
+            return delete_seconds
+        return seconds
+
+    def inject_error(self, service, operation=None, error=None, count=1,
+                     rate=None):
+        """
+        Makes calls fail
+        :param service: the OpenStack service (i.e.
+                        api_metrics.SERVICE_COMPUTE)
+        :param operation: the operation as named by api_metrics (i.e.
+                          'servers.create') else every operation of the
+                          service fails
+        :param error: the exception raised (default FakeApiError with the
+                      code 500)
+        :param count: the number of calls failing or None for no limit
+        :param rate: the probability for each call to fail (default 1)
+        """
+        if not error:
+            error = FakeApiError('Injected error', 500)
+        with self.lock:
+            self.__errors.append({'service': service, 'operation': operation,
+                                  'error': error, 'count': count,
+                                  'rate': rate})
+
+    def clear_errors(self):
+        """
+        Removes the errors injected
+        """
+        with self.lock:
+            del self.__errors[:]
+
+    def fail_resource(self, resource_type, name):
+        """
+        Makes the creation of the resources of a type with a name fail once
+        its transition has passed
+        :param resource_type: the type (i.e. RES_SERVER)
+        :param name: the resource's name
+        """
+        with self.lock:
+            self.__failures.add((resource_type, name))
+
+    def before_call(self, service, operation):
+        """
+        Called by the fake clients before each operation to apply the
+        latency, remove the resources whose deletion has completed and raise
+        the errors injected
+        :param service: the OpenStack service
+        :param operation: the operation
+        """
+        latency = self.get_latency(service, operation)
+        if latency:
+            time.sleep(latency)
+
+        self.purge()
+
+        error = None
+        with self.lock:
+            for rule in self.__errors:
+                if rule['service'] != service:
+                    continue
+                if rule['operation'] and rule['operation'] != operation:
+                    continue
+                if rule['count'] is not None and rule['count'] <= 0:
+                    continue
+                if (rule['rate'] is not None and
+                        self.__random.random() >= rule['rate']):
+                    continue
+                if rule['count'] is not None:
+                    rule['count'] -= 1
+                error = rule['error']
+                break
+        if error:
+            logger.debug('Failing %s call %s', service, operation)
+            raise error
+
+    def start_action(self, resource_type, resource_id, name, action):
+        """
+        Starts an action changing the status of a resource
+        :param resource_type: the type (i.e. RES_SERVER)
+        :param resource_id: the resource's ID
+        :param name: the resource's name
+        :param action: the action (i.e. ACTION_CREATE)
+        """
+        delay = self.get_transition(resource_type, action)
+        with self.lock:
+            failed = (action != ACTION_DELETE and
+                      (resource_type, name) in self.__failures)
+            state = self.states.get(resource_id)
+            if not state:
+                state = FakeState(resource_type)
+                self.states[resource_id] = state
+            state.start(action, delay, failed)
+        self.purge()
+
+    def get_status(self, resource_id):
+        """
+        Returns the status of a resource changing over time
+        :param resource_id: the resource's ID
+        :return: the status or None when no action has been started
+        """
+        with self.lock:
+            state = self.states.get(resource_id)
+            if state:
+                return state.get_status()
+
+    def purge(self):
+        """
+        Removes the resources whose deletion has completed
+        """
+        with self.lock:
+            for resource_id, state in list(self.states.items()):
+                if state.is_gone():
+                    del self.states[resource_id]
+                    self.__remove(state.resource_type, resource_id)
+
+    def __remove(self, resource_type, resource_id):
+        """
+        Removes a resource and releases what was bound to it
+        :param resource_type: the type (i.e. RES_SERVER)
+        :param resource_id: the resource's ID
+        """
+        resources = {RES_SERVER: self.servers, RES_VOLUME: self.volumes,
+                     RES_SNAPSHOT: self.snapshots, RES_IMAGE: self.images,
+                     RES_STACK: self.stacks}[resource_type]
+        resources.pop(resource_id, None)
+
+        if resource_type == RES_SERVER:
+            for port in self.ports.values():
+                if port['device_id'] == resource_id:
+                    port['device_id'] = ''
+                    port['device_owner'] = ''
+            for volume in self.volumes.values():
+                volume.attachments = [
+                    attachment for attachment in volume.attachments
+                    if attachment['server_id'] != resource_id]
+
+    def add_project(self, name, domain_id='default'):
+        """
+        Adds a project
+        :return: the FakeResource object
+        """
+        project = FakeResource(id=new_id(), name=name, domain_id=domain_id,
+                               description=None, enabled=True)
+        with self.lock:
+            self.projects[project.id] = project
+        return project
+
+    def add_user(self, name, project=None, domain_id='default'):
+        """
+        Adds a user
+        :param project: the FakeResource of the default project (optional)
+        :return: the FakeResource object
+        """
+        default_project_id = None
+        if project:
+            default_project_id = project.id
+        user = FakeResource(id=new_id(), name=name, domain_id=domain_id,
+                            email=None, enabled=True,
+                            default_project_id=default_project_id)
+        with self.lock:
+            self.users[user.id] = user
+        return user
+
+    def add_role(self, name):
+        """
+        Adds a role
+        :return: the FakeResource object
+        """
+        role = FakeResource(id=new_id(), name=name)
+        with self.lock:
+            self.roles[role.id] = role
+        return role
+
+    def add_flavor(self, name, ram=1024, disk=10, vcpus=1):
+        """
+        Adds a flavor
+        :return: the FakeFlavor object
+        """
+        flavor = FakeFlavor(self, id=new_id(), name=name, ram=ram, disk=disk,
+                            vcpus=vcpus)
+        with self.lock:
+            self.flavors[flavor.id] = flavor
+        return flavor
+
+    def add_image(self, name, disk_format='qcow2', size=13267968):
+        """
+        Adds an active image
+        :return: the image dict
+        """
+        image = {'id': new_id(), 'name': name, 'disk_format': disk_format,
+                 'container_format': 'bare', 'size': size,
+                 'checksum': None, 'status': 'active',
+                 'visibility': 'public'}
+        with self.lock:
+            self.images[image['id']] = image
+        return image
+
+    def add_network(self, name, cidr=None, external=False):
+        """
+        Adds a network with a subnet when a CIDR is given
+        :param external: when True, routers may use the network as their
+                         gateway and floating IPs are allocated on it
+        :return: the network dict
+        """
+        network = self.new_network({'name': name,
+                                    'router:external': external})
+        if cidr:
+            self.new_subnet({'name': name + '-subnet', 'cidr': cidr,
+                             'network_id': network['id']})
+        return network
+
+    def new_network(self, body):
+        """
+        Adds a network
+        :param body: the network attributes as given to neutron
+        :return: the network dict
+        """
+        network = {'id': new_id(), 'admin_state_up': True, 'shared': False,
+                   'router:external': False, 'status': 'ACTIVE',
+                   'subnets': list(), 'tenant_id': ''}
+        network.update(body)
+        with self.lock:
+            self.networks[network['id']] = network
+        return network
+
+    def new_subnet(self, body):
+        """
+        Adds a subnet to its network
+        :param body: the subnet attributes as given to neutron
+        :return: the subnet dict
+        """
+        subnet = {'id': new_id(), 'ip_version': 4, 'enable_dhcp': True,
+                  'dns_nameservers': list(), 'host_routes': list(),
+                  'allocation_pools': list(), 'tenant_id': '',
+                  'gateway_ip': get_host_ip(body['cidr'], 1)}
+        subnet.update(body)
+        with self.lock:
+            network = self.networks.get(subnet['network_id'])
+            if not network:
+                raise NetworkNotFoundClient(
+                    message='network %s not found' % subnet['network_id'])
+            network['subnets'].append(subnet['id'])
+            self.subnets[subnet['id']] = subnet
+        return subnet
+
+    def new_mac(self):
+        """
+        Returns a MAC address unique within this cloud
+        """
+        with self.lock:
+            value = self.__next_mac
+            self.__next_mac += 1
+        return 'fa:16:3e:%02x:%02x:%02x' % (
+            (value >> 16) & 0xff, (value >> 8) & 0xff, value & 0xff)
+
+    def allocate_ip(self, subnet):
+        """
+        Returns the next free address of a subnet
+        :param subnet: the subnet dict
+        :return: the dotted address
+        """
+        with self.lock:
+            # Index 1 is the gateway
+            index = self.__next_hosts.get(subnet['id'], 2)
+            self.__next_hosts[subnet['id']] = index + 1
+        return get_host_ip(subnet['cidr'], index)
+
+    def get_server_networks(self, server_id):
+        """
+        Returns the IPs of a server keyed by network name as nova does
+        :param server_id: the server's ID
+        :return: a dict of lists
+        """
+        out = dict()
+        with self.lock:
+            for port in self.ports.values():
+                if port['device_id'] != server_id:
+                    continue
+                network = self.networks.get(port['network_id'])
+                if network:
+                    out.setdefault(network['name'], list()).extend(
+                        fixed_ip['ip_address']
+                        for fixed_ip in port['fixed_ips'])
+        return out
+
+
+class FakeResource:
+    """
+    Resource object as returned by the nova, keystone, cinder and heat clients
+    """
+
+    def __init__(self, **kwargs):
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+
+
+class FakeFlavor(FakeResource):
+    """
+    Flavor as returned by novaclient
+    """
+
+    def __init__(self, cloud, **kwargs):
+        self.cloud = cloud
+        self.ram = None
+        self.disk = None
+        self.vcpus = None
+        self.ephemeral = 0
+        self.swap = ''
+        self.rxtx_factor = 1.0
+        self.is_public = True
+        self.extra_specs = dict()
+        FakeResource.__init__(self, **kwargs)
+
+    def set_keys(self, metadata):
+        self.cloud.before_call(api_metrics.SERVICE_COMPUTE,
+                               'flavors.set_keys')
+        self.extra_specs.update(metadata)
+
+    def get_keys(self):
+        self.cloud.before_call(api_metrics.SERVICE_COMPUTE,
+                               'flavors.get_keys')
+        return dict(self.extra_specs)
+
+
+class FakeServer(FakeResource):
+    """
+    Server as returned by novaclient
+    """
+
+    def __init__(self, cloud, **kwargs):
+        self.cloud = cloud
+        self.image = None
+        self.key_name = None
+        self.security_groups = list()
+        setattr(self, 'os-extended-volumes:volumes_attached', list())
+        FakeResource.__init__(self, **kwargs)
+
+    @property
+    def status(self):
+        return self.cloud.get_status(self.id)
+
+    @property
+    def networks(self):
+        return self.cloud.get_server_networks(self.id)
+
+    def add_floating_ip(self, address, fixed_address=None):
+        self.cloud.before_call(api_metrics.SERVICE_COMPUTE,
+                               'servers.add_floating_ip')
+        with self.cloud.lock:
+            for fip in self.cloud.floating_ips.values():
+                if fip['floating_ip_address'] == address:
+                    for port in self.cloud.ports.values():
+                        for fixed_ip in port['fixed_ips']:
+                            if fixed_ip['ip_address'] == fixed_address:
+                                fip['port_id'] = port['id']
+                                fip['fixed_ip_address'] = fixed_address
+                                fip['status'] = 'ACTIVE'
+                    return
+        raise NovaNotFound(404, 'Floating IP %s not found' % address)
+
+    def get_console_output(self, length=None):
+        self.cloud.before_call(api_metrics.SERVICE_COMPUTE,
+                               'servers.get_console_output')
+        return 'login:'
+
+
+class FakeVolume(FakeResource):
+    """
+    Volume as returned by cinderclient
+    """
+
+    def __init__(self, cloud, **kwargs):
+        self.cloud = cloud
+        self.attachments = list()
+        FakeResource.__init__(self, **kwargs)
+
+    @property
+    def status(self):
+        status = self.cloud.get_status(self.id)
+        if status == 'available' and self.attachments:
+            return 'in-use'
+        return status
+
+
+class FakeSnapshot(FakeResource):
+    """
+    Volume snapshot as returned by cinderclient
+    """
+
+    def __init__(self, cloud, **kwargs):
+        self.cloud = cloud
+        FakeResource.__init__(self, **kwargs)
+
+    @property
+    def status(self):
+        return self.cloud.get_status(self.id)
+
+
+class FakeStack(FakeResource):
+    """
+    Stack as returned by heatclient. The stacks have no resources nor outputs
+    """
+
+    def __init__(self, cloud, **kwargs):
+        self.cloud = cloud
+        self.outputs = list()
+        FakeResource.__init__(self, **kwargs)
+
+    @property
+    def identifier(self):
+        return '%s/%s' % (self.stack_name, self.id)
+
+    @property
+    def stack_status(self):
+        return self.cloud.get_status(self.id)
+
+    @property
+    def stack_status_reason(self):
+        with self.cloud.lock:
+            return self.cloud.states[self.id].get_reason()
+
+
+class FakeApi:
+    """
+    Base class of the fake clients and resource managers whose methods
+    decorated with api_call are the operations of the API
+    """
+
+    def __init__(self, cloud, service, prefix=''):
+        """
+        Constructor
+        :param cloud: the FakeCloud object
+        :param service: the OpenStack service (i.e.
+                        api_metrics.SERVICE_COMPUTE)
+        :param prefix: the path of the manager from the client as named by
+                       api_metrics (i.e. 'servers.')
+        """
+        self.cloud = cloud
+        self.service = service
+        self.prefix = prefix
+
+
+class FakeManager(FakeApi):
+    """
+    Base class of the managers of the resource objects kept in the dict of
+    the cloud named by the collection attribute
+    """
+
+    collection = None
+
+    def _get_resources(self):
+        return getattr(self.cloud, self.collection)
+
+    def _get(self, resource):
+        """
+        Returns a resource
+        :param resource: the resource or its ID
+        :return: the resource object
+        """
+        resource_id = getattr(resource, 'id', resource)
+        with self.cloud.lock:
+            out = self._get_resources().get(resource_id)
+        if out is None:
+            raise not_found(self.service, '%s %s not found' % (
+                self.collection, resource_id))
+        return out
+
+    def _list(self, filters=None):
+        """
+        Returns the resources whose attributes match the filters not None
+        :param filters: a dict
+        :return: a list of resource objects
+        """
+        filters = dict((key, value) for key, value in
+                       (filters or dict()).items() if value is not None)
+        with self.cloud.lock:
+            return [resource for resource in self._get_resources().values()
+                    if matches(vars(resource), filters)]
+
+    def _add(self, resource):
+        with self.cloud.lock:
+            self._get_resources()[resource.id] = resource
+        return resource
+
+    @api_call
+    def get(self, resource):
+        return self._get(resource)
+
+    @api_call
+    def list(self):
+        return self._list()
+
+    @api_call
+    def delete(self, resource):
+        resource = self._get(resource)
+        with self.cloud.lock:
+            self._get_resources().pop(resource.id, None)
+
+
+class FakeServerManager(FakeManager):
+    """
+    The servers resource of the fake nova client
+    """
+
+    collection = 'servers'
+
+    @api_call
+    def create(self, name, image, flavor, nics=None, key_name=None,
+               security_groups=None, userdata=None, availability_zone=None,
+               block_device_mapping_v2=None, **kwargs):
+        server_id = new_id()
+        image_ref = None
+        if image:
+            image_ref = {'id': image.id}
+        server = FakeServer(
+            self.cloud, id=server_id, name=name, image=image_ref,
+            flavor={'id': flavor.id}, key_name=key_name,
+            security_groups=[{'name': sec_grp_name} for sec_grp_name in
+                             security_groups or list()])
+        with self.cloud.lock:
+            for nic in nics or list():
+                port = self.cloud.ports.get(nic.get('port-id'))
+                if not port:
+                    raise NovaNotFound(404, 'Port %s not found' %
+                                       nic.get('port-id'))
+                port['device_id'] = server_id
+                port['device_owner'] = 'compute:nova'
+            self.cloud.servers[server_id] = server
+        self.cloud.start_action(RES_SERVER, server_id, name, ACTION_CREATE)
+        return server
+
+    @api_call
+    def list(self, detailed=True, search_opts=None):
+        return self._list(search_opts)
+
+    @api_call
+    def delete(self, server):
+        server = self._get(server)
+        self.cloud.start_action(RES_SERVER, server.id, server.name,
+                                ACTION_DELETE)
+
+    @api_call
+    def add_security_group(self, server, security_group_name):
+        self._get(server).security_groups.append(
+            {'name': security_group_name})
+
+    @api_call
+    def remove_security_group(self, server, security_group_name):
+        server = self._get(server)
+        server.security_groups = [
+            sec_grp for sec_grp in server.security_groups
+            if sec_grp['name'] != security_group_name]
+
+
+class FakeFlavorManager(FakeManager):
+    """
+    The flavors resource of the fake nova client
+    """
+
+    collection = 'flavors'
+
+    @api_call
+    def find(self, name):
+        for flavor in self._list({'name': name}):
+            return flavor
+        raise NovaNotFound(404, 'Flavor %s not found' % name)
+
+    @api_call
+    def list(self, detailed=True, is_public=True):
+        return self._list()
+
+    @api_call
+    def create(self, name, ram, vcpus, disk, flavorid='auto', ephemeral=0,
+               swap=0, rxtx_factor=1.0, is_public=True):
+        if flavorid == 'auto':
+            flavorid = new_id()
+        return self._add(FakeFlavor(
+            self.cloud, id=flavorid, name=name, ram=ram, vcpus=vcpus,
+            disk=disk, ephemeral=ephemeral, swap=swap,
+            rxtx_factor=rxtx_factor, is_public=is_public))
+
+
+class FakeKeypairManager(FakeManager):
+    """
+    The keypairs resource of the fake nova client where the ID of a keypair
+    is its name
+    """
+
+    collection = 'keypairs'
+
+    @api_call
+    def create(self, name, public_key=None, key_type='ssh'):
+        if not public_key:
+            public_key = 'ssh-rsa %s' % new_id()
+        digest = hashlib.md5(public_key.encode('utf-8')).hexdigest()
+        return self._add(FakeResource(
+            id=name, name=name, public_key=public_key,
+            fingerprint=':'.join(digest[index:index + 2]
+                                 for index in range(0, len(digest), 2))))
+
+
+class FakeQuotaSetManager(FakeApi):
+    """
+    The quotas resource of the fake nova client
+    """
+
+    @api_call
+    def get(self, tenant_id):
+        with self.cloud.lock:
+            return FakeResource(id=tenant_id, **self.cloud.compute_quotas.get(
+                tenant_id, DEFAULT_COMPUTE_QUOTAS))
+
+    @api_call
+    def update(self, tenant_id, **kwargs):
+        with self.cloud.lock:
+            quotas = dict(self.cloud.compute_quotas.get(
+                tenant_id, DEFAULT_COMPUTE_QUOTAS))
+            quotas.update(kwargs)
+            self.cloud.compute_quotas[tenant_id] = quotas
+            return FakeResource(id=tenant_id, **quotas)
+
+
+class FakeServerVolumeManager(FakeApi):
+    """
+    The volumes resource of the fake nova client attaching volumes to servers
+    """
+
+    def __get(self, server_id, volume_id):
+        with self.cloud.lock:
+            server = self.cloud.servers.get(server_id)
+            volume = self.cloud.volumes.get(volume_id)
+        if not server or not volume:
+            raise NovaNotFound(404, 'Server %s or volume %s not found' % (
+                server_id, volume_id))
+        return server, volume
+
+    @api_call
+    def create_server_volume(self, server_id, volume_id, device=None):
+        server, volume = self.__get(server_id, volume_id)
+        with self.cloud.lock:
+            getattr(server, 'os-extended-volumes:volumes_attached').append(
+                {'id': volume_id})
+            volume.attachments.append({
+                'id': volume_id, 'volume_id': volume_id,
+                'server_id': server_id, 'attachment_id': new_id(),
+                'device': device or '/dev/vdb'})
+        return FakeResource(id=volume_id, serverId=server_id,
+                            volumeId=volume_id, device=device)
+
+    @api_call
+    def delete_server_volume(self, server_id, volume_id=None,
+                             attachment_id=None):
+        server, volume = self.__get(server_id, volume_id or attachment_id)
+        with self.cloud.lock:
+            setattr(server, 'os-extended-volumes:volumes_attached', [
+                attached for attached in
+                getattr(server, 'os-extended-volumes:volumes_attached')
+                if attached['id'] != volume.id])
+            volume.attachments = [
+                attachment for attachment in volume.attachments
+                if attachment['server_id'] != server_id]
+
+
+class FakeNovaClient:
+    """
+    Stands in for novaclient.client.Client
+    """
+
+    def __init__(self, cloud):
+        service = api_metrics.SERVICE_COMPUTE
+        self.servers = FakeServerManager(cloud, service, 'servers.')
+        self.flavors = FakeFlavorManager(cloud, service, 'flavors.')
+        self.keypairs = FakeKeypairManager(cloud, service, 'keypairs.')
+        self.quotas = FakeQuotaSetManager(cloud, service, 'quotas.')
+        self.volumes = FakeServerVolumeManager(cloud, service, 'volumes.')
+
+
+class FakeImageController(FakeApi):
+    """
+    The images resource of the fake glance v2 client. An image created is
+    queued until its data is uploaded
+    """
+
+    def __view(self, image):
+        """
+        Returns a copy of an image with its current status
+        """
+        out = copy.deepcopy(image)
+        status = self.cloud.get_status(image['id'])
+        if status:
+            out['status'] = status
+        return out
+
+    def __get(self, image_id):
+        with self.cloud.lock:
+            image = self.cloud.images.get(image_id)
+        if not image:
+            raise GlanceNotFound('Image %s not found' % image_id)
+        return image
+
+    @api_call
+    def list(self, filters=None, **kwargs):
+        with self.cloud.lock:
+            images = [self.__view(image)
+                      for image in self.cloud.images.values()
+                      if matches(image, filters or dict())]
+        for image in images:
+            yield image
+
+    @api_call
+    def get(self, image_id):
+        with self.cloud.lock:
+            return self.__view(self.__get(image_id))
+
+    @api_call
+    def create(self, **kwargs):
+        image = {'id': new_id(), 'status': 'queued', 'size': None,
+                 'checksum': None, 'visibility': 'shared'}
+        image.update(kwargs)
+        with self.cloud.lock:
+            self.cloud.images[image['id']] = image
+        return copy.deepcopy(image)
+
+    @api_call
+    def upload(self, image_id, image_data, image_size=None):
+        image = self.__get(image_id)
+        size = 0
+        checksum = hashlib.md5()
+        while True:
+            chunk = image_data.read(65536)
+            if not chunk:
+                break
+            size += len(chunk)
+            checksum.update(chunk)
+        with self.cloud.lock:
+            image['size'] = size
+            image['checksum'] = checksum.hexdigest()
+        self.cloud.start_action(RES_IMAGE, image_id, image['name'],
+                                ACTION_UPLOAD)
+
+    @api_call
+    def delete(self, image_id):
+        image = self.__get(image_id)
+        with self.cloud.lock:
+            self.cloud.images.pop(image['id'], None)
+            self.cloud.states.pop(image['id'], None)
+
+
+class FakeGlanceClient:
+    """
+    Stands in for the glanceclient.Client of version 2
+    """
+
+    def __init__(self, cloud):
+        self.version = 2.0
+        self.images = FakeImageController(
+            cloud, api_metrics.SERVICE_IMAGE, 'images.')
+
+
+class FakeNeutronClient(FakeApi):
+    """
+    Stands in for neutronclient.neutron.client.Client. Each method returns
+    copies of the resources wrapped as the neutron API does
+    """
+
+    def __init__(self, cloud):
+        FakeApi.__init__(self, cloud, api_metrics.SERVICE_NETWORK)
+
+    def __list(self, resources, key, filters):
+        with self.cloud.lock:
+            return {key: [copy.deepcopy(resource)
+                          for resource in resources.values()
+                          if matches(resource, filters)]}
+
+    def __get(self, resources, key, resource_id, error_class):
+        resource = resources.get(resource_id)
+        if not resource:
+            raise error_class(message='%s %s not found' % (key, resource_id))
+        return resource
+
+    def __show(self, resources, key, resource_id, error_class):
+        with self.cloud.lock:
+            return {key: copy.deepcopy(self.__get(
+                resources, key, resource_id, error_class))}
+
+    def __delete(self, resources, key, resource_id, error_class):
+        with self.cloud.lock:
+            if not resources.pop(resource_id, None):
+                raise error_class(
+                    message='%s %s not found' % (key, resource_id))
+
+    @api_call
+    def list_networks(self, **filters):
+        return self.__list(self.cloud.networks, 'networks', filters)
+
+    @api_call
+    def show_network(self, network_id):
+        return self.__show(self.cloud.networks, 'network', network_id,
+                           NetworkNotFoundClient)
+
+    @api_call
+    def create_network(self, body):
+        return {'network': copy.deepcopy(
+            self.cloud.new_network(body['network']))}
+
+    @api_call
+    def delete_network(self, network_id):
+        self.__delete(self.cloud.networks, 'network', network_id,
+                      NetworkNotFoundClient)
+
+    @api_call
+    def list_subnets(self, **filters):
+        return self.__list(self.cloud.subnets, 'subnets', filters)
+
+    @api_call
+    def show_subnet(self, subnet_id):
+        return self.__show(self.cloud.subnets, 'subnet', subnet_id,
+                           NeutronNotFound)
+
+    @api_call
+    def create_subnet(self, body):
+        return {'subnets': [copy.deepcopy(self.cloud.new_subnet(subnet_body))
+                            for subnet_body in body['subnets']]}
+
+    @api_call
+    def delete_subnet(self, subnet_id):
+        with self.cloud.lock:
+            subnet = self.cloud.subnets.get(subnet_id)
+            if subnet:
+                network = self.cloud.networks.get(subnet['network_id'])
+                if network and subnet_id in network['subnets']:
+                    network['subnets'].remove(subnet_id)
+            self.__delete(self.cloud.subnets, 'subnet', subnet_id,
+                          NeutronNotFound)
+
+    @api_call
+    def list_ports(self, **filters):
+        return self.__list(self.cloud.ports, 'ports', filters)
+
+    @api_call
+    def show_port(self, port_id):
+        return self.__show(self.cloud.ports, 'port', port_id,
+                           PortNotFoundClient)
+
+    @api_call
+    def create_port(self, body):
+        port = {'id': new_id(), 'name': '', 'admin_state_up': True,
+                'device_id': '', 'device_owner': '',
+                'mac_address': self.cloud.new_mac(),
+                'allowed_address_pairs': list(), 'security_groups': list(),
+                'status': 'DOWN', 'tenant_id': ''}
+        port.update(body['port'])
+        with self.cloud.lock:
+            network = self.__get(self.cloud.networks, 'network',
+                                 port['network_id'], NetworkNotFoundClient)
+            if not port.get('fixed_ips'):
+                port['fixed_ips'] = list()
+                for subnet_id in network['subnets'][:1]:
+                    subnet = self.cloud.subnets[subnet_id]
+                    port['fixed_ips'].append({
+                        'subnet_id': subnet_id,
+                        'ip_address': self.cloud.allocate_ip(subnet)})
+            self.cloud.ports[port['id']] = port
+        return {'port': copy.deepcopy(port)}
+
+    @api_call
+    def delete_port(self, port_id):
+        self.__delete(self.cloud.ports, 'port', port_id, PortNotFoundClient)
+
+    @api_call
+    def list_routers(self, **filters):
+        return self.__list(self.cloud.routers, 'routers', filters)
+
+    @api_call
+    def show_router(self, router_id):
+        return self.__show(self.cloud.routers, 'router', router_id,
+                           NeutronNotFound)
+
+    @api_call
+    def create_router(self, body):
+        router = {'id': new_id(), 'name': '', 'admin_state_up': True,
+                  'status': 'ACTIVE', 'tenant_id': '',
+                  'external_gateway_info': None}
+        router.update(body['router'])
+        with self.cloud.lock:
+            self.cloud.routers[router['id']] = router
+        return {'router': copy.deepcopy(router)}
+
+    @api_call
+    def delete_router(self, router):
+        self.__delete(self.cloud.routers, 'router', router, NeutronNotFound)
+
+    @api_call
+    def add_interface_router(self, router, body):
+        with self.cloud.lock:
+            self.__get(self.cloud.routers, 'router', router, NeutronNotFound)
+            if body.get('port_id'):
+                port = self.__get(self.cloud.ports, 'port', body['port_id'],
+                                  PortNotFoundClient)
+            else:
+                subnet = self.__get(self.cloud.subnets, 'subnet',
+                                    body.get('subnet_id'), NeutronNotFound)
+                port = {'id': new_id(), 'name': '', 'admin_state_up': True,
+                        'network_id': subnet['network_id'],
+                        'mac_address': self.cloud.new_mac(),
+                        'fixed_ips': [{'subnet_id': subnet['id'],
+                                       'ip_address': subnet['gateway_ip']}],
+                        'allowed_address_pairs': list(),
+                        'security_groups': list(), 'status': 'ACTIVE',
+                        'tenant_id': ''}
+                self.cloud.ports[port['id']] = port
+            port['device_id'] = router
+            port['device_owner'] = 'network:router_interface'
+            return {'id': router, 'port_id': port['id'], 'tenant_id': '',
+                    'subnet_id': port['fixed_ips'][0]['subnet_id']}
+
+    @api_call
+    def remove_interface_router(self, router, body):
+        with self.cloud.lock:
+            for port in list(self.cloud.ports.values()):
+                if port['device_id'] != router:
+                    continue
+                if port['id'] == body.get('port_id'):
+                    port['device_id'] = ''
+                    port['device_owner'] = ''
+                    return
+                if body.get('subnet_id') in [
+                        fixed_ip['subnet_id']
+                        for fixed_ip in port['fixed_ips']]:
+                    del self.cloud.ports[port['id']]
+                    return
+        raise NeutronNotFound(
+            message='Router %s has no interface %s' % (router, body))
+
+    def __security_group_view(self, sec_grp):
+        """
+        Returns a copy of a security group with its rules
+        """
+        out = copy.deepcopy(sec_grp)
+        out['security_group_rules'] = [
+            copy.deepcopy(rule)
+            for rule in self.cloud.security_group_rules.values()
+            if rule['security_group_id'] == sec_grp['id']]
+        return out
+
+    def __new_rule(self, body):
+        rule = {'id': new_id(), 'direction': 'ingress', 'ethertype': 'IPv4',
+                'protocol': None, 'port_range_min': None,
+                'port_range_max': None, 'remote_ip_prefix': None,
+                'remote_group_id': None, 'description': '', 'tenant_id': ''}
+        rule.update(body)
+        with self.cloud.lock:
+            self.__get(self.cloud.security_groups, 'security_group',
+                       rule['security_group_id'], NeutronNotFound)
+            self.cloud.security_group_rules[rule['id']] = rule
+        return rule
+
+    @api_call
+    def list_security_groups(self, **filters):
+        with self.cloud.lock:
+            return {'security_groups': [
+                self.__security_group_view(sec_grp)
+                for sec_grp in self.cloud.security_groups.values()
+                if matches(sec_grp, filters)]}
+
+    @api_call
+    def create_security_group(self, body):
+        sec_grp = {'id': new_id(), 'name': '', 'description': '',
+                   'tenant_id': ''}
+        sec_grp.update(body['security_group'])
+        with self.cloud.lock:
+            self.cloud.security_groups[sec_grp['id']] = sec_grp
+            for ethertype in ('IPv4', 'IPv6'):
+                self.__new_rule({'security_group_id': sec_grp['id'],
+                                 'direction': 'egress',
+                                 'ethertype': ethertype,
+                                 'tenant_id': sec_grp['tenant_id']})
+            return {'security_group': self.__security_group_view(sec_grp)}
+
+    @api_call
+    def delete_security_group(self, sec_grp_id):
+        with self.cloud.lock:
+            self.__delete(self.cloud.security_groups, 'security_group',
+                          sec_grp_id, NeutronNotFound)
+            for rule in list(self.cloud.security_group_rules.values()):
+                if rule['security_group_id'] == sec_grp_id:
+                    del self.cloud.security_group_rules[rule['id']]
+
+    @api_call
+    def list_security_group_rules(self, **filters):
+        return self.__list(self.cloud.security_group_rules,
+                           'security_group_rules', filters)
+
+    @api_call
+    def create_security_group_rule(self, body):
+        return {'security_group_rule': copy.deepcopy(
+            self.__new_rule(body['security_group_rule']))}
+
+    @api_call
+    def delete_security_group_rule(self, rule_id):
+        self.__delete(self.cloud.security_group_rules, 'security_group_rule',
+                      rule_id, NeutronNotFound)
+
+    @api_call
+    def list_floatingips(self, **filters):
+        return self.__list(self.cloud.floating_ips, 'floatingips', filters)
+
+    @api_call
+    def create_floatingip(self, body):
+        fip = {'id': new_id(), 'port_id': None, 'fixed_ip_address': None,
+               'router_id': None, 'status': 'DOWN', 'tenant_id': ''}
+        fip.update(body['floatingip'])
+        with self.cloud.lock:
+            network = self.__get(
+                self.cloud.networks, 'network', fip['floating_network_id'],
+                NetworkNotFoundClient)
+            if not network['subnets']:
+                raise NeutronNotFound(
+                    message='network %s has no subnet' % network['id'])
+            fip['floating_ip_address'] = self.cloud.allocate_ip(
+                self.cloud.subnets[network['subnets'][0]])
+            self.cloud.floating_ips[fip['id']] = fip
+        return {'floatingip': copy.deepcopy(fip)}
+
+    @api_call
+    def delete_floatingip(self, fip_id):
+        self.__delete(self.cloud.floating_ips, 'floatingip', fip_id,
+                      NeutronNotFound)
+
+    @api_call
+    def show_quota(self, project_id, **kwargs):
+        with self.cloud.lock:
+            return {'quota': dict(self.cloud.network_quotas.get(
+                project_id, DEFAULT_NETWORK_QUOTAS))}
+
+    @api_call
+    def update_quota(self, project_id, body=None):
+        with self.cloud.lock:
+            quota = dict(self.cloud.network_quotas.get(
+                project_id, DEFAULT_NETWORK_QUOTAS))
+            quota.update(body['quota'])
+            self.cloud.network_quotas[project_id] = quota
+            return {'quota': dict(quota)}
+
+
+class FakeProjectManager(FakeManager):
+    """
+    The projects resource of the fake keystone v3 client
+    """
+
+    collection = 'projects'
+
+    @api_call
+    def list(self, **kwargs):
+        return self._list({'name': kwargs.get('name')})
+
+    @api_call
+    def create(self, name, domain, description=None, enabled=True,
+               **kwargs):
+        return self._add(FakeResource(
+            id=new_id(), name=name, domain_id=getattr(domain, 'id', domain),
+            description=description, enabled=enabled))
+
+    @api_call
+    def delete(self, project):
+        project = self._get(project)
+        with self.cloud.lock:
+            del self.cloud.projects[project.id]
+            self.cloud.role_grants = set(
+                grant for grant in self.cloud.role_grants
+                if grant[1] != project.id)
+
+
+class FakeUserManager(FakeManager):
+    """
+    The users resource of the fake keystone v3 client
+    """
+
+    collection = 'users'
+
+    @api_call
+    def list(self, **kwargs):
+        return self._list()
+
+    @api_call
+    def create(self, name, domain=None, project=None, password=None,
+               email=None, description=None, enabled=True,
+               default_project=None, **kwargs):
+        project = project or default_project
+        return self._add(FakeResource(
+            id=new_id(), name=name,
+            domain_id=getattr(domain, 'id', domain) or 'default',
+            default_project_id=getattr(project, 'id', project), email=email,
+            description=description, enabled=enabled))
+
+    @api_call
+    def delete(self, user):
+        user = self._get(user)
+        with self.cloud.lock:
+            del self.cloud.users[user.id]
+            self.cloud.role_grants = set(
+                grant for grant in self.cloud.role_grants
+                if grant[0] != user.id)
+
+
+class FakeRoleManager(FakeManager):
+    """
+    The roles resource of the fake keystone v3 client
+    """
+
+    collection = 'roles'
+
+    @api_call
+    def list(self, user=None, project=None, **kwargs):
+        if not user and not project:
+            return self._list()
+        user_id = getattr(user, 'id', user)
+        project_id = getattr(project, 'id', project)
+        with self.cloud.lock:
+            return [self.cloud.roles[role_id]
+                    for grant_user, grant_project, role_id in
+                    self.cloud.role_grants
+                    if user_id in (None, grant_user) and
+                    project_id in (None, grant_project) and
+                    role_id in self.cloud.roles]
+
+    @api_call
+    def create(self, name, **kwargs):
+        return self._add(FakeResource(id=new_id(), name=name))
+
+    @api_call
+    def grant(self, role, user=None, project=None, **kwargs):
+        with self.cloud.lock:
+            self.cloud.role_grants.add((
+                getattr(user, 'id', user), getattr(project, 'id', project),
+                getattr(role, 'id', role)))
+
+
+class FakeDomainManager(FakeManager):
+    """
+    The domains resource of the fake keystone v3 client
+    """
+
+    collection = 'domains'
+
+    @api_call
+    def list(self, **kwargs):
+        return self._list({'name': kwargs.get('name')})
+
+
+class FakeKeystoneClient:
+    """
+    Stands in for the keystoneclient.client.Client of version 3
+    """
+
+    def __init__(self, cloud):
+        service = api_metrics.SERVICE_IDENTITY
+        self.version = 'v3'
+        self.projects = FakeProjectManager(cloud, service, 'projects.')
+        self.users = FakeUserManager(cloud, service, 'users.')
+        self.roles = FakeRoleManager(cloud, service, 'roles.')
+        self.domains = FakeDomainManager(cloud, service, 'domains.')
+
+
+class FakeVolumeManager(FakeManager):
+    """
+    The volumes resource of the fake cinder client
+    """
+
+    collection = 'volumes'
+
+    @api_call
+    def list(self, detailed=True, search_opts=None):
+        return self._list(search_opts)
+
+    @api_call
+    def create(self, size, name=None, description=None, imageRef=None,
+               snapshot_id=None, source_volid=None, volume_type=None,
+               availability_zone=None, multiattach=False, **kwargs):
+        volume = self._add(FakeVolume(
+            self.cloud, id=new_id(), name=name, description=description,
+            size=size, volume_type=volume_type,
+            availability_zone=availability_zone or 'nova',
+            multiattach=multiattach, snapshot_id=snapshot_id,
+            source_volid=source_volid))
+        self.cloud.start_action(RES_VOLUME, volume.id, name, ACTION_CREATE)
+        return volume
+
+    @api_call
+    def delete(self, volume):
+        volume = self._get(volume)
+        self.cloud.start_action(RES_VOLUME, volume.id, volume.name,
+                                ACTION_DELETE)
+
+
+class FakeVolumeSnapshotManager(FakeManager):
+    """
+    The volume_snapshots resource of the fake cinder client
+    """
+
+    collection = 'snapshots'
+
+    @api_call
+    def list(self, detailed=True, search_opts=None):
+        return self._list(search_opts)
+
+    @api_call
+    def create(self, volume_id, force=False, name=None, description=None,
+               metadata=None):
+        with self.cloud.lock:
+            volume = self.cloud.volumes.get(volume_id)
+        if not volume:
+            raise CinderNotFound(404, 'Volume %s not found' % volume_id)
+        snapshot = self._add(FakeSnapshot(
+            self.cloud, id=new_id(), name=name, description=description,
+            volume_id=volume_id, size=volume.size))
+        self.cloud.start_action(RES_SNAPSHOT, snapshot.id, name,
+                                ACTION_CREATE)
+        return snapshot
+
+    @api_call
+    def delete(self, snapshot, force=False):
+        snapshot = self._get(snapshot)
+        self.cloud.start_action(RES_SNAPSHOT, snapshot.id, snapshot.name,
+                                ACTION_DELETE)
+
+
+class FakeVolumeTypeManager(FakeManager):
+    """
+    The volume_types resource of the fake cinder client
+    """
+
+    collection = 'volume_types'
+
+    @api_call
+    def list(self, search_opts=None, is_public=None):
+        return self._list()
+
+    @api_call
+    def create(self, name, description=None, is_public=True):
+        return self._add(FakeResource(
+            id=new_id(), name=name, description=description,
+            is_public=is_public, qos_specs_id=None))
+
+    @api_call
+    def delete(self, volume_type):
+        volume_type = self._get(volume_type)
+        with self.cloud.lock:
+            del self.cloud.volume_types[volume_type.id]
+            self.cloud.volume_encryptions.pop(volume_type.id, None)
+
+
+class FakeVolumeEncryptionTypeManager(FakeApi):
+    """
+    The volume_encryption_types resource of the fake cinder client. Getting
+    the encryption of a volume type without one returns an empty object as
+    cinder does
+    """
+
+    @api_call
+    def get(self, volume_type):
+        with self.cloud.lock:
+            encryption = self.cloud.volume_encryptions.get(
+                getattr(volume_type, 'id', volume_type))
+        return encryption or FakeResource()
+
+    @api_call
+    def create(self, volume_type, specs):
+        volume_type_id = getattr(volume_type, 'id', volume_type)
+        encryption = FakeResource(
+            encryption_id=new_id(), volume_type_id=volume_type_id,
+            control_location=specs.get('control_location'),
+            provider=specs.get('provider'))
+        for key in ('cipher', 'key_size'):
+            if key in specs:
+                setattr(encryption, key, specs[key])
+        with self.cloud.lock:
+            self.cloud.volume_encryptions[volume_type_id] = encryption
+        return encryption
+
+    @api_call
+    def delete(self, volume_type):
+        with self.cloud.lock:
+            self.cloud.volume_encryptions.pop(
+                getattr(volume_type, 'id', volume_type), None)
+
+
+class FakeQoSSpecsManager(FakeManager):
+    """
+    The qos_specs resource of the fake cinder client
+    """
+
+    collection = 'qos_specs'
+
+    @api_call
+    def create(self, name, specs):
+        specs = dict(specs)
+        return self._add(FakeResource(
+            id=new_id(), name=name,
+            consumer=specs.pop('consumer', 'back-end'), specs=specs))
+
+    @api_call
+    def associate(self, qos_specs, vol_type_id):
+        qos_specs = self._get(qos_specs)
+        with self.cloud.lock:
+            volume_type = self.cloud.volume_types.get(vol_type_id)
+            if not volume_type:
+                raise CinderNotFound(
+                    404, 'Volume type %s not found' % vol_type_id)
+            volume_type.qos_specs_id = qos_specs.id
+
+    @api_call
+    def delete(self, qos_specs, force=False):
+        qos_specs = self._get(qos_specs)
+        with self.cloud.lock:
+            del self.cloud.qos_specs[qos_specs.id]
+
+
+class FakeCinderClient:
+    """
+    Stands in for cinderclient.client.Client
+    """
+
+    def __init__(self, cloud):
+        service = api_metrics.SERVICE_VOLUME
+        # The HTTP client identifying the credentials of real clients
+        self.client = None
+        self.volumes = FakeVolumeManager(cloud, service, 'volumes.')
+        self.volume_snapshots = FakeVolumeSnapshotManager(
+            cloud, service, 'volume_snapshots.')
+        self.volume_types = FakeVolumeTypeManager(
+            cloud, service, 'volume_types.')
+        self.volume_encryption_types = FakeVolumeEncryptionTypeManager(
+            cloud, service, 'volume_encryption_types.')
+        self.qos_specs = FakeQoSSpecsManager(cloud, service, 'qos_specs.')
+
+
+class FakeStackManager(FakeManager):
+    """
+    The stacks resource of the fake heat client
+    """
+
+    collection = 'stacks'
+
+    @api_call
+    def list(self, **kwargs):
+        return self._list({'stack_name': kwargs.get('stack_name')})
+
+    @api_call
+    def create(self, **kwargs):
+        stack = self._add(FakeStack(
+            self.cloud, id=new_id(), stack_name=kwargs['stack_name'],
+            template=kwargs.get('template'),
+            parameters=kwargs.get('parameters', dict())))
+        self.cloud.start_action(RES_STACK, stack.id, stack.stack_name,
+                                ACTION_CREATE)
+        return {'stack': {'id': stack.id, 'links': list()}}
+
+    @api_call
+    def update(self, stack_id, **kwargs):
+        stack = self._get(stack_id)
+        with self.cloud.lock:
+            stack.template = kwargs.get('template', stack.template)
+            stack.parameters = kwargs.get('parameters', stack.parameters)
+        self.cloud.start_action(RES_STACK, stack.id, stack.stack_name,
+                                ACTION_UPDATE)
+
+    @api_call
+    def preview_update(self, stack_id, **kwargs):
+        self._get(stack_id)
+        return {'resource_changes': {
+            'added': list(), 'deleted': list(), 'replaced': list(),
+            'updated': list(), 'unchanged': list()}}
+
+    @api_call
+    def delete(self, stack_id):
+        stack = self._get(stack_id)
+        self.cloud.start_action(RES_STACK, stack.id, stack.stack_name,
+                                ACTION_DELETE)
+
+
+class FakeStackResourceManager(FakeApi):
+    """
+    The resources resource of the fake heat client
+    """
+
+    @api_call
+    def list(self, stack_id, **kwargs):
+        get_stack(self.cloud, stack_id)
+        return list()
+
+
+class FakeEventManager(FakeApi):
+    """
+    The events resource of the fake heat client emitting an event for the
+    start and the completion of each action of a stack
+    """
+
+    @api_call
+    def list(self, stack_id, marker=None, limit=None, sort_dir=None,
+             **kwargs):
+        stack = get_stack(self.cloud, stack_id)
+        with self.cloud.lock:
+            events = [
+                FakeResource(
+                    id='%s-%d' % (stack.id, index),
+                    resource_name=stack.stack_name,
+                    physical_resource_id=stack.id, resource_status=status,
+                    resource_status_reason=reason,
+                    event_time=time.strftime('%Y-%m-%dT%H:%M:%SZ',
+                                             time.gmtime(event_time)))
+                for index, status, reason, event_time in
+                self.cloud.states[stack.id].get_events()]
+
+        if sort_dir == 'desc':
+            events.reverse()
+        if marker:
+            event_ids = [event.id for event in events]
+            if marker in event_ids:
+                events = events[event_ids.index(marker) + 1:]
+        if limit:
+            events = events[:limit]
+        return events
+
+
+class FakeHeatClient:
+    """
+    Stands in for heatclient.client.Client
+    """
+
+    def __init__(self, cloud):
+        service = api_metrics.SERVICE_ORCHESTRATION
+        self.stacks = FakeStackManager(cloud, service, 'stacks.')
+        self.resources = FakeStackResourceManager(
+            cloud, service, 'resources.')
+        self.events = FakeEventManager(cloud, service, 'events.')
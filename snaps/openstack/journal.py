@@ -0,0 +1,205 @@
+# Copyright (c) 2017 Cable Television Laboratories, Inc. ("CableLabs")
+#                    and others.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+import enum
+
+__author__ = 'spisarski'
+
+"""
+Records the IDs of the resources deployed by a DeploymentGraph in an
+append-only JSON lines file so later runs can load the creators from those IDs
+rather than searching for every resource by name
+"""
+
+logger = logging.getLogger('journal')
+
+EVENT_DEPLOYED = 'deployed'
+EVENT_CLEANED = 'cleaned'
+
+
+def get_settings_hash(settings_list):
+    """
+    Returns a digest of settings objects that changes whenever any of their
+    attributes does
+    :param settings_list: a list of SNAPS-OO settings objects
+    :return: the hex digest string
+    """
+    data = json.dumps(__to_primitive(list(settings_list)), sort_keys=True)
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+
+def __to_primitive(value):
+    """
+    Converts a settings object and the values it holds into the types json
+    can serialize
+    :param value: the value to convert
+    :return: the converted value
+    """
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, enum.Enum):
+        return str(value)
+    if isinstance(value, dict):
+        return dict((str(key), __to_primitive(item))
+                    for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return [__to_primitive(item) for item in value]
+    if isinstance(value, (set, frozenset)):
+        return sorted((__to_primitive(item) for item in value),
+                      key=lambda item: json.dumps(item, sort_keys=True))
+    if hasattr(value, '__dict__'):
+        return {'class': value.__class__.__name__,
+                'attributes': __to_primitive(vars(value))}
+    return str(value)
+
+
+def __to_key(value):
+    """
+    Converts the JSON lists of a journal entry's name back to tuples
+    :param value: the value read from the journal
+    :return: the hashable value
+    """
+    if isinstance(value, list):
+        return tuple(__to_key(item) for item in value)
+    return value
+
+
+def read_entries(path):
+    """
+    Replays a journal file
+    :param path: the path to the journal file
+    :return: a dict of the last deployed entry of each resource that has not
+             been cleaned since, keyed by (resource type, name). Each entry is
+             a dict with the keys 'type', 'name', 'hash', 'ids' and 'time'
+    """
+    out = dict()
+    if not os.path.isfile(path):
+        return out
+
+    with open(path) as journal_file:
+        for line_num, line in enumerate(journal_file, 1):
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+                key = (entry['type'], __to_key(entry['name']))
+            except (ValueError, KeyError) as e:
+                # i.e. the last line of a run that was killed mid-write
+                logger.warning('Skipping invalid line %s of journal %s - %s',
+                               line_num, path, e)
+                continue
+
+            if entry.get('event') == EVENT_DEPLOYED:
+                entry['name'] = key[1]
+                out[key] = entry
+            elif entry.get('event') == EVENT_CLEANED:
+                out.pop(key, None)
+    return out
+
+
+class DeploymentJournal:
+    """
+    Append-only JSON lines file recording when each resource of a
+    DeploymentGraph is deployed, with the settings hash and the IDs returned
+    by its creator's get_resource_ids(), and when it is cleaned. Replaying
+    the file gives the resources still deployed. Entries are written from the
+    graph's worker threads and flushed to disk one at a time so a run that
+    crashes keeps everything recorded before the crash
+    """
+
+    def __init__(self, path):
+        """
+        Constructor
+        :param path: the path to the journal file which is created on the
+                     first entry
+        """
+        self.path = path
+        self.__lock = threading.Lock()
+
+    def record_deployed(self, resource_type, name, settings_hash,
+                        resource_ids):
+        """
+        Records that a resource has been deployed
+        :param resource_type: the type of resource
+        :param name: the name of the resource
+        :param settings_hash: the value of get_settings_hash() for the
+                              settings the resource was deployed with
+        :param resource_ids: the dict returned by the creator's
+                             get_resource_ids()
+        """
+        self.__append({'event': EVENT_DEPLOYED, 'type': resource_type,
+                       'name': name, 'hash': settings_hash,
+                       'ids': resource_ids, 'time': time.time()})
+
+    def record_cleaned(self, resource_type, name):
+        """
+        Records that a resource has been cleaned
+        :param resource_type: the type of resource
+        :param name: the name of the resource
+        """
+        self.__append({'event': EVENT_CLEANED, 'type': resource_type,
+                       'name': name, 'time': time.time()})
+
+    def load(self):
+        """
+        Replays the journal
+        :return: a dict of entries keyed by (resource type, name) as returned
+                 by read_entries()
+        """
+        with self.__lock:
+            return read_entries(self.path)
+
+    def compact(self):
+        """
+        Rewrites the journal with only the entries of the resources still
+        deployed. The new file replaces the old one atomically and is deleted
+        when nothing is deployed anymore
+        """
+        with self.__lock:
+            entries = read_entries(self.path)
+            if not entries:
+                if os.path.isfile(self.path):
+                    os.remove(self.path)
+                return
+
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w') as journal_file:
+                for key in sorted(entries, key=str):
+                    entry = entries[key]
+                    entry['event'] = EVENT_DEPLOYED
+                    journal_file.write(json.dumps(entry, sort_keys=True))
+                    journal_file.write('\n')
+                journal_file.flush()
+                os.fsync(journal_file.fileno())
+            os.rename(tmp_path, self.path)
+
+    def __append(self, entry):
+        """
+        Appends an entry to the journal and flushes it to disk
+        :param entry: the dict to write
+        """
+        line = json.dumps(entry, sort_keys=True)
+        with self.__lock:
+            with open(self.path, 'a') as journal_file:
+                journal_file.write(line)
+                journal_file.write('\n')
+                journal_file.flush()
+                os.fsync(journal_file.fileno())
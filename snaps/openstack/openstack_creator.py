@@ -32,6 +32,13 @@ class OpenStackCloudObject(CloudObject):
         # super(self.__class__, self, os_creds)
         self._os_creds = os_creds
 
+    def get_os_creds(self):
+        """
+        Returns the OpenStack credentials this creator was constructed with
+        :return: the OSCreds object
+        """
+        return self._os_creds
+
     def initialize(self):
         raise NotImplementedError('Do not override abstract method')
 
@@ -163,6 +163,16 @@ class OSCreds:
 
         return new_url
 
+    def get_key(self):
+        """
+        Returns the values identifying the cloud, project and user of these
+        credentials, such as to share one client among the creators using
+        the same credentials
+        :return: a tuple
+        """
+        return (self.auth_url, self.region_name, self.project_name,
+                self.username)
+
     @property
     def __str__(self):
         """Converts object to a string"""
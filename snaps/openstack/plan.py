@@ -0,0 +1,381 @@
+# Copyright (c) 2017 Cable Television Laboratories, Inc. ("CableLabs")
+#                    and others.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import logging
+
+from snaps.openstack import deployment
+from snaps.openstack.openstack_creator import OpenStackCloudObject
+from snaps.openstack.utils import (
+    cinder_utils, glance_utils, neutron_utils, nova_utils)
+
+__author__ = 'spisarski'
+
+"""
+Resolves the creators of a DeploymentGraph against the resources that
+already exist without calling initialize() on any of them. The existing
+resources of each set of credentials are retrieved with one list call per
+resource type
+"""
+
+logger = logging.getLogger('plan')
+
+PLAN_CREATE = 'create'
+PLAN_EXISTS = 'exists'
+PLAN_DRIFT = 'drift'
+PLAN_UNCHECKED = 'unchecked'
+
+RES_PORT = 'port'
+
+
+class PlanItem:
+    """
+    What deploying a single resource would do
+    """
+
+    def __init__(self, resource_type, name, action, differences=None):
+        """
+        Constructor
+        :param resource_type: the type of resource (i.e. RES_NETWORK)
+        :param name: the name of the resource
+        :param action: PLAN_CREATE, PLAN_EXISTS, PLAN_DRIFT or PLAN_UNCHECKED
+        :param differences: a list of strings describing how the existing
+                            resource differs from its settings
+        """
+        self.resource_type = resource_type
+        self.name = name
+        self.action = action
+        self.differences = differences or list()
+
+
+class ResourceSnapshot:
+    """
+    The existing resources of one set of credentials, retrieved by name with
+    one list call per resource type
+    """
+
+    def __init__(self, os_creds):
+        """
+        Constructor
+        :param os_creds: the OpenStack credentials
+        """
+        self.os_creds = os_creds
+        self.__resources = dict()
+
+    def load(self, names):
+        """
+        Retrieves the resources with the given names
+        :param names: a dict of sets of names keyed by resource type
+        """
+        neutron_lists = (
+            (deployment.RES_NETWORK, neutron_utils.get_networks_by_names),
+            (deployment.RES_SUBNET, neutron_utils.get_subnets_by_names),
+            (RES_PORT, neutron_utils.get_ports_by_names),
+            (deployment.RES_ROUTER, neutron_utils.get_routers_by_names),
+            (deployment.RES_SECURITY_GROUP,
+             neutron_utils.get_security_groups_by_names))
+        nova_lists = (
+            (deployment.RES_FLAVOR, nova_utils.get_flavors_by_names),
+            (deployment.RES_KEYPAIR, nova_utils.get_keypairs_by_names),
+            (deployment.RES_INSTANCE, nova_utils.get_servers_by_names))
+
+        if [res_type for res_type, func in neutron_lists
+                if names.get(res_type)]:
+            neutron = neutron_utils.neutron_client(self.os_creds)
+            for res_type, func in neutron_lists:
+                if names.get(res_type):
+                    self.__resources[res_type] = func(
+                        neutron, names[res_type])
+
+        if [res_type for res_type, func in nova_lists
+                if names.get(res_type)]:
+            nova = nova_utils.nova_client(self.os_creds)
+            for res_type, func in nova_lists:
+                if names.get(res_type):
+                    self.__resources[res_type] = func(nova, names[res_type])
+
+        if names.get(deployment.RES_IMAGE):
+            glance = glance_utils.glance_client(self.os_creds)
+            self.__resources[deployment.RES_IMAGE] = (
+                glance_utils.get_images_by_names(
+                    glance, names[deployment.RES_IMAGE]))
+
+        if names.get(deployment.RES_VOLUME):
+            cinder = cinder_utils.cinder_client(self.os_creds)
+            self.__resources[deployment.RES_VOLUME] = (
+                cinder_utils.get_volumes_by_name(
+                    cinder, names[deployment.RES_VOLUME]))
+
+    def add(self, resource_type, domain_obj):
+        """
+        Adds an existing resource retrieved by other means
+        :param resource_type: the type of resource
+        :param domain_obj: the SNAPS-OO domain object
+        """
+        self.__resources.setdefault(resource_type, dict())[
+            domain_obj.name] = domain_obj
+
+    def get(self, resource_type, name):
+        """
+        Returns an existing resource
+        :param resource_type: the type of resource
+        :param name: the name of the resource
+        :return: the SNAPS-OO domain object or None
+        """
+        return self.__resources.get(resource_type, dict()).get(name)
+
+
+def create_plan(graph, snapshots=None):
+    """
+    Resolves every node of a DeploymentGraph against ResourceSnapshots of
+    the credentials used by its creators without changing anything
+    :param graph: the DeploymentGraph object
+    :param snapshots: a list of ResourceSnapshot objects to use instead of
+                      retrieving the resources of their credentials
+                      (optional)
+    :return: a list of PlanItem objects in deployment order
+    """
+    nodes = list()
+    names_by_creds = dict()
+    creds_by_key = dict()
+    for level in graph.get_levels():
+        for key in level:
+            if key[0] == deployment.RES_PROJECT_USERS:
+                continue
+
+            # OpenStackUser.get_os_creds() returns the credentials of the
+            # user it manages rather than those it was constructed with
+            os_creds = OpenStackCloudObject.get_os_creds(
+                graph.get_creator(*key))
+            creds_key = os_creds.get_key()
+            creds_by_key[creds_key] = os_creds
+            nodes.append((key, creds_key))
+
+            names = names_by_creds.setdefault(creds_key, dict())
+            for settings in graph.get_settings(key):
+                for res_type, name in __get_lookups(key[0], settings):
+                    names.setdefault(res_type, set()).add(name)
+
+    snapshots = dict((snapshot.os_creds.get_key(), snapshot)
+                     for snapshot in snapshots or list())
+    for creds_key, names in names_by_creds.items():
+        if creds_key not in snapshots:
+            snapshot = ResourceSnapshot(creds_by_key[creds_key])
+            snapshot.load(names)
+            snapshots[creds_key] = snapshot
+
+    out = list()
+    for key, creds_key in nodes:
+        out.extend(__plan_node(key, graph.get_settings(key),
+                               snapshots[creds_key]))
+    return out
+
+
+def format_plan(items):
+    """
+    Returns a human readable table of a plan
+    :param items: the list of PlanItem objects
+    :return: the string
+    """
+    counts = dict()
+    lines = ['Deployment plan:']
+    for item in items:
+        counts[item.action] = counts.get(item.action, 0) + 1
+        lines.append('  %-9s %-16s %s' % (
+            item.action, item.resource_type, item.name))
+        for difference in item.differences:
+            lines.append('            - %s' % difference)
+    lines.append('  %d to create, %d existing, %d drifted, %d unchecked' % (
+        counts.get(PLAN_CREATE, 0), counts.get(PLAN_EXISTS, 0),
+        counts.get(PLAN_DRIFT, 0), counts.get(PLAN_UNCHECKED, 0)))
+    return '\n'.join(lines)
+
+
+def __get_lookups(resource_type, settings):
+    """
+    Returns the resources to retrieve in order to plan a node
+    :param resource_type: the type of the node
+    :param settings: one of the node's settings objects
+    :return: a list of (resource type, name) tuples
+    """
+    out = list()
+    if resource_type == deployment.RES_VOLUME_GROUP:
+        out.append((deployment.RES_VOLUME, settings.name))
+    elif resource_type in (
+            deployment.RES_NETWORK, deployment.RES_ROUTER,
+            deployment.RES_SECURITY_GROUP, deployment.RES_IMAGE,
+            deployment.RES_FLAVOR, deployment.RES_KEYPAIR,
+            deployment.RES_INSTANCE):
+        out.append((resource_type, settings.name))
+
+    if resource_type == deployment.RES_NETWORK:
+        for subnet_settings in settings.subnet_settings:
+            out.append((deployment.RES_SUBNET, subnet_settings.name))
+    elif resource_type == deployment.RES_ROUTER:
+        if settings.external_gateway:
+            out.append((deployment.RES_NETWORK, settings.external_gateway))
+    elif resource_type == deployment.RES_INSTANCE:
+        out.append((deployment.RES_FLAVOR, __get_flavor_name(settings)))
+        for port_settings in settings.port_settings:
+            out.append((RES_PORT, port_settings.name))
+    return out
+
+
+def __plan_node(key, settings_list, snapshot):
+    """
+    Returns the PlanItem objects of a node
+    :param key: the (resource type, name) tuple of the node
+    :param settings_list: the node's settings objects
+    :param snapshot: the ResourceSnapshot of the node's credentials
+    :return: a list of PlanItem objects
+    """
+    resource_type, name = key
+    if resource_type == deployment.RES_VOLUME_GROUP:
+        return [__plan_item(
+            deployment.RES_VOLUME, settings.name,
+            snapshot.get(deployment.RES_VOLUME, settings.name),
+            __diff_volume, settings, snapshot)
+            for settings in settings_list]
+
+    diff_functions = {
+        deployment.RES_NETWORK: __diff_network,
+        deployment.RES_ROUTER: __diff_router,
+        deployment.RES_FLAVOR: __diff_flavor,
+        deployment.RES_INSTANCE: __diff_instance,
+        deployment.RES_SECURITY_GROUP: None,
+        deployment.RES_IMAGE: None,
+        deployment.RES_KEYPAIR: None,
+    }
+    if resource_type not in diff_functions or not settings_list:
+        return [PlanItem(resource_type, name, PLAN_UNCHECKED)]
+
+    return [__plan_item(
+        resource_type, name, snapshot.get(resource_type, name),
+        diff_functions[resource_type], settings_list[0], snapshot)]
+
+
+def __plan_item(resource_type, name, existing, diff_function, settings,
+                snapshot):
+    """
+    Returns the PlanItem of a resource
+    :param resource_type: the type of resource
+    :param name: the resource's name
+    :param existing: the existing domain object or None
+    :param diff_function: the function returning the differences between
+                          the settings and the existing object (optional)
+    :param settings: the resource's settings object
+    :param snapshot: the ResourceSnapshot
+    :return: the PlanItem object
+    """
+    if not existing:
+        return PlanItem(resource_type, name, PLAN_CREATE)
+
+    differences = list()
+    if diff_function:
+        differences = diff_function(settings, existing, snapshot)
+    if differences:
+        return PlanItem(resource_type, name, PLAN_DRIFT, differences)
+    return PlanItem(resource_type, name, PLAN_EXISTS)
+
+
+def __diff_value(differences, attr, expected, found):
+    """
+    Appends a difference when an expected value is set and is not the one
+    found
+    """
+    if expected is not None and expected != found:
+        differences.append('%s: expected %s, found %s' % (
+            attr, expected, found))
+
+
+def __diff_network(settings, network, snapshot):
+    """
+    Returns the differences between a NetworkSettings and a Network
+    """
+    out = list()
+    __diff_value(out, 'shared', settings.shared, network.shared)
+    __diff_value(out, 'external', settings.external or None,
+                 network.external)
+    __diff_value(out, 'network_type', settings.network_type, network.type)
+    for subnet_settings in settings.subnet_settings:
+        subnet = snapshot.get(deployment.RES_SUBNET, subnet_settings.name)
+        if not subnet:
+            out.append('subnet %s: missing' % subnet_settings.name)
+        else:
+            __diff_value(out, 'subnet %s cidr' % subnet_settings.name,
+                         subnet_settings.cidr, subnet.cidr)
+    return out
+
+
+def __diff_router(settings, router, snapshot):
+    """
+    Returns the differences between a RouterSettings and a Router
+    """
+    out = list()
+    if settings.external_gateway:
+        gateway_net = snapshot.get(
+            deployment.RES_NETWORK, settings.external_gateway)
+        gateway_info = router.external_gateway_info or dict()
+        if (not gateway_net or
+                gateway_net.id != gateway_info.get('network_id')):
+            out.append('external_gateway: expected %s' %
+                       settings.external_gateway)
+    return out
+
+
+def __diff_flavor(settings, flavor, snapshot):
+    """
+    Returns the differences between a FlavorSettings and a Flavor
+    """
+    out = list()
+    for attr in ('ram', 'disk', 'vcpus', 'ephemeral', 'is_public'):
+        __diff_value(out, attr, getattr(settings, attr),
+                     getattr(flavor, attr))
+    return out
+
+
+def __diff_volume(settings, volume, snapshot):
+    """
+    Returns the differences between a VolumeSettings and a Volume
+    """
+    out = list()
+    __diff_value(out, 'size', settings.size, volume.size)
+    __diff_value(out, 'type_name', settings.type_name, volume.type)
+    return out
+
+
+def __diff_instance(settings, vm_inst, snapshot):
+    """
+    Returns the differences between a VmInstanceSettings and a VmInst
+    """
+    out = list()
+    flavor_name = __get_flavor_name(settings)
+    flavor = snapshot.get(deployment.RES_FLAVOR, flavor_name)
+    if not flavor or flavor.id != vm_inst.flavor_id:
+        out.append('flavor: expected %s' % flavor_name)
+    for port_settings in settings.port_settings:
+        if not snapshot.get(RES_PORT, port_settings.name):
+            out.append('port %s: missing' % port_settings.name)
+    return out
+
+
+def __get_flavor_name(settings):
+    """
+    Returns the name of a VM's flavor
+    :param settings: the VmInstanceSettings object
+    :return: the name
+    """
+    # i.e. a Flavor domain object in place of the flavor's name
+    if hasattr(settings.flavor, 'name'):
+        return settings.flavor.name
+    return settings.flavor
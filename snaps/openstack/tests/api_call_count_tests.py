@@ -0,0 +1,251 @@
+# Copyright (c) 2017 Cable Television Laboratories, Inc. ("CableLabs")
+#                    and others.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import json
+import unittest
+
+import pkg_resources
+
+from snaps import api_metrics
+from snaps.openstack import fake_cloud
+from snaps.openstack.create_image import ImageSettings
+from snaps.openstack.create_instance import (
+    OpenStackVmInstance, VmInstanceSettings)
+from snaps.openstack.create_network import (
+    NetworkSettings, OpenStackNetwork, PortSettings, SubnetSettings)
+from snaps.openstack.os_credentials import OSCreds
+from snaps.openstack.utils import (
+    glance_utils, neutron_utils, nova_utils, settings_utils)
+
+__author__ = 'spisarski'
+
+"""
+Counts the API calls the creators make against a FakeCloud and compares them
+with the bounds stored in api_call_baselines.json. Each scenario is run with
+a growing number of items (i.e. the ports of a VM) and must not make more
+than base + per_item * N calls. After an intended change of the number of
+calls, the baselines are rewritten by running this module:
+    python -m snaps.openstack.tests.api_call_count_tests
+"""
+
+BASELINES_FILE = pkg_resources.resource_filename(
+    'snaps.openstack.tests', 'api_call_baselines.json')
+
+# The numbers of items with which each scenario is run
+SIZES = (1, 2, 4)
+
+FLAVOR_NAME = 'm1.small'
+IMAGE_NAME = 'cirros'
+NETWORK_NAME = 'net'
+
+os_creds = OSCreds(username='admin', password='admin',
+                   auth_url='http://localhost:5000/v3', project_name='admin')
+
+
+def get_network_creator(subnet_count=1):
+    """
+    Returns the creator of a network with a subnet per count
+    """
+    return OpenStackNetwork(os_creds, NetworkSettings(
+        name=NETWORK_NAME, subnet_settings=[
+            SubnetSettings(name='subnet-%d' % index,
+                           cidr='10.0.%d.0/24' % index)
+            for index in range(subnet_count)]))
+
+
+def get_vm_creator(name, port_count):
+    """
+    Returns the creator of a VM with a port per count on the network
+    """
+    return OpenStackVmInstance(
+        os_creds, VmInstanceSettings(
+            name=name, flavor=FLAVOR_NAME, port_settings=[
+                PortSettings(name='%s-port-%d' % (name, index),
+                             network_name=NETWORK_NAME)
+                for index in range(port_count)]),
+        ImageSettings(name=IMAGE_NAME, image_user='cirros', exists=True))
+
+
+def network_create(count):
+    return get_network_creator(count).create
+
+
+def network_clean(count):
+    creator = get_network_creator(count)
+    creator.create()
+    return creator.clean
+
+
+def vm_create(count):
+    get_network_creator().create()
+    creator = get_vm_creator('vm', count)
+    return lambda: creator.create(block=True)
+
+
+def vm_clean(count):
+    get_network_creator().create()
+    creator = get_vm_creator('vm', count)
+    creator.create(block=True)
+    return creator.clean
+
+
+def vm_inst_settings(count):
+    get_network_creator().create()
+    creator = get_vm_creator('vm', count)
+    creator.create(block=True)
+    nova = nova_utils.nova_client(os_creds)
+    neutron = neutron_utils.neutron_client(os_creds)
+    server = creator.get_vm_inst()
+    return lambda: settings_utils.create_vm_inst_settings(
+        nova, neutron, server)
+
+
+def vm_inst_settings_indexed(count):
+    get_network_creator().create()
+    servers = list()
+    for index in range(count):
+        creator = get_vm_creator('vm-%d' % index, 1)
+        creator.create(block=True)
+        servers.append(creator.get_vm_inst())
+    nova = nova_utils.nova_client(os_creds)
+    neutron = neutron_utils.neutron_client(os_creds)
+    glance = glance_utils.glance_client(os_creds)
+
+    def create_settings():
+        index = settings_utils.get_server_resource_index(
+            nova, neutron, glance, servers)
+        for server in servers:
+            settings_utils.create_vm_inst_settings(
+                nova, neutron, server, resource_index=index)
+
+    return create_settings
+
+
+# The functions setting up a scenario with N items on the installed fake
+# cloud and returning the function whose API calls are counted
+SCENARIOS = {
+    'network_create': network_create,
+    'network_clean': network_clean,
+    'vm_create': vm_create,
+    'vm_clean': vm_clean,
+    'vm_inst_settings': vm_inst_settings,
+    'vm_inst_settings_indexed': vm_inst_settings_indexed,
+}
+
+
+def count_calls(scenario, count):
+    """
+    Runs a scenario with a number of items on a new fake cloud
+    :param scenario: the key of the scenario in SCENARIOS
+    :param count: the number of items
+    :return: the ApiMetricsCollector of the calls made by the function
+             returned by the scenario
+    """
+    cloud = fake_cloud.FakeCloud()
+    cloud.add_flavor(FLAVOR_NAME)
+    cloud.add_image(IMAGE_NAME)
+
+    # Registered during the setup so every client created is instrumented
+    setup_collector = api_metrics.ApiMetricsCollector()
+    collector = api_metrics.ApiMetricsCollector()
+    fake_cloud.install(cloud)
+    api_metrics.add_hook(setup_collector)
+    try:
+        function = SCENARIOS[scenario](count)
+        api_metrics.add_hook(collector)
+        function()
+    finally:
+        api_metrics.remove_hook(collector)
+        api_metrics.remove_hook(setup_collector)
+        fake_cloud.uninstall(cloud)
+    return collector
+
+
+def read_baselines():
+    """
+    Returns the stored baselines
+    :return: a dict of dicts with the keys 'base' and 'per_item' keyed by
+             scenario
+    """
+    with open(BASELINES_FILE) as baselines_file:
+        return json.load(baselines_file)
+
+
+def write_baselines():
+    """
+    Measures the scenarios with one and two items and writes their bounds
+    """
+    baselines = dict()
+    for scenario in SCENARIOS:
+        one = count_calls(scenario, 1).get_call_count()
+        two = count_calls(scenario, 2).get_call_count()
+        baselines[scenario] = {'base': one - (two - one),
+                               'per_item': two - one}
+    with open(BASELINES_FILE, 'w') as baselines_file:
+        json.dump(baselines, baselines_file, indent=4, sort_keys=True)
+        baselines_file.write('\n')
+
+
+class ApiCallCountTests(unittest.TestCase):
+    """
+    Ensures the number of API calls made by the creators does not grow past
+    their baselines
+    """
+
+    def setUp(self):
+        self.baselines = read_baselines()
+
+    def __assert_within_baseline(self, scenario):
+        """
+        Asserts that each size of a scenario stays within its bound
+        :param scenario: the key of the scenario in SCENARIOS
+        """
+        baseline = self.baselines[scenario]
+        for count in SIZES:
+            collector = count_calls(scenario, count)
+            bound = baseline['base'] + baseline['per_item'] * count
+            self.assertTrue(
+                collector.get_call_count() <= bound,
+                '%s with %d items made %d API calls where the baseline '
+                'allows %d\n%s' % (scenario, count,
+                                   collector.get_call_count(), bound,
+                                   collector.summary()))
+
+    def test_baselines(self):
+        """
+        Ensures every scenario has a baseline
+        """
+        self.assertEqual(set(SCENARIOS.keys()), set(self.baselines.keys()))
+
+    def test_network_create(self):
+        self.__assert_within_baseline('network_create')
+
+    def test_network_clean(self):
+        self.__assert_within_baseline('network_clean')
+
+    def test_vm_create(self):
+        self.__assert_within_baseline('vm_create')
+
+    def test_vm_clean(self):
+        self.__assert_within_baseline('vm_clean')
+
+    def test_vm_inst_settings(self):
+        self.__assert_within_baseline('vm_inst_settings')
+
+    def test_vm_inst_settings_indexed(self):
+        self.__assert_within_baseline('vm_inst_settings_indexed')
+
+
+if __name__ == '__main__':
+    write_baselines()
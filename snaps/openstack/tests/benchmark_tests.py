@@ -0,0 +1,229 @@
+# Copyright (c) 2017 Cable Television Laboratories, Inc. ("CableLabs")
+#                    and others.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import pkg_resources
+
+from snaps import waiter
+from snaps.openstack import benchmark, fake_cloud
+from snaps.openstack.benchmark import (
+    BenchmarkRunner, BenchmarkSettings, BenchmarkSettingsError)
+from snaps.openstack.tests import api_call_count_tests
+from snaps.openstack.tests.api_call_count_tests import os_creds
+
+__author__ = 'spisarski'
+
+
+class BenchmarkSettingsUnitTests(unittest.TestCase):
+    """
+    Tests the construction of the BenchmarkSettings class
+    """
+
+    def test_no_params(self):
+        with self.assertRaises(BenchmarkSettingsError):
+            BenchmarkSettings()
+
+    def test_invalid_type(self):
+        with self.assertRaises(BenchmarkSettingsError):
+            BenchmarkSettings(name='foo', type='volume')
+
+    def test_invalid_concurrency(self):
+        with self.assertRaises(BenchmarkSettingsError):
+            BenchmarkSettings(name='foo', type='network', concurrency=[0])
+
+    def test_vm_no_image(self):
+        with self.assertRaises(BenchmarkSettingsError):
+            BenchmarkSettings(name='foo', type='vm', flavor='bar')
+
+    def test_vm_ssh_no_floating_ip(self):
+        with self.assertRaises(BenchmarkSettingsError):
+            BenchmarkSettings(name='foo', type='vm', flavor='bar',
+                              image_name='cirros', image_user='cirros',
+                              ssh=True)
+
+    def test_vm_floating_ip_no_ext_net(self):
+        with self.assertRaises(BenchmarkSettingsError):
+            BenchmarkSettings(name='foo', type='vm', flavor='bar',
+                              image_name='cirros', image_user='cirros',
+                              floating_ip=True)
+
+    def test_stack_no_template(self):
+        with self.assertRaises(BenchmarkSettingsError):
+            BenchmarkSettings(name='foo', type='stack')
+
+    def test_config_with_name_type(self):
+        settings = BenchmarkSettings(
+            **{'name': 'foo', 'type': 'vm', 'count': '3', 'concurrency': 2,
+               'flavor': 'bar', 'image': 'cirros', 'image_user': 'cirros',
+               'ext_net': 'external', 'floating_ip': True})
+        self.assertEqual('foo', settings.name)
+        self.assertEqual(benchmark.RES_VM, settings.resource_type)
+        self.assertEqual(3, settings.count)
+        self.assertEqual(1, settings.iterations)
+        self.assertEqual([2], settings.concurrency)
+        self.assertEqual('cirros', settings.image_name)
+        self.assertEqual('external', settings.ext_net_name)
+        self.assertTrue(settings.floating_ip)
+        self.assertFalse(settings.ssh)
+
+
+class BenchmarkTests(unittest.TestCase):
+    """
+    Tests the BenchmarkRunner class against a FakeCloud
+    """
+
+    def setUp(self):
+        self.cloud = fake_cloud.FakeCloud(seed=1)
+        self.cloud.add_flavor(api_call_count_tests.FLAVOR_NAME)
+        self.cloud.add_image(api_call_count_tests.IMAGE_NAME)
+        self.cloud.add_network('external', '172.24.4.0/24', external=True)
+        fake_cloud.install(self.cloud)
+        waiter.set_default_backoff(
+            waiter.Backoff(initial_delay=0.01, max_interval=0.05, jitter=0))
+        self.runner = BenchmarkRunner(os_creds)
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        waiter.set_default_backoff(None)
+        fake_cloud.uninstall(self.cloud)
+        shutil.rmtree(self.tmp_dir)
+
+    def test_percentile(self):
+        """
+        Tests the nearest-rank percentiles
+        """
+        samples = list(range(100, 0, -1))
+        self.assertEqual(50, benchmark.percentile(samples, 50))
+        self.assertEqual(95, benchmark.percentile(samples, 95))
+        self.assertEqual(99, benchmark.percentile(samples, 99))
+        self.assertEqual(1, benchmark.percentile(samples, 0))
+        self.assertEqual(7, benchmark.percentile([7], 99))
+        self.assertIsNone(benchmark.percentile([], 50))
+        self.assertEqual({'p50': 2, 'p95': 3, 'p99': 3},
+                         benchmark.get_percentiles([3, 1, 2]))
+
+    def test_vms(self):
+        """
+        Tests that VMs with floating IPs are created and cleaned at each
+        concurrency level and that the shared network and router are
+        cleaned afterwards
+        """
+        self.cloud.set_transition(fake_cloud.RES_SERVER, 0.1)
+        results = self.runner.run(BenchmarkSettings(
+            name='vms', type=benchmark.RES_VM, count=3, iterations=2,
+            concurrency=[1, 3], flavor=api_call_count_tests.FLAVOR_NAME,
+            image_name=api_call_count_tests.IMAGE_NAME, image_user='cirros',
+            ext_net_name='external', floating_ip=True))
+
+        self.assertEqual([1, 3], [result.concurrency for result in results])
+        for result in results:
+            self.assertEqual(6, result.resources)
+            self.assertEqual(list(), result.failures)
+            self.assertEqual(6, len(result.active_times))
+            self.assertEqual(6, len(result.clean_times))
+            self.assertEqual(list(), result.ssh_times)
+            self.assertTrue(min(result.active_times) >= 0.1)
+            self.assertTrue(result.calls_per_resource(
+                benchmark.PHASE_CREATE) > 0)
+            self.assertTrue(result.calls_per_resource(
+                benchmark.PHASE_CLEAN) > 0)
+            self.assertTrue(result.throughput() > 0)
+
+        # Created concurrently, three VMs take about as long as one
+        self.assertTrue(results[1].throughput() > results[0].throughput())
+
+        for collection in ('servers', 'ports', 'floating_ips', 'routers'):
+            self.assertEqual(dict(), getattr(self.cloud, collection),
+                             collection)
+        self.assertEqual(['external'], [
+            network['name'] for network in self.cloud.networks.values()])
+
+    def test_networks(self):
+        """
+        Tests that networks with routers are created and cleaned
+        """
+        results = self.runner.run(BenchmarkSettings(
+            name='nets', type=benchmark.RES_NETWORK, count=4,
+            concurrency=[2], ext_net_name='external'))
+
+        self.assertEqual(1, len(results))
+        self.assertEqual(4, len(results[0].active_times))
+        self.assertEqual(list(), results[0].failures)
+        self.assertEqual(dict(), self.cloud.routers)
+        self.assertEqual(1, len(self.cloud.networks))
+
+    def test_stacks(self):
+        """
+        Tests that stacks are created and cleaned
+        """
+        self.cloud.set_transition(fake_cloud.RES_STACK, 0.1)
+        results = self.runner.run(BenchmarkSettings(
+            name='stacks', type=benchmark.RES_STACK, count=2,
+            concurrency=[2], template_path=pkg_resources.resource_filename(
+                'snaps.openstack.tests.heat', 'test_heat_template.yaml')))
+
+        self.assertEqual(2, len(results[0].active_times))
+        self.assertTrue(min(results[0].active_times) >= 0.1)
+        self.assertEqual(dict(), self.cloud.stacks)
+
+    def test_failures(self):
+        """
+        Tests that the resources that fail are reported, are not measured
+        and are still cleaned
+        """
+        self.cloud.fail_resource(fake_cloud.RES_SERVER, 'vms-1-0-1')
+        results = self.runner.run(BenchmarkSettings(
+            name='vms', type=benchmark.RES_VM, count=2,
+            flavor=api_call_count_tests.FLAVOR_NAME,
+            image_name=api_call_count_tests.IMAGE_NAME, image_user='cirros'))
+
+        self.assertEqual(2, results[0].resources)
+        self.assertEqual(1, len(results[0].active_times))
+        self.assertEqual(1, len(results[0].failures))
+        self.assertTrue(results[0].failures[0].startswith('vms-1-0-1: '))
+        self.assertEqual(dict(), self.cloud.servers)
+
+    def test_report(self):
+        """
+        Tests the JSON document and table of the results
+        """
+        self.runner.run(BenchmarkSettings(
+            name='nets', type=benchmark.RES_NETWORK, count=2,
+            concurrency=[1, 2]))
+
+        path = os.path.join(self.tmp_dir, 'results.json')
+        self.runner.write(path)
+        with open(path) as json_file:
+            results = json.load(json_file)['results']
+
+        self.assertEqual(2, len(results))
+        self.assertEqual('nets', results[0]['name'])
+        self.assertEqual(benchmark.RES_NETWORK, results[0]['type'])
+        self.assertEqual([1, 2], [result['concurrency']
+                                  for result in results])
+        self.assertEqual({'p50', 'p95', 'p99'},
+                         set(results[0]['time_to_active'].keys()))
+        self.assertIsNone(results[0]['time_to_ssh']['p50'])
+        self.assertTrue(results[0]['api_calls_per_resource']['create'] > 0)
+        self.assertTrue(results[0]['throughput'] > 0)
+
+        summary = self.runner.summary().splitlines()
+        self.assertEqual(4, len(summary))
+        self.assertTrue(summary[2].split()[:4] == ['nets', 'network', '1',
+                                                   '2/2'])
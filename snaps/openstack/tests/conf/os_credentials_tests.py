@@ -325,3 +325,14 @@ class OSCredsUnitTests(unittest.TestCase):
         self.assertEqual('1234', os_creds.proxy_settings.port)
         self.assertIsNone(os_creds.proxy_settings.ssh_proxy_cmd)
         self.assertEqual('test_region', os_creds.region_name)
+
+    def test_get_key(self):
+        os_creds = OSCreds(
+            username='foo', password='bar', auth_url='http://foo.bar:5000/v2',
+            project_name='hello', region_name='test_region')
+        self.assertEqual(
+            ('http://foo.bar:5000/v2.0', 'test_region', 'hello', 'foo'),
+            os_creds.get_key())
+        self.assertEqual(os_creds.get_key(), OSCreds(
+            username='foo', password='baz', auth_url='http://foo.bar:5000/v2',
+            project_name='hello', region_name='test_region').get_key())
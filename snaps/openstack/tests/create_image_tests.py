@@ -19,6 +19,7 @@ try:
 except ImportError:
     from urllib2 import URLError
 
+import gzip
 import logging
 import shutil
 import unittest
@@ -88,6 +89,30 @@ class ImageSettingsUnitTests(unittest.TestCase):
         self.assertFalse(settings.exists)
         self.assertFalse(settings.public)
         self.assertIsNone(settings.nic_config_pb_loc)
+        self.assertIsNone(settings.checksum)
+        self.assertFalse(settings.dedup)
+        self.assertIsNone(settings.upload_chunk_size)
+        self.assertIsNone(settings.compression)
+        self.assertIsNone(settings.cache_dir)
+
+    def test_compressed_url(self):
+        settings = ImageSettings(name='foo', image_user='bar',
+                                 img_format='qcow2',
+                                 url='http://foo.com/bar.qcow2.xz',
+                                 cache_dir='/tmp/cache')
+        self.assertEqual('xz', settings.compression)
+        self.assertEqual('/tmp/cache', settings.cache_dir)
+
+    def test_config_compressed_file(self):
+        settings = ImageSettings(
+            **{'name': 'foo', 'image_user': 'bar', 'format': 'raw',
+               'image_file': '/foo/bar.img', 'compression': 'gzip'})
+        self.assertEqual('gzip', settings.compression)
+
+    def test_unsupported_compression(self):
+        with self.assertRaises(ImageSettingsError):
+            ImageSettings(name='foo', image_user='bar', img_format='qcow2',
+                          url='http://foo.com', compression='zip')
 
     def test_name_user_format_url_only_properties(self):
         properties = {'hw_video_model': 'vga'}
@@ -156,7 +181,8 @@ class ImageSettingsUnitTests(unittest.TestCase):
                                  nic_config_pb_loc='/foo/bar',
                                  kernel_image_settings=kernel_settings,
                                  ramdisk_image_settings=ramdisk_settings,
-                                 exists=True, public=True)
+                                 exists=True, public=True,
+                                 checksum='abc123', dedup=True)
         self.assertEqual('foo', settings.name)
         self.assertEqual('bar', settings.image_user)
         self.assertEqual('qcow2', settings.format)
@@ -176,6 +202,8 @@ class ImageSettingsUnitTests(unittest.TestCase):
         self.assertEqual('qcow2', settings.ramdisk_image_settings.format)
         self.assertTrue(settings.exists)
         self.assertTrue(settings.public)
+        self.assertEqual('abc123', settings.checksum)
+        self.assertTrue(settings.dedup)
 
     def test_config_all_url(self):
         settings = ImageSettings(
@@ -193,7 +221,8 @@ class ImageSettingsUnitTests(unittest.TestCase):
                    'download_url': 'http://ramdisk.com',
                    'image_user': 'bar',
                    'format': 'qcow2'},
-               'exists': True, 'public': True})
+               'exists': True, 'public': True, 'checksum': 'abc123',
+               'dedup': True})
         self.assertEqual('foo', settings.name)
         self.assertEqual('bar', settings.image_user)
         self.assertEqual('qcow2', settings.format)
@@ -210,6 +239,8 @@ class ImageSettingsUnitTests(unittest.TestCase):
                          settings.ramdisk_image_settings.url)
         self.assertTrue(settings.exists)
         self.assertTrue(settings.public)
+        self.assertEqual('abc123', settings.checksum)
+        self.assertTrue(settings.dedup)
 
     def test_all_file(self):
         properties = {'hw_video_model': 'vga'}
@@ -235,7 +266,7 @@ class ImageSettingsUnitTests(unittest.TestCase):
                'image_file': '/foo/bar.qcow',
                'extra_properties': '{\'hw_video_model\' : \'vga\'}',
                'nic_config_pb_loc': '/foo/bar', 'exists': True,
-               'public': True})
+               'public': True, 'upload_chunk_size': '4194304'})
         self.assertEqual('foo', settings.name)
         self.assertEqual('bar', settings.image_user)
         self.assertEqual('qcow2', settings.format)
@@ -246,6 +277,7 @@ class ImageSettingsUnitTests(unittest.TestCase):
         self.assertEqual('/foo/bar', settings.nic_config_pb_loc)
         self.assertTrue(settings.exists)
         self.assertTrue(settings.public)
+        self.assertEqual(4194304, settings.upload_chunk_size)
 
 
 class CreateImageSuccessTests(OSIntegrationTestCase):
@@ -370,6 +402,39 @@ class CreateImageSuccessTests(OSIntegrationTestCase):
             logger.warn(
                 'Test not executed as the image metadata requires image files')
 
+    def test_create_image_compressed_file(self):
+        """
+        Tests the creation of an OpenStack image from a gzip compressed file
+        which is decompressed while being uploaded and cached for reuse.
+        """
+        if not self.image_settings.image_file and self.image_settings.url:
+            image_file_name = file_utils.download(self.image_settings.url,
+                                                  self.tmp_dir).name
+        else:
+            image_file_name = self.image_settings.image_file
+
+        compressed_file_name = self.tmp_dir + '/image.img.gz'
+        with open(image_file_name, 'rb') as image_file:
+            with gzip.open(compressed_file_name, 'wb') as compressed_file:
+                shutil.copyfileobj(image_file, compressed_file)
+
+        cache_dir = self.tmp_dir + '/cache'
+        file_image_settings = ImageSettings(
+            name=self.image_name, image_user=self.image_settings.image_user,
+            img_format=self.image_settings.format,
+            image_file=compressed_file_name, cache_dir=cache_dir)
+        self.assertEqual('gzip', file_image_settings.compression)
+
+        self.image_creator = create_image.OpenStackImage(
+            self.os_creds, file_image_settings)
+        created_image = self.image_creator.create()
+        self.assertIsNotNone(created_image)
+        self.assertEqual(os.path.getsize(image_file_name), created_image.size)
+        self.assertEqual(
+            file_utils.get_file_checksum(image_file_name),
+            file_utils.get_file_checksum(os.path.join(
+                cache_dir, file_utils.get_cache_name(compressed_file_name))))
+
     def test_create_delete_image(self):
         """
         Tests the creation then deletion of an OpenStack image to ensure
@@ -426,6 +491,39 @@ class CreateImageSuccessTests(OSIntegrationTestCase):
         image2 = os_image_2.create()
         self.assertEqual(image1.id, image2.id)
 
+    def test_create_image_dedup(self):
+        """
+        Tests that a second image with the same contents but another name is
+        reused rather than uploaded when dedup is True and that cleaning the
+        second creator leaves the shared image intact.
+        """
+        if not self.image_settings.image_file and self.image_settings.url:
+            image_file_name = file_utils.download(self.image_settings.url,
+                                                  self.tmp_dir).name
+        else:
+            image_file_name = self.image_settings.image_file
+
+        file_image_settings = openstack_tests.file_image_test_settings(
+            name=self.image_name, file_path=image_file_name)
+        self.image_creator = create_image.OpenStackImage(
+            self.os_creds, file_image_settings)
+        image1 = self.image_creator.create()
+
+        dedup_settings = ImageSettings(
+            name=self.image_name + '-dedup',
+            image_user=file_image_settings.image_user,
+            img_format=file_image_settings.format,
+            image_file=image_file_name, dedup=True)
+        dedup_creator = create_image.OpenStackImage(
+            self.os_creds, dedup_settings)
+        image2 = dedup_creator.create()
+        self.assertEqual(image1.id, image2.id)
+
+        dedup_creator.clean()
+        self.assertIsNone(dedup_creator.get_image())
+        self.assertIsNotNone(glance_utils.get_image_by_id(
+            self.glance, image1.id))
+
     def test_create_same_image_new_settings(self):
         """
         Tests the creation of an OpenStack image when the image already exists
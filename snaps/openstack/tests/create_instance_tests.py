@@ -36,11 +36,12 @@ from snaps.openstack.create_router import OpenStackRouter, RouterSettings
 from snaps.openstack.create_security_group import (
     SecurityGroupSettings, OpenStackSecurityGroup, SecurityGroupRuleSettings,
     Direction, Protocol)
-from snaps.openstack.create_volume import OpenStackVolume, VolumeSettings
+from snaps.openstack.create_volume import (
+    OpenStackVolume, VolumeSettings, get_image_volume_cache)
 from snaps.openstack.tests import openstack_tests, validation_utils
 from snaps.openstack.tests.os_source_file_test import (
     OSIntegrationTestCase, OSComponentTestCase)
-from snaps.openstack.utils import nova_utils
+from snaps.openstack.utils import nova_utils, cinder_utils
 
 __author__ = 'spisarski'
 
@@ -95,6 +96,29 @@ class VmInstanceSettingsUnitTests(unittest.TestCase):
         self.assertEqual(180, settings.ssh_connect_timeout)
         self.assertIsNone(settings.availability_zone)
         self.assertIsNone(settings.volume_names)
+        self.assertFalse(settings.boot_from_volume)
+        self.assertIsNone(settings.boot_volume_size)
+        self.assertIsNone(settings.boot_volume_type)
+        self.assertTrue(settings.delete_boot_volume)
+
+    def test_boot_from_volume(self):
+        port_settings = PortSettings(name='foo-port', network_name='bar-net')
+        settings = VmInstanceSettings(
+            **{'name': 'foo', 'flavor': 'bar', 'ports': [port_settings],
+               'boot_from_volume': 'true', 'boot_volume_size': '20',
+               'boot_volume_type': 'fast', 'delete_boot_volume': False})
+        self.assertTrue(settings.boot_from_volume)
+        self.assertEqual(20, settings.boot_volume_size)
+        self.assertEqual('fast', settings.boot_volume_type)
+        self.assertFalse(settings.delete_boot_volume)
+        self.assertEqual('foo-boot-volume', settings.get_boot_volume_name())
+
+    def test_boot_from_volume_bad_size(self):
+        port_settings = PortSettings(name='foo-port', network_name='bar-net')
+        with self.assertRaises(VmInstanceSettingsError):
+            VmInstanceSettings(
+                name='foo', flavor='bar', port_settings=[port_settings],
+                boot_from_volume=True, boot_volume_size='big')
 
     def test_config_with_name_flavor_port_only(self):
         port_settings = PortSettings(name='foo-port', network_name='bar-net')
@@ -509,6 +533,43 @@ class CreateInstanceSimpleTests(OSIntegrationTestCase):
         # Exception should not be thrown
         self.inst_creator.clean()
 
+    def test_create_delete_volume_instance(self):
+        """
+        Tests the creation of an OpenStack instance booting from a volume
+        cloned from the cached volume of its image
+        """
+        instance_settings = VmInstanceSettings(
+            name=self.vm_inst_name,
+            flavor=self.flavor_creator.flavor_settings.name,
+            port_settings=[self.port_settings], boot_from_volume=True)
+
+        self.inst_creator = OpenStackVmInstance(
+            self.os_creds, instance_settings,
+            self.image_creator.image_settings)
+        cache = get_image_volume_cache(self.os_creds)
+
+        try:
+            vm_inst = self.inst_creator.create(block=True)
+            self.assertIsNotNone(vm_inst)
+
+            cinder = cinder_utils.cinder_client(self.os_creds)
+            boot_volume = cinder_utils.get_volume(
+                cinder, instance_settings.get_boot_volume_name())
+            self.assertIsNotNone(boot_volume)
+            self.assertTrue(
+                boot_volume.id in [rec['id'] for rec in vm_inst.volume_ids])
+
+            golden = cache.get_golden_volume(
+                self.image_creator.image_settings.name).get_volume()
+            self.assertIsNotNone(golden)
+            self.assertNotEqual(golden.id, boot_volume.id)
+
+            self.inst_creator.clean()
+            self.assertIsNone(nova_utils.get_server(
+                self.nova, vm_inst_settings=instance_settings))
+        finally:
+            cache.clean()
+
 
 class CreateInstanceSingleNetworkTests(OSIntegrationTestCase):
     """
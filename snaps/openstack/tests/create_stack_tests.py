@@ -29,10 +29,13 @@ import logging
 import unittest
 import uuid
 
-from snaps.openstack import create_stack
+from snaps import waiter
+from snaps.openstack import create_stack, fake_cloud
 from snaps.openstack.create_stack import (
-    StackSettings, StackSettingsError, StackCreationError)
-from snaps.openstack.tests import openstack_tests, create_instance_tests
+    StackSettings, StackSettingsError, StackCreationError, StackError,
+    StackEventWaiter, OpenStackHeatStack, OpenStackHeatStackGroup)
+from snaps.openstack.tests import (
+    api_call_count_tests, openstack_tests, create_instance_tests)
 from snaps.openstack.tests.os_source_file_test import OSIntegrationTestCase
 from snaps.openstack.utils import heat_utils, neutron_utils, nova_utils
 
@@ -121,6 +124,100 @@ class StackSettingsUnitTests(unittest.TestCase):
         self.assertEqual(999, settings.stack_create_timeout)
 
 
+class StackEventWaiterTests(unittest.TestCase):
+    """
+    Tests the StackEventWaiter class and the blocking waits of
+    OpenStackHeatStack against a FakeCloud
+    """
+
+    def setUp(self):
+        self.cloud = fake_cloud.FakeCloud()
+        self.cloud.set_transition(fake_cloud.RES_STACK, 0.2)
+        fake_cloud.install(self.cloud)
+        waiter.set_default_backoff(
+            waiter.Backoff(initial_delay=0.01, max_interval=0.05, jitter=0))
+        self.heat_cli = heat_utils.heat_client(api_call_count_tests.os_creds)
+        self.stack_settings = StackSettings(
+            name='stack', template_path=pkg_resources.resource_filename(
+                'snaps.openstack.tests.heat', 'test_heat_template.yaml'))
+
+    def tearDown(self):
+        waiter.set_default_backoff(None)
+        fake_cloud.uninstall(self.cloud)
+
+    def test_marker(self):
+        """
+        Tests that a wait only reads the events after its marker, so waiting
+        again from the marker of a completed stack times out unless the
+        stack's status is checked first
+        """
+        stack = heat_utils.create_stack(self.heat_cli, self.stack_settings)
+        stack_waiter = StackEventWaiter(self.heat_cli, stack)
+        self.assertTrue(stack_waiter.wait(
+            create_stack.STATUS_CREATE_COMPLETE,
+            create_stack.STATUS_CREATE_FAILED, 5, poll_interval=0.01))
+        marker = stack_waiter.get_marker()
+        self.assertIsNotNone(marker)
+
+        stack_waiter = StackEventWaiter(self.heat_cli, stack, marker=marker)
+        start = time.time()
+        self.assertTrue(stack_waiter.wait(
+            create_stack.STATUS_CREATE_COMPLETE,
+            create_stack.STATUS_CREATE_FAILED, 5, poll_interval=0.01,
+            check_status=True))
+        self.assertTrue(time.time() - start < 1)
+        self.assertEqual(marker, stack_waiter.get_marker())
+
+        self.assertEqual(list(), heat_utils.get_stack_events(
+            self.heat_cli, stack, marker=marker))
+
+    def test_failure(self):
+        """
+        Tests that the failure event of the stack raises a StackError
+        """
+        self.cloud.fail_resource(fake_cloud.RES_STACK, 'stack')
+        stack = heat_utils.create_stack(self.heat_cli, self.stack_settings)
+        stack_waiter = StackEventWaiter(self.heat_cli, stack)
+        with self.assertRaises(StackError):
+            stack_waiter.wait(create_stack.STATUS_CREATE_COMPLETE,
+                              create_stack.STATUS_CREATE_FAILED, 5,
+                              poll_interval=0.01)
+
+        with self.assertRaises(StackError):
+            StackEventWaiter(self.heat_cli, stack).wait(
+                create_stack.STATUS_CREATE_COMPLETE,
+                create_stack.STATUS_CREATE_FAILED, 5, poll_interval=0.01,
+                check_status=True)
+
+    def test_timeout(self):
+        """
+        Tests that the wait returns False once the timeout has passed
+        """
+        self.cloud.set_transition(fake_cloud.RES_STACK, 10)
+        stack = heat_utils.create_stack(self.heat_cli, self.stack_settings)
+        start = time.time()
+        self.assertFalse(StackEventWaiter(self.heat_cli, stack).wait(
+            create_stack.STATUS_CREATE_COMPLETE,
+            create_stack.STATUS_CREATE_FAILED, 0.2, poll_interval=0.01))
+        self.assertTrue(time.time() - start < 2)
+
+    def test_repeated_wait(self):
+        """
+        Tests that waiting again for a stack that is already complete returns
+        at once rather than after the timeout
+        """
+        stack_creator = OpenStackHeatStack(
+            api_call_count_tests.os_creds, self.stack_settings)
+        stack_creator.create()
+
+        start = time.time()
+        self.assertTrue(stack_creator.stack_complete(block=True, timeout=5))
+        self.assertTrue(time.time() - start < 1)
+
+        stack_creator.clean()
+        self.assertEqual(dict(), self.cloud.stacks)
+
+
 class CreateStackSuccessTests(OSIntegrationTestCase):
     """
     Tests for the CreateStack class defined in create_stack.py
@@ -215,6 +312,11 @@ class CreateStackSuccessTests(OSIntegrationTestCase):
         self.assertEqual(created_stack.id, retrieved_stack.id)
         self.assertEqual(0, len(self.stack_creator.get_outputs()))
 
+        resource_times = self.stack_creator.get_resource_times()
+        self.assertTrue(len(resource_times) > 0)
+        for seconds in resource_times.values():
+            self.assertTrue(seconds >= 0)
+
     def test_create_stack_short_timeout(self):
         """
         Tests the creation of an OpenStack stack from Heat template file.
@@ -330,6 +432,52 @@ class CreateStackSuccessTests(OSIntegrationTestCase):
         stack2 = stack_creator2.create()
         self.assertEqual(created_stack1.id, stack2.id)
 
+    def test_update_stack(self):
+        """
+        Tests the update of an existing OpenStack stack where only the VM's
+        name changes.
+        """
+        stack_settings = StackSettings(
+            name=self.__class__.__name__ + '-' + str(self.guid) + '-stack',
+            template_path=self.heat_tmplt_path,
+            env_values=self.env_values)
+        self.stack_creator = create_stack.OpenStackHeatStack(self.heat_creds,
+                                                             stack_settings)
+        created_stack = self.stack_creator.create()
+        self.assertIsNotNone(created_stack)
+
+        changes = self.stack_creator.preview_update()
+        self.assertEqual(0, len(changes.get('updated', [])))
+        self.assertEqual(0, len(changes.get('replaced', [])))
+
+        # No resource changes so the update is skipped
+        skipped_stack = self.stack_creator.update(preview=True)
+        self.assertEqual(created_stack.id, skipped_stack.id)
+        self.assertEqual(create_stack.STATUS_CREATE_COMPLETE,
+                         self.stack_creator.get_status())
+
+        new_inst_name = self.vm_inst_name + '-updated'
+        new_env_values = dict(self.env_values)
+        new_env_values['inst_name'] = new_inst_name
+        new_settings = StackSettings(
+            name=stack_settings.name, template_path=self.heat_tmplt_path,
+            env_values=new_env_values)
+
+        changes = self.stack_creator.preview_update(new_settings)
+        self.assertEqual(['my_instance'], changes.get('updated'))
+
+        updated_stack = self.stack_creator.update(new_settings)
+        self.assertEqual(created_stack.id, updated_stack.id)
+        self.assertEqual(create_stack.STATUS_UPDATE_COMPLETE,
+                         self.stack_creator.get_status())
+        self.assertTrue(
+            'my_instance' in self.stack_creator.get_resource_times())
+
+        vm_inst_creators = self.stack_creator.get_vm_inst_creators()
+        self.assertEqual(1, len(vm_inst_creators))
+        self.assertEqual(new_inst_name,
+                         vm_inst_creators[0].get_vm_inst().name)
+
     def test_retrieve_network_creators(self):
         """
         Tests the creation of an OpenStack stack from Heat template file and
@@ -393,6 +541,43 @@ class CreateStackSuccessTests(OSIntegrationTestCase):
         self.assertIsNotNone(nova_utils.get_server_object_by_id(
             nova, vm_inst_creators[0].get_vm_inst().id))
 
+    def test_retrieve_vm_inst_creators_batch(self):
+        """
+        Tests that the VM instance creators built in batch mode match the ones
+        built by querying OpenStack for each server.
+        """
+        stack_settings = StackSettings(
+            name=self.__class__.__name__ + '-' + str(self.guid) + '-stack',
+            template_path=self.heat_tmplt_path,
+            env_values=self.env_values)
+        self.stack_creator = create_stack.OpenStackHeatStack(self.heat_creds,
+                                                             stack_settings)
+        created_stack = self.stack_creator.create()
+        self.assertIsNotNone(created_stack)
+
+        vm_inst_creators = self.stack_creator.get_vm_inst_creators()
+        batch_creators = self.stack_creator.get_vm_inst_creators(batch=True)
+        self.assertEqual(1, len(batch_creators))
+
+        vm_settings = vm_inst_creators[0].instance_settings
+        batch_settings = batch_creators[0].instance_settings
+        self.assertEqual(vm_inst_creators[0].get_vm_inst(),
+                         batch_creators[0].get_vm_inst())
+        self.assertEqual(vm_settings.name, batch_settings.name)
+        self.assertEqual(vm_settings.flavor.id, batch_settings.flavor.id)
+        self.assertEqual(len(vm_settings.port_settings),
+                         len(batch_settings.port_settings))
+        for port_setting, batch_port_setting in zip(
+                vm_settings.port_settings, batch_settings.port_settings):
+            self.assertEqual(port_setting.mac_address,
+                             batch_port_setting.mac_address)
+            self.assertEqual(port_setting.network_name,
+                             batch_port_setting.network_name)
+        batch_port_name = batch_settings.port_settings[0].name
+        self.assertEqual(vm_inst_creators[0].get_port_ip(
+            vm_settings.port_settings[0].name),
+            batch_creators[0].get_port_ip(batch_port_name))
+
 
 class CreateStackFloatingIpTests(OSIntegrationTestCase):
     """
@@ -589,6 +774,100 @@ class CreateStackVolumeTests(OSIntegrationTestCase):
         self.assertEqual(volume_type.id, encryption.volume_type_id)
 
 
+class CreateStackGroupTests(OSIntegrationTestCase):
+    """
+    Tests for the OpenStackHeatStackGroup class defined in create_stack.py
+    """
+
+    def setUp(self):
+        """
+        Instantiates the settings for the stacks in the group
+        """
+        super(self.__class__, self).__start__()
+
+        self.guid = self.__class__.__name__ + '-' + str(uuid.uuid4())
+
+        self.heat_creds = self.admin_os_creds
+        self.heat_creds.project_name = self.admin_os_creds.project_name
+
+        self.heat_cli = heat_utils.heat_client(self.heat_creds)
+        self.heat_tmplt_path = pkg_resources.resource_filename(
+            'snaps.openstack.tests.heat', 'volume_heat_template.yaml')
+
+        self.stack_settings_list = list()
+        for i in range(3):
+            prefix = self.guid + '-' + str(i)
+            self.stack_settings_list.append(StackSettings(
+                name=prefix + '-stack', template_path=self.heat_tmplt_path,
+                env_values={'volume_name': prefix + '-volume',
+                            'volume_type_name': prefix + '-volume-type'}))
+
+        self.stack_group = None
+
+    def tearDown(self):
+        """
+        Cleans the stacks
+        """
+        if self.stack_group:
+            try:
+                self.stack_group.clean()
+            except:
+                pass
+
+        super(self.__class__, self).__clean__()
+
+    def test_create_delete_stack_group(self):
+        """
+        Tests the concurrent creation and deletion of a group of stacks
+        """
+        self.stack_group = OpenStackHeatStackGroup(
+            self.heat_creds, self.stack_settings_list, max_workers=2)
+        stacks = self.stack_group.create()
+        self.assertEqual(3, len(stacks))
+        self.assertEqual(0, len(self.stack_group.get_failures()))
+
+        creation_times = self.stack_group.get_creation_times()
+        for stack_settings in self.stack_settings_list:
+            self.assertTrue(stack_settings.name in creation_times)
+            self.assertEqual(
+                create_stack.STATUS_CREATE_COMPLETE,
+                heat_utils.get_stack_status(
+                    self.heat_cli, stacks[stack_settings.name].id))
+
+        stack_creators = self.stack_group.get_stack_creators()
+        self.assertEqual(3, len(stack_creators))
+        for stack_creator in stack_creators.values():
+            self.assertEqual(1, len(stack_creator.get_volume_creators()))
+
+        self.stack_group.clean()
+
+        deletion_times = self.stack_group.get_deletion_times()
+        for stack_settings in self.stack_settings_list:
+            self.assertTrue(stack_settings.name in deletion_times)
+            self.assertIsNone(heat_utils.get_stack(
+                self.heat_cli, stack_settings=stack_settings))
+        self.assertEqual(0, len(self.stack_group.get_stacks()))
+
+    def test_create_stack_group_with_failure(self):
+        """
+        Tests that a stack which cannot be created does not stop the other
+        stacks in the group
+        """
+        self.stack_settings_list.append(StackSettings(
+            name=self.guid + '-bad-stack', template_path=self.heat_tmplt_path,
+            env_values={'foo': 'bar'}))
+
+        self.stack_group = OpenStackHeatStackGroup(
+            self.heat_creds, self.stack_settings_list)
+        with self.assertRaises(StackCreationError):
+            self.stack_group.create()
+
+        failures = self.stack_group.get_failures()
+        self.assertEqual(1, len(failures))
+        self.assertTrue(self.guid + '-bad-stack' in failures)
+        self.assertEqual(3, len(self.stack_group.get_creation_times()))
+
+
 class CreateStackNegativeTests(OSIntegrationTestCase):
     """
     Negative test cases for the CreateStack class
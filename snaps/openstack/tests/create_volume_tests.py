@@ -29,9 +29,11 @@ import unittest
 import uuid
 
 from snaps.openstack.create_volume import (
-    VolumeSettings, VolumeSettingsError, OpenStackVolume)
+    VolumeSettings, VolumeSettingsError, OpenStackVolume,
+    OpenStackVolumeGroup, OpenStackGoldenVolume)
 from snaps.openstack.tests.os_source_file_test import OSIntegrationTestCase
 from snaps.openstack.utils import cinder_utils
+from snaps.openstack.utils.cinder_utils import CinderException
 
 __author__ = 'spisarski'
 
@@ -110,6 +112,31 @@ class VolumeSettingsUnitTests(unittest.TestCase):
         self.assertEqual('bar', settings.type_name)
         self.assertEqual('zone1', settings.availability_zone)
         self.assertTrue(settings.multi_attach)
+        self.assertIsNone(settings.snapshot_name)
+        self.assertIsNone(settings.source_volume_name)
+
+    def test_snapshot_source(self):
+        settings = VolumeSettings(name='foo', snapshot_name='snap')
+        self.assertEqual('snap', settings.snapshot_name)
+        self.assertIsNone(settings.image_name)
+        self.assertIsNone(settings.source_volume_name)
+
+    def test_config_source_volume(self):
+        settings = VolumeSettings(
+            **{'name': 'foo', 'source_volume_name': 'golden'})
+        self.assertEqual('golden', settings.source_volume_name)
+        self.assertIsNone(settings.image_name)
+        self.assertIsNone(settings.snapshot_name)
+
+    def test_image_and_snapshot_source(self):
+        with self.assertRaises(VolumeSettingsError):
+            VolumeSettings(name='foo', image_name='image',
+                           snapshot_name='snap')
+
+    def test_snapshot_and_source_volume(self):
+        with self.assertRaises(VolumeSettingsError):
+            VolumeSettings(name='foo', snapshot_name='snap',
+                           source_volume_name='golden')
 
 
 class CreateSimpleVolumeSuccessTests(OSIntegrationTestCase):
@@ -366,12 +393,12 @@ class CreateVolumeWithImageTests(OSIntegrationTestCase):
         if self.volume_creator:
             try:
                 self.volume_creator.clean()
-            except:
+            except Exception:
                 pass
         if self.image_creator:
             try:
                 self.image_creator.clean()
-            except:
+            except Exception:
                 pass
 
         super(self.__class__, self).__clean__()
@@ -407,3 +434,178 @@ class CreateVolumeWithImageTests(OSIntegrationTestCase):
             self.cinder, created_volume.id)
 
         self.assertEqual(created_volume, retrieved_volume)
+
+
+class CreateVolumeGroupTests(OSIntegrationTestCase):
+    """
+    Test for the OpenStackVolumeGroup class defined in create_volume.py
+    """
+
+    def setUp(self):
+        """
+        Instantiates the settings for the volumes in the group
+        """
+        super(self.__class__, self).__start__()
+
+        guid = self.__class__.__name__ + '-' + str(uuid.uuid4())
+        self.volume_settings_list = [
+            VolumeSettings(name=guid + '-vol-' + str(i)) for i in range(3)]
+
+        self.cinder = cinder_utils.cinder_client(self.os_creds)
+        self.volume_group = None
+
+    def tearDown(self):
+        """
+        Cleans the volumes
+        """
+        if self.volume_group:
+            self.volume_group.clean()
+
+        super(self.__class__, self).__clean__()
+
+    def test_create_delete_volume_group(self):
+        """
+        Tests the concurrent creation and deletion of a group of volumes
+        """
+        self.volume_group = OpenStackVolumeGroup(
+            self.os_creds, self.volume_settings_list, max_workers=2)
+        volumes = self.volume_group.create(block=True)
+        self.assertEqual(3, len(volumes))
+
+        creation_times = self.volume_group.get_creation_times()
+        for volume_settings in self.volume_settings_list:
+            self.assertTrue(volume_settings.name in creation_times)
+            retrieved_volume = cinder_utils.get_volume(
+                self.cinder, volume_settings=volume_settings)
+            self.assertEqual(volumes[volume_settings.name], retrieved_volume)
+
+        self.volume_group.clean()
+
+        deletion_times = self.volume_group.get_deletion_times()
+        for volume_settings in self.volume_settings_list:
+            self.assertTrue(volume_settings.name in deletion_times)
+            self.assertIsNone(cinder_utils.get_volume(
+                self.cinder, volume_settings=volume_settings))
+        self.assertEqual(0, len(self.volume_group.get_volumes()))
+
+    def test_create_existing_volume_group(self):
+        """
+        Tests that a group only creates the volumes that do not already exist
+        """
+        volume_creator = OpenStackVolume(
+            self.os_creds, self.volume_settings_list[0])
+        existing_volume = volume_creator.create(block=True)
+
+        self.volume_group = OpenStackVolumeGroup(
+            self.os_creds, self.volume_settings_list)
+        volumes = self.volume_group.create(block=True)
+
+        self.assertEqual(existing_volume,
+                         volumes[self.volume_settings_list[0].name])
+        creation_times = self.volume_group.get_creation_times()
+        self.assertFalse(self.volume_settings_list[0].name in creation_times)
+        self.assertEqual(2, len(creation_times))
+
+
+class CreateVolumeCloneTests(OSIntegrationTestCase):
+    """
+    Test cases for creating volumes from a golden image-backed volume
+    """
+
+    def setUp(self):
+        super(self.__class__, self).__start__()
+
+        self.cinder = cinder_utils.cinder_client(self.os_creds)
+
+        self.guid = self.__class__.__name__ + '-' + str(uuid.uuid4())
+        self.image_name = self.guid + '-image'
+
+        os_image_settings = openstack_tests.cirros_image_settings(
+            name=self.image_name, image_metadata=self.image_metadata)
+        self.image_creator = OpenStackImage(self.os_creds, os_image_settings)
+        self.image_creator.create()
+
+        self.golden_settings = VolumeSettings(
+            name=self.guid + '-golden', image_name=self.image_name)
+        self.golden_volume = None
+
+    def tearDown(self):
+        if self.golden_volume:
+            try:
+                self.golden_volume.clean()
+            except Exception:
+                pass
+        if self.image_creator:
+            try:
+                self.image_creator.clean()
+            except Exception:
+                pass
+
+        super(self.__class__, self).__clean__()
+
+    def test_bad_source_volume_name(self):
+        """
+        Tests OpenStackVolume#create() method to ensure a volume is NOT created
+        when cloning a volume that does not exist
+        """
+        volume_creator = OpenStackVolume(
+            self.os_creds,
+            VolumeSettings(name=self.guid + '-vol',
+                           source_volume_name='foo'))
+
+        with self.assertRaises(CinderException):
+            volume_creator.create(block=True)
+
+    def test_clone_golden_volume(self):
+        """
+        Tests OpenStackGoldenVolume#clone() method to ensure clones of the
+        golden volume are created from the source volume
+        """
+        self.golden_volume = OpenStackGoldenVolume(
+            self.os_creds, self.golden_settings)
+        golden = self.golden_volume.create()
+        self.assertIsNone(self.golden_volume.get_snapshot())
+
+        clone_creator = self.golden_volume.clone(
+            VolumeSettings(name=self.guid + '-clone'))
+        clone = clone_creator.get_volume()
+        self.assertTrue(clone_creator.volume_active())
+        self.assertEqual(golden.size, clone.size)
+        self.assertNotEqual(golden.id, clone.id)
+
+        self.golden_volume.clean_clones()
+        self.assertIsNone(cinder_utils.get_volume(
+            self.cinder, volume_name=clone.name))
+        self.assertEqual(golden, cinder_utils.get_volume(
+            self.cinder, volume_settings=self.golden_settings))
+
+    def test_clone_golden_volume_snapshot(self):
+        """
+        Tests OpenStackGoldenVolume#clone() method to ensure clones of the
+        golden volume are created from its snapshot and that the golden
+        volume is reused by name
+        """
+        self.golden_volume = OpenStackGoldenVolume(
+            self.os_creds, self.golden_settings, use_snapshot=True)
+        golden = self.golden_volume.create()
+        snapshot = self.golden_volume.get_snapshot()
+        self.assertIsNotNone(snapshot)
+        self.assertEqual(golden.id, snapshot.volume_id)
+
+        golden_volume_2 = OpenStackGoldenVolume(
+            self.os_creds, self.golden_settings, use_snapshot=True)
+        self.assertEqual(golden, golden_volume_2.create())
+        self.assertEqual(snapshot, golden_volume_2.get_snapshot())
+
+        clone_creator = golden_volume_2.clone(
+            VolumeSettings(name=self.guid + '-clone', size=2))
+        self.assertTrue(clone_creator.volume_active())
+        self.assertEqual(2, clone_creator.get_volume().size)
+        golden_volume_2.clean_clones()
+
+        self.golden_volume.clean()
+        self.assertIsNone(cinder_utils.get_volume(
+            self.cinder, volume_settings=self.golden_settings))
+        self.assertIsNone(cinder_utils.get_volume_snapshot(
+            self.cinder, snapshot.name))
+        self.golden_volume = None
@@ -0,0 +1,294 @@
+# Copyright (c) 2017 Cable Television Laboratories, Inc. ("CableLabs")
+#                    and others.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import threading
+import time
+import unittest
+
+from snaps.openstack import deployment
+from snaps.openstack.create_instance import (
+    VmInstanceSettings, FloatingIpSettings)
+from snaps.openstack.create_network import (
+    NetworkSettings, SubnetSettings, PortSettings)
+from snaps.openstack.create_router import RouterSettings
+from snaps.openstack.create_volume import VolumeSettings
+from snaps.openstack.deployment import DeploymentGraph, DeploymentError
+
+__author__ = 'spisarski'
+
+
+class RecordingCreator:
+    """
+    Creator recording when create() was called without accessing OpenStack
+    """
+
+    def __init__(self, name, events, lock, seconds=0, error=None,
+                 clean_errors=0):
+        self.name = name
+        self.events = events
+        self.lock = lock
+        self.seconds = seconds
+        self.error = error
+        self.clean_errors = clean_errors
+
+    def create(self):
+        with self.lock:
+            self.events.append(('start', self.name))
+        time.sleep(self.seconds)
+        with self.lock:
+            self.events.append(('end', self.name))
+        if self.error:
+            raise Exception(self.error)
+
+    def clean(self):
+        with self.lock:
+            self.events.append(('clean', self.name))
+        time.sleep(self.seconds)
+        with self.lock:
+            self.events.append(('cleaned', self.name))
+        if self.clean_errors:
+            self.clean_errors -= 1
+            raise Exception('clean failed')
+
+
+class DeploymentGraphTests(unittest.TestCase):
+    """
+    Tests the dependency inference and ordering of the DeploymentGraph class
+    """
+
+    def setUp(self):
+        self.events = list()
+        self.lock = threading.Lock()
+
+    def creator(self, name, seconds=0, error=None, clean_errors=0):
+        return RecordingCreator(name, self.events, self.lock, seconds, error,
+                                clean_errors)
+
+    def index(self, event, name):
+        return self.events.index((event, name))
+
+    def test_settings_references(self):
+        """
+        Tests that the names referenced by a VM instance settings object are
+        returned with their resource types
+        """
+        settings = VmInstanceSettings(
+            name='vm', flavor='flavor', volume_names=['vol'],
+            security_group_names=['sec-grp'],
+            port_settings=[PortSettings(name='port', network_name='net')],
+            floating_ips=[FloatingIpSettings(
+                name='fip', port_name='port', router_name='router')])
+        self.assertEqual(
+            set([(deployment.RES_FLAVOR, 'flavor'),
+                 (deployment.RES_VOLUME, 'vol'),
+                 (deployment.RES_SECURITY_GROUP, 'sec-grp'),
+                 (deployment.RES_NETWORK, 'net'),
+                 (deployment.RES_ROUTER, 'router')]),
+            deployment.get_settings_references(settings))
+
+    def test_inferred_dependencies(self):
+        """
+        Tests that the dependencies are inferred from the settings including
+        a router referencing the subnet of a network
+        """
+        graph = DeploymentGraph()
+        net_key = graph.add(
+            deployment.RES_NETWORK, 'net', self.creator('net'),
+            settings=NetworkSettings(name='net', subnet_settings=[
+                SubnetSettings(name='subnet', cidr='10.0.0.0/24')]))
+        router_key = graph.add(
+            deployment.RES_ROUTER, 'router', self.creator('router'),
+            settings=RouterSettings(
+                name='router', external_gateway='ext-net',
+                internal_subnets=['subnet']))
+        vm_key = graph.add(
+            deployment.RES_INSTANCE, 'vm', self.creator('vm'),
+            settings=VmInstanceSettings(
+                name='vm', flavor='flavor',
+                port_settings=[PortSettings(name='port', network_name='net')],
+                floating_ips=[FloatingIpSettings(
+                    name='fip', port_name='port', router_name='router')]),
+            depends_on=[(deployment.RES_IMAGE, 'image')])
+        image_key = graph.add(
+            deployment.RES_IMAGE, 'image', self.creator('image'))
+
+        self.assertEqual(set(), graph.get_dependencies(net_key))
+        self.assertEqual(set([net_key]), graph.get_dependencies(router_key))
+        self.assertEqual(set([net_key, router_key, image_key]),
+                         graph.get_dependencies(vm_key))
+        self.assertEqual([[net_key, image_key], [router_key], [vm_key]],
+                         graph.get_levels())
+
+    def test_deploy_concurrent(self):
+        """
+        Tests that independent creators are deployed concurrently and that
+        each creator is deployed after its dependencies
+        """
+        graph = DeploymentGraph(max_workers=4)
+        graph.add(deployment.RES_IMAGE, 'image', self.creator('image', 0.2))
+        graph.add(deployment.RES_NETWORK, 'net', self.creator('net', 0.1))
+        graph.add(deployment.RES_ROUTER, 'router', self.creator('router'),
+                  depends_on=[(deployment.RES_NETWORK, 'net')])
+        for name in ('vm-1', 'vm-2'):
+            graph.add(deployment.RES_INSTANCE, name, self.creator(name, 0.1),
+                      depends_on=[(deployment.RES_IMAGE, 'image'),
+                                  (deployment.RES_ROUTER, 'router')])
+
+        creators = graph.deploy()
+        self.assertEqual(5, len(creators))
+        self.assertEqual(0, len(graph.get_failures()))
+        self.assertEqual(5, len(graph.get_deploy_times()))
+
+        # the image upload overlaps the network and router creation
+        self.assertTrue(self.index('end', 'router') <
+                        self.index('end', 'image'))
+        for name in ('vm-1', 'vm-2'):
+            self.assertTrue(self.index('end', 'image') <
+                            self.index('start', name))
+
+        # the VMs boot at the same time
+        self.assertTrue(self.index('start', 'vm-2') <
+                        self.index('end', 'vm-1'))
+
+    def test_deploy_failure(self):
+        """
+        Tests that a failed creator skips its dependents without stopping the
+        independent creators
+        """
+        graph = DeploymentGraph()
+        graph.add(deployment.RES_NETWORK, 'net',
+                  self.creator('net', error='boom'))
+        graph.add(deployment.RES_ROUTER, 'router', self.creator('router'),
+                  depends_on=[(deployment.RES_NETWORK, 'net')])
+        graph.add(deployment.RES_INSTANCE, 'vm', self.creator('vm'),
+                  depends_on=[(deployment.RES_ROUTER, 'router'),
+                              (deployment.RES_NETWORK, 'net')])
+        graph.add(deployment.RES_IMAGE, 'image', self.creator('image'))
+
+        with self.assertRaises(DeploymentError):
+            graph.deploy()
+
+        failures = graph.get_failures()
+        self.assertEqual(3, len(failures))
+        self.assertEqual('boom', failures[(deployment.RES_NETWORK, 'net')])
+        self.assertTrue((deployment.RES_INSTANCE, 'vm') in failures)
+        self.assertTrue(('end', 'image') in self.events)
+        self.assertFalse(('start', 'router') in self.events)
+
+    def test_volume_aliases(self):
+        """
+        Tests that a volume group is referenced by the names of its volumes
+        """
+        graph = DeploymentGraph()
+        group_key = graph.add(
+            deployment.RES_VOLUME_GROUP, 'group', self.creator('group'),
+            settings=[VolumeSettings(name='vol-1', type_name='type')],
+            aliases=[(deployment.RES_VOLUME, 'vol-1')])
+        type_key = graph.add(
+            deployment.RES_VOLUME_TYPE, 'type', self.creator('type'))
+        vm_key = graph.add(
+            deployment.RES_INSTANCE, 'vm', self.creator('vm'),
+            settings=VmInstanceSettings(
+                name='vm', flavor='flavor', volume_names=['vol-1'],
+                port_settings=[PortSettings(name='port', network_name='net')]))
+
+        self.assertEqual(set([type_key]), graph.get_dependencies(group_key))
+        self.assertEqual(set([group_key]), graph.get_dependencies(vm_key))
+
+    def test_cycle(self):
+        """
+        Tests that a dependency cycle raises a DeploymentError before any
+        creator is deployed
+        """
+        graph = DeploymentGraph()
+        graph.add(deployment.RES_NETWORK, 'net', self.creator('net'),
+                  depends_on=[(deployment.RES_ROUTER, 'router')])
+        graph.add(deployment.RES_ROUTER, 'router', self.creator('router'),
+                  depends_on=[(deployment.RES_NETWORK, 'net')])
+        with self.assertRaises(DeploymentError):
+            graph.deploy()
+        self.assertEqual(0, len(self.events))
+
+    def test_duplicate(self):
+        """
+        Tests that adding the same resource twice raises a DeploymentError
+        """
+        graph = DeploymentGraph()
+        graph.add(deployment.RES_NETWORK, 'net', self.creator('net'))
+        with self.assertRaises(DeploymentError):
+            graph.add(deployment.RES_NETWORK, 'net', self.creator('net'))
+
+    def test_clean_reverse_order(self):
+        """
+        Tests that the creators are cleaned after the creators depending upon
+        them and that the creators of the same level are cleaned concurrently
+        """
+        graph = DeploymentGraph(max_workers=4)
+        graph.add(deployment.RES_IMAGE, 'image', self.creator('image', 0.1))
+        graph.add(deployment.RES_NETWORK, 'net', self.creator('net', 0.1))
+        graph.add(deployment.RES_ROUTER, 'router', self.creator('router'),
+                  depends_on=[(deployment.RES_NETWORK, 'net')])
+        for name in ('vm-1', 'vm-2'):
+            graph.add(deployment.RES_INSTANCE, name, self.creator(name, 0.1),
+                      depends_on=[(deployment.RES_IMAGE, 'image'),
+                                  (deployment.RES_ROUTER, 'router')])
+
+        graph.clean()
+        self.assertEqual(0, len(graph.get_clean_failures()))
+        self.assertEqual(10, len(self.events))
+
+        for name in ('vm-1', 'vm-2'):
+            self.assertTrue(self.index('cleaned', name) <
+                            self.index('clean', 'router'))
+        self.assertTrue(self.index('cleaned', 'router') <
+                        self.index('clean', 'net'))
+
+        # the VMs are deleted at the same time as are the image and network
+        self.assertTrue(self.index('clean', 'vm-2') <
+                        self.index('cleaned', 'vm-1'))
+        self.assertTrue(self.index('clean', 'net') <
+                        self.index('cleaned', 'image'))
+
+    def test_clean_skip_types(self):
+        """
+        Tests that the creators of skipped resource types are not cleaned
+        """
+        graph = DeploymentGraph()
+        graph.add(deployment.RES_IMAGE, 'image', self.creator('image'))
+        graph.add(deployment.RES_NETWORK, 'net', self.creator('net'))
+        graph.clean(skip_types=[deployment.RES_IMAGE])
+        self.assertEqual([('clean', 'net'), ('cleaned', 'net')], self.events)
+
+    def test_clean_retry(self):
+        """
+        Tests that a failed clean is retried and that a creator failing every
+        retry is reported without stopping the rest of the teardown
+        """
+        graph = DeploymentGraph()
+        graph.add(deployment.RES_NETWORK, 'net', self.creator('net'))
+        graph.add(deployment.RES_ROUTER, 'router',
+                  self.creator('router', clean_errors=1),
+                  depends_on=[(deployment.RES_NETWORK, 'net')])
+        graph.add(deployment.RES_INSTANCE, 'vm',
+                  self.creator('vm', clean_errors=3),
+                  depends_on=[(deployment.RES_ROUTER, 'router')])
+
+        with self.assertRaises(DeploymentError):
+            graph.clean(retries=2, retry_interval=0)
+
+        self.assertEqual({(deployment.RES_INSTANCE, 'vm'): 'clean failed'},
+                         graph.get_clean_failures())
+        self.assertEqual(3, self.events.count(('clean', 'vm')))
+        self.assertEqual(2, self.events.count(('clean', 'router')))
+        self.assertTrue(('cleaned', 'net') in self.events)
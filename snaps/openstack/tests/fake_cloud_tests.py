@@ -0,0 +1,394 @@
+# Copyright (c) 2017 Cable Television Laboratories, Inc. ("CableLabs")
+#                    and others.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import pkg_resources
+from heatclient.exc import HTTPNotFound
+
+from snaps import api_metrics, waiter
+from snaps.openstack import create_instance, deployment, fake_cloud
+from snaps.openstack.create_flavor import FlavorSettings, OpenStackFlavor
+from snaps.openstack.create_image import ImageSettings, OpenStackImage
+from snaps.openstack.create_instance import VmInstanceCreationError
+from snaps.openstack.create_keypairs import KeypairSettings, OpenStackKeypair
+from snaps.openstack.create_network import (
+    NetworkSettings, OpenStackNetwork, SubnetSettings)
+from snaps.openstack.create_project import OpenStackProject, ProjectSettings
+from snaps.openstack.create_qos import Consumer, OpenStackQoS, QoSSettings
+from snaps.openstack.create_router import OpenStackRouter, RouterSettings
+from snaps.openstack.create_security_group import (
+    Direction, OpenStackSecurityGroup, Protocol, SecurityGroupRuleSettings,
+    SecurityGroupSettings)
+from snaps.openstack.create_stack import (
+    OpenStackHeatStack, StackError, StackSettings)
+from snaps.openstack.create_user import OpenStackUser, UserSettings
+from snaps.openstack.create_volume import OpenStackVolume, VolumeSettings
+from snaps.openstack.create_volume_type import (
+    OpenStackVolumeType, VolumeTypeSettings)
+from snaps.openstack.deployment import DeploymentError, DeploymentGraph
+from snaps.openstack.tests import api_call_count_tests
+from snaps.openstack.tests.api_call_count_tests import os_creds
+from snaps.openstack.utils import cinder_utils, heat_utils, nova_utils
+
+__author__ = 'spisarski'
+
+
+def get_stack_creator(name):
+    """
+    Returns the creator of a stack with the test template
+    """
+    return OpenStackHeatStack(os_creds, StackSettings(
+        name=name, template_path=pkg_resources.resource_filename(
+            'snaps.openstack.tests.heat', 'test_heat_template.yaml')))
+
+
+class FakeCloudTests(unittest.TestCase):
+    """
+    Tests the creators against a FakeCloud and its latency, status
+    transitions and error injection
+    """
+
+    def setUp(self):
+        self.cloud = fake_cloud.FakeCloud(seed=1)
+        self.cloud.add_flavor(api_call_count_tests.FLAVOR_NAME)
+        self.cloud.add_image(api_call_count_tests.IMAGE_NAME)
+        fake_cloud.install(self.cloud)
+        waiter.set_default_backoff(
+            waiter.Backoff(initial_delay=0.01, max_interval=0.05, jitter=0))
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        waiter.set_default_backoff(None)
+        fake_cloud.uninstall(self.cloud)
+        shutil.rmtree(self.tmp_dir)
+
+    def test_creators(self):
+        """
+        Tests that the creators of every resource type create and clean
+        their resources
+        """
+        self.cloud.add_network('external', '172.24.4.0/24', external=True)
+        image_file = os.path.join(self.tmp_dir, 'image')
+        with open(image_file, 'wb') as image:
+            image.write(b'\0' * 1024)
+
+        creators = [
+            OpenStackProject(os_creds, ProjectSettings(name='project')),
+            OpenStackUser(os_creds, UserSettings(
+                name='user', password='pass', roles={'admin': 'admin'})),
+            OpenStackKeypair(os_creds, KeypairSettings(
+                name='keypair',
+                public_filepath=os.path.join(self.tmp_dir, 'key.pub'),
+                private_filepath=os.path.join(self.tmp_dir, 'key'))),
+            OpenStackFlavor(os_creds, FlavorSettings(
+                name='flavor', ram=1, disk=1, vcpus=1,
+                metadata={'hw:mem_page_size': 'any'})),
+            OpenStackSecurityGroup(os_creds, SecurityGroupSettings(
+                name='sec-grp', rule_settings=[SecurityGroupRuleSettings(
+                    sec_grp_name='sec-grp', direction=Direction.ingress,
+                    protocol=Protocol.tcp, port_range_min=22,
+                    port_range_max=22)])),
+            OpenStackNetwork(os_creds, NetworkSettings(
+                name='net', subnet_settings=[
+                    SubnetSettings(name='subnet', cidr='10.0.0.0/24')])),
+            OpenStackRouter(os_creds, RouterSettings(
+                name='router', external_gateway='external',
+                internal_subnets=['subnet'])),
+            OpenStackQoS(os_creds, QoSSettings(
+                name='qos', consumer=Consumer.both, specs={'read': '1'})),
+            OpenStackVolumeType(os_creds, VolumeTypeSettings(
+                name='vol-type', qos_spec_name='qos')),
+            OpenStackVolume(os_creds, VolumeSettings(
+                name='volume', size=1, type_name='vol-type')),
+            OpenStackImage(os_creds, ImageSettings(
+                name='image', image_user='cirros', img_format='qcow2',
+                image_file=image_file)),
+            get_stack_creator('stack'),
+        ]
+        for creator in creators:
+            self.assertIsNotNone(creator.create())
+
+        self.assertEqual(1024, self.cloud.images[
+            creators[10].get_image().id]['size'])
+        self.assertEqual(
+            'vol-type', self.cloud.volumes[creators[9].get_volume().id].
+            volume_type)
+
+        for creator in reversed(creators):
+            creator.clean()
+
+        for collection in ('keypairs', 'security_groups',
+                           'security_group_rules', 'routers', 'ports',
+                           'qos_specs', 'volume_types', 'volumes', 'stacks'):
+            self.assertEqual(dict(), getattr(self.cloud, collection),
+                             collection)
+        self.assertEqual([api_call_count_tests.FLAVOR_NAME], [
+            flavor.name for flavor in self.cloud.flavors.values()])
+        self.assertEqual(['admin'], [
+            project.name for project in self.cloud.projects.values()])
+        self.assertEqual(['admin'], [
+            user.name for user in self.cloud.users.values()])
+        self.assertEqual(['external'], [
+            network['name'] for network in self.cloud.networks.values()])
+
+    def test_server_transition(self):
+        """
+        Tests that a server is built until its transition time has passed
+        """
+        self.cloud.set_transition(fake_cloud.RES_SERVER, 0.2)
+        api_call_count_tests.get_network_creator().create()
+        creator = api_call_count_tests.get_vm_creator('vm', 1)
+
+        start = time.time()
+        creator.create(block=False)
+        nova = nova_utils.nova_client(os_creds)
+        self.assertEqual('BUILD', nova_utils.get_server_status(
+            nova, creator.get_vm_inst()))
+        self.assertTrue(creator.vm_active(block=True))
+        self.assertTrue(time.time() - start >= 0.2)
+        self.assertEqual('ACTIVE', nova_utils.get_server_status(
+            nova, creator.get_vm_inst()))
+
+    def test_server_failure(self):
+        """
+        Tests that a server failing ends in the ERROR status
+        """
+        self.cloud.fail_resource(fake_cloud.RES_SERVER, 'vm')
+        api_call_count_tests.get_network_creator().create()
+        creator = api_call_count_tests.get_vm_creator('vm', 1)
+        with self.assertRaises(VmInstanceCreationError):
+            creator.create(block=True)
+
+    def test_vms_deleted(self):
+        """
+        Tests that the VMs being deleted are awaited, that the VMs already
+        gone count as deleted and that creators without a VM are ignored
+        """
+        api_call_count_tests.get_network_creator().create()
+        creators = [api_call_count_tests.get_vm_creator('vm-%d' % index, 1)
+                    for index in range(3)]
+        for creator in creators[:2]:
+            creator.create(block=True)
+
+        creators[0].clean(block=False)
+        self.cloud.set_transition(fake_cloud.RES_SERVER, 0, 0.2)
+        creators[1].clean(block=False)
+        self.assertEqual(1, len(self.cloud.servers))
+
+        start = time.time()
+        self.assertEqual(list(), create_instance.vms_deleted(creators))
+        self.assertTrue(time.time() - start >= 0.2)
+        self.assertEqual(dict(), self.cloud.servers)
+
+        for creator in creators:
+            creator.clean()
+        self.assertIsNone(creators[0].get_vm_id())
+        self.assertIsNone(creators[2].get_vm_id())
+
+    def test_graph_clean_vms(self):
+        """
+        Tests that a deployment graph cleans its VMs and then their network
+        and that an error awaiting the VMs does not stop the teardown
+        """
+        for error in (False, True):
+            net_key = (deployment.RES_NETWORK,
+                       api_call_count_tests.NETWORK_NAME)
+            graph = DeploymentGraph()
+            graph.add(net_key[0], net_key[1],
+                      api_call_count_tests.get_network_creator())
+            vm_key = graph.add(
+                deployment.RES_INSTANCE, 'vm',
+                api_call_count_tests.get_vm_creator('vm', 1),
+                depends_on=[net_key])
+            graph.deploy()
+            self.assertEqual(1, len(self.cloud.servers))
+
+            if error:
+                self.cloud.inject_error(api_metrics.SERVICE_COMPUTE,
+                                        'servers.list')
+                with self.assertRaises(DeploymentError):
+                    graph.clean()
+                self.assertEqual([vm_key],
+                                 list(graph.get_clean_failures().keys()))
+            else:
+                graph.clean()
+
+            self.assertEqual(dict(), self.cloud.servers)
+            self.assertEqual(dict(), self.cloud.ports)
+            self.assertEqual(dict(), self.cloud.networks)
+
+    def test_volume_lookups(self):
+        """
+        Tests that volumes are retrieved by ID without listing every volume
+        and by name with a filtered list
+        """
+        creators = [OpenStackVolume(os_creds, VolumeSettings(name=name))
+                    for name in ('vol-1', 'vol-2')]
+        volume_ids = [creator.create(block=True).id for creator in creators]
+        cinder = cinder_utils.cinder_client(os_creds)
+
+        self.cloud.inject_error(
+            api_metrics.SERVICE_VOLUME, 'volumes.list', count=None)
+        self.assertEqual(volume_ids, [
+            volume.id for volume in cinder_utils.get_volumes_by_ids(
+                cinder, volume_ids + ['missing'])])
+        self.assertEqual(
+            dict((volume_id, 'available') for volume_id in volume_ids),
+            cinder_utils.get_volume_statuses(
+                cinder, ['missing'] + volume_ids))
+        self.cloud.clear_errors()
+
+        volumes = cinder_utils.get_volumes_by_name(
+            cinder, ['vol-2', 'vol-1', 'vol-2', 'missing'])
+        self.assertEqual(['vol-1', 'vol-2'], sorted(volumes.keys()))
+        self.assertEqual(volume_ids[1], volumes['vol-2'].id)
+
+        for creator in creators:
+            creator.clean()
+
+    def test_stack_events(self):
+        """
+        Tests the events of a stack being created and deleted
+        """
+        self.cloud.set_transition(fake_cloud.RES_STACK, 0.1, 0.1)
+        creator = get_stack_creator('stack')
+        stack = creator.create()
+
+        heat = heat_utils.heat_client(os_creds)
+        self.assertEqual(
+            ['CREATE_IN_PROGRESS', 'CREATE_COMPLETE'],
+            [event.resource_status
+             for event in heat_utils.get_stack_events(heat, stack)])
+
+        heat_utils.delete_stack(heat, stack)
+        self.assertEqual('DELETE_IN_PROGRESS',
+                         heat_utils.get_stack_status(heat, stack.id))
+        time.sleep(0.1)
+        with self.assertRaises(HTTPNotFound):
+            heat_utils.get_stack_status(heat, stack.id)
+
+    def test_stack_failure(self):
+        """
+        Tests that a stack failing raises a StackError
+        """
+        self.cloud.fail_resource(fake_cloud.RES_STACK, 'stack')
+        with self.assertRaises(StackError):
+            get_stack_creator('stack').create()
+
+    def test_latency(self):
+        """
+        Tests that the latency of an operation takes precedence over the one
+        of its service
+        """
+        self.cloud.set_latency(0.1, api_metrics.SERVICE_COMPUTE)
+        self.cloud.set_latency(0, api_metrics.SERVICE_COMPUTE, 'flavors.list')
+        nova = nova_utils.nova_client(os_creds)
+
+        start = time.time()
+        nova_utils.get_flavor_by_name(nova, api_call_count_tests.FLAVOR_NAME)
+        self.assertTrue(time.time() - start >= 0.1)
+
+        start = time.time()
+        nova_utils.get_flavors_by_names(
+            nova, [api_call_count_tests.FLAVOR_NAME])
+        self.assertTrue(time.time() - start < 0.1)
+
+    def test_inject_error_count(self):
+        """
+        Tests that the number of calls given fail with the error's code
+        """
+        self.cloud.inject_error(api_metrics.SERVICE_COMPUTE, 'flavors.find',
+                                count=2)
+        collector = api_metrics.ApiMetricsCollector()
+        api_metrics.add_hook(collector)
+        try:
+            nova = nova_utils.nova_client(os_creds)
+            for index in range(2):
+                with self.assertRaises(fake_cloud.FakeApiError):
+                    nova_utils.get_flavor_by_name(
+                        nova, api_call_count_tests.FLAVOR_NAME)
+            self.assertIsNotNone(nova_utils.get_flavor_by_name(
+                nova, api_call_count_tests.FLAVOR_NAME))
+        finally:
+            api_metrics.remove_hook(collector)
+
+        metrics = [metrics for metrics in collector.get_metrics()
+                   if metrics.operation == 'flavors.find'][0]
+        self.assertEqual(3, metrics.calls)
+        self.assertEqual(2, metrics.errors)
+
+    def test_inject_error_rate(self):
+        """
+        Tests that the calls fail at random with the rate given and the same
+        calls fail with the same seed
+        """
+        outcomes = list()
+        for attempt in range(2):
+            cloud = fake_cloud.FakeCloud(seed=2)
+            cloud.inject_error(api_metrics.SERVICE_NETWORK, count=None,
+                               rate=0.5)
+            neutron = cloud.client(api_metrics.SERVICE_NETWORK)
+            outcome = list()
+            for index in range(20):
+                try:
+                    neutron.list_networks()
+                    outcome.append(True)
+                except fake_cloud.FakeApiError:
+                    outcome.append(False)
+            outcomes.append(outcome)
+
+        self.assertEqual(outcomes[0], outcomes[1])
+        self.assertTrue(True in outcomes[0])
+        self.assertTrue(False in outcomes[0])
+
+    def test_create_cloud(self):
+        """
+        Tests a fake cloud configured by a dict
+        """
+        cloud = fake_cloud.create_cloud({
+            'latency': [{'seconds': 0.5, 'service': 'compute'}],
+            'transitions': {'server': 3,
+                            'stack': {'seconds': 2, 'delete_seconds': 1}},
+            'errors': [{'service': 'network', 'operation': 'list_networks',
+                        'code': 503}],
+            'failures': [{'type': 'server', 'name': 'vm'}],
+            'flavors': [{'name': 'm1.tiny', 'ram': 512}],
+            'images': [{'name': 'cirros'}],
+            'networks': [{'name': 'external', 'cidr': '172.24.4.0/24',
+                          'external': True}]})
+
+        self.assertEqual(0.5, cloud.get_latency('compute', 'servers.get'))
+        self.assertEqual(0, cloud.get_latency('network', 'list_ports'))
+        self.assertEqual(3, cloud.get_transition(
+            fake_cloud.RES_SERVER, fake_cloud.ACTION_CREATE))
+        self.assertEqual(1, cloud.get_transition(
+            fake_cloud.RES_STACK, fake_cloud.ACTION_DELETE))
+        self.assertEqual(['m1.tiny'], [
+            flavor.name for flavor in cloud.flavors.values()])
+        self.assertEqual(['cirros'], [
+            image['name'] for image in cloud.images.values()])
+
+        neutron = cloud.client(api_metrics.SERVICE_NETWORK)
+        with self.assertRaises(fake_cloud.FakeApiError) as context:
+            neutron.list_networks()
+        self.assertEqual(503, context.exception.code)
+        networks = neutron.list_networks(**{'router:external': True})
+        self.assertEqual(['external'], [
+            network['name'] for network in networks['networks']])
+        self.assertEqual(1, len(networks['networks'][0]['subnets']))
@@ -0,0 +1,179 @@
+# Copyright (c) 2017 Cable Television Laboratories, Inc. ("CableLabs")
+#                    and others.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from snaps.openstack import deployment, journal
+from snaps.openstack.create_network import NetworkSettings, SubnetSettings
+from snaps.openstack.create_security_group import (
+    SecurityGroupRuleSettings, Direction)
+from snaps.openstack.deployment import DeploymentGraph
+from snaps.openstack.journal import DeploymentJournal
+from snaps.openstack.tests.deployment_tests import RecordingCreator
+
+__author__ = 'spisarski'
+
+
+class JournalCreator(RecordingCreator):
+    """
+    Creator returning its ID to the journal and recording when it has been
+    loaded from one without accessing OpenStack
+    """
+
+    def __init__(self, name, events, lock, existing_ids=None):
+        RecordingCreator.__init__(self, name, events, lock)
+        self.existing_ids = existing_ids or set()
+        self.resource_id = None
+
+    def create(self):
+        RecordingCreator.create(self)
+        self.resource_id = self.name + '-id'
+
+    def clean(self):
+        RecordingCreator.clean(self)
+        self.resource_id = None
+
+    def initialize_from_ids(self, resource_ids):
+        with self.lock:
+            self.events.append(('restore', self.name))
+        if resource_ids['id'] in self.existing_ids:
+            self.resource_id = resource_ids['id']
+        return self.resource_id
+
+    def get_resource_ids(self):
+        if self.resource_id:
+            return {'id': self.resource_id}
+
+
+class DeploymentJournalTests(unittest.TestCase):
+    """
+    Tests the recording and replay of a DeploymentJournal and its use by the
+    DeploymentGraph class
+    """
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'deploy.journal')
+        self.journal = DeploymentJournal(self.path)
+        self.events = list()
+        self.lock = threading.Lock()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def graph(self, existing_ids=None, cidr='10.0.0.0/24'):
+        """
+        Returns a graph of a network and a router depending upon it
+        """
+        graph = DeploymentGraph(deploy_journal=self.journal)
+        graph.add(deployment.RES_NETWORK, 'net', JournalCreator(
+            'net', self.events, self.lock, existing_ids),
+            settings=NetworkSettings(name='net', subnet_settings=[
+                SubnetSettings(name='subnet', cidr=cidr)]))
+        graph.add(deployment.RES_ROUTER, 'router', JournalCreator(
+            'router', self.events, self.lock, existing_ids),
+            depends_on=[(deployment.RES_SUBNET, 'subnet')])
+        return graph
+
+    def test_replay(self):
+        """
+        Tests that the last deployed entry of each resource is returned until
+        it is cleaned and that a truncated line is skipped
+        """
+        self.journal.record_deployed('network', 'net', 'a', {'id': '1'})
+        self.journal.record_deployed('volume_group', (None, 'proj'), 'b',
+                                     {'volumes': {'vol': '2'}})
+        self.journal.record_deployed('network', 'net', 'c', {'id': '3'})
+        self.journal.record_deployed('router', 'router', 'd', {'id': '4'})
+        self.journal.record_cleaned('router', 'router')
+        with open(self.path, 'a') as journal_file:
+            journal_file.write('{"event": "deployed", "type": "rou')
+
+        entries = self.journal.load()
+        self.assertEqual(
+            set([('network', 'net'), ('volume_group', (None, 'proj'))]),
+            set(entries.keys()))
+        self.assertEqual('c', entries[('network', 'net')]['hash'])
+        self.assertEqual({'id': '3'}, entries[('network', 'net')]['ids'])
+
+        self.journal.compact()
+        self.assertEqual(entries, self.journal.load())
+        with open(self.path) as journal_file:
+            self.assertEqual(2, len(journal_file.readlines()))
+
+        self.journal.record_cleaned('network', 'net')
+        self.journal.record_cleaned('volume_group', (None, 'proj'))
+        self.journal.compact()
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_settings_hash(self):
+        """
+        Tests that the settings hash only changes along with the settings
+        """
+        rule = SecurityGroupRuleSettings(sec_grp_name='grp',
+                                         direction=Direction.ingress)
+        settings = [NetworkSettings(name='net', subnet_settings=[
+            SubnetSettings(name='subnet', cidr='10.0.0.0/24')]), rule]
+        digest = journal.get_settings_hash(settings)
+        self.assertEqual(digest, journal.get_settings_hash([
+            NetworkSettings(name='net', subnet_settings=[
+                SubnetSettings(name='subnet', cidr='10.0.0.0/24')]), rule]))
+        self.assertNotEqual(digest, journal.get_settings_hash([
+            NetworkSettings(name='net', subnet_settings=[
+                SubnetSettings(name='subnet', cidr='10.0.1.0/24')]), rule]))
+        self.assertNotEqual(digest, journal.get_settings_hash(settings[:1]))
+
+    def test_resume(self):
+        """
+        Tests that a second deployment loads the journaled creators from
+        their IDs and deploys the ones that changed or cannot be found
+        """
+        self.graph().deploy()
+        self.assertEqual(2, len(self.journal.load()))
+
+        del self.events[:]
+        graph = self.graph(existing_ids=set(['net-id', 'router-id']))
+        graph.deploy()
+        self.assertEqual([('restore', 'net'), ('restore', 'router')],
+                         self.events)
+        self.assertEqual(
+            set([(deployment.RES_NETWORK, 'net'),
+                 (deployment.RES_ROUTER, 'router')]), graph.get_restored())
+
+        # The router no longer exists and the network's subnet has changed
+        del self.events[:]
+        graph = self.graph(existing_ids=set(['net-id']),
+                           cidr='10.0.1.0/24')
+        graph.deploy()
+        self.assertEqual([('start', 'net'), ('end', 'net'),
+                          ('restore', 'router'), ('start', 'router'),
+                          ('end', 'router')], self.events)
+        self.assertEqual(set(), graph.get_restored())
+
+    def test_clean(self):
+        """
+        Tests that cleaning a graph removes its resources from the journal
+        """
+        graph = self.graph()
+        graph.deploy()
+        graph.clean(retry_interval=0)
+        self.assertEqual(dict(), self.journal.load())
+
+        del self.events[:]
+        self.graph().deploy()
+        self.assertFalse(('restore', 'net') in self.events)
@@ -0,0 +1,135 @@
+# Copyright (c) 2017 Cable Television Laboratories, Inc. ("CableLabs")
+#                    and others.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import unittest
+
+from snaps.domain.flavor import Flavor
+from snaps.domain.network import Network, Subnet, Port
+from snaps.domain.vm_inst import VmInst
+from snaps.domain.volume import Volume
+from snaps.openstack import deployment, plan
+from snaps.openstack.create_flavor import FlavorSettings, OpenStackFlavor
+from snaps.openstack.create_image import ImageSettings
+from snaps.openstack.create_instance import (
+    VmInstanceSettings, OpenStackVmInstance)
+from snaps.openstack.create_network import (
+    NetworkSettings, SubnetSettings, PortSettings, OpenStackNetwork)
+from snaps.openstack.create_volume import (
+    VolumeSettings, OpenStackVolumeGroup)
+from snaps.openstack.deployment import DeploymentGraph
+from snaps.openstack.os_credentials import OSCreds
+from snaps.openstack.plan import ResourceSnapshot
+
+__author__ = 'spisarski'
+
+
+class PlanTests(unittest.TestCase):
+    """
+    Tests the resolution of a DeploymentGraph against a ResourceSnapshot
+    without accessing OpenStack
+    """
+
+    def setUp(self):
+        self.os_creds = OSCreds(
+            username='user', password='pass', auth_url='http://foo:5000/v3',
+            project_name='proj')
+        self.snapshot = ResourceSnapshot(self.os_creds)
+        self.graph = DeploymentGraph()
+
+        net_settings = NetworkSettings(name='net', subnet_settings=[
+            SubnetSettings(name='subnet-1', cidr='10.0.0.0/24'),
+            SubnetSettings(name='subnet-2', cidr='10.0.1.0/24')])
+        self.graph.add(deployment.RES_NETWORK, 'net',
+                       OpenStackNetwork(self.os_creds, net_settings),
+                       settings=net_settings)
+
+        flavor_settings = FlavorSettings(name='flavor', ram=1024, disk=10,
+                                         vcpus=2)
+        self.graph.add(deployment.RES_FLAVOR, 'flavor',
+                       OpenStackFlavor(self.os_creds, flavor_settings),
+                       settings=flavor_settings)
+
+        vol_settings = [VolumeSettings(name='vol-1', size=1),
+                        VolumeSettings(name='vol-2', size=2)]
+        self.graph.add(deployment.RES_VOLUME_GROUP, 'volumes',
+                       OpenStackVolumeGroup(self.os_creds, vol_settings),
+                       settings=vol_settings)
+
+        vm_settings = VmInstanceSettings(
+            name='vm', flavor='flavor',
+            port_settings=[PortSettings(name='port', network_name='net')])
+        self.graph.add(
+            deployment.RES_INSTANCE, 'vm', OpenStackVmInstance(
+                self.os_creds, vm_settings,
+                ImageSettings(name='image', image_user='cirros',
+                              img_format='qcow2', url='http://foo')),
+            settings=vm_settings)
+
+    def actions(self, items):
+        return dict(((item.resource_type, item.name), item.action)
+                    for item in items)
+
+    def test_all_create(self):
+        """
+        Tests that every resource missing from the snapshot is planned to be
+        created in deployment order
+        """
+        items = plan.create_plan(self.graph, snapshots=[self.snapshot])
+        self.assertEqual(
+            [(deployment.RES_NETWORK, 'net'),
+             (deployment.RES_FLAVOR, 'flavor'),
+             (deployment.RES_VOLUME, 'vol-1'),
+             (deployment.RES_VOLUME, 'vol-2'),
+             (deployment.RES_INSTANCE, 'vm')],
+            [(item.resource_type, item.name) for item in items])
+        for item in items:
+            self.assertEqual(plan.PLAN_CREATE, item.action)
+
+    def test_exists_and_drift(self):
+        """
+        Tests that existing resources matching their settings are reported as
+        existing and the others with their differences
+        """
+        self.snapshot.add(deployment.RES_NETWORK, Network(
+            name='net', id='net-id', shared=False))
+        self.snapshot.add(deployment.RES_SUBNET, Subnet(
+            name='subnet-1', cidr='10.0.0.0/24'))
+        self.snapshot.add(deployment.RES_FLAVOR, Flavor(
+            name='flavor', id='flavor-id', ram=2048, disk=10, vcpus=2,
+            ephemeral=0, is_public=True))
+        self.snapshot.add(deployment.RES_VOLUME, Volume(
+            name='vol-1', volume_id='vol-id', description=None, size=1,
+            vol_type=None, availability_zone=None, multi_attach=False))
+        self.snapshot.add(deployment.RES_INSTANCE, VmInst(
+            name='vm', inst_id='vm-id', image_id='image-id',
+            flavor_id='flavor-id', networks=dict(), keypair_name=None,
+            sec_grp_names=list(), volume_ids=list()))
+        self.snapshot.add(plan.RES_PORT, Port(name='port', id='port-id'))
+
+        items = plan.create_plan(self.graph, snapshots=[self.snapshot])
+        self.assertEqual({
+            (deployment.RES_NETWORK, 'net'): plan.PLAN_DRIFT,
+            (deployment.RES_FLAVOR, 'flavor'): plan.PLAN_DRIFT,
+            (deployment.RES_VOLUME, 'vol-1'): plan.PLAN_EXISTS,
+            (deployment.RES_VOLUME, 'vol-2'): plan.PLAN_CREATE,
+            (deployment.RES_INSTANCE, 'vm'): plan.PLAN_EXISTS,
+        }, self.actions(items))
+
+        self.assertEqual(['subnet subnet-2: missing'], items[0].differences)
+        self.assertEqual(['ram: expected 1024, found 2048'],
+                         items[1].differences)
+
+        summary = plan.format_plan(items)
+        self.assertTrue(
+            '1 to create, 2 existing, 2 drifted, 0 unchecked' in summary)
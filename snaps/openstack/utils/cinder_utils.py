@@ -12,14 +12,19 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import itertools
 import logging
+import threading
+import time
+import weakref
 
 from cinderclient.client import Client
 from cinderclient.exceptions import NotFound
 
+from snaps import api_metrics, concurrency
 from snaps.domain.volume import (
-    QoSSpec, VolumeType, VolumeTypeEncryption, Volume)
-from snaps.openstack.utils import keystone_utils
+    QoSSpec, VolumeType, VolumeTypeEncryption, Volume, VolumeSnapshot)
+from snaps.openstack.utils import client_factory, keystone_utils
 
 __author__ = 'spisarski'
 
@@ -28,6 +33,22 @@ logger = logging.getLogger('cinder_utils')
 VERSION_2 = 2
 VERSION_3 = 3
 
+# Seconds the name indexes of volume types and QoS specs are reused before
+# being listed again
+LOOKUP_CACHE_TTL = 10
+
+# Maximum number of concurrent calls made when retrieving many volumes as
+# the volume list cannot be filtered by more than one name or by ID
+LOOKUP_MAX_WORKERS = 8
+
+__lookup_cache = dict()
+__lookup_cache_lock = threading.Lock()
+
+# Keys of the clients without authentication plugins, held weakly so a key is
+# never handed to a new client reusing the id() of a collected one
+__client_keys = weakref.WeakKeyDictionary()
+__client_key_count = itertools.count()
+
 """
 Utilities for basic neutron API calls
 """
@@ -38,9 +59,13 @@ def cinder_client(os_creds):
     Creates and returns a cinder client object
     :return: the cinder client
     """
-    return Client(version=os_creds.volume_api_version,
-                  session=keystone_utils.keystone_session(os_creds),
-                  region_name=os_creds.region_name)
+    client = client_factory.get_client(api_metrics.SERVICE_VOLUME)
+    if not client:
+        client = Client(
+            version=os_creds.volume_api_version,
+            session=keystone_utils.keystone_session(os_creds),
+            region_name=os_creds.region_name)
+    return api_metrics.instrument(api_metrics.SERVICE_VOLUME, client)
 
 
 def get_volume(cinder, volume_name=None, volume_settings=None):
@@ -54,7 +79,7 @@ def get_volume(cinder, volume_name=None, volume_settings=None):
     if volume_settings:
         volume_name = volume_settings.name
 
-    volumes = cinder.volumes.list()
+    volumes = cinder.volumes.list(search_opts={'name': volume_name})
     for volume in volumes:
         if volume.name == volume_name:
             return Volume(
@@ -91,6 +116,25 @@ def get_volume_by_id(cinder, volume_id):
         multi_attach=volume.multiattach, attachments=volume.attachments)
 
 
+def get_volumes_by_ids(cinder, volume_ids):
+    """
+    Returns the volumes with the given IDs with no more than
+    LOOKUP_MAX_WORKERS concurrent volume calls
+    :param cinder: the Cinder client
+    :param volume_ids: the IDs of the volumes to retrieve
+    :return: a list of SNAPS-OO Domain Volume objects in the order of
+             volume_ids where the volumes that cannot be found are left out
+    """
+    def get_volume_or_none(volume_id):
+        try:
+            return get_volume_by_id(cinder, volume_id)
+        except NotFound:
+            return None
+
+    return [volume for volume in concurrency.run_concurrent(
+        get_volume_or_none, volume_ids, LOOKUP_MAX_WORKERS) if volume]
+
+
 def get_volume_status(cinder, volume):
     """
     Returns a new OpenStack Volume object for a given OpenStack volume object
@@ -102,17 +146,76 @@ def get_volume_status(cinder, volume):
     return os_volume.status
 
 
+def get_volume_statuses(cinder, volume_ids):
+    """
+    Returns the status of many volumes with no more than LOOKUP_MAX_WORKERS
+    concurrent volume calls
+    :param cinder: the Cinder client
+    :param volume_ids: the IDs of the volumes to query
+    :return: a dict of status values keyed by the ID of each volume that
+             still exists
+    """
+    def get_status(volume_id):
+        try:
+            return volume_id, cinder.volumes.get(volume_id).status
+        except NotFound:
+            return volume_id, None
+
+    return dict((volume_id, status) for volume_id, status in
+                concurrency.run_concurrent(
+                    get_status, volume_ids, LOOKUP_MAX_WORKERS)
+                if status is not None)
+
+
+def get_volumes_by_name(cinder, volume_names):
+    """
+    Returns the volumes with the given names with one volume list call
+    filtered by name per name and no more than LOOKUP_MAX_WORKERS of them
+    at the same time
+    :param cinder: the Cinder client
+    :param volume_names: the names of the volumes to lookup
+    :return: a dict of SNAPS-OO Domain Volume objects keyed by name where the
+             first volume listed wins when names are duplicated
+    """
+    volume_names = sorted(set(volume_names))
+    volumes = concurrency.run_concurrent(
+        lambda volume_name: get_volume(cinder, volume_name=volume_name),
+        volume_names, LOOKUP_MAX_WORKERS)
+    return dict((volume.name, volume) for volume in volumes if volume)
+
+
 def create_volume(cinder, volume_settings):
     """
     Creates and returns OpenStack volume object with an external URL
     :param cinder: the cinder client
     :param volume_settings: the volume settings object
     :return: the OpenStack volume object
-    :raise Exception if using a file and it cannot be found
-    """
+    :raise CinderException when the source snapshot or volume cannot be found
+    """
+    snapshot_id = None
+    if volume_settings.snapshot_name:
+        snapshot = get_volume_snapshot(
+            cinder, volume_settings.snapshot_name)
+        if not snapshot:
+            raise CinderException(
+                'Cannot find volume snapshot with name - %s' %
+                volume_settings.snapshot_name)
+        snapshot_id = snapshot.id
+
+    source_volid = None
+    if volume_settings.source_volume_name:
+        source_volume = get_volume(
+            cinder, volume_settings.source_volume_name)
+        if not source_volume:
+            raise CinderException(
+                'Cannot find source volume with name - %s' %
+                volume_settings.source_volume_name)
+        source_volid = source_volume.id
+
     volume = cinder.volumes.create(
         name=volume_settings.name, description=volume_settings.description,
         size=volume_settings.size, imageRef=volume_settings.image_name,
+        snapshot_id=snapshot_id, source_volid=source_volid,
         volume_type=volume_settings.type_name,
         availability_zone=volume_settings.availability_zone,
         multiattach=volume_settings.multi_attach)
@@ -135,6 +238,61 @@ def delete_volume(cinder, volume):
     return cinder.volumes.delete(volume.id)
 
 
+def get_volume_snapshot(cinder, snapshot_name):
+    """
+    Returns an OpenStack volume snapshot object for a given name
+    :param cinder: the Cinder client
+    :param snapshot_name: the snapshot name to lookup
+    :return: the SNAPS-OO Domain VolumeSnapshot object or None
+    """
+    snapshots = cinder.volume_snapshots.list(
+        search_opts={'name': snapshot_name})
+    for snapshot in snapshots:
+        if snapshot.name == snapshot_name:
+            return VolumeSnapshot(
+                name=snapshot.name, snapshot_id=snapshot.id,
+                volume_id=snapshot.volume_id, size=snapshot.size,
+                description=snapshot.description)
+
+
+def get_volume_snapshot_status(cinder, snapshot):
+    """
+    Returns the status of a volume snapshot
+    :param cinder: the Cinder client
+    :param snapshot: the domain VolumeSnapshot object
+    :return: the status string
+    """
+    os_snapshot = cinder.volume_snapshots.get(snapshot.id)
+    return os_snapshot.status
+
+
+def create_volume_snapshot(cinder, volume, snapshot_name, description=None):
+    """
+    Creates and returns a snapshot of a volume
+    :param cinder: the cinder client
+    :param volume: the domain Volume object to snapshot
+    :param snapshot_name: the snapshot's name
+    :param description: the snapshot's description (optional)
+    :return: the SNAPS-OO Domain VolumeSnapshot object
+    """
+    snapshot = cinder.volume_snapshots.create(
+        volume.id, name=snapshot_name, description=description)
+    return VolumeSnapshot(
+        name=snapshot.name, snapshot_id=snapshot.id,
+        volume_id=snapshot.volume_id, size=snapshot.size,
+        description=snapshot.description)
+
+
+def delete_volume_snapshot(cinder, snapshot):
+    """
+    Deletes a volume snapshot from OpenStack
+    :param cinder: the cinder client
+    :param snapshot: the domain VolumeSnapshot object to delete
+    """
+    logger.info('Deleting volume snapshot named - %s', snapshot.name)
+    cinder.volume_snapshots.delete(snapshot.id)
+
+
 def get_volume_type(cinder, volume_type_name=None, volume_type_settings=None):
     """
     Returns an OpenStack volume type object for a given name
@@ -149,12 +307,13 @@ def get_volume_type(cinder, volume_type_name=None, volume_type_settings=None):
     if volume_type_settings:
         volume_type_name = volume_type_settings.name
 
-    volume_types = cinder.volume_types.list()
-    for vol_type in volume_types:
-        if vol_type.name == volume_type_name:
-            encryption = get_volume_encryption_by_type(cinder, vol_type)
-            return VolumeType(vol_type.name, vol_type.id, vol_type.is_public,
-                              encryption, None)
+    vol_type = __get_name_index(
+        cinder, 'volume_types', cinder.volume_types.list).get(
+        volume_type_name)
+    if vol_type:
+        encryption = __get_os_volume_encryption(cinder, vol_type)
+        return VolumeType(vol_type.name, vol_type.id, vol_type.is_public,
+                          encryption, None)
 
 
 def __get_os_volume_type_by_id(cinder, volume_type_id):
@@ -180,9 +339,7 @@ def get_volume_type_by_id(cinder, volume_type_id):
     """
     os_vol_type = __get_os_volume_type_by_id(cinder, volume_type_id)
     if os_vol_type:
-        temp_vol_type = VolumeType(os_vol_type.name, os_vol_type.id,
-                                   os_vol_type.is_public, None, None)
-        encryption = get_volume_encryption_by_type(cinder, temp_vol_type)
+        encryption = __get_os_volume_encryption(cinder, os_vol_type)
 
         qos_spec = None
         if os_vol_type.qos_specs_id:
@@ -203,6 +360,7 @@ def create_volume_type(cinder, type_settings):
     vol_type = cinder.volume_types.create(
         type_settings.name, type_settings.description,
         type_settings.public)
+    clear_lookup_cache()
 
     vol_encryption = None
     if type_settings.encryption:
@@ -233,6 +391,7 @@ def delete_volume_type(cinder, vol_type):
     """
     logger.info('Deleting volume named - %s', vol_type.name)
     cinder.volume_types.delete(vol_type.id)
+    clear_lookup_cache()
 
 
 def get_volume_encryption_by_type(cinder, volume_type):
@@ -243,6 +402,16 @@ def get_volume_encryption_by_type(cinder, volume_type):
     :return: the VolumeEncryption domain object or None
     """
     os_vol_type = __get_os_volume_type_by_id(cinder, volume_type.id)
+    return __get_os_volume_encryption(cinder, os_vol_type)
+
+
+def __get_os_volume_encryption(cinder, os_vol_type):
+    """
+    Returns the encryption of an OpenStack volume type object
+    :param cinder: the Cinder client
+    :param os_vol_type: the OpenStack volume type object
+    :return: the VolumeEncryption domain object or None
+    """
     encryption = cinder.volume_encryption_types.get(os_vol_type)
     if hasattr(encryption, 'encryption_id'):
         cipher = None
@@ -314,10 +483,8 @@ def __get_os_qos(cinder, qos_name=None, qos_settings=None):
     if qos_settings:
         qos_name = qos_settings.name
 
-    qoss = cinder.qos_specs.list()
-    for qos in qoss:
-        if qos.name == qos_name:
-            return qos
+    return __get_name_index(
+        cinder, 'qos_specs', cinder.qos_specs.list).get(qos_name)
 
 
 def get_qos(cinder, qos_name=None, qos_settings=None):
@@ -356,6 +523,7 @@ def create_qos(cinder, qos_settings):
     specs = qos_settings.specs
     specs['consumer'] = qos_settings.consumer.value
     qos = cinder.qos_specs.create(qos_settings.name, qos_settings.specs)
+    clear_lookup_cache()
     return QoSSpec(name=qos.name, spec_id=qos.id, consumer=qos.consumer)
 
 
@@ -367,3 +535,67 @@ def delete_qos(cinder, qos):
     """
     logger.info('Deleting QoS named - %s', qos.name)
     cinder.qos_specs.delete(qos.id)
+    clear_lookup_cache()
+
+
+def __get_name_index(cinder, resource, list_function):
+    """
+    Returns a dict of OpenStack objects keyed by name built from
+    list_function. The index is shared by all clients authenticating with the
+    same credentials and is rebuilt after LOOKUP_CACHE_TTL seconds or when
+    clear_lookup_cache() is called. The first object listed wins when names
+    are duplicated
+    :param cinder: the Cinder client
+    :param resource: the name of the resource type being indexed
+    :param list_function: the function listing all objects of the type
+    :return: the dict
+    """
+    key = (__get_client_key(cinder), resource)
+    now = time.time()
+    with __lookup_cache_lock:
+        entry = __lookup_cache.get(key)
+    if entry and now - entry[0] < LOOKUP_CACHE_TTL:
+        return entry[1]
+
+    index = dict()
+    for os_obj in list_function():
+        index.setdefault(os_obj.name, os_obj)
+    with __lookup_cache_lock:
+        __lookup_cache[key] = (now, index)
+    return index
+
+
+def __get_client_key(cinder):
+    """
+    Returns a value identifying the credentials and region of a client or,
+    when its authentication plugin cannot identify them, the client itself
+    :param cinder: the Cinder client
+    :return: the key
+    """
+    http_client = cinder.client
+    auth = getattr(http_client, 'auth', None)
+    if not auth and getattr(http_client, 'session', None):
+        auth = http_client.session.auth
+    if auth and hasattr(auth, 'get_cache_id'):
+        return auth.get_cache_id(), getattr(http_client, 'region_name', None)
+
+    with __lookup_cache_lock:
+        key = __client_keys.get(cinder)
+        if key is None:
+            key = ('client', next(__client_key_count))
+            __client_keys[cinder] = key
+        return key
+
+
+def clear_lookup_cache():
+    """
+    Discards the cached volume type and QoS spec name indexes
+    """
+    with __lookup_cache_lock:
+        __lookup_cache.clear()
+
+
+class CinderException(Exception):
+    """
+    Exception when calls to the Cinder client cannot be served properly
+    """
@@ -0,0 +1,48 @@
+# Copyright (c) 2017 Cable Television Laboratories, Inc. ("CableLabs")
+#                    and others.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+__author__ = 'spisarski'
+
+"""
+The hook the client factories of the snaps.openstack.utils modules call
+before connecting to OpenStack, such as the one of snaps.openstack.fake_cloud
+returning the clients of a fake cloud
+"""
+
+__factory = None
+
+
+def set_client_factory(factory):
+    """
+    Sets the function the client factories call before connecting to
+    OpenStack
+    :param factory: the function called with the service (i.e.
+                    api_metrics.SERVICE_COMPUTE) returning a client or None
+                    to connect to OpenStack. None removes it
+    """
+    global __factory
+    __factory = factory
+
+
+def get_client(service):
+    """
+    Returns the client of a service from the function set with
+    set_client_factory()
+    :param service: the OpenStack service (i.e. api_metrics.SERVICE_COMPUTE)
+    :return: the client or None when a client connecting to OpenStack must
+             be created
+    """
+    factory = __factory
+    if factory:
+        return factory(service)
@@ -14,13 +14,14 @@
 # limitations under the License.
 import logging
 import os
+import time
 import uuid
 
-from snaps import file_utils
+from snaps import api_metrics, file_utils, image_metrics
 from glanceclient.client import Client
 
 from snaps.domain.image import Image
-from snaps.openstack.utils import keystone_utils
+from snaps.openstack.utils import client_factory, keystone_utils
 
 __author__ = 'spisarski'
 
@@ -39,9 +40,13 @@ def glance_client(os_creds):
     Creates and returns a glance client object
     :return: the glance client
     """
-    return Client(version=os_creds.image_api_version,
-                  session=keystone_utils.keystone_session(os_creds),
-                  region_name=os_creds.region_name)
+    client = client_factory.get_client(api_metrics.SERVICE_IMAGE)
+    if not client:
+        client = Client(
+            version=os_creds.image_api_version,
+            session=keystone_utils.keystone_session(os_creds),
+            region_name=os_creds.region_name)
+    return api_metrics.instrument(api_metrics.SERVICE_IMAGE, client)
 
 
 def get_image(glance, image_name=None, image_settings=None):
@@ -74,6 +79,78 @@ def get_image(glance, image_name=None, image_settings=None):
                 size=image['size'], properties=image.get('properties'))
 
 
+def get_images_by_names(glance, names):
+    """
+    Returns the images with the given names with a single list call
+    :param glance: the Glance client
+    :param names: the names of the images to retrieve
+    :return: a dict of SNAPS-OO Domain Image objects keyed by name where the
+             first image listed wins when names are duplicated
+    """
+    names = set(names)
+    out = dict()
+    if not names:
+        return out
+
+    for image in glance.images.list():
+        if glance.version == VERSION_1:
+            if image.name in names and image.name not in out:
+                out[image.name] = Image(
+                    name=image.name, image_id=image.id, size=image.size,
+                    properties=image.properties)
+        elif glance.version == VERSION_2:
+            if image['name'] in names and image['name'] not in out:
+                out[image['name']] = Image(
+                    name=image['name'], image_id=image['id'],
+                    size=image['size'], properties=image.get('properties'))
+    return out
+
+
+def get_image_by_checksum(glance, checksum, disk_format, properties=None):
+    """
+    Returns the first active image whose contents, format and properties
+    match the given values regardless of its name
+    :param glance: the Glance client
+    :param checksum: the MD5 checksum of the image's contents
+    :param disk_format: the image's disk format
+    :param properties: dict() of properties the image must have (optional)
+    :return: the SNAPS-OO Domain Image object or None
+    """
+    img_filter = {'disk_format': disk_format, 'status': 'active'}
+    if glance.version == VERSION_2:
+        # Glance v2 filters by checksum on the server
+        img_filter['checksum'] = checksum
+    images = glance.images.list(**{'filters': img_filter})
+    for image in images:
+        if glance.version == VERSION_1:
+            if (image.checksum == checksum
+                    and __has_properties(image.properties, properties)):
+                return Image(name=image.name, image_id=image.id,
+                             size=image.size, properties=image.properties)
+        elif glance.version == VERSION_2:
+            if (image.get('checksum') == checksum
+                    and __has_properties(image, properties)):
+                return Image(
+                    name=image['name'], image_id=image['id'],
+                    size=image['size'], properties=image.get('properties'))
+
+
+def __has_properties(image_properties, properties):
+    """
+    Returns True when each of the properties is set on the image with the
+    same value
+    :param image_properties: the image's properties
+    :param properties: dict() of expected properties or None
+    :return: T/F
+    """
+    if not isinstance(properties, dict):
+        return True
+    for key, value in properties.items():
+        if str(image_properties.get(key)) != str(value):
+            return False
+    return True
+
+
 def get_image_by_id(glance, image_id):
     """
     Returns an OpenStack image object for a given name
@@ -138,7 +215,10 @@ def __create_image_v1(glance, image_settings):
         if image_settings.extra_properties:
             kwargs['properties'] = image_settings.extra_properties
 
-        if image_settings.url:
+        if image_settings.compression:
+            image_file = __open_compressed_source(image_settings)
+            kwargs['data'] = image_file
+        elif image_settings.url:
             kwargs['location'] = image_settings.url
         elif image_settings.image_file:
             image_file = open(image_settings.image_file, 'rb')
@@ -149,7 +229,12 @@ def __create_image_v1(glance, image_settings):
                 image_settings.name)
             return None
 
+        start = time.time()
         created_image = glance.images.create(**kwargs)
+        if image_file:
+            image_metrics.record_phase(
+                image_settings.name, image_metrics.PHASE_UPLOAD,
+                time.time() - start, image_file.tell())
         return Image(name=image_settings.name, image_id=created_image.id,
                      size=created_image.size,
                      properties=created_image.properties)
@@ -168,13 +253,19 @@ def __create_image_v2(glance, image_settings):
     """
     cleanup_temp_file = False
     image_file = None
-    if image_settings.image_file is not None:
+    image_filename = None
+    upload_file = None
+    if image_settings.compression:
+        upload_file = __open_compressed_source(image_settings)
+    elif image_settings.image_file is not None:
         image_filename = image_settings.image_file
     elif image_settings.url:
         file_name = str(uuid.uuid4())
         try:
             image_file = file_utils.download(
-                image_settings.url, './tmp', file_name)
+                image_settings.url, './tmp', file_name,
+                checksum=image_settings.checksum,
+                callback=image_metrics.download_callback(image_settings.name))
             image_filename = image_file.name
         except:
             if image_file:
@@ -199,8 +290,13 @@ def __create_image_v2(glance, image_settings):
             kwargs.update(image_settings.extra_properties)
 
         os_image = glance.images.create(**kwargs)
-        image_file = open(os.path.expanduser(image_filename), 'rb')
-        glance.images.upload(os_image['id'], image_file)
+        if not upload_file:
+            upload_file = __open_upload_file(image_filename, image_settings)
+        start = time.time()
+        glance.images.upload(os_image['id'], upload_file)
+        image_metrics.record_phase(
+            image_settings.name, image_metrics.PHASE_UPLOAD,
+            time.time() - start, upload_file.tell())
     except:
         logger.error('Unexpected exception creating image. Rolling back')
         if os_image:
@@ -209,16 +305,70 @@ def __create_image_v2(glance, image_settings):
                 size=os_image['size'], properties=os_image.get('properties')))
         raise
     finally:
-        if image_file:
-            logger.debug('Closing file %s', image_file.name)
-            image_file.close()
+        if upload_file:
+            logger.debug('Closing file %s', upload_file.name)
+            upload_file.close()
         if cleanup_temp_file:
-            logger.info('Removing file %s', image_file.name)
+            logger.info('Removing file %s', image_filename)
             os.remove(image_filename)
 
     return get_image_by_id(glance, os_image['id'])
 
 
+def __open_upload_file(image_filename, image_settings):
+    """
+    Opens a local image file for upload as a MappedFileReader so the glance
+    client's reads are slices of the file's mapping rather than read() system
+    calls into new byte strings. Empty files cannot be mapped and are opened
+    normally
+    :param image_filename: the path to the image file
+    :param image_settings: the image settings object
+    :return: the file-like object
+    """
+    expanded_path = os.path.expanduser(image_filename)
+    if os.path.getsize(expanded_path) == 0:
+        return open(expanded_path, 'rb')
+
+    chunk_size = (image_settings.upload_chunk_size
+                  or file_utils.MAPPED_READ_CHUNK_SIZE)
+    return file_utils.MappedFileReader(expanded_path, chunk_size)
+
+
+def __open_compressed_source(image_settings):
+    """
+    Returns a file-like object with the decompressed contents of a compressed
+    image URL or file. The data is decompressed while it is being uploaded
+    unless a copy has already been saved to the image_settings.cache_dir and,
+    when image_settings.checksum is set, its contents match it
+    :param image_settings: the image settings object
+    :return: the file-like object
+    """
+    source = image_settings.url or image_settings.image_file
+    cache_path = None
+    if image_settings.cache_dir:
+        cache_path = os.path.join(
+            os.path.expanduser(image_settings.cache_dir),
+            file_utils.get_cache_name(source))
+        if file_utils.file_exists(cache_path):
+            if (not image_settings.checksum
+                    or file_utils.get_file_checksum(cache_path) ==
+                    image_settings.checksum.lower()):
+                logger.info('Uploading cached decompressed image - %s',
+                            cache_path)
+                return __open_upload_file(cache_path, image_settings)
+            logger.warning('Cached image %s does not match the checksum %s, '
+                           'decompressing the source again', cache_path,
+                           image_settings.checksum)
+            os.remove(cache_path)
+
+    logger.info('Decompressing %s image while uploading - %s',
+                image_settings.compression, source)
+    return file_utils.open_decompressed(
+        image_settings.compression, url=image_settings.url,
+        file_path=image_settings.image_file, cache_path=cache_path,
+        checksum=image_settings.checksum)
+
+
 def delete_image(glance, image):
     """
     Deletes an image from OpenStack
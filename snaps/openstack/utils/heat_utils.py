@@ -12,24 +12,45 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import copy
+import hashlib
 import logging
+import os
+import threading
+from collections import OrderedDict
 
 import yaml
 from heatclient.client import Client
 from heatclient.common.template_format import yaml_loader
+from cinderclient.exceptions import NotFound as CinderNotFound
 from novaclient.exceptions import NotFound
 from oslo_serialization import jsonutils
 
-from snaps import file_utils
-from snaps.domain.stack import Stack, Resource, Output
+from snaps import api_metrics, concurrency, file_utils
+from snaps.domain.stack import Stack, Resource, Output, Event
 
-from snaps.openstack.utils import keystone_utils, neutron_utils, nova_utils, \
-    cinder_utils
+from snaps.openstack.utils import client_factory, keystone_utils, \
+    neutron_utils, nova_utils, cinder_utils
 
 __author__ = 'spisarski'
 
 logger = logging.getLogger('heat_utils')
 
+# Maximum number of concurrent calls made when resolving stack resources that
+# cannot be retrieved with a single list call
+RESOLVE_MAX_WORKERS = 8
+
+RES_TYPE_NETWORK = 'OS::Neutron::Net'
+RES_TYPE_SERVER = 'OS::Nova::Server'
+RES_TYPE_VOLUME = 'OS::Cinder::Volume'
+RES_TYPE_VOLUME_TYPE = 'OS::Cinder::VolumeType'
+
+# Maximum number of parsed templates kept by the template cache
+TEMPLATE_CACHE_SIZE = 128
+
+__template_cache = OrderedDict()
+__template_cache_lock = threading.Lock()
+
 
 def heat_client(os_creds):
     """
@@ -38,9 +59,13 @@ def heat_client(os_creds):
     :return: the client
     """
     logger.debug('Retrieving Nova Client')
-    return Client(os_creds.heat_api_version,
-                  session=keystone_utils.keystone_session(os_creds),
-                  region_name=os_creds.region_name)
+    client = client_factory.get_client(api_metrics.SERVICE_ORCHESTRATION)
+    if not client:
+        client = Client(
+            os_creds.heat_api_version,
+            session=keystone_utils.keystone_session(os_creds),
+            region_name=os_creds.region_name)
+    return api_metrics.instrument(api_metrics.SERVICE_ORCHESTRATION, client)
 
 
 def get_stack(heat_cli, stack_settings=None, stack_name=None):
@@ -98,6 +123,80 @@ def get_stack_status_reason(heat_cli, stack_id):
     return heat_cli.stacks.get(stack_id).stack_status_reason
 
 
+def get_stack_statuses(heat_cli, stack_ids):
+    """
+    Returns the status of many stacks with a single list call
+    :param heat_cli: the OpenStack heat client
+    :param stack_ids: the IDs of the stacks to query
+    :return: a dict of (status, status reason) tuples keyed by the ID of each
+             stack that still exists
+    """
+    stack_ids = set(stack_ids)
+    out = dict()
+    for os_stack in heat_cli.stacks.list():
+        if os_stack.id in stack_ids:
+            out[os_stack.id] = (os_stack.stack_status,
+                                os_stack.stack_status_reason)
+    return out
+
+
+def get_stacks_by_name(heat_cli, stack_names):
+    """
+    Returns the stacks with the given names with a single list call
+    :param heat_cli: the OpenStack heat client
+    :param stack_names: the names of the stacks to lookup
+    :return: a dict of Stack domain objects keyed by the stack name
+    """
+    stack_names = set(stack_names)
+    out = dict()
+    for os_stack in heat_cli.stacks.list():
+        if os_stack.stack_name in stack_names:
+            out[os_stack.stack_name] = Stack(
+                name=os_stack.identifier, stack_id=os_stack.id)
+    return out
+
+
+def get_stack_events(heat_cli, stack, marker=None, limit=None):
+    """
+    Returns the events of a stack, oldest first, that were emitted after the
+    event with the ID of the marker
+    :param heat_cli: the OpenStack heat client
+    :param stack: the SNAPS-OO Stack domain object
+    :param marker: the ID of the last event already seen (optional)
+    :param limit: the maximum number of events to return (optional)
+    :return: a list of Event domain objects
+    """
+    os_events = heat_cli.events.list(
+        stack.id, marker=marker, limit=limit, sort_dir='asc')
+    return [__map_os_event(os_event) for os_event in os_events]
+
+
+def get_last_stack_event(heat_cli, stack):
+    """
+    Returns the latest event of a stack
+    :param heat_cli: the OpenStack heat client
+    :param stack: the SNAPS-OO Stack domain object
+    :return: the Event domain object or None
+    """
+    os_events = heat_cli.events.list(stack.id, limit=1, sort_dir='desc')
+    for os_event in os_events:
+        return __map_os_event(os_event)
+
+
+def __map_os_event(os_event):
+    """
+    Returns the Event domain object of an OpenStack event
+    :param os_event: the OpenStack event object
+    :return: the Event domain object
+    """
+    return Event(
+        event_id=os_event.id, resource_name=os_event.resource_name,
+        physical_resource_id=os_event.physical_resource_id,
+        resource_status=os_event.resource_status,
+        resource_status_reason=os_event.resource_status_reason,
+        event_time=os_event.event_time)
+
+
 def create_stack(heat_cli, stack_settings):
     """
     Executes an Ansible playbook to the given host
@@ -105,21 +204,78 @@ def create_stack(heat_cli, stack_settings):
     :param stack_settings: the stack configuration
     :return: the Stack domain object
     """
+    args = __get_stack_args(stack_settings)
+    args['stack_name'] = stack_settings.name
+
+    stack = heat_cli.stacks.create(**args)
+
+    return get_stack_by_id(heat_cli, stack_id=stack['stack']['id'])
+
+
+def update_stack(heat_cli, stack, stack_settings, existing=True):
+    """
+    Updates an existing Heat stack with the template and parameters of the
+    given settings. Heat only touches the resources whose definitions have
+    changed
+    :param heat_cli: the OpenStack heat client object
+    :param stack: the SNAPS-OO Stack domain object to update
+    :param stack_settings: the new stack configuration
+    :param existing: when True, the update is sent as a PATCH so any
+                     parameters not set are kept from the existing stack
+    :return: the Stack domain object
+    """
+    args = __get_stack_args(stack_settings)
+    args['existing'] = existing
+
+    heat_cli.stacks.update(stack.id, **args)
+
+    return get_stack_by_id(heat_cli, stack_id=stack.id)
+
+
+def preview_stack_update(heat_cli, stack, stack_settings, existing=True):
+    """
+    Returns the changes Heat would make to the stack's resources when updated
+    with the given settings without changing anything
+    :param heat_cli: the OpenStack heat client object
+    :param stack: the SNAPS-OO Stack domain object to update
+    :param stack_settings: the new stack configuration
+    :param existing: when True, any parameters not set are kept from the
+                     existing stack
+    :return: a dict of lists of resource names keyed by the type of change
+             (added, deleted, replaced, updated and unchanged)
+    """
+    args = __get_stack_args(stack_settings)
+    args['existing'] = existing
+
+    preview = heat_cli.stacks.preview_update(stack.id, **args)
+
+    out = dict()
+    for change_type, resources in preview['resource_changes'].items():
+        out[change_type] = sorted(
+            resource['resource_name'] for resource in resources)
+    return out
+
+
+def __get_stack_args(stack_settings):
+    """
+    Returns the template and parameter arguments of a stack create or update
+    call
+    :param stack_settings: the stack configuration
+    :return: a dict
+    """
     args = dict()
 
     if stack_settings.template:
         args['template'] = stack_settings.template
     else:
-        args['template'] = parse_heat_template_str(
-            file_utils.read_file(stack_settings.template_path))
-    args['stack_name'] = stack_settings.name
+        # the heat client only serializes the template so the cached dict is
+        # passed without being copied
+        args['template'] = __get_template_file(stack_settings.template_path)
 
     if stack_settings.env_values:
         args['parameters'] = stack_settings.env_values
 
-    stack = heat_cli.stacks.create(**args)
-
-    return get_stack_by_id(heat_cli, stack_id=stack['stack']['id'])
+    return args
 
 
 def delete_stack(heat_cli, stack):
@@ -162,6 +318,37 @@ def get_resources(heat_cli, stack, res_type=None):
         return out
 
 
+def get_resource_index(heat_cli, stack):
+    """
+    Returns the physical IDs of all of the resources of a stack grouped by
+    resource type with a single resource list call
+    :param heat_cli: the OpenStack heat client
+    :param stack: the SNAPS-OO Stack domain object
+    :return: a dict of lists of physical resource IDs keyed by resource type
+    """
+    index = dict()
+    for os_resource in __get_os_resources(heat_cli, stack):
+        if os_resource.physical_resource_id:
+            index.setdefault(os_resource.resource_type, list()).append(
+                os_resource.physical_resource_id)
+    return index
+
+
+def __get_resource_ids(heat_cli, stack, res_type, resource_index):
+    """
+    Returns the physical IDs of a stack's resources of a given type
+    :param heat_cli: the OpenStack heat client
+    :param stack: the SNAPS-OO Stack domain object
+    :param res_type: the resource type
+    :param resource_index: the index returned by get_resource_index() or
+                           None to retrieve a new one
+    :return: a list of IDs
+    """
+    if resource_index is None:
+        resource_index = get_resource_index(heat_cli, stack)
+    return resource_index.get(res_type, list())
+
+
 def get_outputs(heat_cli, stack):
     """
     Returns all of the SNAPS-OO Output domain objects for the defined outputs
@@ -185,97 +372,182 @@ def get_outputs(heat_cli, stack):
     return out
 
 
-def get_stack_networks(heat_cli, neutron, stack):
+def get_stack_networks(heat_cli, neutron, stack, resource_index=None):
     """
     Returns a list of Network domain objects deployed by this stack
     :param heat_cli: the OpenStack heat client object
     :param neutron: the OpenStack neutron client object
     :param stack: the SNAPS-OO Stack domain object
+    :param resource_index: the value of get_resource_index() to reuse
+                           (optional)
     :return: a list of Network objects
     """
-
-    out = list()
-    resources = get_resources(heat_cli, stack, 'OS::Neutron::Net')
-    for resource in resources:
-        network = neutron_utils.get_network_by_id(
-            neutron, resource.id)
-        if network:
-            out.append(network)
-
-    return out
+    network_ids = __get_resource_ids(
+        heat_cli, stack, RES_TYPE_NETWORK, resource_index)
+    return neutron_utils.get_networks_by_ids(neutron, network_ids)
 
 
-def get_stack_servers(heat_cli, nova, stack):
+def get_stack_servers(heat_cli, nova, stack, resource_index=None):
     """
     Returns a list of VMInst domain objects associated with a Stack
     :param heat_cli: the OpenStack heat client object
     :param nova: the OpenStack nova client object
     :param stack: the SNAPS-OO Stack domain object
+    :param resource_index: the value of get_resource_index() to reuse
+                           (optional)
     :return: a list of VMInst domain objects
     """
-
-    out = list()
-    resources = get_resources(heat_cli, stack, 'OS::Nova::Server')
-    for resource in resources:
+    def get_server(server_id):
         try:
-            server = nova_utils.get_server_object_by_id(nova, resource.id)
-            if server:
-                out.append(server)
+            return nova_utils.get_server_object_by_id(nova, server_id)
         except NotFound:
-            logger.warn('VmInst cannot be located with ID %s', resource.id)
+            logger.warn('VmInst cannot be located with ID %s', server_id)
 
-    return out
+    server_ids = __get_resource_ids(
+        heat_cli, stack, RES_TYPE_SERVER, resource_index)
+    return [server for server in concurrency.run_concurrent(
+        get_server, server_ids, RESOLVE_MAX_WORKERS) if server]
 
 
-def get_stack_volumes(heat_cli, cinder, stack):
+def get_stack_volumes(heat_cli, cinder, stack, resource_index=None):
     """
-    Returns an instance of NetworkSettings for each network owned by this stack
+    Returns a list of Volume domain objects deployed by this stack
     :param heat_cli: the OpenStack heat client object
     :param cinder: the OpenStack cinder client object
     :param stack: the SNAPS-OO Stack domain object
+    :param resource_index: the value of get_resource_index() to reuse
+                           (optional)
     :return: a list of Volume domain objects
     """
+    volume_ids = __get_resource_ids(
+        heat_cli, stack, RES_TYPE_VOLUME, resource_index)
+    if not volume_ids:
+        return list()
 
-    out = list()
-    resources = get_resources(heat_cli, stack, 'OS::Cinder::Volume')
-    for resource in resources:
-        try:
-            server = cinder_utils.get_volume_by_id(cinder, resource.id)
-            if server:
-                out.append(server)
-        except NotFound:
-            logger.warn('Volume cannot be located with ID %s', resource.id)
-
-    return out
+    volumes = cinder_utils.get_volumes_by_ids(cinder, volume_ids)
+    if len(volumes) < len(volume_ids):
+        found_ids = set(volume.id for volume in volumes)
+        for volume_id in volume_ids:
+            if volume_id not in found_ids:
+                logger.warn('Volume cannot be located with ID %s', volume_id)
+    return volumes
 
 
-def get_stack_volume_types(heat_cli, cinder, stack):
+def get_stack_volume_types(heat_cli, cinder, stack, resource_index=None):
     """
-    Returns an instance of NetworkSettings for each network owned by this stack
+    Returns a list of VolumeType domain objects deployed by this stack
     :param heat_cli: the OpenStack heat client object
     :param cinder: the OpenStack cinder client object
     :param stack: the SNAPS-OO Stack domain object
+    :param resource_index: the value of get_resource_index() to reuse
+                           (optional)
     :return: a list of VolumeType domain objects
     """
-
-    out = list()
-    resources = get_resources(heat_cli, stack, 'OS::Cinder::VolumeType')
-    for resource in resources:
+    def get_volume_type(volume_type_id):
         try:
-            vol_type = cinder_utils.get_volume_type_by_id(cinder, resource.id)
-            if vol_type:
-                out.append(vol_type)
-        except NotFound:
-            logger.warn('VolumeType cannot be located with ID %s', resource.id)
+            return cinder_utils.get_volume_type_by_id(cinder, volume_type_id)
+        except (NotFound, CinderNotFound):
+            logger.warn('VolumeType cannot be located with ID %s',
+                        volume_type_id)
 
-    return out
+    volume_type_ids = __get_resource_ids(
+        heat_cli, stack, RES_TYPE_VOLUME_TYPE, resource_index)
+    return [vol_type for vol_type in concurrency.run_concurrent(
+        get_volume_type, volume_type_ids, RESOLVE_MAX_WORKERS) if vol_type]
 
 
 def parse_heat_template_str(tmpl_str):
     """
     Takes a heat template string, performs some simple validation and returns a
     dict containing the parsed structure. This function supports both JSON and
-    YAML Heat template formats.
+    YAML Heat template formats. Parsed templates are cached by the hash of
+    their contents
+    """
+    return copy.deepcopy(__get_template_str(tmpl_str))
+
+
+def parse_heat_template_file(template_path):
+    """
+    Returns a dict containing the parsed structure of a heat template file.
+    Parsed templates are cached by the path, modification time and size of
+    the file
+    :param template_path: the location of the template file
+    :return: the template dict
+    """
+    return copy.deepcopy(__get_template_file(template_path))
+
+
+def clear_template_cache():
+    """
+    Discards all of the cached templates
+    """
+    with __template_cache_lock:
+        __template_cache.clear()
+
+
+def __get_template_file(template_path):
+    """
+    Returns the shared cached dict of a heat template file which must not be
+    modified
+    :param template_path: the location of the template file
+    :return: the template dict
+    """
+    path = os.path.abspath(os.path.expanduser(template_path))
+    stat = os.stat(path)
+    key = ('file', path, stat.st_mtime, stat.st_size)
+    tpl = __get_cached_template(key)
+    if tpl is None:
+        tpl = __get_template_str(file_utils.read_file(path))
+        __put_cached_template(key, tpl)
+    return tpl
+
+
+def __get_template_str(tmpl_str):
+    """
+    Returns the shared cached dict of a heat template string which must not be
+    modified
+    :param tmpl_str: the template contents
+    :return: the template dict
+    """
+    key = ('str', hashlib.sha1(tmpl_str.encode('utf-8')).hexdigest())
+    tpl = __get_cached_template(key)
+    if tpl is None:
+        tpl = __parse_template(tmpl_str)
+        __put_cached_template(key, tpl)
+    return tpl
+
+
+def __get_cached_template(key):
+    """
+    Returns a template from the cache and marks it as most recently used
+    :param key: the cache key
+    :return: the template dict or None
+    """
+    with __template_cache_lock:
+        tpl = __template_cache.pop(key, None)
+        if tpl is not None:
+            __template_cache[key] = tpl
+        return tpl
+
+
+def __put_cached_template(key, tpl):
+    """
+    Adds a template to the cache, discarding the least recently used ones
+    when the cache is full
+    :param key: the cache key
+    :param tpl: the template dict
+    """
+    with __template_cache_lock:
+        __template_cache[key] = tpl
+        while len(__template_cache) > TEMPLATE_CACHE_SIZE:
+            __template_cache.popitem(last=False)
+
+
+def __parse_template(tmpl_str):
+    """
+    Parses and validates a JSON or YAML heat template
+    :param tmpl_str: the template contents
+    :return: the template dict
     """
     if tmpl_str.startswith('{'):
         tpl = jsonutils.loads(tmpl_str)
@@ -19,9 +19,11 @@ from keystoneauth1.identity import v3, v2
 from keystoneauth1 import session
 import requests
 
+from snaps import api_metrics
 from snaps.domain.project import Project, Domain
 from snaps.domain.role import Role
 from snaps.domain.user import User
+from snaps.openstack.utils import client_factory
 
 logger = logging.getLogger('keystone_utils')
 
@@ -83,11 +85,14 @@ def keystone_client(os_creds):
     :param os_creds: the OpenStack credentials (OSCreds) object
     :return: the client
     """
-    return Client(
-        version=os_creds.identity_api_version,
-        session=keystone_session(os_creds),
-        interface=os_creds.interface,
-        region_name=os_creds.region_name)
+    client = client_factory.get_client(api_metrics.SERVICE_IDENTITY)
+    if not client:
+        client = Client(
+            version=os_creds.identity_api_version,
+            session=keystone_session(os_creds),
+            interface=os_creds.interface,
+            region_name=os_creds.region_name)
+    return api_metrics.instrument(api_metrics.SERVICE_IDENTITY, client)
 
 
 def get_endpoint(os_creds, service_type, interface='public'):
@@ -152,6 +157,22 @@ def get_project(keystone=None, os_creds=None, project_settings=None,
                            domain_id=domain_id)
 
 
+def get_project_by_id(keystone, proj_id):
+    """
+    Returns the project with the given ID
+    :param keystone: the Keystone client
+    :param proj_id: the project ID
+    :return: the SNAPS-OO Project domain object
+    """
+    if keystone.version == V2_VERSION_STR:
+        os_project = keystone.tenants.get(proj_id)
+        return Project(name=os_project.name, project_id=os_project.id)
+
+    os_project = keystone.projects.get(proj_id)
+    return Project(name=os_project.name, project_id=os_project.id,
+                   domain_id=os_project.domain_id)
+
+
 def create_project(keystone, project_settings):
     """
     Creates a project
@@ -228,6 +249,17 @@ def get_user(keystone, username, project_name=None):
     return None
 
 
+def get_user_by_id(keystone, user_id):
+    """
+    Returns the user with the given ID
+    :param keystone: the keystone client
+    :param user_id: the user's ID
+    :return: a SNAPS-OO User domain object
+    """
+    user = keystone.users.get(user_id)
+    return User(name=user.name, user_id=user.id)
+
+
 def create_user(keystone, user_settings):
     """
     Creates a user
@@ -17,12 +17,13 @@ import logging
 from neutronclient.common.exceptions import NotFound
 from neutronclient.neutron.client import Client
 
+from snaps import api_metrics
 from snaps.domain.network import (
     Port, SecurityGroup, SecurityGroupRule, Router, InterfaceRouter, Subnet,
     Network)
 from snaps.domain.project import NetworkQuotas
 from snaps.domain.vm_inst import FloatingIp
-from snaps.openstack.utils import keystone_utils
+from snaps.openstack.utils import client_factory, keystone_utils
 
 __author__ = 'spisarski'
 
@@ -40,9 +41,13 @@ def neutron_client(os_creds):
     :param os_creds: the credentials for connecting to the OpenStack remote API
     :return: the client object
     """
-    return Client(api_version=os_creds.network_api_version,
-                  session=keystone_utils.keystone_session(os_creds),
-                  region_name=os_creds.region_name)
+    client = client_factory.get_client(api_metrics.SERVICE_NETWORK)
+    if not client:
+        client = Client(
+            api_version=os_creds.network_api_version,
+            session=keystone_utils.keystone_session(os_creds),
+            region_name=os_creds.region_name)
+    return api_metrics.instrument(api_metrics.SERVICE_NETWORK, client)
 
 
 def create_network(neutron, os_creds, network_settings):
@@ -116,6 +121,116 @@ def get_network_by_id(neutron, network_id):
             return Network(**network)
 
 
+def get_networks_by_ids(neutron, network_ids, chunk_size=100):
+    """
+    Returns the networks with the given IDs using one ID-filtered list call
+    for each chunk of IDs
+    :param neutron: the client
+    :param network_ids: the IDs of the networks to retrieve
+    :param chunk_size: the maximum number of IDs in each list call
+    :return: a list of SNAPS-OO Network domain objects in the order of
+             network_ids where the networks that cannot be found are left out
+    """
+    network_ids = list(network_ids)
+    found = dict()
+    for i in range(0, len(network_ids), chunk_size):
+        networks = neutron.list_networks(
+            **{'id': network_ids[i:i + chunk_size]})
+        for network in networks['networks']:
+            found[network['id']] = Network(**network)
+    return [found[network_id] for network_id in network_ids
+            if network_id in found]
+
+
+def get_networks_by_names(neutron, network_names):
+    """
+    Returns the networks with the given names with a single list call
+    :param neutron: the client
+    :param network_names: the names of the networks to retrieve
+    :return: a dict of SNAPS-OO Network domain objects keyed by name where the
+             first network listed wins when names are duplicated
+    """
+    network_names = list(set(network_names))
+    out = dict()
+    if not network_names:
+        return out
+
+    networks = neutron.list_networks(**{'name': network_names})
+    for network in networks['networks']:
+        if network['name'] not in out:
+            out[network['name']] = Network(**network)
+    return out
+
+
+def get_subnets_by_names(neutron, subnet_names):
+    """
+    Returns the subnets with the given names with a single list call
+    :param neutron: the client
+    :param subnet_names: the names of the subnets to retrieve
+    :return: a dict of SNAPS-OO Subnet domain objects keyed by name where the
+             first subnet listed wins when names are duplicated
+    """
+    return __get_by_names(
+        neutron.list_subnets, 'subnets', subnet_names, Subnet)
+
+
+def get_routers_by_names(neutron, router_names):
+    """
+    Returns the routers with the given names with a single list call
+    :param neutron: the client
+    :param router_names: the names of the routers to retrieve
+    :return: a dict of SNAPS-OO Router domain objects keyed by name where the
+             first router listed wins when names are duplicated
+    """
+    return __get_by_names(
+        neutron.list_routers, 'routers', router_names, Router)
+
+
+def get_ports_by_names(neutron, port_names):
+    """
+    Returns the ports with the given names with a single list call
+    :param neutron: the client
+    :param port_names: the names of the ports to retrieve
+    :return: a dict of SNAPS-OO Port domain objects keyed by name where the
+             first port listed wins when names are duplicated
+    """
+    return __get_by_names(neutron.list_ports, 'ports', port_names, Port)
+
+
+def get_security_groups_by_names(neutron, sec_grp_names):
+    """
+    Returns the security groups with the given names with a single list call
+    :param neutron: the client
+    :param sec_grp_names: the names of the security groups to retrieve
+    :return: a dict of SNAPS-OO SecurityGroup domain objects keyed by name
+             where the first group listed wins when names are duplicated
+    """
+    return __get_by_names(
+        neutron.list_security_groups, 'security_groups', sec_grp_names,
+        SecurityGroup)
+
+
+def __get_by_names(list_function, resource_key, names, domain_class):
+    """
+    Returns the neutron objects with the given names with a single
+    name-filtered list call
+    :param list_function: the neutron client's list function
+    :param resource_key: the key of the objects in the list response
+    :param names: the names of the objects to retrieve
+    :param domain_class: the SNAPS-OO domain class of the objects
+    :return: a dict of domain objects keyed by name
+    """
+    names = list(set(names))
+    out = dict()
+    if not names:
+        return out
+
+    for os_obj in list_function(**{'name': names})[resource_key]:
+        if os_obj['name'] not in out:
+            out[os_obj['name']] = domain_class(**os_obj)
+    return out
+
+
 def create_subnet(neutron, subnet_settings, os_creds, network=None):
     """
     Creates a network subnet for OpenStack
@@ -455,6 +570,26 @@ def get_ports(neutron, network, ips=None):
     return out
 
 
+def get_ports_by_networks(neutron, networks, chunk_size=100):
+    """
+    Returns the ports of many networks using one network-filtered list call
+    for each chunk of networks
+    :param neutron: the client
+    :param networks: the SNAPS-OO Network domain objects
+    :param chunk_size: the maximum number of networks in each list call
+    :return: a dict of lists of SNAPS-OO Port domain objects keyed by the
+             network ID
+    """
+    network_ids = list(set(network.id for network in networks))
+    out = dict((network_id, list()) for network_id in network_ids)
+    for i in range(0, len(network_ids), chunk_size):
+        ports = neutron.list_ports(
+            **{'network_id': network_ids[i:i + chunk_size]})
+        for port in ports['ports']:
+            out[port['network_id']].append(Port(**port))
+    return out
+
+
 def create_security_group(neutron, keystone, sec_grp_settings):
     """
     Creates a security group object in OpenStack
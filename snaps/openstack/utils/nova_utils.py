@@ -16,19 +16,19 @@
 import logging
 
 import os
-import time
 from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives import serialization
 from cryptography.hazmat.primitives.asymmetric import rsa
 from novaclient.client import Client
 from novaclient.exceptions import NotFound
 
-from snaps import file_utils
+from snaps import api_metrics, file_utils, waiter
 from snaps.domain.flavor import Flavor
 from snaps.domain.keypair import Keypair
 from snaps.domain.project import ComputeQuotas
 from snaps.domain.vm_inst import VmInst
-from snaps.openstack.utils import keystone_utils, glance_utils, neutron_utils
+from snaps.openstack.utils import (
+    client_factory, keystone_utils, glance_utils, neutron_utils)
 
 __author__ = 'spisarski'
 
@@ -47,13 +47,17 @@ def nova_client(os_creds):
     :return: the client object
     """
     logger.debug('Retrieving Nova Client')
-    return Client(os_creds.compute_api_version,
-                  session=keystone_utils.keystone_session(os_creds),
-                  region_name=os_creds.region_name)
+    client = client_factory.get_client(api_metrics.SERVICE_COMPUTE)
+    if not client:
+        client = Client(
+            os_creds.compute_api_version,
+            session=keystone_utils.keystone_session(os_creds),
+            region_name=os_creds.region_name)
+    return api_metrics.instrument(api_metrics.SERVICE_COMPUTE, client)
 
 
 def create_server(nova, neutron, glance, instance_settings, image_settings,
-                  keypair_settings=None):
+                  keypair_settings=None, boot_volume=None):
     """
     Creates a VM instance
     :param nova: the nova client (required)
@@ -62,6 +66,8 @@ def create_server(nova, neutron, glance, instance_settings, image_settings,
     :param instance_settings: the VM instance settings object (required)
     :param image_settings: the VM's image settings object (required)
     :param keypair_settings: the VM's keypair settings object (optional)
+    :param boot_volume: the domain Volume object from which the VM boots
+                        instead of the image (optional)
     :return: a snaps.domain.VmInst object
     """
 
@@ -86,8 +92,10 @@ def create_server(nova, neutron, glance, instance_settings, image_settings,
         raise NovaException(
             'Flavor not found with name - %s', instance_settings.flavor)
 
-    image = glance_utils.get_image(glance, image_settings=image_settings)
-    if image:
+    image = None
+    if not boot_volume:
+        image = glance_utils.get_image(glance, image_settings=image_settings)
+    if image or boot_volume:
         userdata = None
         if instance_settings.userdata:
             if isinstance(instance_settings.userdata, str):
@@ -112,6 +120,13 @@ def create_server(nova, neutron, glance, instance_settings, image_settings,
         if instance_settings.availability_zone:
             args['availability_zone'] = instance_settings.availability_zone
 
+        if boot_volume:
+            args['block_device_mapping_v2'] = [{
+                'uuid': boot_volume.id, 'source_type': 'volume',
+                'destination_type': 'volume', 'boot_index': 0,
+                'delete_on_termination':
+                    instance_settings.delete_boot_volume}]
+
         server = nova.servers.create(**args)
 
         return __map_os_server_obj_to_vm_inst(server)
@@ -180,9 +195,14 @@ def __map_os_server_obj_to_vm_inst(os_server):
     if hasattr(os_server, 'os-extended-volumes:volumes_attached'):
         volumes = getattr(os_server, 'os-extended-volumes:volumes_attached')
 
+    # Servers booted from a volume have no image
+    image_id = None
+    if os_server.image:
+        image_id = os_server.image['id']
+
     return VmInst(
         name=os_server.name, inst_id=os_server.id,
-        image_id=os_server.image['id'], flavor_id=os_server.flavor['id'],
+        image_id=image_id, flavor_id=os_server.flavor['id'],
         networks=os_server.networks, keypair_name=os_server.key_name,
         sec_grp_names=sec_grp_names, volume_ids=volumes)
 
@@ -255,6 +275,43 @@ def get_server_object_by_id(nova, server_id):
     return __map_os_server_obj_to_vm_inst(server)
 
 
+def get_servers_by_ids(nova, server_ids):
+    """
+    Returns the servers with the given IDs with a single list call
+    :param nova: the Nova client
+    :param server_ids: the IDs of the servers to retrieve
+    :return: a list of SNAPS-OO VmInst objects in the order of server_ids
+             where the servers that cannot be found are left out
+    """
+    server_ids = list(server_ids)
+    wanted = set(server_ids)
+    found = dict()
+    for os_server in nova.servers.list():
+        if os_server.id in wanted:
+            found[os_server.id] = __map_os_server_obj_to_vm_inst(os_server)
+    return [found[server_id] for server_id in server_ids
+            if server_id in found]
+
+
+def get_servers_by_names(nova, server_names):
+    """
+    Returns the servers with the given names with a single list call
+    :param nova: the Nova client
+    :param server_names: the names of the servers to retrieve
+    :return: a dict of SNAPS-OO VmInst objects keyed by name where the first
+             server listed wins when names are duplicated
+    """
+    server_names = set(server_names)
+    out = dict()
+    if not server_names:
+        return out
+
+    for os_server in nova.servers.list():
+        if os_server.name in server_names and os_server.name not in out:
+            out[os_server.name] = __map_os_server_obj_to_vm_inst(os_server)
+    return out
+
+
 def get_server_security_group_names(nova, server):
     """
     Returns a server with a given id
@@ -419,6 +476,26 @@ def get_keypair_by_name(nova, name):
     return None
 
 
+def get_keypairs_by_names(nova, names):
+    """
+    Returns the keypairs with the given names with a single list call
+    :param nova: the Nova client
+    :param names: the names of the keypairs to retrieve
+    :return: a dict of SNAPS-OO Keypair objects keyed by name
+    """
+    names = set(names)
+    out = dict()
+    if not names:
+        return out
+
+    for keypair in nova.keypairs.list():
+        if keypair.name in names:
+            out[keypair.name] = Keypair(
+                name=keypair.name, kp_id=keypair.id,
+                public_key=keypair.public_key)
+    return out
+
+
 def delete_keypair(nova, key):
     """
     Deletes a keypair object from OpenStack
@@ -534,6 +611,30 @@ def get_flavor_by_name(nova, name):
             rxtx_factor=os_flavor.rxtx_factor, is_public=os_flavor.is_public)
 
 
+def get_flavors_by_names(nova, names):
+    """
+    Returns the flavors with the given names with a single list call
+    :param nova: the Nova client
+    :param names: the names of the flavors to retrieve
+    :return: a dict of SNAPS Flavor domain objects keyed by name where the
+             first flavor listed wins when names are duplicated
+    """
+    names = set(names)
+    out = dict()
+    if not names:
+        return out
+
+    for os_flavor in nova.flavors.list(is_public=None):
+        if os_flavor.name in names and os_flavor.name not in out:
+            out[os_flavor.name] = Flavor(
+                name=os_flavor.name, id=os_flavor.id, ram=os_flavor.ram,
+                disk=os_flavor.disk, vcpus=os_flavor.vcpus,
+                ephemeral=os_flavor.ephemeral, swap=os_flavor.swap,
+                rxtx_factor=os_flavor.rxtx_factor,
+                is_public=os_flavor.is_public)
+    return out
+
+
 def create_flavor(nova, flavor_settings):
     """
     Creates and returns and OpenStack flavor object
@@ -666,13 +767,19 @@ def attach_volume(nova, server, volume, timeout=None):
     nova.volumes.create_server_volume(server.id, volume.id)
 
     if timeout:
-        start_time = time.time()
-        while time.time() < start_time + timeout:
+        attached = list()
+
+        def is_attached():
             vm = get_server_object_by_id(nova, server.id)
             for vol_dict in vm.volume_ids:
                 if volume.id == vol_dict['id']:
-                    return vm
+                    attached.append(vm)
+                    return True
+            return False
 
+        if waiter.wait_for('vm_volume', volume.name, is_attached, timeout,
+                           expected='attached'):
+            return attached[-1]
         return None
     else:
         return get_server_object_by_id(nova, server.id)
@@ -691,17 +798,19 @@ def detach_volume(nova, server, volume, timeout=None):
     nova.volumes.delete_server_volume(server.id, volume.id)
 
     if timeout:
-        start_time = time.time()
-        while time.time() < start_time + timeout:
+        detached = list()
+
+        def is_detached():
             vm = get_server_object_by_id(nova, server.id)
-            found = False
             for vol_dict in vm.volume_ids:
                 if volume.id == vol_dict['id']:
-                    found = True
-
-            if not found:
-                return vm
+                    return False
+            detached.append(vm)
+            return True
 
+        if waiter.wait_for('vm_volume', volume.name, is_detached, timeout,
+                           expected='detached'):
+            return detached[-1]
         return None
     else:
         return get_server_object_by_id(nova, server.id)
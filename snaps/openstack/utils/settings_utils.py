@@ -109,29 +109,128 @@ def create_volume_type_settings(volume_type):
         qos_spec_name=qos_spec_name, public=volume_type.public)
 
 
-def create_vm_inst_settings(nova, neutron, server):
+def get_server_resource_index(nova, neutron, glance, servers):
+    """
+    Retrieves once the flavors, images, networks, ports, floating IPs,
+    routers and subnets referenced by many servers so their settings can be
+    created without querying OpenStack for each server
+    :param nova: the nova client
+    :param neutron: the neutron client
+    :param glance: the glance client
+    :param servers: a list of SNAPS-OO VmInst domain objects
+    :return: a dict of the retrieved domain objects keyed by 'flavors' and
+             'images' (dicts keyed by ID), 'networks' (dict keyed by name),
+             'ports' (dict of lists keyed by network ID), 'floating_ips'
+             (list), 'routers' and 'subnets' (dicts keyed by ID)
+    """
+    out = dict()
+
+    out['flavors'] = dict()
+    for flavor_id in set(server.flavor_id for server in servers):
+        out['flavors'][flavor_id] = nova_utils.get_flavor_by_id(
+            nova, flavor_id)
+
+    out['images'] = dict()
+    for image_id in set(server.image_id for server in servers):
+        if image_id:
+            out['images'][image_id] = glance_utils.get_image_by_id(
+                glance, image_id)
+
+    net_names = set()
+    for server in servers:
+        net_names.update(server.networks.keys())
+    out['networks'] = neutron_utils.get_networks_by_names(neutron, net_names)
+    out['ports'] = neutron_utils.get_ports_by_networks(
+        neutron, out['networks'].values())
+
+    ports_by_id = dict()
+    for ports in out['ports'].values():
+        for port in ports:
+            ports_by_id[port.id] = port
+
+    out['floating_ips'] = list()
+    out['routers'] = dict()
+    out['subnets'] = dict()
+    for floating_ip in neutron_utils.get_floating_ips(neutron):
+        port = ports_by_id.get(floating_ip.port_id)
+        if not port:
+            continue
+
+        out['floating_ips'].append(floating_ip)
+        if floating_ip.router_id not in out['routers']:
+            out['routers'][floating_ip.router_id] = (
+                neutron_utils.get_router_by_id(neutron, floating_ip.router_id))
+        for ip_dict in port.ips:
+            subnet_id = ip_dict.get('subnet_id')
+            if subnet_id and subnet_id not in out['subnets']:
+                out['subnets'][subnet_id] = neutron_utils.get_subnet_by_id(
+                    neutron, subnet_id)
+
+    return out
+
+
+def create_vm_inst_settings(nova, neutron, server, resource_index=None):
     """
     Returns a NetworkSettings object
     :param nova: the nova client
     :param neutron: the neutron client
     :param server: a SNAPS-OO VmInst domain object
+    :param resource_index: the dict returned by get_server_resource_index()
+                           from which the server's resources are read instead
+                           of querying OpenStack (optional)
     :return:
     """
-
-    flavor_name = nova_utils.get_flavor_by_id(nova, server.flavor_id)
-
     kwargs = dict()
     kwargs['name'] = server.name
-    kwargs['flavor'] = flavor_name
-    kwargs['port_settings'] = __create_port_settings(
-        neutron, server.networks)
     kwargs['security_group_names'] = server.sec_grp_names
-    kwargs['floating_ip_settings'] = __create_floatingip_settings(
-        neutron, kwargs['port_settings'])
+
+    if resource_index is not None:
+        kwargs['flavor'] = resource_index['flavors'].get(server.flavor_id)
+        kwargs['port_settings'] = __create_port_settings_from_index(
+            resource_index, server.networks)
+        kwargs['floating_ip_settings'] = (
+            __create_floatingip_settings_from_index(
+                resource_index, kwargs['port_settings']))
+    else:
+        kwargs['flavor'] = nova_utils.get_flavor_by_id(nova, server.flavor_id)
+        kwargs['port_settings'] = __create_port_settings(
+            neutron, server.networks)
+        kwargs['floating_ip_settings'] = __create_floatingip_settings(
+            neutron, kwargs['port_settings'])
 
     return VmInstanceSettings(**kwargs)
 
 
+def get_vm_inst_ports(resource_index, vm_inst_settings):
+    """
+    Returns the ports of a server from the resource index
+    :param resource_index: the dict returned by get_server_resource_index()
+    :param vm_inst_settings: the server's VmInstanceSettings as returned by
+                             create_vm_inst_settings()
+    :return: a list of tuple 2 where index 0 is the port name and index 1 is
+             the SNAPS-OO Port object
+    """
+    out = list()
+    for port_setting in vm_inst_settings.port_settings:
+        port = __get_index_port(resource_index, port_setting)
+        if port:
+            out.append((port_setting.name, port))
+    return out
+
+
+def get_vm_inst_floating_ips(resource_index, ports):
+    """
+    Returns the floating IPs of a server's ports from the resource index
+    :param resource_index: the dict returned by get_server_resource_index()
+    :param ports: the server's ports as returned by get_vm_inst_ports()
+    :return: a list of tuple 2 (port_id, SNAPS FloatingIp) objects
+    """
+    port_ids = set(port.id for port_name, port in ports)
+    return [(floating_ip.port_id, floating_ip)
+            for floating_ip in resource_index['floating_ips']
+            if floating_ip.port_id in port_ids]
+
+
 def __create_port_settings(neutron, networks):
     """
     Returns a list of port settings based on the networks parameter
@@ -158,6 +257,100 @@ def __create_port_settings(neutron, networks):
     return out
 
 
+def __create_port_settings_from_index(resource_index, networks):
+    """
+    Returns a list of port settings based on the networks parameter from the
+    resource index
+    :param resource_index: the dict returned by get_server_resource_index()
+    :param networks: a dict where the key is the network name and the value
+                     is a list of IP addresses
+    :return:
+    """
+    out = list()
+
+    for net_name, ips in networks.items():
+        network = resource_index['networks'].get(net_name)
+        if not network:
+            continue
+
+        for port in resource_index['ports'].get(network.id, list()):
+            if ips and not [ip_dict for ip_dict in port.ips
+                            if ip_dict.get('ip_address') in ips]:
+                continue
+
+            kwargs = dict()
+            if port.name:
+                kwargs['name'] = port.name
+            kwargs['network_name'] = network.name
+            kwargs['mac_address'] = port.mac_address
+            kwargs['allowed_address_pairs'] = port.allowed_address_pairs
+            kwargs['admin_state_up'] = port.admin_state_up
+            out.append(PortSettings(**kwargs))
+
+    return out
+
+
+def __get_index_port(resource_index, port_setting):
+    """
+    Returns the port from the resource index matching a port setting created
+    by __create_port_settings_from_index()
+    :param resource_index: the dict returned by get_server_resource_index()
+    :param port_setting: the PortSettings object
+    :return: the SNAPS-OO Port domain object or None
+    """
+    network = resource_index['networks'].get(port_setting.network_name)
+    if network:
+        for port in resource_index['ports'].get(network.id, list()):
+            if port.mac_address == port_setting.mac_address:
+                return port
+
+
+def __create_floatingip_settings_from_index(resource_index, port_settings):
+    """
+    Returns a list of FloatingIPSettings objects as they pertain to an
+    existing deployed server instance from the resource index
+    :param resource_index: the dict returned by get_server_resource_index()
+    :param port_settings: list of SNAPS-OO PortSettings objects
+    :return: a list of FloatingIPSettings objects or an empty list if no
+             floating IPs have been created
+    """
+    base_fip_name = 'fip-'
+    fip_ctr = 1
+    out = list()
+
+    ports = dict()
+    for port_setting in port_settings:
+        port = __get_index_port(resource_index, port_setting)
+        if port:
+            ports[port.id] = port
+
+    for floating_ip in resource_index['floating_ips']:
+        setting_port = ports.get(floating_ip.port_id)
+        if not setting_port:
+            continue
+
+        router = resource_index['routers'][floating_ip.router_id]
+        kwargs = dict()
+        kwargs['name'] = base_fip_name + str(fip_ctr)
+        kwargs['port_name'] = setting_port.name
+        kwargs['port_id'] = setting_port.id
+        kwargs['router_name'] = router.name
+
+        for ip_dict in setting_port.ips:
+            if ('ip_address' in ip_dict and
+                    'subnet_id' in ip_dict and
+                    ip_dict['ip_address'] == floating_ip.fixed_ip_address):
+                subnet = resource_index['subnets'].get(ip_dict['subnet_id'])
+                if subnet:
+                    kwargs['subnet_name'] = subnet.name
+
+        out.append(FloatingIpSettings(**kwargs))
+
+        fip_ctr += 1
+
+    return out
+
+
 def __create_floatingip_settings(neutron, port_settings):
     """
     Returns a list of FloatingIPSettings objects as they pertain to an
@@ -213,24 +406,31 @@ def __create_floatingip_settings(neutron, port_settings):
     return out
 
 
-def determine_image_settings(glance, server, image_settings):
+def determine_image_settings(glance, server, image_settings,
+                             resource_index=None):
     """
     Returns a ImageSettings object from the list that matches the name in one
     of the image_settings parameter
     :param glance: the glance client
     :param server: a SNAPS-OO VmInst domain object
     :param image_settings: list of ImageSettings objects
+    :param resource_index: the dict returned by get_server_resource_index()
+                           from which the server's image is read instead of
+                           querying OpenStack (optional)
     :return: ImageSettings or None
     """
     if image_settings:
-        for image_setting in image_settings:
+        if resource_index is not None:
+            image = resource_index['images'].get(server.image_id)
+        else:
             image = glance_utils.get_image_by_id(glance, server.image_id)
+        for image_setting in image_settings:
             if image and image.name == image_setting.name:
                 return image_setting
 
 
 def determine_keypair_settings(heat_cli, stack, server, keypair_settings=None,
-                               priv_key_key=None):
+                               priv_key_key=None, outputs=None):
     """
     Returns a KeypairSettings object from the list that matches the
     server.keypair_name value in the keypair_settings parameter if not None,
@@ -242,6 +442,8 @@ def determine_keypair_settings(heat_cli, stack, server, keypair_settings=None,
     :param server: a SNAPS-OO VmInst domain object
     :param keypair_settings: list of KeypairSettings objects
     :param priv_key_key: the stack options that holds the private key value
+    :param outputs: the stack's outputs as returned by heat_utils.get_outputs()
+                    to avoid retrieving them again (optional)
     :return: KeypairSettings or None
     """
     # Existing keypair being used by Heat Template
@@ -252,7 +454,8 @@ def determine_keypair_settings(heat_cli, stack, server, keypair_settings=None,
 
     # Keypair created by Heat template
     if priv_key_key:
-        outputs = heat_utils.get_outputs(heat_cli, stack)
+        if outputs is None:
+            outputs = heat_utils.get_outputs(heat_cli, stack)
         for output in outputs:
             if output.key == priv_key_key:
                 # Save to file
@@ -73,12 +73,29 @@ class CinderUtilsVolumeTests(OSComponentTestCase):
         guid = uuid.uuid4()
         self.volume_name = self.__class__.__name__ + '-' + str(guid)
         self.volume = None
+        self.snapshot = None
+        self.clone = None
         self.cinder = cinder_utils.cinder_client(self.os_creds)
 
     def tearDown(self):
         """
         Cleans the remote OpenStack objects
         """
+        if self.clone:
+            try:
+                cinder_utils.delete_volume(self.cinder, self.clone)
+            except NotFound:
+                pass
+            self.assertTrue(volume_deleted(self.cinder, self.clone))
+
+        if self.snapshot:
+            try:
+                cinder_utils.delete_volume_snapshot(
+                    self.cinder, self.snapshot)
+            except NotFound:
+                pass
+            self.assertTrue(snapshot_deleted(self.cinder, self.snapshot))
+
         if self.volume:
             try:
                 cinder_utils.delete_volume(self.cinder, self.volume)
@@ -126,6 +143,44 @@ class CinderUtilsVolumeTests(OSComponentTestCase):
         self.assertIsNone(
             cinder_utils.get_volume(self.cinder, volume_settings))
 
+    def test_create_volume_from_snapshot(self):
+        """
+        Tests the cinder_utils.create_volume_snapshot() and
+        cinder_utils.create_volume() with a snapshot_name
+        """
+        self.volume = cinder_utils.create_volume(
+            self.cinder, VolumeSettings(name=self.volume_name))
+        self.assertTrue(volume_active(self.cinder, self.volume))
+
+        self.snapshot = cinder_utils.create_volume_snapshot(
+            self.cinder, self.volume, self.volume_name + '-snapshot')
+        self.assertEqual(self.volume.id, self.snapshot.volume_id)
+        self.assertTrue(snapshot_active(self.cinder, self.snapshot))
+        self.assertEqual(self.snapshot, cinder_utils.get_volume_snapshot(
+            self.cinder, self.snapshot.name))
+
+        self.clone = cinder_utils.create_volume(
+            self.cinder, VolumeSettings(
+                name=self.volume_name + '-clone',
+                snapshot_name=self.snapshot.name))
+        self.assertTrue(volume_active(self.cinder, self.clone))
+        self.assertEqual(self.volume.size, self.clone.size)
+
+    def test_create_volume_from_source_volume(self):
+        """
+        Tests the cinder_utils.create_volume() with a source_volume_name
+        """
+        self.volume = cinder_utils.create_volume(
+            self.cinder, VolumeSettings(name=self.volume_name))
+        self.assertTrue(volume_active(self.cinder, self.volume))
+
+        self.clone = cinder_utils.create_volume(
+            self.cinder, VolumeSettings(
+                name=self.volume_name + '-clone',
+                source_volume_name=self.volume_name))
+        self.assertTrue(volume_active(self.cinder, self.clone))
+        self.assertNotEqual(self.volume.id, self.clone.id)
+
 
 def volume_active(cinder, volume):
     """
@@ -167,6 +222,44 @@ def volume_deleted(cinder, volume):
     return False
 
 
+def snapshot_active(cinder, snapshot):
+    """
+    Returns true if volume snapshot becomes active
+    :param cinder:
+    :param snapshot:
+    :return:
+    """
+    end_time = time.time() + create_volume.SNAPSHOT_ACTIVE_TIMEOUT
+    while time.time() < end_time:
+        status = cinder_utils.get_volume_snapshot_status(cinder, snapshot)
+        if status == create_volume.STATUS_ACTIVE:
+            return True
+        elif status == create_volume.STATUS_FAILED:
+            return False
+        time.sleep(3)
+
+    return False
+
+
+def snapshot_deleted(cinder, snapshot):
+    """
+    Returns true if volume snapshot is deleted
+    :param cinder:
+    :param snapshot:
+    :return:
+    """
+    end_time = time.time() + create_volume.VOLUME_DELETE_TIMEOUT
+    while time.time() < end_time:
+        try:
+            cinder_utils.get_volume_snapshot_status(cinder, snapshot)
+        except NotFound:
+            return True
+
+        time.sleep(3)
+
+    return False
+
+
 class CinderUtilsQoSTests(OSComponentTestCase):
     """
     Test for the CreateQos class defined in create_qos.py
@@ -261,6 +354,22 @@ class CinderUtilsQoSTests(OSComponentTestCase):
         self.assertIsNone(cinder_utils.get_qos(
             self.cinder, qos_settings=qos_settings))
 
+    def test_get_qos_other_client(self):
+        """
+        Tests that cinder_utils.get_qos() finds a new QoS spec through
+        another client with the same credentials while the name index
+        created before it is still cached
+        """
+        qos_settings = QoSSettings(name=self.qos_name, consumer=Consumer.both)
+        self.assertIsNone(cinder_utils.get_qos(
+            self.cinder, qos_settings=qos_settings))
+
+        self.qos = cinder_utils.create_qos(self.cinder, qos_settings)
+        other_cinder = cinder_utils.cinder_client(self.os_creds)
+        qos = cinder_utils.get_qos(other_cinder, qos_settings=qos_settings)
+        self.assertIsNotNone(qos)
+        self.assertEqual(self.qos.id, qos.id)
+
 
 class CinderUtilsSimpleVolumeTypeTests(OSComponentTestCase):
     """
@@ -0,0 +1,46 @@
+# Copyright (c) 2017 Cable Television Laboratories, Inc. ("CableLabs")
+#                    and others.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import unittest
+
+from snaps import api_metrics
+from snaps.openstack.utils import client_factory
+
+__author__ = 'spisarski'
+
+
+class ClientFactoryTests(unittest.TestCase):
+    """
+    Tests the hook the client factories of the utils modules call before
+    connecting to OpenStack
+    """
+
+    def test_client_factory(self):
+        """
+        Ensures the client factory is called with the service until it is
+        removed
+        """
+        client = object()
+        client_factory.set_client_factory(
+            lambda service: client
+            if service == api_metrics.SERVICE_COMPUTE else None)
+        try:
+            self.assertTrue(client is client_factory.get_client(
+                api_metrics.SERVICE_COMPUTE))
+            self.assertIsNone(client_factory.get_client(
+                api_metrics.SERVICE_NETWORK))
+        finally:
+            client_factory.set_client_factory(None)
+        self.assertIsNone(client_factory.get_client(
+            api_metrics.SERVICE_COMPUTE))
@@ -13,11 +13,16 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 import logging
+import os
 import pkg_resources
+import shutil
+import tempfile
+import unittest
 import uuid
 
 import time
 
+from snaps import file_utils
 from snaps.openstack import create_stack
 from snaps.openstack.create_flavor import OpenStackFlavor, FlavorSettings
 
@@ -49,7 +54,7 @@ class HeatSmokeTests(OSComponentTestCase):
         # This should not throw an exception
         stacks = heat.stacks.list()
         for stack in stacks:
-            print stack
+            print(stack)
 
     def test_heat_connect_fail(self):
         """
@@ -67,7 +72,70 @@ class HeatSmokeTests(OSComponentTestCase):
         # This should throw an exception
         with self.assertRaises(Exception):
             for stack in stacks:
-                print stack
+                print(stack)
+
+
+class HeatTemplateParseTests(unittest.TestCase):
+    """
+    Tests the parsing and caching of heat templates
+    """
+
+    def setUp(self):
+        heat_utils.clear_template_cache()
+        self.tmp_dir = tempfile.mkdtemp()
+        self.template_path = os.path.join(self.tmp_dir, 'template.yaml')
+        with open(self.template_path, 'w') as template_file:
+            template_file.write(
+                'heat_template_version: 2015-04-30\n'
+                'parameters:\n'
+                '  image_name:\n'
+                '    type: string\n'
+                '    default: foo\n')
+
+    def tearDown(self):
+        heat_utils.clear_template_cache()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_parse_yaml_str(self):
+        tpl = heat_utils.parse_heat_template_str(
+            file_utils.read_file(self.template_path))
+        self.assertEqual('2015-04-30', tpl['heat_template_version'])
+        self.assertEqual(
+            'foo', tpl['parameters']['image_name']['default'])
+
+    def test_parse_json_str(self):
+        tpl = heat_utils.parse_heat_template_str(
+            '{"heat_template_version": "2015-04-30"}')
+        self.assertEqual('2015-04-30', tpl['heat_template_version'])
+
+    def test_parse_no_version(self):
+        with self.assertRaises(ValueError):
+            heat_utils.parse_heat_template_str('foo: bar\n')
+
+    def test_parsed_copies(self):
+        tpl1 = heat_utils.parse_heat_template_file(self.template_path)
+        tpl1['parameters']['image_name']['default'] = 'bar'
+
+        tpl2 = heat_utils.parse_heat_template_file(self.template_path)
+        self.assertEqual(
+            'foo', tpl2['parameters']['image_name']['default'])
+
+    def test_file_modified(self):
+        tpl1 = heat_utils.parse_heat_template_file(self.template_path)
+        self.assertEqual(
+            'foo', tpl1['parameters']['image_name']['default'])
+
+        with open(self.template_path, 'w') as template_file:
+            template_file.write(
+                'heat_template_version: 2015-04-30\n'
+                'parameters:\n'
+                '  image_name:\n'
+                '    type: string\n'
+                '    default: foobar\n')
+
+        tpl2 = heat_utils.parse_heat_template_file(self.template_path)
+        self.assertEqual(
+            'foobar', tpl2['parameters']['image_name']['default'])
 
 
 class HeatUtilsCreateSimpleStackTests(OSComponentTestCase):
@@ -186,12 +254,21 @@ class HeatUtilsCreateSimpleStackTests(OSComponentTestCase):
 
         self.assertTrue(is_active)
 
+        resource_index = heat_utils.get_resource_index(
+            self.heat_client, self.stack1)
+        self.assertEqual(
+            1, len(resource_index[heat_utils.RES_TYPE_NETWORK]))
+        self.assertEqual(1, len(resource_index[heat_utils.RES_TYPE_SERVER]))
+
         neutron = neutron_utils.neutron_client(self.os_creds)
         networks = heat_utils.get_stack_networks(
-            self.heat_client, neutron, self.stack1)
+            self.heat_client, neutron, self.stack1,
+            resource_index=resource_index)
         self.assertIsNotNone(networks)
         self.assertEqual(1, len(networks))
         self.assertEqual(self.network_name, networks[0].name)
+        self.assertEqual(resource_index[heat_utils.RES_TYPE_NETWORK][0],
+                         networks[0].id)
 
         subnets = neutron_utils.get_subnets_by_network(neutron, networks[0])
         self.assertEqual(1, len(subnets))
@@ -199,7 +276,8 @@ class HeatUtilsCreateSimpleStackTests(OSComponentTestCase):
 
         nova = nova_utils.nova_client(self.os_creds)
         servers = heat_utils.get_stack_servers(
-            self.heat_client, nova, self.stack1)
+            self.heat_client, nova, self.stack1,
+            resource_index=resource_index)
         self.assertIsNotNone(servers)
         self.assertEqual(1, len(servers))
         self.assertEqual(self.vm_inst_name, servers[0].name)
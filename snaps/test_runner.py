@@ -17,7 +17,8 @@ import json
 import logging
 import unittest
 
-from snaps import test_suite_builder, file_utils
+from snaps import (
+    api_metrics, test_suite_builder, file_utils, image_metrics, waiter)
 from snaps.openstack.tests import openstack_tests
 
 __author__ = 'spisarski'
@@ -155,10 +156,20 @@ def main(arguments):
         logger.error('Environment file or external network not defined')
         exit(1)
 
+    metrics_collector = image_metrics.ImageMetricsCollector()
+    image_metrics.add_hook(metrics_collector)
+    wait_collector = waiter.WaitMetricsCollector()
+    waiter.add_hook(wait_collector)
+    api_collector = api_metrics.ApiMetricsCollector()
+    api_metrics.add_hook(api_collector)
+
     i = 0
     while i < int(arguments.num_runs):
         result = unittest.TextTestRunner(verbosity=2).run(suite)
         i += 1
+        metrics_collector.log_summary()
+        wait_collector.log_summary()
+        api_collector.log_summary()
 
         if result.errors:
             logger.error('Number of errors in test suite - %s',
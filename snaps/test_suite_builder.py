@@ -28,13 +28,18 @@ from snaps.domain.test.project_tests import (
     ComputeQuotasDomainObjectTests, NetworkQuotasDomainObjectTests)
 from snaps.domain.test.role_tests import RoleDomainObjectTests
 from snaps.domain.test.stack_tests import (
-    StackDomainObjectTests, ResourceDomainObjectTests)
+    StackDomainObjectTests, ResourceDomainObjectTests,
+    EventDomainObjectTests)
 from snaps.domain.test.user_tests import UserDomainObjectTests
 from snaps.domain.test.vm_inst_tests import (
     VmInstDomainObjectTests, FloatingIpDomainObjectTests)
 from snaps.domain.test.volume_tests import (
     QoSSpecDomainObjectTests, VolumeTypeDomainObjectTests,
-    VolumeTypeEncryptionObjectTests, VolumeDomainObjectTests)
+    VolumeTypeEncryptionObjectTests, VolumeDomainObjectTests,
+    VolumeSnapshotDomainObjectTests)
+from snaps.openstack.tests.api_call_count_tests import ApiCallCountTests
+from snaps.openstack.tests.benchmark_tests import (
+    BenchmarkSettingsUnitTests, BenchmarkTests)
 from snaps.openstack.tests.conf.os_credentials_tests import (
     ProxySettingsUnitTests, OSCredsUnitTests)
 from snaps.openstack.tests.create_flavor_tests import (
@@ -67,28 +72,37 @@ from snaps.openstack.tests.create_security_group_tests import (
     CreateSecurityGroupTests, SecurityGroupRuleSettingsUnitTests,
     SecurityGroupSettingsUnitTests)
 from snaps.openstack.tests.create_stack_tests import (
-    StackSettingsUnitTests, CreateStackSuccessTests, CreateStackNegativeTests,
-    CreateStackFloatingIpTests, CreateStackVolumeTests)
+    StackSettingsUnitTests, StackEventWaiterTests, CreateStackSuccessTests,
+    CreateStackNegativeTests, CreateStackFloatingIpTests,
+    CreateStackVolumeTests, CreateStackGroupTests)
 from snaps.openstack.tests.create_user_tests import (
     UserSettingsUnitTests, CreateUserSuccessTests)
 from snaps.openstack.tests.create_volume_tests import (
     VolumeSettingsUnitTests, CreateSimpleVolumeSuccessTests,
     CreateVolumeWithTypeTests, CreateVolumeWithImageTests,
-    CreateSimpleVolumeFailureTests)
+    CreateSimpleVolumeFailureTests, CreateVolumeGroupTests,
+    CreateVolumeCloneTests)
 from snaps.openstack.tests.create_volume_type_tests import (
     VolumeTypeSettingsUnitTests, CreateSimpleVolumeTypeSuccessTests,
     CreateVolumeTypeComplexTests)
+from snaps.openstack.tests.deployment_tests import DeploymentGraphTests
+from snaps.openstack.tests.fake_cloud_tests import FakeCloudTests
+from snaps.openstack.tests.journal_tests import DeploymentJournalTests
+from snaps.openstack.tests.plan_tests import PlanTests
 from snaps.openstack.tests.os_source_file_test import (
     OSComponentTestCase, OSIntegrationTestCase)
 from snaps.openstack.utils.tests.cinder_utils_tests import (
     CinderSmokeTests, CinderUtilsQoSTests, CinderUtilsSimpleVolumeTypeTests,
     CinderUtilsAddEncryptionTests, CinderUtilsVolumeTypeCompleteTests,
     CinderUtilsVolumeTests)
+from snaps.openstack.utils.tests.client_factory_tests import (
+    ClientFactoryTests)
 from snaps.openstack.utils.tests.glance_utils_tests import (
     GlanceSmokeTests, GlanceUtilsTests)
 from snaps.openstack.utils.tests.heat_utils_tests import (
     HeatSmokeTests, HeatUtilsCreateSimpleStackTests,
-    HeatUtilsCreateComplexStackTests, HeatUtilsVolumeTests)
+    HeatUtilsCreateComplexStackTests, HeatUtilsVolumeTests,
+    HeatTemplateParseTests)
 from snaps.openstack.utils.tests.keystone_utils_tests import (
     KeystoneSmokeTests, KeystoneUtilsTests)
 from snaps.openstack.utils.tests.neutron_utils_tests import (
@@ -102,7 +116,14 @@ from snaps.openstack.utils.tests.settings_utils_tests import (
     SettingsUtilsVolumeTests)
 from snaps.provisioning.tests.ansible_utils_tests import (
     AnsibleProvisioningTests)
-from snaps.tests.file_utils_tests import FileUtilsTests
+from snaps.tests.file_utils_tests import (
+    FileUtilsTests, FileUtilsDownloadTests)
+from snaps.tests.image_metrics_tests import ImageMetricsTests
+from snaps.tests.waiter_tests import WaiterTests
+from snaps.tests.api_metrics_tests import ApiMetricsTests
+from snaps.tests.trace_tests import TraceRecorderTests
+from snaps.tests.concurrency_tests import ConcurrencyTests
+from snaps.tests.hooks_tests import HooksTests
 
 __author__ = 'spisarski'
 
@@ -114,6 +135,21 @@ def add_unit_tests(suite):
     :return: None as the tests will be adding to the 'suite' parameter object
     """
     suite.addTest(unittest.TestLoader().loadTestsFromTestCase(FileUtilsTests))
+    suite.addTest(unittest.TestLoader().loadTestsFromTestCase(
+        FileUtilsDownloadTests))
+    suite.addTest(unittest.TestLoader().loadTestsFromTestCase(
+        ImageMetricsTests))
+    suite.addTest(unittest.TestLoader().loadTestsFromTestCase(WaiterTests))
+    suite.addTest(unittest.TestLoader().loadTestsFromTestCase(
+        ApiMetricsTests))
+    suite.addTest(unittest.TestLoader().loadTestsFromTestCase(
+        ClientFactoryTests))
+    suite.addTest(unittest.TestLoader().loadTestsFromTestCase(
+        TraceRecorderTests))
+    suite.addTest(unittest.TestLoader().loadTestsFromTestCase(
+        ConcurrencyTests))
+    suite.addTest(unittest.TestLoader().loadTestsFromTestCase(
+        HooksTests))
     suite.addTest(unittest.TestLoader().loadTestsFromTestCase(
         SecurityGroupRuleSettingsUnitTests))
     suite.addTest(unittest.TestLoader().loadTestsFromTestCase(
@@ -180,14 +216,35 @@ def add_unit_tests(suite):
         StackDomainObjectTests))
     suite.addTest(unittest.TestLoader().loadTestsFromTestCase(
         ResourceDomainObjectTests))
+    suite.addTest(unittest.TestLoader().loadTestsFromTestCase(
+        EventDomainObjectTests))
     suite.addTest(unittest.TestLoader().loadTestsFromTestCase(
         StackSettingsUnitTests))
+    suite.addTest(unittest.TestLoader().loadTestsFromTestCase(
+        StackEventWaiterTests))
+    suite.addTest(unittest.TestLoader().loadTestsFromTestCase(
+        HeatTemplateParseTests))
+    suite.addTest(unittest.TestLoader().loadTestsFromTestCase(
+        DeploymentGraphTests))
+    suite.addTest(unittest.TestLoader().loadTestsFromTestCase(PlanTests))
+    suite.addTest(unittest.TestLoader().loadTestsFromTestCase(
+        DeploymentJournalTests))
+    suite.addTest(unittest.TestLoader().loadTestsFromTestCase(
+        ApiCallCountTests))
+    suite.addTest(unittest.TestLoader().loadTestsFromTestCase(
+        FakeCloudTests))
+    suite.addTest(unittest.TestLoader().loadTestsFromTestCase(
+        BenchmarkSettingsUnitTests))
+    suite.addTest(unittest.TestLoader().loadTestsFromTestCase(
+        BenchmarkTests))
     suite.addTest(unittest.TestLoader().loadTestsFromTestCase(
         VolumeTypeDomainObjectTests))
     suite.addTest(unittest.TestLoader().loadTestsFromTestCase(
         VolumeTypeEncryptionObjectTests))
     suite.addTest(unittest.TestLoader().loadTestsFromTestCase(
         VolumeDomainObjectTests))
+    suite.addTest(unittest.TestLoader().loadTestsFromTestCase(
+        VolumeSnapshotDomainObjectTests))
     suite.addTest(unittest.TestLoader().loadTestsFromTestCase(
         QoSSpecDomainObjectTests))
     suite.addTest(unittest.TestLoader().loadTestsFromTestCase(
@@ -463,6 +520,16 @@ def add_openstack_integration_tests(suite, os_creds, ext_net_name,
         ext_net_name=ext_net_name, use_keystone=use_keystone,
         flavor_metadata=flavor_metadata, image_metadata=image_metadata,
         log_level=log_level))
+    suite.addTest(OSIntegrationTestCase.parameterize(
+        CreateVolumeGroupTests, os_creds=os_creds,
+        ext_net_name=ext_net_name, use_keystone=use_keystone,
+        flavor_metadata=flavor_metadata, image_metadata=image_metadata,
+        log_level=log_level))
+    suite.addTest(OSIntegrationTestCase.parameterize(
+        CreateVolumeCloneTests, os_creds=os_creds,
+        ext_net_name=ext_net_name, use_keystone=use_keystone,
+        flavor_metadata=flavor_metadata, image_metadata=image_metadata,
+        log_level=log_level))
 
     # VM Instances
     suite.addTest(OSIntegrationTestCase.parameterize(
@@ -515,6 +582,11 @@ def add_openstack_integration_tests(suite, os_creds, ext_net_name,
         use_keystone=use_keystone,
         flavor_metadata=flavor_metadata, image_metadata=image_metadata,
         log_level=log_level))
+    suite.addTest(OSIntegrationTestCase.parameterize(
+        CreateStackGroupTests, os_creds=os_creds, ext_net_name=ext_net_name,
+        use_keystone=use_keystone,
+        flavor_metadata=flavor_metadata, image_metadata=image_metadata,
+        log_level=log_level))
     suite.addTest(OSIntegrationTestCase.parameterize(
         CreateStackNegativeTests, os_creds=os_creds, ext_net_name=ext_net_name,
         use_keystone=use_keystone,
@@ -0,0 +1,174 @@
+# Copyright (c) 2017 Cable Television Laboratories, Inc. ("CableLabs")
+#                    and others.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from snaps import api_metrics
+
+__author__ = 'spisarski'
+
+
+class NotFoundError(Exception):
+    """
+    Error raised by the fake client carrying an HTTP status code
+    """
+    code = 404
+
+
+class FakeServerManager(object):
+    """
+    Resource manager of the fake client
+    """
+
+    def list(self):
+        return ['server-1', 'server-2']
+
+    def get(self, server_id):
+        raise NotFoundError(server_id)
+
+    def generate(self):
+        for item in ('a', 'b', 'c'):
+            yield item
+
+    def generate_error(self):
+        yield 'a'
+        raise NotFoundError('b')
+
+
+class FakeClient(object):
+    """
+    Client standing in for one of the OpenStack clients
+    """
+
+    def __init__(self):
+        self.version = '2'
+        self.servers = FakeServerManager()
+
+    def list_networks(self):
+        return {'networks': [{'id': '1'}, {'id': '2'}, {'id': '3'}]}
+
+
+class ApiMetricsTests(unittest.TestCase):
+    """
+    Tests the instrumented clients and the hooks in api_metrics.py
+    """
+
+    def setUp(self):
+        self.collector = api_metrics.ApiMetricsCollector()
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        api_metrics.remove_hook(self.collector)
+        shutil.rmtree(self.tmp_dir)
+
+    def test_disabled(self):
+        """
+        Ensures clients are not wrapped while no hook is registered
+        """
+        self.assertFalse(api_metrics.is_enabled())
+        client = FakeClient()
+        self.assertTrue(client is api_metrics.instrument(
+            api_metrics.SERVICE_COMPUTE, client))
+
+    def test_calls(self):
+        """
+        Ensures the calls through a client and its managers are reported
+        with their status and number of items while other attributes are
+        passed through
+        """
+        api_metrics.add_hook(self.collector)
+        client = api_metrics.instrument(api_metrics.SERVICE_COMPUTE,
+                                        FakeClient())
+
+        self.assertEqual('2', client.version)
+        client.version = '3'
+        self.assertEqual('3', client.version)
+
+        self.assertEqual(['server-1', 'server-2'], client.servers.list())
+        client.servers.list()
+        self.assertEqual(3, len(client.list_networks()['networks']))
+        self.assertEqual(['a', 'b', 'c'], list(client.servers.generate()))
+        with self.assertRaises(NotFoundError):
+            client.servers.get('foo')
+
+        metrics = dict((metrics.operation, metrics)
+                       for metrics in self.collector.get_metrics())
+        self.assertEqual(
+            set(['servers.list', 'list_networks', 'servers.generate',
+                 'servers.get']), set(metrics.keys()))
+        self.assertEqual(2, metrics['servers.list'].calls)
+        self.assertEqual(4, metrics['servers.list'].items)
+        self.assertEqual(3, metrics['list_networks'].items)
+        self.assertEqual(3, metrics['servers.generate'].items)
+        self.assertEqual(1, metrics['servers.get'].errors)
+        self.assertEqual(5, self.collector.get_call_count())
+        self.assertEqual(5, self.collector.get_call_count(
+            api_metrics.SERVICE_COMPUTE))
+        self.assertEqual(0, self.collector.get_call_count(
+            api_metrics.SERVICE_NETWORK))
+        self.assertTrue('servers.list' in self.collector.summary())
+
+    def test_generators(self):
+        """
+        Ensures generators are returned unread and are reported once they
+        are exhausted, closed or raise
+        """
+        api_metrics.add_hook(self.collector)
+        client = api_metrics.instrument(api_metrics.SERVICE_IMAGE,
+                                        FakeClient())
+
+        items = client.servers.generate()
+        self.assertEqual('a', next(items))
+        self.assertEqual(0, self.collector.get_call_count())
+        items.close()
+        self.assertEqual(1, self.collector.get_call_count())
+
+        items = client.servers.generate_error()
+        with self.assertRaises(NotFoundError):
+            list(items)
+
+        metrics = dict((metrics.operation, metrics)
+                       for metrics in self.collector.get_metrics())
+        self.assertEqual(1, metrics['servers.generate'].calls)
+        self.assertEqual(1, metrics['servers.generate'].items)
+        self.assertEqual(0, metrics['servers.generate'].errors)
+        self.assertEqual(1, metrics['servers.generate_error'].items)
+        self.assertEqual(1, metrics['servers.generate_error'].errors)
+
+    def test_json_writer(self):
+        """
+        Ensures the JSON writer appends one line per call
+        """
+        path = os.path.join(self.tmp_dir, 'calls.json')
+        writer = api_metrics.ApiCallJsonWriter(path)
+        api_metrics.add_hook(writer)
+        try:
+            client = api_metrics.instrument(api_metrics.SERVICE_NETWORK,
+                                            FakeClient())
+            client.list_networks()
+            with self.assertRaises(NotFoundError):
+                client.servers.get('foo')
+        finally:
+            api_metrics.remove_hook(writer)
+
+        with open(path) as json_file:
+            calls = [json.loads(line) for line in json_file]
+        self.assertEqual(['list_networks', 'servers.get'],
+                         [call['operation'] for call in calls])
+        self.assertEqual(['OK', '404'], [call['status'] for call in calls])
+        self.assertEqual(api_metrics.SERVICE_NETWORK, calls[0]['service'])
@@ -0,0 +1,107 @@
+# Copyright (c) 2017 Cable Television Laboratories, Inc. ("CableLabs")
+#                    and others.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import threading
+import time
+import unittest
+
+from snaps import concurrency
+
+__author__ = 'spisarski'
+
+
+class ConcurrencyTests(unittest.TestCase):
+    """
+    Tests the bounded pool of the concurrency module
+    """
+
+    def test_results_in_order(self):
+        """
+        Tests that the results are returned in item order and that no more
+        than max_workers calls are in flight at the same time
+        """
+        lock = threading.Lock()
+        in_flight = [0, 0]
+
+        def function(item):
+            with lock:
+                in_flight[0] += 1
+                in_flight[1] = max(in_flight)
+            time.sleep(0.01)
+            with lock:
+                in_flight[0] -= 1
+            return item * 2
+
+        self.assertEqual([0, 2, 4, 6, 8, 10],
+                         concurrency.run_concurrent(function, range(6), 2))
+        self.assertEqual(2, in_flight[1])
+
+    def test_single_item(self):
+        """
+        Tests that a single item is handled in the calling thread
+        """
+        self.assertEqual([threading.current_thread()],
+                         concurrency.run_concurrent(
+                             lambda item: threading.current_thread(), [1],
+                             4))
+        self.assertEqual(list(), concurrency.run_concurrent(
+            lambda item: item, list(), 4))
+
+    def test_raise_first_error(self):
+        """
+        Tests that no call is started once one raised and that its
+        exception is raised
+        """
+        called = list()
+
+        def function(item):
+            called.append(item)
+            if item == 1:
+                raise ValueError('foo')
+
+        with self.assertRaises(ValueError):
+            concurrency.run_concurrent(function, range(10), 1)
+        self.assertEqual([0, 1], called)
+
+    def test_on_error(self):
+        """
+        Tests that every item is called when errors are handed to on_error
+        """
+        errors = list()
+
+        def function(item):
+            if item % 2:
+                raise ValueError(item)
+            return item
+
+        results = concurrency.run_concurrent(
+            function, range(5), 3,
+            on_error=lambda item, e: errors.append((item, str(e))))
+        self.assertEqual([0, None, 2, None, 4], results)
+        self.assertEqual([(1, '1'), (3, '3')], sorted(errors))
+
+    def test_run_workers(self):
+        """
+        Tests that the worker runs once in each thread
+        """
+        threads = set()
+        lock = threading.Lock()
+
+        def worker():
+            with lock:
+                threads.add(threading.current_thread())
+            time.sleep(0.01)
+
+        concurrency.run_workers(worker, 3)
+        self.assertEqual(3, len(threads))
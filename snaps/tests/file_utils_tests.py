@@ -12,12 +12,24 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import bz2
+import gzip
+import hashlib
+import mmap
 import os
 import pkg_resources
+import threading
 import unittest
 import shutil
 import uuid
 
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
 from snaps import file_utils
 from snaps.openstack.tests import openstack_tests
 
@@ -117,6 +129,146 @@ class FileUtilsTests(unittest.TestCase):
         self.assertEqual('admin', os_env_dict['OS_USERNAME'])
         self.assertEqual('admin', os_env_dict['OS_TENANT_NAME'])
 
+    def test_get_file_checksum(self):
+        """
+        Ensure the file_utils.get_file_checksum() method returns the MD5 hex
+        digest of the file's contents
+        """
+        test_file = file_utils.save_string_to_file('test string',
+                                                   self.tmpFile)
+        self.assertEqual(hashlib.md5(b'test string').hexdigest(),
+                         file_utils.get_file_checksum(test_file.name))
+
+    def test_mapped_file_reader(self):
+        """
+        Ensure the file_utils.MappedFileReader returns the whole file as
+        memoryview slices of at most the size read
+        """
+        contents = os.urandom(100000)
+        with open(self.tmpFile, 'wb') as the_file:
+            the_file.write(contents)
+
+        with file_utils.MappedFileReader(self.tmpFile, 1000) as reader:
+            self.assertEqual(0, reader.chunk_size % mmap.ALLOCATIONGRANULARITY)
+            self.assertEqual(len(contents), reader.size)
+
+            chunk = reader.read(10)
+            self.assertIsInstance(chunk, memoryview)
+            self.assertEqual(contents[:10], bytes(chunk))
+            self.assertEqual(10, reader.tell())
+
+            reader.seek(0)
+            pieces = list(reader)
+            self.assertEqual(reader.chunk_size, len(pieces[0]))
+            self.assertEqual(contents, b''.join(
+                bytes(piece) for piece in pieces))
+            self.assertEqual(0, len(reader.read()))
+
+            reader.seek(-10, os.SEEK_END)
+            self.assertEqual(contents[-10:], bytes(reader.read()))
+
+    def test_get_compression(self):
+        """
+        Ensure compression types are derived from file and URL extensions
+        """
+        self.assertEqual(file_utils.COMPRESSION_GZIP,
+                         file_utils.get_compression('/foo/bar.img.gz'))
+        self.assertEqual(file_utils.COMPRESSION_XZ,
+                         file_utils.get_compression('http://foo/bar.img.XZ'))
+        self.assertEqual(file_utils.COMPRESSION_BZ2,
+                         file_utils.get_compression('http://foo/b.bz2?a=b'))
+        self.assertIsNone(file_utils.get_compression('/foo/bar.qcow2'))
+        self.assertIsNone(file_utils.get_compression(None))
+        self.assertEqual('bar.img', file_utils.get_decompressed_name(
+            'http://f/bar.img.gz'))
+        self.assertEqual('bar.img',
+                         file_utils.get_decompressed_name('/foo/bar.img'))
+
+    def test_get_cache_name(self):
+        """
+        Ensure sources with the same base name are cached under different
+        names and that relative and absolute paths share one
+        """
+        name_a = file_utils.get_cache_name('http://f/a/disk.img.gz')
+        name_b = file_utils.get_cache_name('http://f/b/disk.img.gz')
+        self.assertTrue(name_a.endswith('-disk.img'))
+        self.assertTrue(name_b.endswith('-disk.img'))
+        self.assertNotEqual(name_a, name_b)
+        self.assertEqual(
+            file_utils.get_cache_name('disk.img.xz'),
+            file_utils.get_cache_name(os.path.abspath('disk.img.xz')))
+
+    def test_decompress_gzip_members(self):
+        """
+        Ensure concatenated gzip members are decompressed as one stream and
+        that the checksum covers the decompressed data
+        """
+        contents = os.urandom(200000) + b'0' * 3000000
+        with open(self.tmpFile, 'wb') as the_file:
+            the_file.write(gzip.compress(contents))
+            the_file.write(gzip.compress(contents))
+
+        with file_utils.open_decompressed(
+                file_utils.COMPRESSION_GZIP, file_path=self.tmpFile) as reader:
+            out = b''.join(iter(lambda: reader.read(65536), b''))
+            self.assertEqual(contents * 2, out)
+            self.assertEqual(len(out), reader.tell())
+            self.assertEqual(hashlib.md5(out).hexdigest(), reader.checksum())
+
+        self.assertEqual(
+            hashlib.md5(contents * 2).hexdigest(),
+            file_utils.get_file_checksum(self.tmpFile,
+                                         file_utils.COMPRESSION_GZIP))
+
+    def test_decompress_bz2_cache(self):
+        """
+        Ensure the decompressed data is cached once fully read
+        """
+        contents = os.urandom(100000)
+        with open(self.tmpFile, 'wb') as the_file:
+            the_file.write(bz2.compress(contents))
+
+        cache_path = self.test_dir + '/cache/bar.txt'
+        with file_utils.open_decompressed(
+                file_utils.COMPRESSION_BZ2, file_path=self.tmpFile,
+                cache_path=cache_path,
+                checksum=hashlib.md5(contents).hexdigest()) as reader:
+            self.assertEqual(contents, reader.read())
+            self.assertFalse(file_utils.file_exists(cache_path))
+            self.assertEqual(b'', reader.read())
+
+        with open(cache_path, 'rb') as cache_file:
+            self.assertEqual(contents, cache_file.read())
+
+    def test_decompress_truncated(self):
+        """
+        Ensure truncated compressed data raises and leaves no cache file
+        """
+        with open(self.tmpFile, 'wb') as the_file:
+            the_file.write(gzip.compress(os.urandom(100000))[:50000])
+
+        cache_path = self.test_dir + '/cache/bar.txt'
+        with self.assertRaises(file_utils.DownloadException):
+            with file_utils.open_decompressed(
+                    file_utils.COMPRESSION_GZIP, file_path=self.tmpFile,
+                    cache_path=cache_path) as reader:
+                reader.read()
+        self.assertEqual(list(), os.listdir(self.test_dir + '/cache'))
+
+    def test_decompress_bad_checksum(self):
+        """
+        Ensure a checksum mismatch raises at the end of the stream
+        """
+        with open(self.tmpFile, 'wb') as the_file:
+            the_file.write(gzip.compress(b'test string'))
+
+        with self.assertRaises(file_utils.DownloadException):
+            with file_utils.open_decompressed(
+                    file_utils.COMPRESSION_GZIP, file_path=self.tmpFile,
+                    checksum='0' * 32) as reader:
+                while reader.read(4):
+                    pass
+
     def test_write_str_to_file(self):
         """
         Ensure the file_utils.fileExists() method returns false with a
@@ -133,3 +285,215 @@ class FileUtilsTests(unittest.TestCase):
 
         file_contents = file_utils.read_file(self.tmpFile)
         self.assertEqual(test_val, file_contents)
+
+
+class RangeRequestHandler(BaseHTTPRequestHandler):
+    """
+    Minimal HTTP handler serving PAYLOAD with support for single byte range
+    requests. Class attributes control its behavior for each test
+    """
+    payload = b''
+    support_ranges = True
+    drop_after = None
+    requested_ranges = list()
+
+    def do_GET(self):
+        range_header = self.headers.get('Range')
+        self.requested_ranges.append(range_header)
+
+        start, end = 0, len(self.payload) - 1
+        if range_header and self.support_ranges:
+            first, last = range_header.split('=')[1].split('-')
+            start = int(first)
+            if last:
+                end = min(int(last), end)
+            if start > end:
+                self.send_response(416)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header('Content-Range', 'bytes %d-%d/%d' % (
+                start, end, len(self.payload)))
+        else:
+            self.send_response(200)
+
+        body = self.payload[start:end + 1]
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+
+        if self.drop_after is not None:
+            self.wfile.write(body[:self.drop_after])
+            RangeRequestHandler.drop_after = None
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class ThreadedHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class FileUtilsDownloadTests(unittest.TestCase):
+    """
+    Tests the file_utils.download() method against a local HTTP server
+    """
+
+    def setUp(self):
+        guid = self.__class__.__name__ + '-' + str(uuid.uuid4())
+        self.test_dir = '.tmp/' + guid
+        os.makedirs(self.test_dir)
+
+        RangeRequestHandler.payload = os.urandom(256 * 1024 + 7)
+        RangeRequestHandler.support_ranges = True
+        RangeRequestHandler.drop_after = None
+        RangeRequestHandler.requested_ranges = list()
+        self.checksum = hashlib.md5(RangeRequestHandler.payload).hexdigest()
+
+        self.server = ThreadedHTTPServer(
+            ('127.0.0.1', 0), RangeRequestHandler)
+        self.server_thread = threading.Thread(
+            target=self.server.serve_forever)
+        self.server_thread.daemon = True
+        self.server_thread.start()
+        self.url = 'http://127.0.0.1:%d/image.qcow2' % (
+            self.server.server_address[1])
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        if os.path.isdir(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def __read_download(self, name='image.qcow2'):
+        with open(self.test_dir + '/' + name, 'rb') as the_file:
+            return the_file.read()
+
+    def test_download(self):
+        """
+        Tests a single stream download with checksum verification
+        """
+        download_file = file_utils.download(
+            self.url, self.test_dir, checksum=self.checksum)
+        self.assertTrue(download_file.name.endswith('image.qcow2'))
+        self.assertEqual(RangeRequestHandler.payload, self.__read_download())
+        self.assertEqual([None], RangeRequestHandler.requested_ranges)
+
+    def test_download_resume(self):
+        """
+        Tests that only the missing bytes are requested when resuming from a
+        partial file
+        """
+        partial = RangeRequestHandler.payload[:1000]
+        with open(self.test_dir + '/image.qcow2', 'wb') as partial_file:
+            partial_file.write(partial)
+
+        file_utils.download(self.url, self.test_dir, resume=True,
+                            checksum=self.checksum)
+        self.assertEqual(RangeRequestHandler.payload, self.__read_download())
+        self.assertEqual(['bytes=1000-'],
+                         RangeRequestHandler.requested_ranges)
+
+    def test_download_resume_complete(self):
+        """
+        Tests that resuming an already complete file leaves it untouched
+        """
+        with open(self.test_dir + '/image.qcow2', 'wb') as full_file:
+            full_file.write(RangeRequestHandler.payload)
+
+        file_utils.download(self.url, self.test_dir, resume=True,
+                            checksum=self.checksum)
+        self.assertEqual(RangeRequestHandler.payload, self.__read_download())
+
+    def test_download_resume_no_range_support(self):
+        """
+        Tests that the download restarts from zero when the server ignores
+        the Range header
+        """
+        RangeRequestHandler.support_ranges = False
+        with open(self.test_dir + '/image.qcow2', 'wb') as partial_file:
+            partial_file.write(b'garbage')
+
+        file_utils.download(self.url, self.test_dir, resume=True,
+                            checksum=self.checksum)
+        self.assertEqual(RangeRequestHandler.payload, self.__read_download())
+
+    def test_download_retry_dropped(self):
+        """
+        Tests that a dropped connection is resumed from the last byte received
+        """
+        RangeRequestHandler.drop_after = 5000
+        file_utils.download(self.url, self.test_dir, retries=1,
+                            checksum=self.checksum)
+        self.assertEqual(RangeRequestHandler.payload, self.__read_download())
+        self.assertEqual([None, 'bytes=5000-'],
+                         RangeRequestHandler.requested_ranges)
+
+    def test_download_callback(self):
+        """
+        Tests that the callback receives each phase and retry of a download
+        """
+        events = list()
+        RangeRequestHandler.drop_after = 5000
+        file_utils.download(
+            self.url, self.test_dir, retries=1,
+            callback=lambda *args: events.append(args))
+
+        phases = [event[0] for event in events]
+        self.assertEqual(['connect', 'download', 'write', 'retry', 'connect',
+                          'download', 'write'], phases)
+        self.assertEqual(len(RangeRequestHandler.payload), sum(
+            event[2] for event in events if event[0] == 'download'))
+
+    def test_download_dropped_no_retry(self):
+        """
+        Tests that a dropped connection raises when no retries are allowed
+        """
+        RangeRequestHandler.drop_after = 5000
+        with self.assertRaises(file_utils.DownloadException):
+            file_utils.download(self.url, self.test_dir)
+
+    def test_download_segments(self):
+        """
+        Tests a segmented download fetching byte ranges in parallel
+        """
+        file_utils.download(self.url, self.test_dir, segments=4,
+                            checksum=self.checksum)
+        self.assertEqual(RangeRequestHandler.payload, self.__read_download())
+        self.assertEqual(5, len(RangeRequestHandler.requested_ranges))
+        self.assertEqual('bytes=0-0', RangeRequestHandler.requested_ranges[0])
+
+    def test_download_segments_no_range_support(self):
+        """
+        Tests that a segmented download falls back to a single stream when
+        the server does not support range requests
+        """
+        RangeRequestHandler.support_ranges = False
+        file_utils.download(self.url, self.test_dir, segments=4,
+                            checksum=self.checksum)
+        self.assertEqual(RangeRequestHandler.payload, self.__read_download())
+
+    def test_open_decompressed_url(self):
+        """
+        Tests streaming the decompressed contents of a compressed URL
+        """
+        contents = RangeRequestHandler.payload
+        RangeRequestHandler.payload = gzip.compress(contents)
+        with file_utils.open_decompressed(
+                file_utils.COMPRESSION_GZIP, url=self.url,
+                checksum=self.checksum) as reader:
+            self.assertEqual(contents, b''.join(
+                iter(lambda: reader.read(65536), b'')))
+
+    def test_download_bad_checksum(self):
+        """
+        Tests that a checksum mismatch raises and removes the file
+        """
+        with self.assertRaises(file_utils.DownloadException):
+            file_utils.download(self.url, self.test_dir, segments=2,
+                                checksum='0' * 32)
+        self.assertFalse(file_utils.file_exists(
+            self.test_dir + '/image.qcow2'))
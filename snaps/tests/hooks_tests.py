@@ -0,0 +1,100 @@
+# Copyright (c) 2017 Cable Television Laboratories, Inc. ("CableLabs")
+#                    and others.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import logging
+import unittest
+
+from snaps import hooks
+
+__author__ = 'spisarski'
+
+
+class Recorder:
+    """
+    Hook recording the arguments of each event
+    """
+
+    def __init__(self):
+        self.events = list()
+
+    def on_event(self, *args):
+        self.events.append(args)
+
+
+class Counter:
+    """
+    The metrics object of the collector tests
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+
+
+class CountingCollector(hooks.MetricsCollector):
+    """
+    Collector counting the events of each name
+    """
+
+    def __init__(self):
+        hooks.MetricsCollector.__init__(
+            self, Counter, logging.getLogger('hooks_tests'))
+
+    def on_event(self, name):
+        with self._lock:
+            self._get(name).count += 1
+
+    def summary(self):
+        return ', '.join('%s=%d' % (counter.name, counter.count)
+                         for counter in self.get_metrics())
+
+
+class HooksTests(unittest.TestCase):
+    """
+    Tests the hook registry and the metrics collector base class
+    """
+
+    def test_registry(self):
+        """
+        Tests that each hook is registered once and only the registered
+        hooks are notified
+        """
+        registry = hooks.HookRegistry()
+        self.assertFalse(registry.is_enabled())
+
+        hook = Recorder()
+        registry.add(hook)
+        registry.add(hook)
+        self.assertTrue(registry.is_enabled())
+        registry.notify('on_event', 'foo', 1)
+        self.assertEqual([('foo', 1)], hook.events)
+
+        registry.remove(hook)
+        registry.remove(hook)
+        self.assertFalse(registry.is_enabled())
+        registry.notify('on_event', 'bar', 2)
+        self.assertEqual([('foo', 1)], hook.events)
+
+    def test_collector(self):
+        """
+        Tests that a metrics object is created once per key and that the
+        metrics are returned in key order
+        """
+        collector = CountingCollector()
+        for name in ('foo', 'bar', 'foo'):
+            collector.on_event(name)
+
+        self.assertEqual(['bar', 'foo'], [
+            counter.name for counter in collector.get_metrics()])
+        self.assertEqual('bar=1, foo=2', collector.summary())
@@ -0,0 +1,75 @@
+# Copyright (c) 2017 Cable Television Laboratories, Inc. ("CableLabs")
+#                    and others.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import unittest
+
+from snaps import image_metrics
+
+__author__ = 'spisarski'
+
+
+class ImageMetricsTests(unittest.TestCase):
+    """
+    Tests the hooks and collector in image_metrics.py
+    """
+
+    def setUp(self):
+        self.collector = image_metrics.ImageMetricsCollector()
+        image_metrics.add_hook(self.collector)
+
+    def tearDown(self):
+        image_metrics.remove_hook(self.collector)
+
+    def test_no_hooks(self):
+        """
+        Ensures no download callback is created without registered hooks
+        """
+        image_metrics.remove_hook(self.collector)
+        self.assertIsNone(image_metrics.download_callback('foo'))
+        image_metrics.record_phase('foo', image_metrics.PHASE_UPLOAD, 1, 1)
+        self.assertEqual(list(), self.collector.get_metrics())
+
+    def test_record(self):
+        """
+        Ensures phases, retries and time to active are accumulated per image
+        """
+        mb = 1024 * 1024
+        callback = image_metrics.download_callback('foo')
+        callback(image_metrics.PHASE_CONNECT, 0.5, 0)
+        callback(image_metrics.PHASE_DOWNLOAD, 2.0, 10 * mb)
+        callback(image_metrics.PHASE_RETRY, 0, 0)
+        callback(image_metrics.PHASE_DOWNLOAD, 2.0, 10 * mb)
+        image_metrics.record_phase('foo', image_metrics.PHASE_UPLOAD, 4.0,
+                                   20 * mb)
+        image_metrics.record_active('foo', 12.0)
+        image_metrics.record_phase('bar', image_metrics.PHASE_UPLOAD, 1.0,
+                                   mb)
+
+        metrics = self.collector.get_metrics()
+        self.assertEqual(['bar', 'foo'], [m.name for m in metrics])
+
+        foo = metrics[1]
+        self.assertEqual(0.5, foo.phase_seconds['connect'])
+        self.assertEqual(4.0, foo.phase_seconds['download'])
+        self.assertEqual(20 * mb, foo.phase_bytes['download'])
+        self.assertEqual(5.0, foo.throughput('download'))
+        self.assertEqual(5.0, foo.throughput('upload'))
+        self.assertIsNone(foo.throughput('connect'))
+        self.assertEqual(1, foo.retries)
+        self.assertEqual(12.0, foo.time_to_active)
+        self.assertIsNone(metrics[0].time_to_active)
+
+        summary = self.collector.summary()
+        self.assertTrue('foo - time to active 12.00s, retries 1' in summary)
+        self.assertTrue('bar - time to active n/a, retries 0' in summary)
@@ -0,0 +1,104 @@
+# Copyright (c) 2017 Cable Television Laboratories, Inc. ("CableLabs")
+#                    and others.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from snaps import api_metrics, image_metrics, trace, waiter
+from snaps.openstack import deployment
+from snaps.openstack.deployment import DeploymentGraph
+
+__author__ = 'spisarski'
+
+
+class WaitingCreator:
+    """
+    Creator making an API call and waiting for it without accessing
+    OpenStack
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    def create(self):
+        api_metrics.record_call(api_metrics.SERVICE_COMPUTE, 'servers.create',
+                                time.time(), 0, api_metrics.STATUS_OK, 1)
+        results = [False, True]
+        waiter.wait_for('vm', self.name, lambda: results.pop(0), 10,
+                        backoff=waiter.Backoff(initial_delay=0.01, jitter=0))
+
+    def clean(self):
+        pass
+
+
+class TraceRecorderTests(unittest.TestCase):
+    """
+    Tests the timeline recorded by the TraceRecorder class
+    """
+
+    def setUp(self):
+        self.recorder = trace.TraceRecorder()
+        self.recorder.start()
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        self.recorder.stop()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_deployment(self):
+        """
+        Tests that the waits and API calls of each creator are recorded on
+        its thread inside its span
+        """
+        graph = DeploymentGraph()
+        graph.add(deployment.RES_INSTANCE, 'vm-1', WaitingCreator('vm-1'))
+        graph.add(deployment.RES_INSTANCE, 'vm-2', WaitingCreator('vm-2'))
+        graph.deploy()
+        graph.clean()
+        image_metrics.record_phase('image', image_metrics.PHASE_UPLOAD, 0.5,
+                                   1024)
+
+        path = os.path.join(self.tmp_dir, 'trace.json')
+        self.recorder.write(path)
+        with open(path) as trace_file:
+            events = json.load(trace_file)['traceEvents']
+
+        spans = dict((event['name'], event) for event in events
+                     if event['ph'] == 'X')
+        self.assertEqual(
+            set(['deploy instance vm-1', 'deploy instance vm-2',
+                 'clean instance vm-1', 'clean instance vm-2',
+                 'compute servers.create', 'wait vm vm-1', 'wait vm vm-2',
+                 'upload image image']), set(spans.keys()))
+
+        threads = [event['tid'] for event in events if event['ph'] == 'M']
+        for event in events:
+            self.assertTrue(event['tid'] in threads)
+
+        for name in ('vm-1', 'vm-2'):
+            creator = spans['deploy instance ' + name]
+            wait = spans['wait vm ' + name]
+            self.assertEqual(creator['tid'], wait['tid'])
+            self.assertTrue(creator['ts'] <= wait['ts'])
+            self.assertTrue(wait['ts'] + wait['dur'] <=
+                            creator['ts'] + creator['dur'] + 1)
+            self.assertEqual(1, creator['args']['api_calls'])
+            self.assertTrue(creator['args']['wait_seconds'] > 0)
+            self.assertEqual(2, wait['args']['polls'])
+
+        self.assertEqual(0.5 * 1000000, spans['upload image image']['dur'])
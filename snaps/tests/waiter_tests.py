@@ -0,0 +1,135 @@
+# Copyright (c) 2017 Cable Television Laboratories, Inc. ("CableLabs")
+#                    and others.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import time
+import unittest
+
+from snaps import waiter
+
+__author__ = 'spisarski'
+
+
+class WaiterTests(unittest.TestCase):
+    """
+    Tests the backoff, waits and metrics collector in waiter.py
+    """
+
+    def setUp(self):
+        self.collector = waiter.WaitMetricsCollector()
+        waiter.add_hook(self.collector)
+        self.backoff = waiter.Backoff(initial_delay=0.01, factor=1, jitter=0)
+
+    def tearDown(self):
+        waiter.remove_hook(self.collector)
+        waiter.set_default_backoff(None)
+
+    def test_backoff(self):
+        """
+        Ensures the delays grow by the factor up to the max interval and are
+        spread by the jitter
+        """
+        backoff = waiter.Backoff(initial_delay=1, factor=2, max_interval=5,
+                                 jitter=0)
+        self.assertEqual([1, 2, 4, 5, 5],
+                         [backoff.get_delay(i) for i in range(5)])
+
+        backoff = waiter.Backoff(initial_delay=1, factor=1, jitter=0.5)
+        for i in range(20):
+            delay = backoff.get_delay(i)
+            self.assertTrue(0.5 <= delay <= 1.5)
+
+    def test_default_backoff(self):
+        """
+        Ensures the default backoff never polls less often than the poll
+        interval and can be replaced
+        """
+        backoff = waiter.get_backoff(3)
+        self.assertEqual(3, backoff.max_interval)
+        self.assertEqual(1, backoff.initial_delay)
+        self.assertEqual(0.5, waiter.get_backoff(0.5).initial_delay)
+
+        waiter.set_default_backoff(self.backoff)
+        self.assertEqual(self.backoff, waiter.get_backoff(3))
+
+    def test_wait_for(self):
+        """
+        Ensures a wait polls until the check returns True
+        """
+        results = [False, False, True]
+        self.assertTrue(waiter.wait_for(
+            'vm', 'foo', lambda: results.pop(0), 10, backoff=self.backoff,
+            expected='ACTIVE'))
+
+        metrics = self.collector.get_metrics()
+        self.assertEqual(1, len(metrics))
+        self.assertEqual('vm', metrics[0].resource_type)
+        self.assertEqual(1, metrics[0].waits)
+        self.assertEqual(0, metrics[0].failures)
+        self.assertEqual(3, metrics[0].status_calls)
+
+    def test_wait_for_timeout(self):
+        """
+        Ensures a wait that times out returns False without sleeping beyond
+        its deadline
+        """
+        backoff = waiter.Backoff(initial_delay=10, jitter=0)
+        start = time.time()
+        self.assertFalse(waiter.wait_for(
+            'vm', 'foo', lambda: False, 0.2, backoff=backoff))
+        self.assertTrue(time.time() - start < 5)
+        self.assertEqual(1, self.collector.get_metrics()[0].failures)
+
+    def test_wait_for_no_block(self):
+        """
+        Ensures a wait that does not block calls the check once
+        """
+        calls = list()
+        self.assertFalse(waiter.wait_for(
+            'vm', 'foo', lambda: calls.append(1), 10, block=False))
+        self.assertEqual(1, len(calls))
+
+    def test_wait_for_all(self):
+        """
+        Ensures many resources are polled with one call per interval and
+        that the done, failed and timed out ones are returned
+        """
+        polls = list()
+        statuses = [
+            {'a': 'creating', 'b': 'creating', 'c': 'creating'},
+            {'a': 'available', 'b': 'error', 'c': 'creating'},
+            {'c': 'creating'},
+        ]
+
+        def list_statuses(ids):
+            polls.append(ids)
+            return statuses[min(len(polls), len(statuses)) - 1]
+
+        done, failed, pending = waiter.wait_for_all(
+            'volume', ['a', 'b', 'c', 'd'], list_statuses, 'available', 0.5,
+            is_failed=lambda status: status.startswith('error'),
+            missing_status='available', backoff=self.backoff)
+
+        self.assertEqual(set(['a', 'd']), set(done.keys()))
+        self.assertEqual({'b': 'error'}, failed)
+        self.assertEqual(['c'], pending)
+        self.assertEqual(['a', 'b', 'c', 'd'], polls[0])
+        self.assertEqual(['c'], polls[-1])
+
+        metrics = self.collector.get_metrics()[0]
+        self.assertEqual(len(polls), metrics.status_calls)
+        self.assertEqual(4, metrics.waits)
+        self.assertEqual(2, metrics.failures)
+
+        summary = self.collector.summary()
+        self.assertTrue('volume' in summary)
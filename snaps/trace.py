@@ -0,0 +1,175 @@
+# Copyright (c) 2017 Cable Television Laboratories, Inc. ("CableLabs")
+#                    and others.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import json
+import logging
+import os
+import threading
+import time
+
+from snaps import api_metrics, image_metrics, waiter
+from snaps.openstack import deployment
+
+__author__ = 'spisarski'
+
+"""
+Records the creators deployed and cleaned by deployment graphs, the waits
+for resource statuses, the OpenStack API calls and the image transfer phases
+as a timeline in the Chrome Trace Event format which can be opened with
+chrome://tracing or https://ui.perfetto.dev. Every span is drawn on the
+track of the thread that made it, so the waits and API calls of a creator
+are nested under its span
+"""
+
+logger = logging.getLogger('trace')
+
+CAT_CREATOR = 'creator'
+CAT_WAIT = 'wait'
+CAT_API = 'api'
+CAT_IMAGE = 'image'
+
+
+class TraceRecorder(deployment.DeploymentHook, waiter.WaitHook,
+                    api_metrics.ApiCallHook, image_metrics.ImageMetricsHook):
+    """
+    Hook of the deployment, waiter, api_metrics and image_metrics modules
+    recording each event it receives as a span. The OpenStack clients are
+    only instrumented once start() has been called, so it must be called
+    before the creators are initialized
+    """
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__spans = list()
+        self.__threads = dict()
+
+    def start(self):
+        """
+        Registers this recorder with every module emitting events
+        """
+        deployment.add_hook(self)
+        waiter.add_hook(self)
+        api_metrics.add_hook(self)
+        image_metrics.add_hook(self)
+
+    def stop(self):
+        """
+        Unregisters this recorder from every module emitting events
+        """
+        deployment.remove_hook(self)
+        waiter.remove_hook(self)
+        api_metrics.remove_hook(self)
+        image_metrics.remove_hook(self)
+
+    def on_node(self, action, resource_type, name, start, seconds, error):
+        self.__add(CAT_CREATOR, '%s %s %s' % (action, resource_type, name),
+                   start, seconds, {'action': action,
+                                    'resource_type': resource_type,
+                                    'name': str(name), 'error': error})
+
+    def on_wait(self, resource_type, name, expected, seconds, polls,
+                success):
+        self.__add(CAT_WAIT, 'wait %s %s' % (resource_type, name),
+                   time.time() - seconds, seconds,
+                   {'expected': expected, 'polls': polls,
+                    'success': success})
+
+    def on_call(self, service, operation, start, seconds, status, items):
+        self.__add(CAT_API, '%s %s' % (service, operation), start, seconds,
+                   {'status': status, 'items': items})
+
+    def on_phase(self, image_name, phase, seconds, num_bytes):
+        self.__add(CAT_IMAGE, '%s image %s' % (phase, image_name),
+                   time.time() - seconds, seconds, {'bytes': num_bytes})
+
+    def __add(self, category, name, start, seconds, args):
+        """
+        Records a span on the track of the current thread
+        :param category: the category (i.e. CAT_CREATOR)
+        :param name: the name displayed on the span
+        :param start: the time the span started as returned by time.time()
+        :param seconds: the duration of the span
+        :param args: a dict of values displayed when the span is selected
+        """
+        thread = threading.current_thread()
+        with self.__lock:
+            self.__threads[thread.ident] = thread.name
+            self.__spans.append(
+                (category, name, start, seconds, thread.ident, args))
+
+    def get_events(self):
+        """
+        Returns the recorded spans as trace events where the span of each
+        creator also reports the time its waits took and the number of API
+        calls made on its thread while it ran
+        :return: a list of dicts in the Chrome Trace Event format
+        """
+        with self.__lock:
+            spans = sorted(self.__spans, key=lambda span: (span[2], -span[3]))
+            threads = dict(self.__threads)
+
+        if not spans:
+            return list()
+
+        origin = spans[0][2]
+        pid = os.getpid()
+        events = list()
+        for tid, thread_name in sorted(threads.items()):
+            events.append({'name': 'thread_name', 'ph': 'M', 'pid': pid,
+                           'tid': tid, 'args': {'name': thread_name}})
+
+        for category, name, start, seconds, tid, args in spans:
+            args = dict(args)
+            if category == CAT_CREATOR:
+                end = start + seconds
+                nested = [span for span in spans
+                          if span[4] == tid and span[0] != CAT_CREATOR and
+                          start <= span[2] and span[2] + span[3] <= end]
+                args['wait_seconds'] = self.__get_covered_seconds(
+                    [(span[2], span[2] + span[3]) for span in nested
+                     if span[0] == CAT_WAIT])
+                args['api_calls'] = len(
+                    [span for span in nested if span[0] == CAT_API])
+            events.append({
+                'name': name, 'cat': category, 'ph': 'X', 'pid': pid,
+                'tid': tid, 'ts': round((start - origin) * 1000000, 3),
+                'dur': round(seconds * 1000000, 3), 'args': args})
+        return events
+
+    def __get_covered_seconds(self, intervals):
+        """
+        Returns the time covered by intervals that may overlap such as the
+        waits for each volume of a group
+        :param intervals: a list of (start, end) tuples
+        :return: the seconds
+        """
+        out = 0
+        covered_to = None
+        for start, end in sorted(intervals):
+            if covered_to is not None:
+                start = max(start, covered_to)
+            if end > start:
+                out += end - start
+                covered_to = end
+        return out
+
+    def write(self, path):
+        """
+        Writes the trace file
+        :param path: the path to the JSON file
+        """
+        with open(path, 'w') as trace_file:
+            json.dump({'traceEvents': self.get_events(),
+                       'displayTimeUnit': 'ms'}, trace_file)
+        logger.info('Trace written to %s', path)
@@ -0,0 +1,387 @@
+# Copyright (c) 2017 Cable Television Laboratories, Inc. ("CableLabs")
+#                    and others.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import logging
+import random
+import time
+
+from snaps import hooks
+
+__author__ = 'spisarski'
+
+"""
+Waits for resources to reach a status with a pluggable backoff between polls
+and a deadline. Many resources of the same type can be waited upon with one
+list call per poll and every wait is reported to the hooks registered with
+add_hook()
+"""
+
+logger = logging.getLogger('waiter')
+
+POLL_INTERVAL = 3
+DEFAULT_INITIAL_DELAY = 1
+DEFAULT_FACTOR = 1.5
+DEFAULT_JITTER = 0.1
+
+__hooks = hooks.HookRegistry()
+__default_backoff = None
+
+
+class Backoff:
+    """
+    The delays between polls, starting at initial_delay and growing by factor
+    up to max_interval. Each delay is randomly spread by +/- jitter so
+    concurrent waits do not poll in lock step
+    """
+
+    def __init__(self, initial_delay=DEFAULT_INITIAL_DELAY,
+                 factor=DEFAULT_FACTOR, max_interval=None,
+                 jitter=DEFAULT_JITTER):
+        """
+        Constructor
+        :param initial_delay: the seconds to wait after the first poll
+                              (default 1)
+        :param factor: the growth of the delay after each poll where 1 keeps
+                       a fixed interval (default 1.5)
+        :param max_interval: the longest delay in seconds (optional)
+        :param jitter: the ratio by which each delay is randomly spread
+                       (default 0.1)
+        """
+        self.initial_delay = initial_delay
+        self.factor = factor
+        self.max_interval = max_interval
+        self.jitter = jitter
+
+    def get_delay(self, attempt):
+        """
+        Returns the seconds to wait after a poll
+        :param attempt: the number of polls made before the last one
+        :return: the delay in seconds
+        """
+        delay = self.initial_delay * (self.factor ** attempt)
+        if self.max_interval is not None:
+            delay = min(delay, self.max_interval)
+        if self.jitter:
+            delay *= 1 + random.uniform(-self.jitter, self.jitter)
+        return max(0, delay)
+
+
+class Deadline:
+    """
+    The point in time at which a wait times out
+    """
+
+    def __init__(self, timeout):
+        """
+        Constructor
+        :param timeout: the number of seconds from now
+        """
+        self.timeout = timeout
+        self.start = time.time()
+
+    def elapsed(self):
+        """
+        Returns the seconds since the deadline was created
+        """
+        return time.time() - self.start
+
+    def remaining(self):
+        """
+        Returns the seconds left before the deadline
+        """
+        return max(0, self.timeout - self.elapsed())
+
+    def expired(self):
+        """
+        Returns True once the deadline has passed
+        """
+        return self.remaining() <= 0
+
+    def sleep(self, delay):
+        """
+        Sleeps for the delay without going beyond the deadline
+        :param delay: the seconds to sleep
+        """
+        time.sleep(min(delay, self.remaining()))
+
+
+def set_default_backoff(backoff):
+    """
+    Sets the backoff used by every wait that is not given one
+    :param backoff: the Backoff object or None to restore the default of
+                    get_backoff()
+    """
+    global __default_backoff
+    __default_backoff = backoff
+
+
+def get_backoff(poll_interval=POLL_INTERVAL):
+    """
+    Returns the backoff of a wait that is not given one, which is the one set
+    with set_default_backoff() else one starting at DEFAULT_INITIAL_DELAY and
+    growing up to poll_interval
+    :param poll_interval: the longest delay in seconds
+    :return: the Backoff object
+    """
+    if __default_backoff:
+        return __default_backoff
+    return Backoff(initial_delay=min(DEFAULT_INITIAL_DELAY, poll_interval),
+                   max_interval=poll_interval)
+
+
+def wait_for(resource_type, name, check, timeout, block=True,
+             poll_interval=POLL_INTERVAL, backoff=None, expected=None):
+    """
+    Calls check until it returns True or the timeout has been exceeded
+    :param resource_type: the type of the resource reported to the hooks
+                          (i.e. 'vm')
+    :param name: the name of the resource
+    :param check: the function returning T/F where any error it raises ends
+                  the wait and is raised to the caller
+    :param timeout: the timeout value in seconds
+    :param block: when False, check is only called once
+    :param poll_interval: the longest delay in seconds when backoff is None
+    :param backoff: the Backoff object (optional)
+    :param expected: the status being waited for (optional)
+    :return: T/F
+    """
+    if not block:
+        record_poll(resource_type, 1)
+        return check()
+
+    backoff = backoff or get_backoff(poll_interval)
+    deadline = Deadline(timeout)
+    polls = 0
+    success = False
+    try:
+        while True:
+            polls += 1
+            record_poll(resource_type, 1)
+            if check():
+                success = True
+                return True
+
+            if deadline.expired():
+                break
+
+            delay = backoff.get_delay(polls - 1)
+            logger.debug('Retry querying %s %s in %.1f seconds',
+                         resource_type, name, delay)
+            deadline.sleep(delay)
+
+        logger.error('Timeout waiting for %s %s to be %s', resource_type,
+                     name, expected)
+        return False
+    finally:
+        record_wait(resource_type, name, expected, deadline.elapsed(), polls,
+                    success)
+
+
+def wait_for_all(resource_type, ids, list_statuses, expected, timeout,
+                 is_failed=None, missing_status=None, names=None,
+                 poll_interval=POLL_INTERVAL, backoff=None):
+    """
+    Waits for many resources of one type with one call to list_statuses per
+    poll rather than one call per resource
+    :param resource_type: the type of the resources reported to the hooks
+    :param ids: the IDs of the resources
+    :param list_statuses: the function called with the list of pending IDs
+                          returning a dict of their statuses keyed by ID
+    :param expected: the status to wait for
+    :param timeout: the timeout value in seconds
+    :param is_failed: the function called with a status returning True when
+                      the resource has failed (optional)
+    :param missing_status: the status of the IDs missing from the result of
+                           list_statuses (default None keeps waiting)
+    :param names: a dict of names keyed by ID used for logging and the hooks
+    :param poll_interval: the longest delay in seconds when backoff is None
+    :param backoff: the Backoff object (optional)
+    :return: a tuple 3 where index 0 is a dict of the times (as returned by
+             time.time()) at which each resource reached the expected status
+             keyed by ID, index 1 is a dict of the statuses of the failed
+             resources keyed by ID and index 2 is the list of IDs still
+             pending at the timeout
+    """
+    names = names or dict()
+    backoff = backoff or get_backoff(poll_interval)
+    deadline = Deadline(timeout)
+    pending = list(ids)
+    done = dict()
+    failed = dict()
+    polls = 0
+
+    while pending:
+        polls += 1
+        record_poll(resource_type, len(pending))
+        statuses = list_statuses(list(pending))
+        now = time.time()
+        for res_id in list(pending):
+            status = statuses.get(res_id, missing_status)
+            if status == expected:
+                done[res_id] = now
+            elif status is not None and is_failed and is_failed(status):
+                logger.error('%s %s has status %s', resource_type,
+                             names.get(res_id, res_id), status)
+                failed[res_id] = status
+            else:
+                continue
+
+            pending.remove(res_id)
+            record_wait(resource_type, names.get(res_id, res_id), expected,
+                        now - deadline.start, polls, res_id in done)
+
+        if not pending or deadline.expired():
+            break
+
+        delay = backoff.get_delay(polls - 1)
+        logger.debug('Retry querying %s %s statuses in %.1f seconds',
+                     len(pending), resource_type, delay)
+        deadline.sleep(delay)
+
+    if pending:
+        logger.error('Timeout waiting for %s %s to be %s', len(pending),
+                     resource_type, expected)
+        for res_id in pending:
+            record_wait(resource_type, names.get(res_id, res_id), expected,
+                        deadline.elapsed(), polls, False)
+
+    return done, failed, pending
+
+
+def add_hook(hook):
+    """
+    Registers a hook to be notified of waits
+    :param hook: a WaitHook object
+    """
+    __hooks.add(hook)
+
+
+def remove_hook(hook):
+    """
+    Unregisters a hook added with add_hook()
+    :param hook: the WaitHook object
+    """
+    __hooks.remove(hook)
+
+
+def record_poll(resource_type, num_resources):
+    """
+    Notifies the hooks that a status call has been made
+    :param resource_type: the type of the resources
+    :param num_resources: the number of resources the call polled
+    """
+    __hooks.notify('on_poll', resource_type, num_resources)
+
+
+def record_wait(resource_type, name, expected, seconds, polls, success):
+    """
+    Notifies the hooks that a wait has ended
+    :param resource_type: the type of the resource
+    :param name: the name of the resource
+    :param expected: the status waited for
+    :param seconds: the time spent waiting
+    :param polls: the number of status calls made during the wait
+    :param success: False when the wait timed out or failed
+    """
+    __hooks.notify('on_wait', resource_type, name, expected, seconds, polls,
+                   success)
+
+
+class WaitHook:
+    """
+    Base class for objects receiving wait events. Implementations must be
+    thread safe as resources are waited upon from several threads
+    """
+
+    def on_poll(self, resource_type, num_resources):
+        """
+        Called when a status call has been made
+        """
+        pass
+
+    def on_wait(self, resource_type, name, expected, seconds, polls,
+                success):
+        """
+        Called when a wait has ended
+        """
+        pass
+
+
+class WaitMetrics:
+    """
+    The metrics collected for a single resource type
+    """
+
+    def __init__(self, resource_type):
+        """
+        Constructor
+        :param resource_type: the type of resource
+        """
+        self.resource_type = resource_type
+        self.waits = 0
+        self.failures = 0
+        self.total_seconds = 0
+        self.max_seconds = 0
+        self.status_calls = 0
+        self.resources_polled = 0
+
+    def average_seconds(self):
+        """
+        Returns the average time of a wait or None when there were none
+        :return: a float or None
+        """
+        if self.waits:
+            return self.total_seconds / float(self.waits)
+
+
+class WaitMetricsCollector(WaitHook, hooks.MetricsCollector):
+    """
+    Hook accumulating the WaitMetrics of each resource type in memory
+    """
+
+    def __init__(self):
+        hooks.MetricsCollector.__init__(self, WaitMetrics, logger)
+
+    def on_poll(self, resource_type, num_resources):
+        with self._lock:
+            metrics = self._get(resource_type)
+            metrics.status_calls += 1
+            metrics.resources_polled += num_resources
+
+    def on_wait(self, resource_type, name, expected, seconds, polls,
+                success):
+        with self._lock:
+            metrics = self._get(resource_type)
+            metrics.waits += 1
+            if not success:
+                metrics.failures += 1
+            metrics.total_seconds += seconds
+            metrics.max_seconds = max(metrics.max_seconds, seconds)
+
+    def summary(self):
+        """
+        Returns a human readable table of the collected metrics
+        :return: the string
+        """
+        lines = ['Wait metrics:']
+        for metrics in self.get_metrics():
+            average = 'n/a'
+            if metrics.waits:
+                average = '%.2fs' % metrics.average_seconds()
+            lines.append(
+                '  %-16s waits %4d, failed %3d, avg %8s, max %8.2fs, status '
+                'calls %5d' % (
+                    metrics.resource_type, metrics.waits, metrics.failures,
+                    average, metrics.max_seconds, metrics.status_calls))
+        return '\n'.join(lines)